@@ -0,0 +1,23 @@
+"""add keyset pagination index on loads
+
+Revision ID: 20261018_01
+Revises: add_safety_tolls_vendors
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_01'
+down_revision = 'add_safety_tolls_vendors'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_loads_carrier_created_id', 'loads', ['carrier_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_loads_carrier_created_id', table_name='loads')
@@ -0,0 +1,53 @@
+"""add parsed location columns to loads and index load stop locations
+
+Revision ID: 20261018_02
+Revises: 20261018_01
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_02'
+down_revision = '20261018_01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for prefix in ('pickup', 'delivery'):
+        op.add_column('loads', sa.Column(f'{prefix}_city', sa.String(100), nullable=True))
+        op.add_column('loads', sa.Column(f'{prefix}_state', sa.String(20), nullable=True))
+        op.add_column('loads', sa.Column(f'{prefix}_zip', sa.String(20), nullable=True))
+        op.add_column('loads', sa.Column(f'{prefix}_latitude', sa.Float(), nullable=True))
+        op.add_column('loads', sa.Column(f'{prefix}_longitude', sa.Float(), nullable=True))
+        op.create_index(f'ix_loads_{prefix}_city', 'loads', [f'{prefix}_city'], unique=False)
+        op.create_index(f'ix_loads_{prefix}_state', 'loads', [f'{prefix}_state'], unique=False)
+
+    op.create_index(
+        'ix_loads_lane', 'loads',
+        ['carrier_id', 'pickup_state', 'pickup_city', 'delivery_state', 'delivery_city'],
+        unique=False,
+    )
+
+    op.create_index('ix_load_stops_city', 'load_stops', ['city'], unique=False)
+    op.create_index('ix_load_stops_state', 'load_stops', ['state'], unique=False)
+    op.create_index('ix_load_stops_zip_code', 'load_stops', ['zip_code'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_load_stops_zip_code', table_name='load_stops')
+    op.drop_index('ix_load_stops_state', table_name='load_stops')
+    op.drop_index('ix_load_stops_city', table_name='load_stops')
+    op.drop_index('ix_loads_lane', table_name='loads')
+
+    for prefix in ('pickup', 'delivery'):
+        op.drop_index(f'ix_loads_{prefix}_state', table_name='loads')
+        op.drop_index(f'ix_loads_{prefix}_city', table_name='loads')
+        op.drop_column('loads', f'{prefix}_longitude')
+        op.drop_column('loads', f'{prefix}_latitude')
+        op.drop_column('loads', f'{prefix}_zip')
+        op.drop_column('loads', f'{prefix}_state')
+        op.drop_column('loads', f'{prefix}_city')
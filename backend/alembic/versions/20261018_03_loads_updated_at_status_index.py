@@ -0,0 +1,27 @@
+"""add loads.updated_at and carrier/status index for dispatch stats
+
+Revision ID: 20261018_03
+Revises: 20261018_02
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_03'
+down_revision = '20261018_02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('loads', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE loads SET updated_at = created_at WHERE updated_at IS NULL")
+    op.create_index('ix_loads_carrier_status', 'loads', ['carrier_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_loads_carrier_status', table_name='loads')
+    op.drop_column('loads', 'updated_at')
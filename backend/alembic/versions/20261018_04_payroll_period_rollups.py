@@ -0,0 +1,49 @@
+"""add payroll_period_rollups table
+
+Revision ID: 20261018_04
+Revises: 20261018_03
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_04'
+down_revision = '20261018_03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'payroll_period_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('settlement_id', sa.Integer(), nullable=False),
+        sa.Column('carrier_id', sa.Integer(), nullable=False),
+        sa.Column('payee_id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('period_end', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('line_count', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['settlement_id'], ['payroll_settlements.id']),
+        sa.ForeignKeyConstraint(['carrier_id'], ['carriers.id']),
+        sa.ForeignKeyConstraint(['payee_id'], ['payees.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_payroll_period_rollups_id', 'payroll_period_rollups', ['id'], unique=False)
+    op.create_index('ix_payroll_period_rollups_settlement_id', 'payroll_period_rollups', ['settlement_id'], unique=False)
+    op.create_index('ix_payroll_period_rollups_payee_id', 'payroll_period_rollups', ['payee_id'], unique=False)
+    op.create_index('ix_payroll_rollups_carrier_period', 'payroll_period_rollups', ['carrier_id', 'period_start'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_payroll_rollups_carrier_period', table_name='payroll_period_rollups')
+    op.drop_index('ix_payroll_period_rollups_payee_id', table_name='payroll_period_rollups')
+    op.drop_index('ix_payroll_period_rollups_settlement_id', table_name='payroll_period_rollups')
+    op.drop_index('ix_payroll_period_rollups_id', table_name='payroll_period_rollups')
+    op.drop_table('payroll_period_rollups')
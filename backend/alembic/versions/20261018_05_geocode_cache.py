@@ -0,0 +1,42 @@
+"""add geocode_cache table
+
+Revision ID: 20261018_05
+Revises: 20261018_04
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_05'
+down_revision = '20261018_04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'geocode_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('address_key', sa.String(length=500), nullable=False),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('found', sa.Boolean(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('formatted_address', sa.String(length=500), nullable=True),
+        sa.Column('place_type', sa.String(length=200), nullable=True),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_geocode_cache_id', 'geocode_cache', ['id'], unique=False)
+    op.create_index('ix_geocode_cache_address_key', 'geocode_cache', ['address_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_geocode_cache_address_key', table_name='geocode_cache')
+    op.drop_index('ix_geocode_cache_id', table_name='geocode_cache')
+    op.drop_table('geocode_cache')
@@ -0,0 +1,42 @@
+"""add route_leg_cache table
+
+Revision ID: 20261018_06
+Revises: 20261018_05
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_06'
+down_revision = '20261018_05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'route_leg_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('leg_key', sa.String(length=100), nullable=False),
+        sa.Column('profile', sa.String(length=50), nullable=False),
+        sa.Column('origin_longitude', sa.Float(), nullable=False),
+        sa.Column('origin_latitude', sa.Float(), nullable=False),
+        sa.Column('destination_longitude', sa.Float(), nullable=False),
+        sa.Column('destination_latitude', sa.Float(), nullable=False),
+        sa.Column('distance_meters', sa.Float(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_route_leg_cache_id', 'route_leg_cache', ['id'], unique=False)
+    op.create_index('ix_route_leg_cache_leg_key', 'route_leg_cache', ['leg_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_route_leg_cache_leg_key', table_name='route_leg_cache')
+    op.drop_index('ix_route_leg_cache_id', table_name='route_leg_cache')
+    op.drop_table('route_leg_cache')
@@ -0,0 +1,38 @@
+"""add OCR job status columns to load_extractions
+
+Revision ID: 20261018_07
+Revises: 20261018_06
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_07'
+down_revision = '20261018_06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('load_extractions', sa.Column('status', sa.String(length=20), nullable=False, server_default='completed'))
+    op.add_column('load_extractions', sa.Column('job_id', sa.String(length=32), nullable=True))
+    op.add_column('load_extractions', sa.Column('error', sa.Text(), nullable=True))
+    op.add_column('load_extractions', sa.Column('page_count', sa.Integer(), nullable=True))
+    op.add_column('load_extractions', sa.Column('ocr_pages', sa.Integer(), nullable=True))
+    op.add_column('load_extractions', sa.Column('duration_ms', sa.Integer(), nullable=True))
+    op.add_column('load_extractions', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_load_extractions_job_id', 'load_extractions', ['job_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_load_extractions_job_id', table_name='load_extractions')
+    op.drop_column('load_extractions', 'completed_at')
+    op.drop_column('load_extractions', 'duration_ms')
+    op.drop_column('load_extractions', 'ocr_pages')
+    op.drop_column('load_extractions', 'page_count')
+    op.drop_column('load_extractions', 'error')
+    op.drop_column('load_extractions', 'job_id')
+    op.drop_column('load_extractions', 'status')
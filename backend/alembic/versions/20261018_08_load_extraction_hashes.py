@@ -0,0 +1,53 @@
+"""add content hashes and parsed fields to load_extractions
+
+Revision ID: 20261018_08
+Revises: 20261018_07
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_08'
+down_revision = '20261018_07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('load_extractions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('carrier_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('source', sa.String(length=30), nullable=False, server_default='auto_create'))
+        batch_op.add_column(sa.Column('parsed_fields', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('file_hashes', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('duplicate_of_id', sa.Integer(), nullable=True))
+        batch_op.alter_column('load_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.create_foreign_key('fk_load_extractions_carrier', 'carriers', ['carrier_id'], ['id'])
+        batch_op.create_foreign_key('fk_load_extractions_duplicate_of', 'load_extractions', ['duplicate_of_id'], ['id'])
+        batch_op.create_index('ix_load_extractions_carrier_id', ['carrier_id'], unique=False)
+        batch_op.create_index('ix_load_extractions_carrier_hash', ['carrier_id', 'content_hash'], unique=False)
+
+    op.execute(
+        "UPDATE load_extractions SET carrier_id = "
+        "(SELECT loads.carrier_id FROM loads WHERE loads.id = load_extractions.load_id) "
+        "WHERE carrier_id IS NULL"
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM load_extractions WHERE load_id IS NULL")
+    with op.batch_alter_table('load_extractions', schema=None) as batch_op:
+        batch_op.drop_index('ix_load_extractions_carrier_hash')
+        batch_op.drop_index('ix_load_extractions_carrier_id')
+        batch_op.drop_constraint('fk_load_extractions_duplicate_of', type_='foreignkey')
+        batch_op.drop_constraint('fk_load_extractions_carrier', type_='foreignkey')
+        batch_op.alter_column('load_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('duplicate_of_id')
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('file_hashes')
+        batch_op.drop_column('parsed_fields')
+        batch_op.drop_column('source')
+        batch_op.drop_column('carrier_id')
@@ -0,0 +1,28 @@
+"""add external_id (Motive driver id) to drivers
+
+Revision ID: 20261018_09
+Revises: 20261018_08
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_09'
+down_revision = '20261018_08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('drivers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('external_id', sa.String(length=100), nullable=True))
+        batch_op.create_index('ix_drivers_external_id', ['external_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('drivers', schema=None) as batch_op:
+        batch_op.drop_index('ix_drivers_external_id')
+        batch_op.drop_column('external_id')
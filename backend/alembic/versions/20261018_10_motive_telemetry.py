@@ -0,0 +1,79 @@
+"""add motive telemetry events and latest state tables
+
+Revision ID: 20261018_10
+Revises: 20261018_09
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_10'
+down_revision = '20261018_09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'motive_telemetry_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('carrier_id', sa.Integer(), nullable=True),
+        sa.Column('driver_id', sa.Integer(), nullable=True),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('driver_external_id', sa.String(length=100), nullable=True),
+        sa.Column('vehicle_external_id', sa.String(length=100), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['carrier_id'], ['carriers.id']),
+        sa.ForeignKeyConstraint(['driver_id'], ['drivers.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_motive_telemetry_events_id', 'motive_telemetry_events', ['id'], unique=False)
+    op.create_index('ix_motive_telemetry_events_carrier_id', 'motive_telemetry_events', ['carrier_id'], unique=False)
+    op.create_index('ix_motive_events_driver_time', 'motive_telemetry_events', ['driver_id', 'occurred_at'], unique=False)
+    op.create_index('ix_motive_events_vehicle_time', 'motive_telemetry_events', ['vehicle_external_id', 'occurred_at'], unique=False)
+
+    op.create_table(
+        'motive_latest_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('external_id', sa.String(length=100), nullable=False),
+        sa.Column('carrier_id', sa.Integer(), nullable=True),
+        sa.Column('driver_id', sa.Integer(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('speed', sa.Float(), nullable=True),
+        sa.Column('heading', sa.Integer(), nullable=True),
+        sa.Column('address', sa.String(length=500), nullable=True),
+        sa.Column('located_at', sa.DateTime(), nullable=True),
+        sa.Column('hos_status', sa.String(length=50), nullable=True),
+        sa.Column('hos', sa.JSON(), nullable=True),
+        sa.Column('hos_updated_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['carrier_id'], ['carriers.id']),
+        sa.ForeignKeyConstraint(['driver_id'], ['drivers.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_motive_latest_state_id', 'motive_latest_state', ['id'], unique=False)
+    op.create_index('ix_motive_latest_state_carrier_id', 'motive_latest_state', ['carrier_id'], unique=False)
+    op.create_index('ix_motive_latest_state_driver_id', 'motive_latest_state', ['driver_id'], unique=False)
+    op.create_index('ix_motive_latest_state_entity', 'motive_latest_state', ['entity_type', 'external_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_motive_latest_state_entity', table_name='motive_latest_state')
+    op.drop_index('ix_motive_latest_state_driver_id', table_name='motive_latest_state')
+    op.drop_index('ix_motive_latest_state_carrier_id', table_name='motive_latest_state')
+    op.drop_index('ix_motive_latest_state_id', table_name='motive_latest_state')
+    op.drop_table('motive_latest_state')
+    op.drop_index('ix_motive_events_vehicle_time', table_name='motive_telemetry_events')
+    op.drop_index('ix_motive_events_driver_time', table_name='motive_telemetry_events')
+    op.drop_index('ix_motive_telemetry_events_carrier_id', table_name='motive_telemetry_events')
+    op.drop_index('ix_motive_telemetry_events_id', table_name='motive_telemetry_events')
+    op.drop_table('motive_telemetry_events')
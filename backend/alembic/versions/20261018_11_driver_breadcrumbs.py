@@ -0,0 +1,44 @@
+"""add driver_breadcrumbs table
+
+Revision ID: 20261018_11
+Revises: 20261018_10
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_11'
+down_revision = '20261018_10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'driver_breadcrumbs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('carrier_id', sa.Integer(), nullable=False),
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('point_count', sa.Integer(), nullable=False),
+        sa.Column('start_at', sa.DateTime(), nullable=False),
+        sa.Column('end_at', sa.DateTime(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['carrier_id'], ['carriers.id']),
+        sa.ForeignKeyConstraint(['driver_id'], ['drivers.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_driver_breadcrumbs_id', 'driver_breadcrumbs', ['id'], unique=False)
+    op.create_index('ix_driver_breadcrumbs_carrier_id', 'driver_breadcrumbs', ['carrier_id'], unique=False)
+    op.create_index('ix_driver_breadcrumbs_driver_day', 'driver_breadcrumbs', ['driver_id', 'day'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_driver_breadcrumbs_driver_day', table_name='driver_breadcrumbs')
+    op.drop_index('ix_driver_breadcrumbs_carrier_id', table_name='driver_breadcrumbs')
+    op.drop_index('ix_driver_breadcrumbs_id', table_name='driver_breadcrumbs')
+    op.drop_table('driver_breadcrumbs')
@@ -0,0 +1,28 @@
+"""add source to ifta_entries
+
+Revision ID: 20261018_12
+Revises: 20261018_11
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_12'
+down_revision = '20261018_11'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ifta_entries', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source', sa.String(length=20), nullable=False, server_default='manual'))
+        batch_op.create_index('ix_ifta_entries_report_source', ['report_id', 'source'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ifta_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_ifta_entries_report_source')
+        batch_op.drop_column('source')
@@ -0,0 +1,42 @@
+"""add broker_authority_cache table
+
+Revision ID: 20261018_13
+Revises: 20261018_12
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_13'
+down_revision = '20261018_12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'broker_authority_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lookup_key', sa.String(length=60), nullable=False),
+        sa.Column('found', sa.Boolean(), nullable=False),
+        sa.Column('legal_name', sa.String(length=200), nullable=True),
+        sa.Column('dot_number', sa.String(length=50), nullable=True),
+        sa.Column('mc_number', sa.String(length=50), nullable=True),
+        sa.Column('is_broker', sa.Boolean(), nullable=False),
+        sa.Column('operating_status', sa.String(length=50), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_broker_authority_cache_id', 'broker_authority_cache', ['id'], unique=False)
+    op.create_index('ix_broker_authority_cache_lookup_key', 'broker_authority_cache', ['lookup_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_broker_authority_cache_lookup_key', table_name='broker_authority_cache')
+    op.drop_index('ix_broker_authority_cache_id', table_name='broker_authority_cache')
+    op.drop_table('broker_authority_cache')
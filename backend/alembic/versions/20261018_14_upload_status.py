@@ -0,0 +1,38 @@
+"""add per-file upload status to pods and document_exchange
+
+Revision ID: 20261018_14
+Revises: 20261018_13
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_14'
+down_revision = '20261018_13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pods', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_status', sa.String(length=20), nullable=False, server_default='completed'))
+        batch_op.add_column(sa.Column('file_status', sa.JSON(), nullable=True))
+
+    with op.batch_alter_table('document_exchange', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('filename', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('upload_status', sa.String(length=20), nullable=False, server_default='completed'))
+        batch_op.add_column(sa.Column('upload_error', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('document_exchange', schema=None) as batch_op:
+        batch_op.drop_column('upload_error')
+        batch_op.drop_column('upload_status')
+        batch_op.drop_column('filename')
+
+    with op.batch_alter_table('pods', schema=None) as batch_op:
+        batch_op.drop_column('file_status')
+        batch_op.drop_column('upload_status')
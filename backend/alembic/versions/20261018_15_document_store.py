@@ -0,0 +1,63 @@
+"""add document_blobs and stored_documents tables
+
+Revision ID: 20261018_15
+Revises: 20261018_14
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_15'
+down_revision = '20261018_14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'document_blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('backend', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_document_blobs_id', 'document_blobs', ['id'], unique=False)
+    op.create_index('ix_document_blobs_sha256', 'document_blobs', ['sha256'], unique=True)
+
+    op.create_table(
+        'stored_documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('carrier_id', sa.Integer(), nullable=False),
+        sa.Column('load_id', sa.Integer(), nullable=True),
+        sa.Column('blob_id', sa.Integer(), nullable=False),
+        sa.Column('doc_type', sa.String(length=50), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('uploaded_by_user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['carrier_id'], ['carriers.id']),
+        sa.ForeignKeyConstraint(['load_id'], ['loads.id']),
+        sa.ForeignKeyConstraint(['blob_id'], ['document_blobs.id']),
+        sa.ForeignKeyConstraint(['uploaded_by_user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_stored_documents_id', 'stored_documents', ['id'], unique=False)
+    op.create_index('ix_stored_documents_carrier_id', 'stored_documents', ['carrier_id'], unique=False)
+    op.create_index('ix_stored_documents_load_id', 'stored_documents', ['load_id'], unique=False)
+    op.create_index('ix_stored_documents_blob_id', 'stored_documents', ['blob_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_stored_documents_blob_id', table_name='stored_documents')
+    op.drop_index('ix_stored_documents_load_id', table_name='stored_documents')
+    op.drop_index('ix_stored_documents_carrier_id', table_name='stored_documents')
+    op.drop_index('ix_stored_documents_id', table_name='stored_documents')
+    op.drop_table('stored_documents')
+    op.drop_index('ix_document_blobs_sha256', table_name='document_blobs')
+    op.drop_index('ix_document_blobs_id', table_name='document_blobs')
+    op.drop_table('document_blobs')
@@ -0,0 +1,37 @@
+"""key motive_latest_state by carrier
+
+Revision ID: 20261018_16
+Revises: 20261018_15
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_16'
+down_revision = '20261018_15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_motive_latest_state_entity', table_name='motive_latest_state')
+    # Rows without a carrier came from the unscoped webhook; the next events rebuild them
+    op.execute("DELETE FROM motive_latest_state WHERE carrier_id IS NULL")
+    op.alter_column('motive_latest_state', 'carrier_id', existing_type=sa.Integer(), nullable=False)
+    op.create_index('ix_motive_latest_state_entity', 'motive_latest_state',
+                    ['carrier_id', 'entity_type', 'external_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_motive_latest_state_entity', table_name='motive_latest_state')
+    # Keep the newest row per entity so the unscoped unique index can be rebuilt
+    op.execute(
+        "DELETE FROM motive_latest_state WHERE id NOT IN ("
+        "SELECT MAX(id) FROM motive_latest_state GROUP BY entity_type, external_id)"
+    )
+    op.alter_column('motive_latest_state', 'carrier_id', existing_type=sa.Integer(), nullable=True)
+    op.create_index('ix_motive_latest_state_entity', 'motive_latest_state',
+                    ['entity_type', 'external_id'], unique=True)
@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +11,88 @@ class Settings(BaseSettings):
     DEBUG: bool = False
 
     DATABASE_URL: str = "sqlite:///./app.db"
+
+    # Connection pool ("queue" keeps connections open per worker, "null" opens one per request)
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Seconds the dispatch board stats stay cached per carrier
+    DISPATCH_STATS_CACHE_TTL: int = 5
+
+    # Threads for in-process background jobs (batch settlements, recalculation, ...)
+    BACKGROUND_JOB_WORKERS: int = 4
+
+    # Rate-con OCR: processes in the page OCR pool and render resolution
+    OCR_WORKERS: int = 2
+    OCR_DPI: int = 200
+
+    # Batch invoice PDFs: processes in the render pool (batches smaller than
+    # INVOICE_RENDER_MIN_BATCH render in the request process)
+    INVOICE_RENDER_WORKERS: int = 2
+    INVOICE_RENDER_MIN_BATCH: int = 8
+
+    # POD PDFs: pages rendering at once in the shared headless browser, renders
+    # per page before it is replaced, and per-render timeout in seconds
+    PDF_BROWSER_MAX_PAGES: int = 4
+    PDF_BROWSER_PAGE_REUSE: int = 50
+    PDF_BROWSER_RENDER_TIMEOUT: float = 30.0
+
+    # Outbound HTTP (shared by all integrations; rate limits are set per provider)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_MAX_RETRIES: int = 2
+    HTTP_BACKOFF_BASE: float = 0.25
+    HTTP_BACKOFF_MAX: float = 8.0
+    HTTP_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    HTTP_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # Geocode cache: in-process LRU in front of the geocode_cache table
+    GEOCODE_CACHE_SIZE: int = 10000
+    GEOCODE_CACHE_TTL: int = 86400
+    GEOCODE_CACHE_MAX_AGE_DAYS: int = 180
+    GEOCODE_CACHE_NEGATIVE_MAX_AGE_DAYS: int = 7
+
+    # Route leg cache: distances/durations keyed by rounded coordinate pairs
+    ROUTE_CACHE_SIZE: int = 20000
+    ROUTE_CACHE_TTL: int = 86400
+    ROUTE_CACHE_MAX_AGE_DAYS: int = 90
+    ROUTE_CACHE_PRECISION: int = 4  # decimal places, ~11 m
+
+    # Motive fleet locations: snapshot served fresh for TTL seconds, then stale while
+    # refreshing in the background, and refetched in the request after MAX_AGE
+    MOTIVE_LOCATION_SNAPSHOT_TTL: int = 30
+    MOTIVE_LOCATION_SNAPSHOT_MAX_AGE: int = 600
+    MOTIVE_LOCATION_CONCURRENCY: int = 8
+    MOTIVE_LOCATION_DEADLINE: float = 3.0  # hard deadline per driver call in the per-driver fallback (no retries)
+
+    # Motive webhooks: events per write transaction, events held in memory before rejecting and
+    # seconds between writes of a batch held through a database outage. SECRETS maps carrier id
+    # to the secret that signs its X-KT-Webhook-Signature (JSON, e.g. {"1": "..."}); webhooks
+    # are refused until one is set
+    MOTIVE_WEBHOOK_BATCH_SIZE: int = 500
+    MOTIVE_WEBHOOK_QUEUE_SIZE: int = 50000
+    MOTIVE_WEBHOOK_RETRY_SECONDS: float = 5.0
+    MOTIVE_WEBHOOK_SECRETS: Dict[int, str] = {}
+
+    # IFTA mileage: GeoJSON of jurisdiction boundaries (empty = app/data/ifta_jurisdictions.geojson)
+    # and the spatial index grid cell size in degrees
+    IFTA_BOUNDARIES_PATH: str = ""
+    IFTA_GRID_DEGREES: float = 0.1
+    
+    # FMCSA broker authority cache: entries are fresh for TTL, then served stale while a
+    # background lookup refreshes them, and refetched in the request after MAX_AGE.
+    # The refresher re-checks brokers on loads touched in the last RECENT_DAYS (0 = off).
+    FMCSA_CACHE_TTL_HOURS: int = 24
+    FMCSA_CACHE_NEGATIVE_TTL_HOURS: int = 6
+    FMCSA_CACHE_MAX_AGE_DAYS: int = 30
+    FMCSA_CONCURRENCY: int = 4
+    FMCSA_REFRESH_INTERVAL_MINUTES: int = 60
+    FMCSA_REFRESH_RECENT_DAYS: int = 30
     
     # PostgreSQL settings (for Docker)
     POSTGRES_DB: str = "fleetflow"
@@ -27,10 +110,26 @@ class Settings(BaseSettings):
 
     DROPBOX_ACCESS_TOKEN: str = ""
     DROPBOX_ROOT_FOLDER: str = "/FleetFlow"
+    # Files larger than one chunk go through upload sessions, one chunk in memory per file
+    DROPBOX_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    DROPBOX_UPLOAD_CONCURRENCY: int = 4
+
+    # Uploaded load documents: storage backend ("local" = content-addressed files under
+    # DOCUMENT_STORAGE_PATH) and the read/write chunk size
+    DOCUMENT_STORAGE_BACKEND: str = "local"
+    DOCUMENT_STORAGE_PATH: str = "storage/documents"
+    DOCUMENT_STORAGE_CHUNK_SIZE: int = 1024 * 1024
 
     GOOGLE_MAPS_API_KEY: str = ""
     MAPBOX_API_KEY: str = ""
-    FMCSA_API_KEY: str = ""
+    FMCSA_API_KEY: str = ""  # QCMobile webKey; only needed for broker search by name
+
+    # Outgoing email (notifications are logged instead of sent when SMTP_HOST is empty)
+    SMTP_HOST: str = ""
+    SMTP_PORT: int = 587
+    SMTP_USER: str = ""
+    SMTP_PASS: str = ""
+    SMTP_FROM: str = "noreply@fleetflow.app"
 
     ENABLE_AIRTABLE: bool = False
     ENABLE_DROPBOX: bool = True
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine, event
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 from app.core.config import settings
 
 # Base model
@@ -11,18 +14,135 @@ _engine = None
 _SessionLocal = None
 
 
+class PoolMetrics:
+    """Counters for connection pool activity, shared by all worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.overflow_checkouts = 0
+            self.wait_count = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_wait(self, elapsed_ms: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            if elapsed_ms > self.wait_max_ms:
+                self.wait_max_ms = elapsed_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg = self.wait_total_ms / self.wait_count if self.wait_count else 0.0
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "wait_avg_ms": round(avg, 3),
+                "wait_max_ms": round(self.wait_max_ms, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.incr("timeouts")
+            raise
+        finally:
+            pool_metrics.record_wait((time.perf_counter() - start) * 1000)
+        if self.overflow() > 0:
+            pool_metrics.incr("overflow_checkouts")
+        return conn
+
+
+def _engine_kwargs() -> dict:
+    """Build create_engine() pool arguments from settings."""
+    if settings.DB_POOL_MODE.lower() == "null":
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _attach_pool_listeners(engine):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, conn_record):
+        pool_metrics.incr("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        pool_metrics.incr("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, conn_record):
+        pool_metrics.incr("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, conn_record, exception):
+        pool_metrics.incr("invalidations")
+
+
 def get_engine():
     """Get or create database engine."""
     global _engine
     if _engine is None:
         _engine = create_engine(
             settings.DATABASE_URL,
-            poolclass=NullPool,
-            echo=settings.DEBUG
+            echo=settings.DEBUG,
+            **_engine_kwargs()
         )
+        _attach_pool_listeners(_engine)
     return _engine
 
 
+def get_pool_stats() -> dict:
+    """Current pool occupancy plus cumulative checkout/overflow/wait counters."""
+    pool = get_engine().pool
+    stats = {
+        "pool_class": type(pool).__name__,
+        "mode": settings.DB_POOL_MODE,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    stats.update(pool_metrics.snapshot())
+    return stats
+
+
 def get_session_factory():
     """Get or create session factory."""
     global _SessionLocal
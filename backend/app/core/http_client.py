@@ -0,0 +1,545 @@
+"""
+Shared HTTP client for external integrations.
+
+Each provider (mapbox, fmcsa, motive, ...) gets one long-lived client with a
+keep-alive connection pool, a token-bucket rate limiter, retries with
+jittered exponential backoff, a circuit breaker and timing metrics. The same
+client has a sync face (get/post/request) for the threadpool endpoints and an
+asyncio face (aget/apost/arequest) for concurrent fan-out; both share the
+limiter, breaker and metrics.
+
+    mapbox_http = http_client("mapbox", base_url="https://api.mapbox.com", rate_per_second=10)
+    response = mapbox_http.get("/geocoding/v5/...", params=params)
+
+Responses are httpx.Response objects. Retryable failures are retried up to
+max_retries times (per call: max_retries=0 disables them); if the last
+attempt still gets a retryable status the response is returned so callers can
+keep their status_code checks. Transport errors and open circuits raise
+HTTPError subclasses.
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set
+
+import httpx
+
+from app.core.config import settings
+
+HTTPError = httpx.HTTPError
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised without touching the network while a provider's circuit is open."""
+
+
+class ProviderConfig:
+    def __init__(
+        self,
+        base_url: str = "",
+        timeout: float = 30.0,
+        rate_per_second: Optional[float] = None,
+        burst: int = 1,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        retry_methods: Iterable[str] = IDEMPOTENT_METHODS,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = settings.HTTP_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = settings.HTTP_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+        self.failure_threshold = (
+            settings.HTTP_CIRCUIT_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        )
+        self.reset_timeout = settings.HTTP_CIRCUIT_RESET_SECONDS if reset_timeout is None else reset_timeout
+        self.max_connections = settings.HTTP_MAX_CONNECTIONS if max_connections is None else max_connections
+        self.max_keepalive = settings.HTTP_MAX_KEEPALIVE if max_keepalive is None else max_keepalive
+        self.headers = headers or {}
+
+    def replace(self, **overrides) -> "ProviderConfig":
+        values = dict(self.__dict__)
+        values.update(overrides)
+        return ProviderConfig(**values)
+
+
+class RateLimiter:
+    """Token bucket; callers reserve a token and sleep until it is theirs."""
+
+    def __init__(self, rate_per_second: Optional[float], burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait for it."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one trial call through after reset_timeout."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED or self.failure_threshold <= 0:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial whose call ended without an outcome (cancelled, invalid request)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this failure opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.failure_threshold <= 0:
+                return False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                opened = self._state != self.OPEN
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                return opened
+            return False
+
+
+class ClientMetrics:
+    """Request counters and latency samples for one provider."""
+
+    def __init__(self, sample_size: int = 1000):
+        self._lock = threading.Lock()
+        self._sample_size = sample_size
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.failures = 0
+            self.retries = 0
+            self.rate_limited = 0
+            self.rate_limit_wait_ms = 0.0
+            self.circuit_rejections = 0
+            self.circuit_opens = 0
+            self.deadline_misses = 0
+            self.status_counts: Dict[str, int] = {}
+            self.latency_total_ms = 0.0
+            self.latency_max_ms = 0.0
+            self._latencies = deque(maxlen=self._sample_size)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_wait(self, seconds: float):
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.rate_limited += 1
+            self.rate_limit_wait_ms += seconds * 1000
+
+    def record_response(self, status_code: Optional[int], elapsed_ms: float):
+        with self._lock:
+            self.requests += 1
+            key = str(status_code) if status_code is not None else "error"
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+            self.latency_total_ms += elapsed_ms
+            self.latency_max_ms = max(self.latency_max_ms, elapsed_ms)
+            self._latencies.append(elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._latencies)
+
+            def pct(p: float) -> float:
+                if not samples:
+                    return 0.0
+                return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3)
+
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "rate_limit_wait_ms": round(self.rate_limit_wait_ms, 3),
+                "circuit_rejections": self.circuit_rejections,
+                "circuit_opens": self.circuit_opens,
+                "deadline_misses": self.deadline_misses,
+                "status_counts": dict(self.status_counts),
+                "latency_avg_ms": round(self.latency_total_ms / self.requests, 3) if self.requests else 0.0,
+                "latency_p50_ms": pct(0.50),
+                "latency_p95_ms": pct(0.95),
+                "latency_max_ms": round(self.latency_max_ms, 3),
+            }
+
+
+class HttpClient:
+    """Pooled, rate-limited, retrying client for one provider."""
+
+    def __init__(self, name: str, config: ProviderConfig):
+        self.name = name
+        self.metrics = ClientMetrics()
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._apply(config)
+
+    def _apply(self, config: ProviderConfig) -> None:
+        self.config = config
+        self.limiter = RateLimiter(config.rate_per_second, config.burst)
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_timeout)
+
+    def configure(self, **overrides) -> None:
+        """Change settings (e.g. base_url in tests); existing pools are closed and rebuilt on next use."""
+        with self._lock:
+            self.close()
+            self._apply(self.config.replace(**overrides))
+
+    # -- connection pools --------------------------------------------------
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.config.base_url,
+            "timeout": self.config.timeout,
+            "headers": self.config.headers,
+            "follow_redirects": True,
+            "limits": httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._client_kwargs())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # AsyncClient pools are bound to the event loop that created them
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**self._client_kwargs())
+            self._async_clients[loop] = client
+        return client
+
+    def close(self) -> None:
+        """
+        Close the sync pool and every async pool on its owning loop: awaited
+        on a loop that is idle or running in another thread, scheduled on the
+        caller's own loop (await aclose() there to wait for it). Pools whose
+        loop has already closed cannot be awaited and go with their loop.
+        """
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        async_clients, self._async_clients = dict(self._async_clients), weakref.WeakKeyDictionary()
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, client in async_clients.items():
+            if loop.is_closed():
+                continue
+            if loop is current:
+                task = loop.create_task(client.aclose())
+                _closing.add(task)
+                task.add_done_callback(_closing.discard)
+            elif loop.is_running():
+                try:
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+                except Exception:
+                    pass
+            else:
+                loop.run_until_complete(client.aclose())
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    # -- retry policy ------------------------------------------------------
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        delay = random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt)))
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+        return min(delay, self.config.backoff_max)
+
+    def _can_retry(self, method: str, attempt: int, max_retries: int, error: Optional[Exception] = None) -> bool:
+        if attempt >= max_retries:
+            return False
+        # A request that never reached the server is safe to resend whatever the method
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        return method in self.config.retry_methods
+
+    def _check_circuit(self) -> None:
+        if not self.breaker.allow():
+            self.metrics.incr("circuit_rejections")
+            raise CircuitOpenError(f"{self.name}: circuit open, skipping request")
+
+    def _record_failure(self) -> None:
+        self.metrics.incr("failures")
+        if self.breaker.record_failure():
+            self.metrics.incr("circuit_opens")
+
+    def record_deadline_miss(self) -> None:
+        """Count a call the caller cancelled at its own deadline as a failure."""
+        self.metrics.incr("deadline_misses")
+        self._record_failure()
+
+    def _handle_response(
+        self, method: str, attempt: int, max_retries: int, response: httpx.Response, elapsed_ms: float
+    ) -> Optional[float]:
+        """Record the outcome; returns a backoff delay if the request should be retried."""
+        self.metrics.record_response(response.status_code, elapsed_ms)
+        if response.status_code >= 500:
+            self._record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status_code in self.config.retry_statuses and self._can_retry(method, attempt, max_retries):
+            self.metrics.incr("retries")
+            return self._backoff(attempt, response)
+        return None
+
+    def _handle_error(
+        self, method: str, attempt: int, max_retries: int, error: httpx.HTTPError, elapsed_ms: float
+    ) -> float:
+        """Record a transport error; returns a backoff delay or re-raises."""
+        self.metrics.record_response(None, elapsed_ms)
+        self._record_failure()
+        if not self._can_retry(method, attempt, max_retries, error):
+            raise error
+        self.metrics.incr("retries")
+        return self._backoff(attempt)
+
+    # -- sync face ---------------------------------------------------------
+
+    def request(self, method: str, url: str, max_retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        method = method.upper()
+        max_retries = self.config.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            self._check_circuit()
+            start = time.perf_counter()
+            try:
+                self.metrics.record_wait(self.limiter.acquire())
+                start = time.perf_counter()
+                response = self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                delay = self._handle_error(method, attempt, max_retries, e, (time.perf_counter() - start) * 1000)
+            except BaseException:
+                # Cancelled or never sent: free a half-open trial so the circuit cannot stick
+                self.breaker.release_trial()
+                raise
+            else:
+                delay = self._handle_response(method, attempt, max_retries, response, (time.perf_counter() - start) * 1000)
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs) -> Iterator[httpx.Response]:
+        """Streamed request (body read by the caller) through the breaker and limiter; never retried."""
+        self._check_circuit()
+        start = time.perf_counter()
+        response = None
+        try:
+            self.metrics.record_wait(self.limiter.acquire())
+            start = time.perf_counter()
+            with self.client.stream(method.upper(), url, **kwargs) as response:
+                self.metrics.record_response(response.status_code, (time.perf_counter() - start) * 1000)
+                if response.status_code >= 500:
+                    self._record_failure()
+                else:
+                    self.breaker.record_success()
+                yield response
+        except httpx.TransportError:
+            # A body cut off mid-stream counts as a failure too
+            if response is None:
+                self.metrics.record_response(None, (time.perf_counter() - start) * 1000)
+            self._record_failure()
+            raise
+        except BaseException:
+            if response is None:
+                self.breaker.release_trial()
+            raise
+
+    # -- asyncio face ------------------------------------------------------
+
+    async def arequest(self, method: str, url: str, max_retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        method = method.upper()
+        max_retries = self.config.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            self._check_circuit()
+            start = time.perf_counter()
+            try:
+                self.metrics.record_wait(await self.limiter.aacquire())
+                start = time.perf_counter()
+                response = await self.async_client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                delay = self._handle_error(method, attempt, max_retries, e, (time.perf_counter() - start) * 1000)
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            else:
+                delay = self._handle_response(method, attempt, max_retries, response, (time.perf_counter() - start) * 1000)
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        return {"circuit": self.breaker.state, **self.metrics.snapshot()}
+
+
+_clients: Dict[str, HttpClient] = {}
+_clients_lock = threading.Lock()
+_closing: Set["asyncio.Task"] = set()  # aclose() tasks close() scheduled on the caller's loop
+
+
+def http_client(name: str, **config) -> HttpClient:
+    """
+    Shared client for a provider, created on first use.
+
+    The first caller's keyword arguments (see ProviderConfig) define the
+    provider; later calls return the same client.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = HttpClient(name, ProviderConfig(**config))
+                _clients[name] = client
+    return client
+
+
+def get_http_client_stats() -> Dict[str, dict]:
+    return {name: client.stats() for name, client in sorted(_clients.items())}
+
+
+def close_http_clients() -> None:
+    for client in list(_clients.values()):
+        client.close()
+
+
+async def aclose_http_clients() -> None:
+    """close_http_clients() from a coroutine, waiting for this loop's async pools to close."""
+    for client in list(_clients.values()):
+        await client.aclose()
+        await asyncio.to_thread(client.close)
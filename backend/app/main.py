@@ -1,10 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import auth, loads, pod, maintenance, expenses, drivers, maps, users, equipment, analytics, payroll, mapbox_routes, fmcsa_routes, dispatch, customers, invoices, ai, customer_portal, accounting, quickbooks, communications, documents, document_uploads, loadboards, motive, safety, tolls, vendors, ifta
+from app.core.config import settings
+from app.core.database import get_pool_stats, get_session_factory
+from app.core.http_client import aclose_http_clients, get_http_client_stats
+from app.services.broker_cache import broker_authority
+from app.services.browser_pool import browser_pool
+from app.services.invoice_batch import shutdown_invoice_render_pool
+from app.services.ocr_pipeline import shutdown_ocr_pool
+
+from app.routers import auth, loads, pod, maintenance, expenses, drivers, maps, users, equipment, analytics, payroll, mapbox_routes, fmcsa_routes, dispatch, customers, invoices, ai, customer_portal, accounting, quickbooks, communications, documents, document_uploads, loadboards, motive, safety, tolls, vendors, ifta, jobs
 # from app.routers import imports  # Has dependency issues, skipping for now
 
-app = FastAPI(title="MAIN TMS", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.FMCSA_REFRESH_INTERVAL_MINUTES > 0:
+        broker_authority.start_refresher(
+            get_session_factory(),
+            interval_seconds=settings.FMCSA_REFRESH_INTERVAL_MINUTES * 60,
+            days=settings.FMCSA_REFRESH_RECENT_DAYS,
+        )
+    yield
+    await browser_pool.close()
+    # Waits for in-flight OCR pages and invoice renders so running jobs can finish
+    await asyncio.to_thread(shutdown_ocr_pool)
+    await asyncio.to_thread(shutdown_invoice_render_pool)
+    await aclose_http_clients()
+
+
+app = FastAPI(title="MAIN TMS", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +40,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paged listings return their next-page cursor in a header
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth.router)
@@ -44,8 +74,24 @@ app.include_router(safety.router)
 app.include_router(tolls.router)
 app.include_router(vendors.router)
 app.include_router(ifta.router)
+app.include_router(jobs.router)
 
 
 @app.get("/health")
 def health():
     return {"ok": True}
+
+
+@app.get("/health/db-pool")
+def health_db_pool():
+    return {"ok": True, "pool": get_pool_stats()}
+
+
+@app.get("/health/http-clients")
+def health_http_clients():
+    return {"ok": True, "clients": get_http_client_stats()}
+
+
+@app.get("/health/pdf-browser")
+def health_pdf_browser():
+    return {"ok": True, "browser": browser_pool.stats()}
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, Boolean, JSON, Float
+from sqlalchemy import BigInteger, Column, Date, DateTime, ForeignKey, Integer, String, Text, Boolean, JSON, Float, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -75,6 +75,7 @@ class Driver(Base):
     email = Column(String(255), nullable=True, index=True)
     phone = Column(String(50), nullable=True)
     payee_id = Column(Integer, ForeignKey("payees.id"), nullable=True, index=True)
+    external_id = Column(String(100), nullable=True, index=True)  # Motive driver id
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     carrier = relationship("Carrier", back_populates="drivers")
@@ -152,6 +153,18 @@ class Load(Base):
     pickup_date = Column(DateTime, nullable=True)
     delivery_address = Column(Text, nullable=False)
     delivery_date = Column(DateTime, nullable=True)
+
+    # Parsed location fields (populated from the addresses on write)
+    pickup_city = Column(String(100), nullable=True, index=True)
+    pickup_state = Column(String(20), nullable=True, index=True)
+    pickup_zip = Column(String(20), nullable=True)
+    pickup_latitude = Column(Float, nullable=True)
+    pickup_longitude = Column(Float, nullable=True)
+    delivery_city = Column(String(100), nullable=True, index=True)
+    delivery_state = Column(String(20), nullable=True, index=True)
+    delivery_zip = Column(String(20), nullable=True)
+    delivery_latitude = Column(Float, nullable=True)
+    delivery_longitude = Column(Float, nullable=True)
     notes = Column(Text, nullable=True)
     
     # Document attachments
@@ -163,29 +176,55 @@ class Load(Base):
     other_document = Column(Text, nullable=True)  # Other documents
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     carrier = relationship("Carrier", back_populates="loads")
     customer = relationship("Customer", back_populates="loads")
     driver = relationship("Driver", back_populates="loads")
-    equipment = relationship("Equipment", back_populates="load")
+    equipment = relationship("Equipment", back_populates="load", foreign_keys="[Equipment.assigned_load_id]")
     extractions = relationship("LoadExtraction", back_populates="load")
     stops = relationship("LoadStop", back_populates="load")
     charges = relationship("LoadCharge", back_populates="load")
     ledger_lines = relationship("SettlementLedgerLine", back_populates="load")
     documents_exchange = relationship("DocumentExchange", foreign_keys="[DocumentExchange.load_id]")
 
+    __table_args__ = (
+        # Keyset pagination for /loads (carrier_id, created_at DESC, id DESC)
+        Index("ix_loads_carrier_created_id", "carrier_id", "created_at", "id"),
+        Index("ix_loads_carrier_status", "carrier_id", "status"),
+        Index("ix_loads_lane", "carrier_id", "pickup_state", "pickup_city", "delivery_state", "delivery_city"),
+    )
+
 
 class LoadExtraction(Base):
     __tablename__ = "load_extractions"
 
     id = Column(Integer, primary_key=True, index=True)
-    load_id = Column(Integer, ForeignKey("loads.id"), nullable=False, index=True)
-    raw_text = Column(Text, nullable=False)
+    carrier_id = Column(Integer, ForeignKey("carriers.id"), nullable=True, index=True)
+    load_id = Column(Integer, ForeignKey("loads.id"), nullable=True, index=True)  # NULL for /loads/parse-rate-con
+    source = Column(String(30), nullable=False, default="auto_create")  # auto_create, parse_rate_con
+    raw_text = Column(Text, nullable=False, default="")
+    parsed_fields = Column(JSON, nullable=True)
     source_files = Column(JSON, nullable=False, default=list)
+    # SHA-256 per uploaded file, and of the whole upload (the file's own hash for single uploads)
+    file_hashes = Column(JSON, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    duplicate_of_id = Column(Integer, ForeignKey("load_extractions.id"), nullable=True)
+    status = Column(String(20), nullable=False, default="completed")  # pending, processing, completed, failed
+    job_id = Column(String(32), nullable=True, index=True)
+    error = Column(Text, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    ocr_pages = Column(Integer, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
 
     load = relationship("Load", back_populates="extractions")
 
+    __table_args__ = (
+        Index("ix_load_extractions_carrier_hash", "carrier_id", "content_hash"),
+    )
+
 
 class PodRecord(Base):
     __tablename__ = "pods"
@@ -195,6 +234,8 @@ class PodRecord(Base):
     uploaded_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     file_links = Column(JSON, nullable=False, default=list)
     signature_link = Column(String(500), nullable=True)
+    upload_status = Column(String(20), nullable=False, default="completed")  # queued, uploading, completed, partial, failed
+    file_status = Column(JSON, nullable=True)  # [{filename, status, url, bytes, error}] per uploaded file
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
@@ -207,7 +248,10 @@ class DocumentExchange(Base):
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False, index=True)
     uploaded_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     doc_type = Column(String(50), nullable=False)  # BOL, Lumper, Receipt, Other
-    attachment_url = Column(String(500), nullable=False)
+    attachment_url = Column(String(500), nullable=False)  # empty until the upload finishes
+    filename = Column(String(255), nullable=True)
+    upload_status = Column(String(20), nullable=False, default="completed")  # pending, completed, failed
+    upload_error = Column(Text, nullable=True)
     status = Column(String(50), nullable=False, default="Pending")  # Pending, Accepted, Rejected
     notes = Column(Text, nullable=True)
     reviewed_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -216,6 +260,34 @@ class DocumentExchange(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
 
+class DocumentBlob(Base):
+    """One stored file per distinct content; uploads of the same bytes share it."""
+    __tablename__ = "document_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    size = Column(BigInteger, nullable=False)
+    backend = Column(String(20), nullable=False, default="local")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class StoredDocument(Base):
+    """An uploaded load document: names a blob for one carrier/load."""
+    __tablename__ = "stored_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    carrier_id = Column(Integer, ForeignKey("carriers.id"), nullable=False, index=True)
+    load_id = Column(Integer, ForeignKey("loads.id"), nullable=True, index=True)
+    blob_id = Column(Integer, ForeignKey("document_blobs.id"), nullable=False, index=True)
+    doc_type = Column(String(50), nullable=True)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=True)
+    uploaded_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    blob = relationship("DocumentBlob")
+
+
 class Expense(Base):
     __tablename__ = "expenses"
 
@@ -273,7 +345,7 @@ class Equipment(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     carrier = relationship("Carrier", back_populates="equipment")
-    load = relationship("Load", back_populates="equipment")
+    load = relationship("Load", back_populates="equipment", foreign_keys=[assigned_load_id])
 
 
 class Notification(Base):
@@ -371,9 +443,9 @@ class LoadStop(Base):
     stop_number = Column(Integer, nullable=False, default=1)
     company = Column(String(200), nullable=True)
     address = Column(Text, nullable=True)
-    city = Column(String(100), nullable=True)
-    state = Column(String(20), nullable=True)
-    zip_code = Column(String(20), nullable=True)
+    city = Column(String(100), nullable=True, index=True)
+    state = Column(String(20), nullable=True, index=True)
+    zip_code = Column(String(20), nullable=True, index=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     date = Column(String(20), nullable=True)
@@ -433,6 +505,28 @@ class SettlementLedgerLine(Base):
     load = relationship("Load", back_populates="ledger_lines")
 
 
+
+class PayrollPeriodRollup(Base):
+    """Per-settlement, per-category totals; rebuilt when a settlement changes status or loses lines."""
+    __tablename__ = "payroll_period_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    settlement_id = Column(Integer, ForeignKey("payroll_settlements.id"), nullable=False, index=True)
+    carrier_id = Column(Integer, ForeignKey("carriers.id"), nullable=False)
+    payee_id = Column(Integer, ForeignKey("payees.id"), nullable=False, index=True)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    status = Column(String(50), nullable=False)
+    category = Column(String(50), nullable=False)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    line_count = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_payroll_rollups_carrier_period", "carrier_id", "period_start"),
+    )
+
+
 # Safety & Compliance Models
 class SafetyEvent(Base):
     __tablename__ = "safety_events"
@@ -568,4 +662,128 @@ class IftaEntry(Base):
     miles = Column(Float, nullable=False)
     gallons = Column(Float, nullable=False)
     notes = Column(Text, nullable=True)
+    source = Column(String(20), nullable=False, default="manual")  # manual, gps (generated from breadcrumbs)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ifta_entries_report_source", "report_id", "source"),
+    )
+
+
+# Routing & Geocoding Cache Models
+class GeocodeCacheEntry(Base):
+    """Geocoding result per normalized address; found=False caches "no match"."""
+    __tablename__ = "geocode_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    address_key = Column(String(500), nullable=False, unique=True, index=True)
+    address = Column(Text, nullable=False)
+    found = Column(Boolean, nullable=False, default=True)
+    longitude = Column(Float, nullable=True)
+    latitude = Column(Float, nullable=True)
+    formatted_address = Column(String(500), nullable=True)
+    place_type = Column(String(200), nullable=True)  # comma-separated Mapbox place types
+    provider = Column(String(50), nullable=False, default="mapbox")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RouteLegCacheEntry(Base):
+    """Driving distance/duration between two rounded coordinates; geometry is not stored."""
+    __tablename__ = "route_leg_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    leg_key = Column(String(100), nullable=False, unique=True, index=True)  # "profile:lon,lat;lon,lat"
+    profile = Column(String(50), nullable=False, default="driving")
+    origin_longitude = Column(Float, nullable=False)
+    origin_latitude = Column(Float, nullable=False)
+    destination_longitude = Column(Float, nullable=False)
+    destination_latitude = Column(Float, nullable=False)
+    distance_meters = Column(Float, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BrokerAuthorityEntry(Base):
+    """FMCSA SAFER snapshot per "mc:<number>" or "dot:<number>"; found=False caches "no record"."""
+    __tablename__ = "broker_authority_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    lookup_key = Column(String(60), nullable=False, unique=True, index=True)
+    found = Column(Boolean, nullable=False, default=True)
+    legal_name = Column(String(200), nullable=True)
+    dot_number = Column(String(50), nullable=True)
+    mc_number = Column(String(50), nullable=True)
+    is_broker = Column(Boolean, nullable=False, default=False)
+    operating_status = Column(String(50), nullable=True)
+    data = Column(JSON, nullable=True)  # parsed snapshot as returned by FMCSAService
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # last fetched from SAFER
+
+
+# Motive Telemetry Models
+class MotiveTelemetryEvent(Base):
+    """Append-only log of Motive webhook events (and live API refreshes)."""
+    __tablename__ = "motive_telemetry_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    carrier_id = Column(Integer, ForeignKey("carriers.id"), nullable=True, index=True)  # null until the driver is linked
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True)
+    event_type = Column(String(50), nullable=False)  # location_update, hos_violation, trip_completed, ...
+    driver_external_id = Column(String(100), nullable=True)
+    vehicle_external_id = Column(String(100), nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    occurred_at = Column(DateTime, nullable=False)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    payload = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        Index("ix_motive_events_driver_time", "driver_id", "occurred_at"),
+        Index("ix_motive_events_vehicle_time", "vehicle_external_id", "occurred_at"),
+    )
+
+
+class MotiveLatestState(Base):
+    """Most recent location and HOS status per Motive driver or vehicle, per carrier."""
+    __tablename__ = "motive_latest_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String(20), nullable=False)  # driver, vehicle
+    external_id = Column(String(100), nullable=False)
+    carrier_id = Column(Integer, ForeignKey("carriers.id"), nullable=False, index=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True, index=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    speed = Column(Float, nullable=True)
+    heading = Column(Integer, nullable=True)
+    address = Column(String(500), nullable=True)
+    located_at = Column(DateTime, nullable=True)
+    hos_status = Column(String(50), nullable=True)
+    hos = Column(JSON, nullable=True)  # last HOS clocks as sent by Motive
+    hos_updated_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_motive_latest_state_entity", "carrier_id", "entity_type", "external_id", unique=True),
+    )
+
+
+class DriverBreadcrumbDay(Base):
+    """One driver's GPS points for one UTC day, delta/varint packed (see services/breadcrumbs.py)."""
+    __tablename__ = "driver_breadcrumbs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    carrier_id = Column(Integer, ForeignKey("carriers.id"), nullable=False, index=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    point_count = Column(Integer, nullable=False, default=0)
+    start_at = Column(DateTime, nullable=False)
+    end_at = Column(DateTime, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_driver_breadcrumbs_driver_day", "driver_id", "day", unique=True),
+    )
@@ -11,6 +11,10 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models import Load, Driver, Equipment, User
+from app.services.dispatch_stats import (
+    get_dispatch_stats as get_cached_dispatch_stats,
+    invalidate_dispatch_stats,
+)
 
 router = APIRouter(prefix="/dispatch", tags=["dispatch"])
 
@@ -51,85 +55,7 @@ def get_dispatch_stats(
     """
     Get real-time dispatch board statistics
     """
-    carrier_id = current_user.carrier_id
-    
-    # Count loads by status
-    available_loads = db.query(func.count(Load.id)).filter(
-        and_(
-            Load.carrier_id == carrier_id,
-            or_(Load.status == "Available", Load.status == "Created")
-        )
-    ).scalar() or 0
-    
-    assigned_loads = db.query(func.count(Load.id)).filter(
-        and_(
-            Load.carrier_id == carrier_id,
-            Load.status == "Assigned"
-        )
-    ).scalar() or 0
-    
-    in_transit_loads = db.query(func.count(Load.id)).filter(
-        and_(
-            Load.carrier_id == carrier_id,
-            or_(Load.status == "In Transit", Load.status == "Picked Up")
-        )
-    ).scalar() or 0
-    
-    # Delivered today
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    delivered_today = db.query(func.count(Load.id)).filter(
-        and_(
-            Load.carrier_id == carrier_id,
-            Load.status == "Delivered",
-            Load.updated_at >= today_start
-        )
-    ).scalar() or 0
-    
-    # Available drivers (no active load)
-    # Get driver IDs with active loads
-    active_driver_ids = db.query(Load.driver_id).filter(
-        and_(
-            Load.carrier_id == carrier_id,
-            Load.driver_id.isnot(None),
-            Load.status.in_(["Assigned", "In Transit", "Picked Up"])
-        )
-    ).distinct().all()
-    active_driver_ids = [d[0] for d in active_driver_ids]
-    
-    available_drivers = db.query(func.count(Driver.id)).filter(
-        and_(
-            Driver.carrier_id == carrier_id,
-            ~Driver.id.in_(active_driver_ids) if active_driver_ids else True
-        )
-    ).scalar() or 0
-    
-    # Available trucks (not assigned to active loads)
-    active_truck_ids = db.query(Equipment.id).join(
-        Load, Load.id == Equipment.current_load_id
-    ).filter(
-        and_(
-            Equipment.carrier_id == carrier_id,
-            Load.status.in_(["Assigned", "In Transit", "Picked Up"])
-        )
-    ).distinct().all()
-    active_truck_ids = [t[0] for t in active_truck_ids]
-    
-    available_trucks = db.query(func.count(Equipment.id)).filter(
-        and_(
-            Equipment.carrier_id == carrier_id,
-            Equipment.type == "truck",
-            ~Equipment.id.in_(active_truck_ids) if active_truck_ids else True
-        )
-    ).scalar() or 0
-    
-    return DispatchBoardStats(
-        available_loads=available_loads,
-        assigned_loads=assigned_loads,
-        in_transit_loads=in_transit_loads,
-        delivered_today=delivered_today,
-        available_drivers=available_drivers,
-        available_trucks=available_trucks
-    )
+    return DispatchBoardStats(**get_cached_dispatch_stats(db, current_user.carrier_id))
 
 
 @router.get("/loads-by-status")
@@ -167,7 +93,7 @@ def get_loads_by_status(
             "delivery_address": load.delivery_address,
             "rate_amount": load.rate_amount,
             "driver_id": load.driver_id,
-            "driver_name": f"{load.driver.first_name} {load.driver.last_name}" if load.driver else None,
+            "driver_name": load.driver.name if load.driver else None,
             "created_at": load.created_at.isoformat(),
             "broker_name": load.broker_name,
             "notes": load.notes,
@@ -216,7 +142,7 @@ def get_available_drivers(
     return [
         {
             "id": driver.id,
-            "name": f"{driver.first_name} {driver.last_name}",
+            "name": driver.name,
             "phone": driver.phone,
             "email": driver.email,
         }
@@ -270,6 +196,7 @@ def assign_load_to_driver(
     load.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate_dispatch_stats(carrier_id)
     db.refresh(load)
     
     return {
@@ -280,7 +207,7 @@ def assign_load_to_driver(
             "load_number": load.load_number,
             "status": load.status,
             "driver_id": load.driver_id,
-            "driver_name": f"{load.driver.first_name} {load.driver.last_name}" if load.driver else None,
+            "driver_name": load.driver.name if load.driver else None,
         }
     }
 
@@ -317,6 +244,7 @@ def update_load_status(
     load.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate_dispatch_stats(carrier_id)
     db.refresh(load)
     
     return {
@@ -356,6 +284,7 @@ def unassign_load(
     load.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate_dispatch_stats(carrier_id)
     db.refresh(load)
     
     return {
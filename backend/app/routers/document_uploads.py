@@ -1,16 +1,18 @@
 """
 Document upload and management endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
-from datetime import datetime
-import os
-import uuid
+from datetime import date, datetime
 
 from app.core.database import get_db
 from app.core.security import verify_token
-from app.models import Load, DocumentExchange, Driver
+from app.models import Customer, Load, DocumentExchange, Driver, StoredDocument
+from app.services.document_archives import customer_pod_entries, load_document_entries
+from app.services.document_storage import content_disposition, document_url, get_document_storage, store_document
+from app.services.zip_service import ZipService
 from pydantic import BaseModel
 
 
@@ -23,7 +25,7 @@ class DocumentApprovalRequest(BaseModel):
 
 
 @router.post("/loads/{load_id}/upload")
-async def upload_load_document(
+def upload_load_document(
     load_id: int,
     doc_type: str = Form(...),  # RC, BOL, POD, INV, RCP, OTH
     file: UploadFile = File(...),
@@ -34,6 +36,7 @@ async def upload_load_document(
 ):
     """
     Upload a document for a load
+    - The file is streamed into document storage; identical content is stored once
     - Drivers can upload documents (goes to docs_exchange for approval)
     - Admins can directly attach documents to loads
     """
@@ -58,45 +61,45 @@ async def upload_load_document(
     
     doc_type_full = doc_type_map.get(doc_type, doc_type)
     
-    # TODO: Save file to storage (Dropbox, S3, etc.)
-    # For now, simulate file storage
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_url = f"/uploads/loads/{load_id}/{doc_type.lower()}_{unique_filename}"
-    
-    # Determine driver_id
+    # Map doc type to load column (admins attach these directly)
+    doc_column_map = {
+        "RC": "rc_document",
+        "BOL": "bol_document",
+        "POD": "pod_document",
+        "INV": "invoice_document",
+        "RCP": "receipt_document",
+        "OTH": "other_document"
+    }
+    column_name = doc_column_map.get(doc_type) if role in ["admin", "dispatcher"] else None
+
+    # Determine driver_id; checked before anything is written to storage
     upload_driver_id = driver_id
     if role == "driver" and token.get("driver_id"):
         upload_driver_id = token.get("driver_id")
+    if not column_name and not upload_driver_id:
+        raise HTTPException(status_code=400, detail="Driver ID required for driver uploads")
+
+    stored = store_document(
+        db, get_document_storage(), file.file, file.filename,
+        carrier_id=carrier_id, load_id=load_id, doc_type=doc_type_full,
+        content_type=file.content_type, user_id=user_id,
+    )
+    file_url = document_url(stored)
     
     # If admin, directly attach to load
-    if role in ["admin", "dispatcher"]:
-        # Map doc type to load column
-        doc_column_map = {
-            "RC": "rc_document",
-            "BOL": "bol_document",
-            "POD": "pod_document",
-            "INV": "invoice_document",
-            "RCP": "receipt_document",
-            "OTH": "other_document"
-        }
+    if column_name:
+        setattr(load, column_name, file_url)
+        db.commit()
         
-        column_name = doc_column_map.get(doc_type)
-        if column_name:
-            setattr(load, column_name, file_url)
-            db.commit()
-            
-            return {
-                "success": True,
-                "message": f"{doc_type_full} uploaded and attached to load",
-                "file_url": file_url,
-                "status": "Approved"
-            }
+        return {
+            "success": True,
+            "message": f"{doc_type_full} uploaded and attached to load",
+            "file_url": file_url,
+            "document_file_id": stored.id,
+            "status": "Approved"
+        }
     
     # If driver or needs approval, create DocumentExchange entry
-    if not upload_driver_id:
-        raise HTTPException(status_code=400, detail="Driver ID required for driver uploads")
-    
     doc_exchange = DocumentExchange(
         carrier_id=carrier_id,
         load_id=load_id,
@@ -104,6 +107,7 @@ async def upload_load_document(
         uploaded_by_user_id=user_id,
         doc_type=doc_type_full,
         attachment_url=file_url,
+        filename=stored.filename,
         status="Pending",
         notes=notes,
         created_at=datetime.utcnow()
@@ -117,11 +121,83 @@ async def upload_load_document(
         "success": True,
         "message": f"{doc_type_full} uploaded and pending approval",
         "document_id": doc_exchange.id,
+        "document_file_id": stored.id,
         "file_url": file_url,
         "status": "Pending"
     }
 
 
+@router.get("/files/{file_id}")
+def download_document(
+    file_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """Download a stored document; supports Range and If-None-Match requests"""
+    document = db.query(StoredDocument).filter(
+        StoredDocument.id == file_id,
+        StoredDocument.carrier_id == token.get("carrier_id")
+    ).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    storage = get_document_storage()
+    if not storage.exists(document.blob.sha256):
+        raise HTTPException(status_code=404, detail="Document file missing from storage")
+    return storage.response(document.blob.sha256, request, document.filename, document.content_type)
+
+
+def _zip_response(entries, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        ZipService.stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(filename, "attachment")},
+    )
+
+
+@router.get("/loads/{load_id}/zip")
+def download_load_documents_zip(
+    load_id: int,
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """Download every document of a load as a ZIP, streamed as it is built"""
+    load = db.query(Load).filter(Load.id == load_id, Load.carrier_id == token.get("carrier_id")).first()
+    if not load:
+        raise HTTPException(status_code=404, detail="Load not found")
+    if token.get("role") == "driver" and token.get("driver_id") and load.driver_id != token.get("driver_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    entries = load_document_entries(db, get_document_storage(), load)
+    return _zip_response(entries, f"load-{load.load_number or load.id}-documents.zip")
+
+
+@router.get("/customers/{customer_id}/pods/zip")
+def download_customer_pods_zip(
+    customer_id: int,
+    start_date: date = Query(..., description="First delivery date (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Last delivery date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """
+    Download the PODs of a customer's loads delivered in a period as a ZIP
+    billing packet (one folder per load), streamed as it is built
+    """
+    carrier_id = token.get("carrier_id")
+    if token.get("role") not in ["admin", "dispatcher"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    customer = db.query(Customer).filter(Customer.id == customer_id, Customer.carrier_id == carrier_id).first()
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    entries = customer_pod_entries(db, get_document_storage(), carrier_id, customer_id, start_date, end_date)
+    return _zip_response(entries, f"pods-customer-{customer_id}-{start_date}-{end_date}.zip")
+
+
 @router.get("/loads/{load_id}/pending")
 def get_pending_documents(
     load_id: int,
@@ -1,9 +1,12 @@
 """
 FMCSA broker verification API endpoints
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import Optional
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.services.broker_cache import broker_authority
 from app.services.fmcsa import FMCSAService
 from app.core.security import get_current_user
 
@@ -17,7 +20,13 @@ class BrokerLookupRequest(BaseModel):
 
 
 @router.post("/verify-broker")
-def verify_broker(request: BrokerLookupRequest, current_user = Depends(get_current_user)):
+def verify_broker(
+    request: BrokerLookupRequest,
+    response: Response,
+    refresh: bool = Query(False, description="Ask SAFER even if a fresh cached lookup exists"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
     """
     Verify broker credentials using MC, DOT, or company name
     """
@@ -28,53 +37,82 @@ def verify_broker(request: BrokerLookupRequest, current_user = Depends(get_curre
         )
     
     try:
-        service = FMCSAService()
-        result = service.verify_broker(
+        result = broker_authority.verify(
+            db,
             mc_number=request.mc_number,
             dot_number=request.dot_number,
-            name=request.name
+            name=request.name,
+            force=refresh,
         )
+        db.commit()
+        response.headers["X-Cache"] = result["cache"]
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"FMCSA lookup failed: {str(e)}")
 
 
-@router.get("/lookup/mc/{mc_number}")
-def lookup_by_mc(mc_number: str, current_user = Depends(get_current_user)):
+@router.post("/verify-open-loads")
+def verify_open_loads(
+    refresh: bool = Query(False, description="Ask SAFER for every broker, ignoring fresh cached lookups"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
     """
-    Look up carrier/broker by MC number
+    Verify every broker on the carrier's open loads (concurrently) and update the loads' broker_verified flags
+    """
+    result = broker_authority.verify_open_loads(db, current_user.carrier_id, force=refresh)
+    db.commit()
+    return result
+
+
+@router.get("/cache/stats")
+def cache_stats(current_user = Depends(get_current_user)):
     """
+    Broker lookup cache counters for this worker
+    """
+    return broker_authority.stats()
+
+
+def _cached_lookup(db: Session, kind: str, number: str, response: Response, refresh: bool, label: str):
     try:
-        service = FMCSAService()
-        result = service.lookup_by_mc_number(mc_number)
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="MC number not found")
-        
-        return result
-    except HTTPException:
-        raise
+        result, state = broker_authority.lookup(db, kind, number, force=refresh)
+        db.commit()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"FMCSA lookup failed: {str(e)}")
+    if state == "unavailable":
+        raise HTTPException(status_code=503, detail="FMCSA SAFER is unavailable")
+    if not result:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    response.headers["X-Cache"] = state
+    return result
+
+
+@router.get("/lookup/mc/{mc_number}")
+def lookup_by_mc(
+    mc_number: str,
+    response: Response,
+    refresh: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
+    """
+    Look up carrier/broker by MC number
+    """
+    return _cached_lookup(db, "mc", mc_number, response, refresh, "MC number")
 
 
 @router.get("/lookup/dot/{dot_number}")
-def lookup_by_dot(dot_number: str, current_user = Depends(get_current_user)):
+def lookup_by_dot(
+    dot_number: str,
+    response: Response,
+    refresh: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
     """
     Look up carrier/broker by DOT number
     """
-    try:
-        service = FMCSAService()
-        result = service.lookup_by_dot_number(dot_number)
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="DOT number not found")
-        
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"FMCSA lookup failed: {str(e)}")
+    return _cached_lookup(db, "dot", dot_number, response, refresh, "DOT number")
 
 
 @router.get("/lookup/name/{name}")
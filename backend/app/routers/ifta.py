@@ -9,6 +9,7 @@ from datetime import datetime
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models import User, IftaReport, IftaEntry
+from app.services.ifta_mileage import IFTA_JURISDICTIONS, BoundaryDataMissing, populate_report_entries
 
 router = APIRouter(prefix="/ifta", tags=["ifta"])
 
@@ -171,6 +172,36 @@ def delete_ifta_report(
     return {"message": "IFTA report deleted"}
 
 
+@router.post("/reports/{report_id}/generate-miles")
+def generate_report_miles(
+    report_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Compute jurisdiction miles for the report's quarter from stored GPS
+    breadcrumbs and replace its GPS entries (one per driver, day and state)
+    """
+    report = db.query(IftaReport).filter(
+        IftaReport.id == report_id,
+        IftaReport.carrier_id == current_user.carrier_id
+    ).first()
+    
+    if not report:
+        raise HTTPException(status_code=404, detail="IFTA report not found")
+    if report.status != "draft":
+        raise HTTPException(status_code=400, detail="Only draft reports can be regenerated")
+    
+    try:
+        result = populate_report_entries(db, report)
+    except BoundaryDataMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    db.commit()
+    update_report_totals(db, report.id)
+    return {"report_id": report.id, **result}
+
+
 @router.get("/entries")
 def get_ifta_entries(
     report_id: Optional[int] = None,
@@ -303,69 +334,7 @@ def delete_ifta_entry(
 def get_jurisdictions():
     """Get list of IFTA jurisdictions"""
     return {
-        "jurisdictions": [
-            {"code": "AL", "name": "Alabama"},
-            {"code": "AZ", "name": "Arizona"},
-            {"code": "AR", "name": "Arkansas"},
-            {"code": "CA", "name": "California"},
-            {"code": "CO", "name": "Colorado"},
-            {"code": "CT", "name": "Connecticut"},
-            {"code": "DE", "name": "Delaware"},
-            {"code": "FL", "name": "Florida"},
-            {"code": "GA", "name": "Georgia"},
-            {"code": "ID", "name": "Idaho"},
-            {"code": "IL", "name": "Illinois"},
-            {"code": "IN", "name": "Indiana"},
-            {"code": "IA", "name": "Iowa"},
-            {"code": "KS", "name": "Kansas"},
-            {"code": "KY", "name": "Kentucky"},
-            {"code": "LA", "name": "Louisiana"},
-            {"code": "ME", "name": "Maine"},
-            {"code": "MD", "name": "Maryland"},
-            {"code": "MA", "name": "Massachusetts"},
-            {"code": "MI", "name": "Michigan"},
-            {"code": "MN", "name": "Minnesota"},
-            {"code": "MS", "name": "Mississippi"},
-            {"code": "MO", "name": "Missouri"},
-            {"code": "MT", "name": "Montana"},
-            {"code": "NE", "name": "Nebraska"},
-            {"code": "NV", "name": "Nevada"},
-            {"code": "NH", "name": "New Hampshire"},
-            {"code": "NJ", "name": "New Jersey"},
-            {"code": "NM", "name": "New Mexico"},
-            {"code": "NY", "name": "New York"},
-            {"code": "NC", "name": "North Carolina"},
-            {"code": "ND", "name": "North Dakota"},
-            {"code": "OH", "name": "Ohio"},
-            {"code": "OK", "name": "Oklahoma"},
-            {"code": "OR", "name": "Oregon"},
-            {"code": "PA", "name": "Pennsylvania"},
-            {"code": "RI", "name": "Rhode Island"},
-            {"code": "SC", "name": "South Carolina"},
-            {"code": "SD", "name": "South Dakota"},
-            {"code": "TN", "name": "Tennessee"},
-            {"code": "TX", "name": "Texas"},
-            {"code": "UT", "name": "Utah"},
-            {"code": "VT", "name": "Vermont"},
-            {"code": "VA", "name": "Virginia"},
-            {"code": "WA", "name": "Washington"},
-            {"code": "WV", "name": "West Virginia"},
-            {"code": "WI", "name": "Wisconsin"},
-            {"code": "WY", "name": "Wyoming"},
-            {"code": "AB", "name": "Alberta"},
-            {"code": "BC", "name": "British Columbia"},
-            {"code": "MB", "name": "Manitoba"},
-            {"code": "NB", "name": "New Brunswick"},
-            {"code": "NL", "name": "Newfoundland and Labrador"},
-            {"code": "NT", "name": "Northwest Territories"},
-            {"code": "NS", "name": "Nova Scotia"},
-            {"code": "NU", "name": "Nunavut"},
-            {"code": "ON", "name": "Ontario"},
-            {"code": "PE", "name": "Prince Edward Island"},
-            {"code": "QC", "name": "Quebec"},
-            {"code": "SK", "name": "Saskatchewan"},
-            {"code": "YT", "name": "Yukon"}
-        ]
+        "jurisdictions": [{"code": code, "name": name} for code, name in IFTA_JURISDICTIONS.items()]
     }
 
 
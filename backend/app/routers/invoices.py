@@ -10,7 +10,7 @@ from pydantic import BaseModel
 
 from app.core.database import get_db
 from app.core.security import get_current_user
-from app.models import User, Load
+from app.models import Carrier, User, Load
 from app.routers.customers import Customer
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
@@ -83,6 +83,15 @@ class InvoiceUpdate(BaseModel):
     amount_paid: Optional[float] = None
 
 
+class InvoiceBatchPdfRequest(BaseModel):
+    invoice_ids: Optional[List[int]] = None
+    start_date: Optional[str] = None  # YYYY-MM-DD, on invoice_date
+    end_date: Optional[str] = None
+    customer_id: Optional[int] = None
+    status: Optional[str] = None
+    format: str = "zip"  # zip (one PDF per invoice) or pdf (merged)
+
+
 class InvoiceResponse(BaseModel):
     id: int
     invoice_number: str
@@ -419,6 +428,86 @@ def download_invoice_pdf(
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
 
+@router.post("/batch/pdf")
+def download_invoice_pdfs(
+    request: InvoiceBatchPdfRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Render many invoices at once (month-end printing) in the PDF worker pool,
+    returned as a ZIP of PDFs streamed while rendering, or as one merged PDF
+    (assembled in memory, then sent)
+    """
+    from fastapi.responses import StreamingResponse
+    from app.services.invoice_batch import file_chunks, merge_pdfs, render_invoices, zip_entries
+    from app.services.pdf_generator import invoice_pdf_data
+    from app.services.zip_service import ZipService
+
+    carrier_id = current_user.carrier_id
+    if request.format not in ("zip", "pdf"):
+        raise HTTPException(status_code=400, detail="format must be zip or pdf")
+    if not request.invoice_ids and not (request.start_date and request.end_date):
+        raise HTTPException(status_code=400, detail="Provide invoice_ids or start_date and end_date")
+    if request.start_date and request.end_date:
+        try:
+            start_date = datetime.strptime(request.start_date, "%Y-%m-%d").date()
+            end_date = datetime.strptime(request.end_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD")
+
+    query = db.query(Invoice).filter(Invoice.carrier_id == carrier_id)
+    if request.invoice_ids:
+        query = query.filter(Invoice.id.in_(request.invoice_ids))
+    if request.start_date and request.end_date:
+        query = query.filter(Invoice.invoice_date >= start_date, Invoice.invoice_date <= end_date)
+    if request.customer_id:
+        query = query.filter(Invoice.customer_id == request.customer_id)
+    if request.status:
+        query = query.filter(Invoice.status == request.status)
+    invoices = query.order_by(Invoice.invoice_date, Invoice.invoice_number).all()
+    if not invoices:
+        raise HTTPException(status_code=404, detail="No invoices found")
+
+    invoice_ids = [invoice.id for invoice in invoices]
+    customers = {
+        customer.id: customer
+        for customer in db.query(Customer).filter(Customer.id.in_({invoice.customer_id for invoice in invoices}))
+    }
+    line_items = {}
+    for item in db.query(InvoiceLineItem).filter(InvoiceLineItem.invoice_id.in_(invoice_ids)).order_by(InvoiceLineItem.id):
+        line_items.setdefault(item.invoice_id, []).append(item)
+
+    carrier = db.query(Carrier).filter(Carrier.id == carrier_id).first()
+    carrier_info = {
+        "company_name": carrier.name if carrier else "Main TMS",
+        "address": (carrier.address if carrier else None) or "",
+        "phone": (carrier.phone if carrier else None) or "",
+        "email": (carrier.email if carrier else None) or "",
+    }
+    items = [
+        (
+            f"invoice_{invoice.invoice_number}.pdf",
+            invoice_pdf_data(invoice, customers.get(invoice.customer_id), line_items.get(invoice.id, [])),
+        )
+        for invoice in invoices
+    ]
+
+    rendered = render_invoices(items, carrier_info)
+    if request.format == "pdf":
+        merged, _ = merge_pdfs(rendered)
+        return StreamingResponse(
+            file_chunks(merged),
+            media_type="application/pdf",
+            headers={"Content-Disposition": f"attachment; filename=invoices_{len(items)}.pdf"},
+        )
+    return StreamingResponse(
+        ZipService.stream_zip(zip_entries(rendered)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=invoices_{len(items)}.zip"},
+    )
+
+
 @router.get("/stats/summary")
 def get_invoice_stats(
     db: Session = Depends(get_db),
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.security import verify_token
+from app.services.jobs import job_registry
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, token: dict = Depends(verify_token)):
+    """Poll a background job's status, progress and result."""
+    job = job_registry.get(job_id)
+    if not job or job.carrier_id != token.get("carrier_id"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -8,9 +8,9 @@ from typing import Optional, List
 from datetime import datetime, date
 from pydantic import BaseModel
 import os
-import requests
 
 from app.core.database import get_db
+from app.core.http_client import HTTPError, http_client
 from app.core.security import get_current_user
 from app.models import User, Load
 
@@ -25,6 +25,9 @@ TRUCKSTOP_API_KEY = os.getenv("TRUCKSTOP_API_KEY", "")
 TRUCKSTOP_API_SECRET = os.getenv("TRUCKSTOP_API_SECRET", "")
 TRUCKSTOP_API_BASE_URL = "https://api.truckstop.com/v2"
 
+dat_http = http_client("dat", base_url=DAT_API_BASE_URL, timeout=30, rate_per_second=5, burst=5)
+truckstop_http = http_client("truckstop", base_url=TRUCKSTOP_API_BASE_URL, timeout=30, rate_per_second=5, burst=5)
+
 
 # Pydantic Models
 class LoadSearchCriteria(BaseModel):
@@ -111,8 +114,8 @@ def search_dat_loads(
     params = {k: v for k, v in params.items() if v is not None}
     
     try:
-        response = requests.get(
-            f"{DAT_API_BASE_URL}/loads/search",
+        response = dat_http.get(
+            "/loads/search",
             headers=headers,
             params=params,
             timeout=30
@@ -152,7 +155,7 @@ def search_dat_loads(
                 detail=f"DAT API error: {response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         # Return empty list if API is not configured or fails
         return []
 
@@ -186,8 +189,8 @@ def get_dat_market_rates(
     }
     
     try:
-        response = requests.get(
-            f"{DAT_API_BASE_URL}/rates/lane",
+        response = dat_http.get(
+            "/rates/lane",
             headers=headers,
             params=params,
             timeout=30
@@ -201,7 +204,7 @@ def get_dat_market_rates(
                 detail=f"DAT API error: {response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         return {
             "error": str(e),
             "message": "Failed to fetch DAT rates"
@@ -279,8 +282,8 @@ def search_truckstop_loads(
     }
     
     try:
-        response = requests.post(
-            f"{TRUCKSTOP_API_BASE_URL}/loads/search",
+        response = truckstop_http.post(
+            "/loads/search",
             headers=headers,
             json=search_payload,
             timeout=30
@@ -320,7 +323,7 @@ def search_truckstop_loads(
                 detail=f"TruckStop API error: {response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         # Return empty list if API is not configured or fails
         return []
 
@@ -368,8 +371,8 @@ def post_truck_to_truckstop(
     }
     
     try:
-        response = requests.post(
-            f"{TRUCKSTOP_API_BASE_URL}/trucks/post",
+        response = truckstop_http.post(
+            "/trucks/post",
             headers=headers,
             json=truck_payload,
             timeout=30
@@ -387,7 +390,7 @@ def post_truck_to_truckstop(
                 detail=f"TruckStop API error: {response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to post truck: {str(e)}"
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, joinedload, selectinload, sessionmaker
 from typing import List, Optional
+import hashlib
 import io
 import re
 from datetime import datetime
@@ -16,15 +19,106 @@ from app.services.dropbox import DropboxService
 from pypdf import PdfReader
 from PIL import Image
 from app.services.pay_engine import recalc_load_pay
-from app.services.rate_con_ocr import RateConfirmationOCR
+from app.services.rate_con_ocr import FieldExtractor, RateConfirmationOCR, is_amount
 from app.services.mapbox import MapboxService, calculate_rate_per_mile
+from app.services.address import apply_load_address_fields, apply_stop_address_fields, format_city_state
+from app.services.dispatch_stats import invalidate_dispatch_stats
+from app.services.jobs import job_registry
+from app.services import ocr_pipeline
+from app.utils.pagination import encode_cursor, keyset_after
 import pdf2image
 
 router = APIRouter(prefix="/loads", tags=["loads"])
 
 
+LOAD_PROJECTION_FIELDS = set(models.Load.__table__.columns.keys())
+
+
+def _load_list_item(load: models.Load) -> LoadResponse:
+    load_dict = {
+        'id': load.id,
+        'carrier_id': load.carrier_id,
+        'load_number': load.load_number,
+        'status': load.status,
+        'pickup_address': load.pickup_address,
+        'pickup_date': load.pickup_date,
+        'delivery_address': load.delivery_address,
+        'delivery_date': load.delivery_date,
+        'notes': load.notes,
+        'driver_id': load.driver_id,
+        'broker_name': load.broker_name,
+        'po_number': load.po_number,
+        'rate_amount': load.rate_amount,
+        'broker_rate': load.rate_amount,
+        'rc_document': load.rc_document,
+        'bol_document': load.bol_document,
+        'pod_document': load.pod_document,
+        'invoice_document': load.invoice_document,
+        'receipt_document': load.receipt_document,
+        'other_document': load.other_document,
+        # Partial Load Details
+        'load_type': load.load_type,
+        'weight': load.weight,
+        'pallets': load.pallets,
+        'length_ft': load.length_ft,
+        'total_miles': load.total_miles,
+        'rate_per_mile': load.rate_per_mile,
+        'stops': load.stops,
+        'created_at': load.created_at,
+        'updated_at': getattr(load, 'updated_at', None),
+    }
+
+    # Add driver relationship
+    if load.driver:
+        load_dict['driver'] = {
+            'id': load.driver.id,
+            'name': load.driver.name
+        }
+
+    # Add customer relationship
+    if load.customer:
+        load_dict['customer'] = {
+            'id': load.customer.id,
+            'company_name': load.customer.company_name,
+            'customer_type': load.customer.customer_type
+        }
+
+    # Location columns are parsed once on write (see app.services.address)
+    load_dict['pickup_location'] = load.pickup_address.partition(',')[0].strip() if load.pickup_address else None
+    load_dict['pickup_city'] = load.pickup_city
+    load_dict['pickup_state'] = load.pickup_state
+    load_dict['pickup_zip'] = load.pickup_zip
+    load_dict['pickup_latitude'] = load.pickup_latitude
+    load_dict['pickup_longitude'] = load.pickup_longitude
+    load_dict['delivery_location'] = load.delivery_address.partition(',')[0].strip() if load.delivery_address else None
+    load_dict['delivery_city'] = load.delivery_city
+    load_dict['delivery_state'] = load.delivery_state
+    load_dict['delivery_zip'] = load.delivery_zip
+    load_dict['delivery_latitude'] = load.delivery_latitude
+    load_dict['delivery_longitude'] = load.delivery_longitude
+
+    return LoadResponse(**load_dict)
+
+
 @router.get("", response_model=list[LoadResponse])
-def list_loads(token: dict = Depends(verify_token), db: Session = Depends(get_db)):
+def list_loads(
+    response: Response,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    status: Optional[str] = Query(None, description="Comma-separated statuses"),
+    driver_id: Optional[int] = Query(None),
+    customer_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Pickup date lower bound (inclusive)"),
+    date_to: Optional[datetime] = Query(None, description="Pickup date upper bound (inclusive)"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return instead of full loads"),
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db),
+):
+    """
+    List loads newest first, paged by keyset on (created_at, id).
+    The next page cursor is returned in the X-Next-Cursor header; the body keeps
+    the LoadResponse list shape unless `fields` requests a column projection.
+    """
     role = token.get("role")
     carrier_id = token.get("carrier_id")
     if not carrier_id:
@@ -35,87 +129,49 @@ def list_loads(token: dict = Depends(verify_token), db: Session = Depends(get_db
         if not token.get("driver_id"):
             return []
         query = query.filter(models.Load.driver_id == token.get("driver_id"))
-    
-    from sqlalchemy.orm import joinedload
-    
+
+    if status:
+        statuses = [s.strip() for s in status.split(",") if s.strip()]
+        query = query.filter(models.Load.status.in_(statuses))
+    if driver_id is not None:
+        query = query.filter(models.Load.driver_id == driver_id)
+    if customer_id is not None:
+        query = query.filter(models.Load.customer_id == customer_id)
+    if date_from is not None:
+        query = query.filter(models.Load.pickup_date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.Load.pickup_date <= date_to)
+
+    after = keyset_after(models.Load.created_at, models.Load.id, cursor)
+    if after is not None:
+        query = query.filter(after)
+    query = query.order_by(models.Load.created_at.desc(), models.Load.id.desc()).limit(limit + 1)
+
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in LOAD_PROJECTION_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        columns = ["id", "created_at"] + [f for f in requested if f not in ("id", "created_at")]
+        rows = query.with_entities(*[getattr(models.Load, c) for c in columns]).all()
+        page = rows[:limit]
+        headers = {}
+        if len(rows) > limit:
+            headers["X-Next-Cursor"] = encode_cursor(page[-1].created_at, page[-1].id)
+        items = [{c: getattr(row, c) for c in columns if c in requested or c == "id"} for row in page]
+        return JSONResponse(content=jsonable_encoder(items), headers=headers)
+
     loads = query.options(
         joinedload(models.Load.driver),
         joinedload(models.Load.customer),
-        joinedload(models.Load.stops)
-    ).order_by(models.Load.created_at.desc()).all()
-    
-    # Enhance each load with parsed address data
-    result = []
-    for load in loads:
-        load_dict = {
-            'id': load.id,
-            'carrier_id': load.carrier_id,
-            'load_number': load.load_number,
-            'status': load.status,
-            'pickup_address': load.pickup_address,
-            'pickup_date': load.pickup_date,
-            'delivery_address': load.delivery_address,
-            'delivery_date': load.delivery_date,
-            'notes': load.notes,
-            'driver_id': load.driver_id,
-            'broker_name': load.broker_name,
-            'po_number': load.po_number,
-            'rate_amount': load.rate_amount,
-            'broker_rate': load.rate_amount,
-            'rc_document': load.rc_document,
-            'bol_document': load.bol_document,
-            'pod_document': load.pod_document,
-            'invoice_document': load.invoice_document,
-            'receipt_document': load.receipt_document,
-            'other_document': load.other_document,
-            # Partial Load Details
-            'load_type': load.load_type,
-            'weight': load.weight,
-            'pallets': load.pallets,
-            'length_ft': load.length_ft,
-            'total_miles': load.total_miles,
-            'rate_per_mile': load.rate_per_mile,
-            'stops': load.stops,
-            'created_at': load.created_at,
-            'updated_at': getattr(load, 'updated_at', None),
-        }
-        
-        # Add driver relationship
-        if load.driver:
-            load_dict['driver'] = {
-                'id': load.driver.id,
-                'name': load.driver.name
-            }
-        
-        # Add customer relationship
-        if load.customer:
-            load_dict['customer'] = {
-                'id': load.customer.id,
-                'company_name': load.customer.company_name,
-                'customer_type': load.customer.customer_type
-            }
-        
-        # Parse pickup address
-        if load.pickup_address:
-            parts = load.pickup_address.split(',')
-            load_dict['pickup_location'] = parts[0].strip() if len(parts) > 0 else None
-            load_dict['pickup_city'] = parts[1].strip() if len(parts) > 1 else None
-            if len(parts) > 2:
-                state_parts = parts[2].strip().split()
-                load_dict['pickup_state'] = state_parts[0] if state_parts else None
-        
-        # Parse delivery address
-        if load.delivery_address:
-            parts = load.delivery_address.split(',')
-            load_dict['delivery_location'] = parts[0].strip() if len(parts) > 0 else None
-            load_dict['delivery_city'] = parts[1].strip() if len(parts) > 1 else None
-            if len(parts) > 2:
-                state_parts = parts[2].strip().split()
-                load_dict['delivery_state'] = state_parts[0] if state_parts else None
-        
-        result.append(LoadResponse(**load_dict))
-    
-    return result
+        selectinload(models.Load.stops)
+    ).all()
+
+    page = loads[:limit]
+    if len(loads) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1].created_at, page[-1].id)
+
+    return [_load_list_item(load) for load in page]
 
 
 @router.get("/{load_id}", response_model=LoadResponse)
@@ -220,6 +276,7 @@ def create_load(payload: LoadCreate, token: dict = Depends(verify_token), db: Se
         receipt_document=payload.receipt_document,
         other_document=payload.other_document,
     )
+    apply_load_address_fields(load)
     db.add(load)
     db.flush() # Get load.id
     
@@ -241,9 +298,11 @@ def create_load(payload: LoadCreate, token: dict = Depends(verify_token), db: Se
                 website=stop_data.website,
                 hours=stop_data.hours
             )
+            apply_stop_address_fields(stop)
             db.add(stop)
     
     db.commit()
+    invalidate_dispatch_stats(carrier_id)
     db.refresh(load)
     
     # Auto-calculate metrics
@@ -263,7 +322,8 @@ def update_load(load_id: int, payload: LoadUpdate, token: dict = Depends(verify_
     if token.get("role") == "driver" and token.get("driver_id") and load.driver_id != token.get("driver_id"):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    for field, value in payload.model_dump(exclude_unset=True).items():
+    updates = payload.model_dump(exclude_unset=True)
+    for field, value in updates.items():
         if field == 'stops' and value is not None:
             # Clear existing stops
             db.query(models.LoadStop).filter(models.LoadStop.load_id == load.id).delete()
@@ -284,11 +344,16 @@ def update_load(load_id: int, payload: LoadUpdate, token: dict = Depends(verify_
                     website=stop_data.get('website'),
                     hours=stop_data.get('hours')
                 )
+                apply_stop_address_fields(stop)
                 db.add(stop)
         elif hasattr(load, field):
             setattr(load, field, value)
-    
+
+    if 'pickup_address' in updates or 'delivery_address' in updates:
+        apply_load_address_fields(load)
+
     db.commit()
+    invalidate_dispatch_stats(carrier_id)
     
     # Auto-calculate metrics if relevant fields changed
     update_load_metrics(load, db)
@@ -338,95 +403,93 @@ def get_pay_ledger(load_id: int, token: dict = Depends(verify_token), db: Sessio
     for line in lines:
         grouped.setdefault(line.payee_id, []).append(line)
 
+    # Pass-through lines only carry the counterpart payee's name in the description
+    counterpart_names: dict[int, str] = {}
+    for line in lines:
+        if line.category != "pass_through" or not line.description:
+            continue
+        if line.amount < 0 and "→" in line.description:
+            counterpart_names[line.id] = line.description.split("→")[-1].strip()
+        elif line.amount >= 0 and "(from " in line.description:
+            counterpart_names[line.id] = line.description.split("(from ")[-1].rstrip(")")
+
+    # One query for every referenced payee, by id or by counterpart name
+    payee_filter = models.Payee.id.in_(list(grouped))
+    if counterpart_names:
+        payee_filter = or_(
+            payee_filter,
+            and_(
+                models.Payee.carrier_id == load.carrier_id,
+                or_(*[models.Payee.name.ilike(f"%{name}%") for name in set(counterpart_names.values())]),
+            ),
+        )
+    payees = db.query(models.Payee).filter(payee_filter).order_by(models.Payee.id).all() if grouped else []
+    payees_by_id = {payee.id: payee for payee in payees}
+    carrier_payees = [payee for payee in payees if payee.carrier_id == load.carrier_id]
+
+    def _match_payee_id(name: str) -> Optional[int]:
+        needle = name.lower()
+        for payee in carrier_payees:
+            if needle in payee.name.lower():
+                return payee.id
+        return None
+
+    # One query for the active pay profile's driver_kind of each payee's driver
+    driver_kinds: dict[int, str] = {}
+    if grouped:
+        profile_rows = (
+            db.query(models.Driver.payee_id, models.DriverPayProfile.driver_kind)
+            .join(models.DriverPayProfile, models.DriverPayProfile.driver_id == models.Driver.id)
+            .filter(
+                models.Driver.payee_id.in_(list(grouped)),
+                models.DriverPayProfile.active == True
+            )
+            .order_by(models.Driver.id, models.DriverPayProfile.id)
+            .all()
+        )
+        for payee_id, driver_kind in profile_rows:
+            driver_kinds.setdefault(payee_id, driver_kind)
+
     by_payee: list[PayeeLedgerResponse] = []
     load_total = 0.0
     for payee_id, payee_lines in grouped.items():
-        payee = db.query(models.Payee).filter(models.Payee.id == payee_id).first()
-        
+        payee = payees_by_id.get(payee_id)
+
         # Separate regular lines from pass-through items
         regular_lines = []
         pass_through_lines = []
-        
+
         for line in payee_lines:
-            if line.category == "pass_through":
-                # For pass-through, we need to get the other payee info
-                if line.amount < 0:
-                    # This is a deduction - find who receives it
-                    # Look for description pattern or search for matching positive line
-                    dest_payee_id = None
-                    dest_payee_name = None
-                    
-                    # Try to parse from description "Something → PayeeName"
-                    if line.description and "→" in line.description:
-                        dest_name = line.description.split("→")[-1].strip()
-                        dest_payee_name = dest_name
-                        # Try to find payee by name
-                        dest_payee = db.query(models.Payee).filter(
-                            models.Payee.name.ilike(f"%{dest_name}%"),
-                            models.Payee.carrier_id == load.carrier_id
-                        ).first()
-                        if dest_payee:
-                            dest_payee_id = dest_payee.id
-                    
-                    pass_through_lines.append({
-                        "id": line.id,
-                        "category": line.category,
-                        "description": line.description,
-                        "amount": line.amount,
-                        "destination_payee_id": dest_payee_id,
-                        "destination_payee_name": dest_payee_name,
-                        "source_payee_id": None,
-                        "source_payee_name": None,
-                        "locked_at": line.locked_at,
-                        "settlement_id": line.settlement_id,
-                    })
-                else:
-                    # This is income from pass-through - find who it came from
-                    source_payee_id = None
-                    source_payee_name = None
-                    
-                    # Try to parse from description "Something (from PayeeName)"
-                    if line.description and "(from " in line.description:
-                        source_name = line.description.split("(from ")[-1].rstrip(")")
-                        source_payee_name = source_name
-                        # Try to find payee by name
-                        source_payee = db.query(models.Payee).filter(
-                            models.Payee.name.ilike(f"%{source_name}%"),
-                            models.Payee.carrier_id == load.carrier_id
-                        ).first()
-                        if source_payee:
-                            source_payee_id = source_payee.id
-                    
-                    regular_lines.append(line)  # Show as regular income for destination payee
-                    # But also track it's from pass-through
+            if line.category == "pass_through" and line.amount < 0:
+                # Deduction - the description names who receives it ("Something → PayeeName")
+                dest_payee_name = counterpart_names.get(line.id)
+                pass_through_lines.append({
+                    "id": line.id,
+                    "category": line.category,
+                    "description": line.description,
+                    "amount": line.amount,
+                    "destination_payee_id": _match_payee_id(dest_payee_name) if dest_payee_name else None,
+                    "destination_payee_name": dest_payee_name,
+                    "source_payee_id": None,
+                    "source_payee_name": None,
+                    "locked_at": line.locked_at,
+                    "settlement_id": line.settlement_id,
+                })
             else:
+                # Pass-through income ("... (from PayeeName)") shows as regular income for the destination payee
                 regular_lines.append(line)
-        
+
         subtotal = round(sum(l.amount for l in payee_lines), 2)
         load_total += subtotal
-        
-        # Get driver info if this payee is linked to a driver
-        driver_kind = None
-        payable_to = payee.name if payee else f"Payee {payee_id}"
-        
-        if payee:
-            driver = db.query(models.Driver).filter(models.Driver.payee_id == payee_id).first()
-            if driver:
-                pay_profile = db.query(models.DriverPayProfile).filter(
-                    models.DriverPayProfile.driver_id == driver.id,
-                    models.DriverPayProfile.active == True
-                ).first()
-                if pay_profile:
-                    driver_kind = pay_profile.driver_kind
-                    payable_to = payee.name  # Can be customized based on payee_type
-        
+
+        payee_name = payee.name if payee else f"Payee {payee_id}"
         by_payee.append(
             PayeeLedgerResponse(
                 payee_id=payee_id,
-                payee_name=payee.name if payee else f"Payee {payee_id}",
+                payee_name=payee_name,
                 payee_type=payee.payee_type if payee else "person",
-                payable_to=payable_to,
-                driver_kind=driver_kind,
+                payable_to=payee_name,
+                driver_kind=driver_kinds.get(payee_id) if payee else None,
                 subtotal=subtotal,
                 lines=[LedgerLineResponse.model_validate(l) for l in regular_lines],
                 pass_through_deductions=[PassThroughLineResponse(**pt) for pt in pass_through_lines],
@@ -570,12 +633,183 @@ def add_pass_through_deduction(
     }
 
 
-@router.post("/auto-create")
+# Draft fields for /auto-create, compiled once (see FieldExtractor)
+AUTO_CREATE_FIELDS = {
+    "broker": [(r"Broker\s*[:\-]\s*([A-Za-z0-9 &.,'/-]{3,})", 0.9)],
+    "po_number": [
+        (r"PO\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)", 0.85),
+        (r"Purchase Order\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)", 0.9),
+    ],
+    "rate": [(r"(\$[\d,]+(?:\.\d{2})?)", 0.7)],
+    "carrier_ref": [
+        (r"Carrier Ref\s*[:\-]\s*([A-Za-z0-9-]+)", 0.9),
+        (r"Carrier\s*Ref\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)", 0.85),
+    ],
+    "load_number": [(r"Load\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)", 0.85)],
+}
+auto_create_extractor = FieldExtractor(AUTO_CREATE_FIELDS, validators={"rate": is_amount})
+CITY_STATE_RE = re.compile(r"([A-Za-z][A-Za-z .'-]+),\s*([A-Z]{2})\b")
+
+
+def _find_city_state_pairs(text: str) -> list[tuple[str, str]]:
+    pairs = []
+    for match in CITY_STATE_RE.finditer(text):
+        city_match = match.group(1)
+        state_match = match.group(2)
+        if city_match and state_match:
+            pairs.append(((city_match or "").strip(), (state_match or "").strip()))
+    return pairs
+
+
+def _rate_con_draft_fields(text: str) -> dict:
+    """Best-effort draft fields from rate-con text for /auto-create, with per-field confidence."""
+    found = auto_create_extractor.extract(text)
+    city_pairs = _find_city_state_pairs(text)
+    pickup_city, pickup_state = city_pairs[0] if len(city_pairs) > 0 else ("TBD", "TBD")
+    delivery_city, delivery_state = city_pairs[1] if len(city_pairs) > 1 else ("TBD", "TBD")
+
+    def value(field: str, default: Optional[str]) -> Optional[str]:
+        return found[field]["value"] if field in found else default
+
+    return {
+        "broker": value("broker", "Unknown Broker"),
+        "po_number": value("po_number", "TBD"),
+        "rate": value("rate", "$0.00"),
+        "carrier_ref": value("carrier_ref", "TBD"),
+        "load_number": value("load_number", None),
+        "pickup_city": pickup_city,
+        "pickup_state": pickup_state,
+        "delivery_city": delivery_city,
+        "delivery_state": delivery_state,
+        "confidence_scores": {field: result["confidence"] for field, result in found.items()},
+    }
+
+
+def _upload_hashes(file_blobs: list) -> tuple[list[str], str]:
+    """SHA-256 per file, plus one hash for the whole upload (the file's own for single uploads)."""
+    hashes = [hashlib.sha256(content).hexdigest() for _, content, _ in file_blobs]
+    if len(hashes) == 1:
+        return hashes, hashes[0]
+    return hashes, hashlib.sha256("".join(hashes).encode()).hexdigest()
+
+
+def _find_cached_extraction(db: Session, carrier_id: int, content_hash: str) -> Optional[models.LoadExtraction]:
+    """Earliest completed, non-empty extraction of the same upload for this carrier."""
+    return db.query(models.LoadExtraction).filter(
+        models.LoadExtraction.carrier_id == carrier_id,
+        models.LoadExtraction.content_hash == content_hash,
+        models.LoadExtraction.status == "completed",
+        models.LoadExtraction.duplicate_of_id.is_(None),
+        models.LoadExtraction.raw_text != "",
+    ).order_by(models.LoadExtraction.id).first()
+
+
+def _complete_auto_create(
+    db: Session,
+    load_id: int,
+    extraction_id: int,
+    file_blobs: list,
+    job_id: Optional[str] = None,
+    progress=None,
+    cached_id: Optional[int] = None,
+) -> dict:
+    """
+    OCR the uploads, fill in the draft load and store the text on its LoadExtraction.
+
+    With cached_id (an earlier extraction of identical files) the stored text
+    and fields are reused and no PDF parsing or OCR runs.
+    """
+    extraction = db.get(models.LoadExtraction, extraction_id)
+    extraction.status = "processing"
+    extraction.job_id = job_id
+    db.commit()
+
+    # Any failure from here on must not leave the extraction stuck in "processing"
+    try:
+        cached = db.get(models.LoadExtraction, cached_id) if cached_id else None
+        if cached is not None:
+            ocr = {"text": cached.raw_text, "page_count": cached.page_count, "ocr_pages": 0, "ocr_errors": 0, "duration_ms": 0}
+        else:
+            ocr = ocr_pipeline.ocr_files(file_blobs, progress=progress)
+
+        combined_text = ocr["text"]
+        if cached is not None and cached.source == "auto_create" and cached.parsed_fields:
+            fields = dict(cached.parsed_fields)
+        else:
+            fields = _rate_con_draft_fields(combined_text)
+        notes = f"Auto-created from {len(file_blobs)} file(s)."
+
+        load = db.get(models.Load, load_id)
+        if fields["load_number"]:
+            load.load_number = fields["load_number"]
+        load.pickup_address = f"{fields['pickup_city']}, {fields['pickup_state']}"
+        load.delivery_address = f"{fields['delivery_city']}, {fields['delivery_state']}"
+        load.notes = notes
+        apply_load_address_fields(load)
+
+        file_links: list[str] = []
+        if settings.ENABLE_DROPBOX:
+            try:
+                dropbox = DropboxService()
+                base_path = f"{settings.DROPBOX_ROOT_FOLDER}/{load.carrier_id}/loads/{load.id}/rate-confirmations"
+                upload_items = [(filename, content) for filename, content, _ in file_blobs]
+                file_links = dropbox.upload_files(upload_items, base_path)
+            except Exception:
+                file_links = []
+        if file_links:
+            load.notes = f"{notes} Uploaded files: {', '.join(file_links)}"
+
+        extraction.raw_text = combined_text
+        extraction.parsed_fields = fields
+        extraction.status = "completed"
+        extraction.page_count = ocr["page_count"]
+        extraction.ocr_pages = ocr["ocr_pages"]
+        extraction.duration_ms = ocr["duration_ms"]
+        extraction.error = f"{ocr['ocr_errors']} page(s) could not be OCR'd" if ocr["ocr_errors"] else None
+        extraction.completed_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        extraction.status = "failed"
+        extraction.error = str(e) or type(e).__name__
+        extraction.completed_at = datetime.utcnow()
+        db.commit()
+        raise
+
+    invalidate_dispatch_stats(load.carrier_id)
+
+    return {
+        "broker": fields["broker"],
+        "po_number": fields["po_number"],
+        "rate": fields["rate"],
+        "carrier_ref": fields["carrier_ref"],
+        "notes": notes,
+        "file_links": file_links,
+        "stops": [
+            {"type": "Pickup", "city": fields["pickup_city"], "state": fields["pickup_state"], "date": "TBD", "time": "TBD"},
+            {"type": "Delivery", "city": fields["delivery_city"], "state": fields["delivery_state"], "date": "TBD", "time": "TBD"},
+        ],
+        "confidence_scores": fields.get("confidence_scores", {}),
+        "load_id": load.id,
+        "extraction_id": extraction.id,
+        "duplicate_of": extraction.duplicate_of_id,
+    }
+
+
+@router.post("/auto-create", status_code=202)
 def auto_create_load(
     files: List[UploadFile] = File(...),
     token: dict = Depends(verify_token),
     db: Session = Depends(get_db),
 ):
+    """
+    Create a draft load from rate-con uploads.
+
+    The draft and a pending LoadExtraction are created immediately; text
+    extraction/OCR runs as a background job that fills in the draft. Poll
+    GET /jobs/{job_id} for the parsed fields. Re-uploads of files already
+    extracted for this carrier (same SHA-256) reuse the stored text.
+    """
     carrier_id = token.get("carrier_id")
     if not carrier_id:
         raise HTTPException(status_code=400, detail="Missing carrier_id")
@@ -595,148 +829,206 @@ def auto_create_load(
             raise HTTPException(status_code=400, detail="File exceeds 5MB limit")
         file_blobs.append((upload.filename, content, upload.content_type))
 
-    def extract_text_from_pdf(content: bytes) -> str:
-        try:
-            reader = PdfReader(io.BytesIO(content))
-            return "\n".join([page.extract_text() or "" for page in reader.pages])
-        except Exception:
-            return ""
-
-    def ocr_image_bytes(content: bytes) -> str:
-        try:
-            import pytesseract  # type: ignore
-        except Exception:
-            return ""
-        try:
-            image = Image.open(io.BytesIO(content))
-            return pytesseract.image_to_string(image) or ""
-        except Exception:
-            return ""
-
-    def ocr_pdf_bytes(content: bytes) -> str:
-        try:
-            import pytesseract  # type: ignore
-            from pdf2image import convert_from_bytes  # type: ignore
-        except Exception:
-            return ""
-        try:
-            images = convert_from_bytes(content)
-            text_chunks = []
-            for image in images:
-                text_chunks.append(pytesseract.image_to_string(image) or "")
-            return "\n".join([t for t in text_chunks if t])
-        except Exception:
-            return ""
-
-    def find_first(patterns: list[str], text: str) -> str | None:
-        for pattern in patterns:
-            match = re.search(pattern, text, flags=re.IGNORECASE)
-            if match:
-                val = match.group(1)
-                return (val or "").strip() if val else None
-        return None
-
-    def find_city_state_pairs(text: str) -> list[tuple[str, str]]:
-        pairs = []
-        for match in re.finditer(r"([A-Za-z][A-Za-z .'-]+),\s*([A-Z]{2})\b", text):
-            city_match = match.group(1)
-            state_match = match.group(2)
-            if city_match and state_match:
-                pairs.append(((city_match or "").strip(), (state_match or "").strip()))
-        return pairs
-
-    combined_text = ""
-    ocr_text = ""
-    for filename, content, content_type in file_blobs:
-        if content_type == "application/pdf":
-            extracted = extract_text_from_pdf(content)
-            combined_text += "\n" + (extracted or "")
-            if len((extracted or "").strip()) < 50:
-                ocr_text += "\n" + ocr_pdf_bytes(content)
-        elif content_type in {"image/jpeg", "image/png"}:
-            ocr_text += "\n" + ocr_image_bytes(content)
-
-    if (ocr_text or "").strip():
-        combined_text = combined_text + "\n" + ocr_text
-
-    broker = find_first([r"Broker\s*[:\-]\s*([A-Za-z0-9 &.,'/-]{3,})"], combined_text) or "Unknown Broker"
-    po_number = find_first([r"PO\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)", r"Purchase Order\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)"], combined_text) or "TBD"
-    rate = find_first([r"(\$[\d,]+(?:\.\d{2})?)"], combined_text) or "$0.00"
-    carrier_ref = find_first([r"Carrier Ref\s*[:\-]\s*([A-Za-z0-9-]+)", r"Carrier\s*Ref\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)"], combined_text) or "TBD"
-    load_number = find_first([r"Load\s*#?\s*[:\-]?\s*([A-Za-z0-9-]+)"], combined_text)
-    if not load_number:
-        load_number = f"AUTO-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-
-    city_pairs = find_city_state_pairs(combined_text)
-    pickup_city, pickup_state = city_pairs[0] if len(city_pairs) > 0 else ("TBD", "TBD")
-    delivery_city, delivery_state = city_pairs[1] if len(city_pairs) > 1 else ("TBD", "TBD")
-
-    pickup_address = f"{pickup_city}, {pickup_state}"
-    delivery_address = f"{delivery_city}, {delivery_state}"
-    notes = f"Auto-created from {len(file_blobs)} file(s)."
+    file_hashes, content_hash = _upload_hashes(file_blobs)
+    cached = _find_cached_extraction(db, carrier_id, content_hash)
 
     load = models.Load(
         carrier_id=carrier_id,
         driver_id=None,
-        load_number=load_number,
+        load_number=f"AUTO-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
         status="Draft",
-        pickup_address=pickup_address,
-        delivery_address=delivery_address,
-        notes=notes,
+        pickup_address="TBD, TBD",
+        delivery_address="TBD, TBD",
+        notes=f"Processing {len(file_blobs)} file(s)...",
     )
+    apply_load_address_fields(load)
     db.add(load)
+    db.flush()
+    extraction = models.LoadExtraction(
+        carrier_id=carrier_id,
+        load_id=load.id,
+        source="auto_create",
+        raw_text="",
+        source_files=[filename for filename, _, _ in file_blobs],
+        file_hashes=file_hashes,
+        content_hash=content_hash,
+        duplicate_of_id=cached.id if cached else None,
+        status="pending",
+    )
+    db.add(extraction)
     db.commit()
-    db.refresh(load)
+    invalidate_dispatch_stats(carrier_id)
 
-    file_links: list[str] = []
-    if settings.ENABLE_DROPBOX:
+    load_id, extraction_id = load.id, extraction.id
+    cached_id = cached.id if cached else None
+    session_factory = sessionmaker(bind=db.get_bind())
+
+    def run(job):
+        job_db = session_factory()
         try:
-            dropbox = DropboxService()
-            base_path = f"{settings.DROPBOX_ROOT_FOLDER}/{carrier_id}/loads/{load.id}/rate-confirmations"
-            upload_items = [(filename, content) for filename, content, _ in file_blobs]
-            file_links = dropbox.upload_files(upload_items, base_path)
-        except Exception:
-            file_links = []
-
-    if (combined_text or "").strip():
-        extraction = models.LoadExtraction(
-            load_id=load.id,
-            raw_text=(combined_text or "").strip(),
-            source_files=[filename for filename, _, _ in file_blobs],
-        )
-        db.add(extraction)
-        db.commit()
+            return _complete_auto_create(
+                job_db, load_id, extraction_id, file_blobs,
+                job_id=job.id,
+                progress=lambda done, total: job.update(done, total, "OCR pages"),
+                cached_id=cached_id,
+            )
+        finally:
+            job_db.close()
 
-    if file_links:
-        load.notes = f"{notes} Uploaded files: {', '.join(file_links)}"
-        db.commit()
+    job = job_registry.submit("rate_con_ocr", carrier_id, run)
 
     return {
-        "broker": broker,
-        "po_number": po_number,
-        "rate": rate,
-        "carrier_ref": carrier_ref,
-        "notes": notes,
-        "file_links": file_links,
-        "stops": [
-            {"type": "Pickup", "city": pickup_city, "state": pickup_state, "date": "TBD", "time": "TBD"},
-            {"type": "Delivery", "city": delivery_city, "state": delivery_state, "date": "TBD", "time": "TBD"},
+        "ok": True,
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "load_id": load_id,
+        "extraction_id": extraction_id,
+        "duplicate_of": cached_id,
+    }
+
+
+@router.get("/extractions/duplicates")
+def list_duplicate_uploads(
+    limit: int = Query(100, ge=1, le=500),
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db),
+):
+    """Rate-con files uploaded more than once (same SHA-256) for this carrier, most repeated first."""
+    carrier_id = token.get("carrier_id")
+    if not carrier_id:
+        raise HTTPException(status_code=400, detail="Missing carrier_id")
+
+    uploads = func.count(models.LoadExtraction.id)
+    groups = db.query(
+        models.LoadExtraction.content_hash,
+        uploads,
+        func.min(models.LoadExtraction.created_at),
+        func.max(models.LoadExtraction.created_at),
+    ).filter(
+        models.LoadExtraction.carrier_id == carrier_id,
+        models.LoadExtraction.content_hash.isnot(None),
+    ).group_by(models.LoadExtraction.content_hash).having(uploads > 1).order_by(
+        uploads.desc(), func.max(models.LoadExtraction.created_at).desc()
+    ).limit(limit).all()
+
+    members: dict[str, list] = {content_hash: [] for content_hash, *_ in groups}
+    if members:
+        rows = db.query(
+            models.LoadExtraction.id,
+            models.LoadExtraction.content_hash,
+            models.LoadExtraction.load_id,
+            models.LoadExtraction.source,
+            models.LoadExtraction.source_files,
+            models.LoadExtraction.duplicate_of_id,
+            models.LoadExtraction.created_at,
+        ).filter(
+            models.LoadExtraction.carrier_id == carrier_id,
+            models.LoadExtraction.content_hash.in_(list(members)),
+        ).order_by(models.LoadExtraction.id)
+        for row in rows:
+            members[row.content_hash].append({
+                "id": row.id,
+                "load_id": row.load_id,
+                "source": row.source,
+                "source_files": row.source_files,
+                "duplicate_of": row.duplicate_of_id,
+                "created_at": row.created_at,
+            })
+
+    return {
+        "duplicate_groups": len(groups),
+        "redundant_uploads": sum(count - 1 for _, count, _, _ in groups),
+        "items": [
+            {
+                "content_hash": content_hash,
+                "uploads": count,
+                "first_uploaded_at": first_at,
+                "last_uploaded_at": last_at,
+                "extractions": members[content_hash],
+            }
+            for content_hash, count, first_at, last_at in groups
         ],
-        "load_id": load.id,
     }
 
 
+@router.get("/{load_id}/extractions")
+def list_load_extractions(
+    load_id: int,
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db),
+):
+    """Rate-con text extractions for a load, newest first, with OCR job status."""
+    carrier_id = token.get("carrier_id")
+    load = db.query(models.Load.id).filter(
+        models.Load.id == load_id,
+        models.Load.carrier_id == carrier_id,
+    ).first()
+    if not load:
+        raise HTTPException(status_code=404, detail="Load not found")
+
+    extractions = db.query(models.LoadExtraction).filter(
+        models.LoadExtraction.load_id == load_id
+    ).order_by(models.LoadExtraction.created_at.desc(), models.LoadExtraction.id.desc()).all()
+    return [
+        {
+            "id": e.id,
+            "status": e.status,
+            "job_id": e.job_id,
+            "content_hash": e.content_hash,
+            "duplicate_of": e.duplicate_of_id,
+            "source_files": e.source_files,
+            "page_count": e.page_count,
+            "ocr_pages": e.ocr_pages,
+            "duration_ms": e.duration_ms,
+            "error": e.error,
+            "raw_text": e.raw_text,
+            "created_at": e.created_at,
+            "completed_at": e.completed_at,
+        }
+        for e in extractions
+    ]
+
+
 @router.post("/parse-rate-con")
 async def parse_rate_con(
     file: UploadFile = File(...),
-    token: dict = Depends(verify_token)
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db),
 ):
     """
     FAST: Parse rate confirmation using direct PDF text extraction (no image conversion)
     Falls back to OCR only if PDF text extraction fails
+    A file already parsed for this carrier (same SHA-256) returns the stored result
     """
     content = await file.read()
     filename = file.filename.lower() if file.filename else "unknown"
+    carrier_id = token.get("carrier_id")
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    def record(raw_text: str, parsed: dict, duplicate_of_id: Optional[int] = None) -> None:
+        db.add(models.LoadExtraction(
+            carrier_id=carrier_id,
+            load_id=None,
+            source="parse_rate_con",
+            raw_text=raw_text,
+            parsed_fields=jsonable_encoder(parsed),
+            source_files=[file.filename],
+            file_hashes=[content_hash],
+            content_hash=content_hash,
+            duplicate_of_id=duplicate_of_id,
+            status="completed",
+            completed_at=datetime.utcnow(),
+        ))
+        db.commit()
+
+    cached = _find_cached_extraction(db, carrier_id, content_hash) if carrier_id else None
+    if cached is not None:
+        if cached.source == "parse_rate_con" and cached.parsed_fields:
+            parsed = dict(cached.parsed_fields)
+        else:
+            parsed = RateConfirmationOCR().extract_from_text(cached.raw_text)
+        record(cached.raw_text, parsed, duplicate_of_id=cached.id)
+        return {**parsed, "duplicate_of": cached.id}
 
     try:
         ocr_service = RateConfirmationOCR()
@@ -773,11 +1065,17 @@ async def parse_rate_con(
                     raw_text = "\n".join(text_chunks)
         else:
             # For images, use OCR service directly
-            return ocr_service.extract_from_image(content)
+            parsed = ocr_service.extract_from_image(content)
+            if carrier_id and (parsed.get("raw_text") or "").strip():
+                record(parsed["raw_text"], parsed)
+            return parsed
             
         if (raw_text or "").strip():
             # Use OCR service to structure the raw text
-            return ocr_service.extract_from_text(raw_text or "")
+            parsed = ocr_service.extract_from_text(raw_text or "")
+            if carrier_id:
+                record(raw_text, parsed)
+            return parsed
         else:
             raise ValueError("No text could be extracted from the document")
             
@@ -809,8 +1107,8 @@ def get_loads_list_data(
     if search:
         search_filter = or_(
             models.Load.load_number.ilike(f"%{search}%"),
-            models.Load.pickup_location.ilike(f"%{search}%"),
-            models.Load.delivery_location.ilike(f"%{search}%")
+            models.Load.pickup_city.ilike(f"%{search}%"),
+            models.Load.delivery_city.ilike(f"%{search}%")
         )
         query = query.filter(search_filter)
     
@@ -822,7 +1120,10 @@ def get_loads_list_data(
     total_records = query.count()
     
     # Apply pagination
-    loads = query.order_by(models.Load.created_at.desc()).offset(start).limit(length).all()
+    loads = query.options(
+        joinedload(models.Load.driver),
+        joinedload(models.Load.customer),
+    ).order_by(models.Load.created_at.desc()).offset(start).limit(length).all()
     
     # Format response
     data = []
@@ -833,10 +1134,10 @@ def get_loads_list_data(
             "display_pickup_date": load.pickup_date.strftime("%m/%d/%y") if load.pickup_date else "",
             "display_delivery_date": load.delivery_date.strftime("%m/%d/%y") if load.delivery_date else "",
             "driver": load.driver.name if load.driver else "",
-            "broker": load.customer.name if load.customer else "",
-            "pickup": load.pickup_location or "",
-            "delivery": load.delivery_location or "",
-            "rate": float(load.rate) if load.rate else 0.0,
+            "broker": load.customer.company_name if load.customer else "",
+            "pickup": format_city_state(load.pickup_city, load.pickup_state) or "",
+            "delivery": format_city_state(load.delivery_city, load.delivery_state) or "",
+            "rate": float(load.rate_amount) if load.rate_amount else 0.0,
             "status": load.status or "new",
             "completed": load.delivery_date.strftime("%m/%d/%y") if load.delivery_date else ""
         })
@@ -873,9 +1174,12 @@ def bulk_update_loads(
             for key, value in updates.items():
                 if hasattr(load, key):
                     setattr(load, key, value)
+            if 'pickup_address' in updates or 'delivery_address' in updates:
+                apply_load_address_fields(load)
             updated_count += 1
     
     db.commit()
+    invalidate_dispatch_stats(carrier_id)
     
     return {
         "success": True,
@@ -897,25 +1201,35 @@ def _get_driver_last_location(driver_id: int, db: Session):
 def update_load_metrics(load: models.Load, db: Session):
     """Recalculate miles and rate per mile for a load"""
     try:
-        mapbox = MapboxService()
+        mapbox = MapboxService(db)
         
         # 1. Loaded Miles Calculation (Stop to Stop)
         addresses = []
+        # Parallel to addresses: the object/prefix each geocoded point belongs to
+        points = []
         if load.pickup_address:
             addresses.append(load.pickup_address)
+            points.append((load, "pickup_"))
         
         # Add intermediate stops
         sorted_stops = sorted(load.stops, key=lambda s: s.stop_number)
         for stop in sorted_stops:
             if stop.address:
                 addresses.append(stop.address)
+                points.append((stop, ""))
         
         if load.delivery_address:
             addresses.append(load.delivery_address)
+            points.append((load, "delivery_"))
             
         if len(addresses) >= 2:
-            route_data = mapbox.calculate_route_with_stops(addresses)
+            route_data = mapbox.calculate_route_with_stops(addresses, include_geometry=False)
             load.total_miles = route_data["total_distance_miles"]
+
+            # Persist geocoded coordinates alongside the parsed location columns
+            for (target, prefix), (lon, lat) in zip(points, route_data.get("coordinates", [])):
+                setattr(target, f"{prefix}latitude", lat)
+                setattr(target, f"{prefix}longitude", lon)
             
             # Update individual stop distances
             # legs[0] is from pickup to stop 1, legs[1] from stop 1 to stop 2, etc.
@@ -929,7 +1243,7 @@ def update_load_metrics(load: models.Load, db: Session):
                 last_loc = _get_driver_last_location(load.driver_id, db)
                 if last_loc and load.pickup_address:
                     try:
-                        dh_route = mapbox.calculate_route_with_stops([last_loc, load.pickup_address])
+                        dh_route = mapbox.calculate_route_with_stops([last_loc, load.pickup_address], include_geometry=False)
                         load.deadhead_miles = dh_route["total_distance_miles"]
                     except:
                         load.deadhead_miles = 0.0
@@ -2,8 +2,12 @@
 Mapbox routing API endpoints
 """
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
+from app.core.database import get_db
+from app.services.geocode_cache import geocode_cache
+from app.services.route_cache import route_cache
 from app.services.mapbox import MapboxService, calculate_rate_per_mile, get_rate_color
 from app.core.security import get_current_user
 
@@ -12,6 +16,7 @@ router = APIRouter(prefix="/mapbox", tags=["mapbox"])
 
 class RouteRequest(BaseModel):
     addresses: List[str]
+    include_geometry: bool = True
 
 
 class GeocodeRequest(BaseModel):
@@ -30,13 +35,14 @@ class RatePerMileRequest(BaseModel):
 
 
 @router.post("/route")
-def calculate_route(request: RouteRequest, current_user = Depends(get_current_user)):
+def calculate_route(request: RouteRequest, current_user = Depends(get_current_user), db: Session = Depends(get_db)):
     """
     Calculate truck route through multiple addresses
     """
     try:
-        service = MapboxService()
-        route_data = service.calculate_route_with_stops(request.addresses)
+        service = MapboxService(db)
+        route_data = service.calculate_route_with_stops(request.addresses, request.include_geometry)
+        db.commit()  # persist newly cached geocodes and legs
         return route_data
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -45,13 +51,14 @@ def calculate_route(request: RouteRequest, current_user = Depends(get_current_us
 
 
 @router.post("/geocode")
-def geocode_address(request: GeocodeRequest, current_user = Depends(get_current_user)):
+def geocode_address(request: GeocodeRequest, current_user = Depends(get_current_user), db: Session = Depends(get_db)):
     """
     Geocode a single address to coordinates
     """
     try:
-        service = MapboxService()
+        service = MapboxService(db)
         result = service.geocode_address(request.address)
+        db.commit()  # persist newly cached geocodes
         
         if not result:
             raise HTTPException(status_code=404, detail="Address not found")
@@ -97,6 +104,18 @@ def calculate_rate_color(request: RatePerMileRequest):
     }
 
 
+@router.get("/geocode-cache/stats")
+def geocode_cache_stats(current_user = Depends(get_current_user)):
+    """Geocode cache hit/miss counters for this worker"""
+    return geocode_cache.stats()
+
+
+@router.get("/route-cache/stats")
+def route_cache_stats(current_user = Depends(get_current_user)):
+    """Route leg cache hit/miss counters for this worker"""
+    return route_cache.stats()
+
+
 @router.get("/health")
 def mapbox_health():
     """Check if Mapbox service is configured"""
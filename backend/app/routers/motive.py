@@ -2,24 +2,37 @@
 Motive (KeepTruckin) ELD/Telematics Integration API endpoints
 GPS tracking, HOS (Hours of Service), and vehicle data
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+import json
 import os
-import requests
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_client import HTTPError
 from app.core.security import get_current_user
 from app.models import User, Driver, Load
+from app.services import breadcrumbs, ifta_mileage
+from app.services.motive import fleet_locations, motive_http, parse_time
+from app.services.motive_telemetry import (
+    SIGNATURE_HEADER,
+    InvalidTelemetryEvent,
+    TelemetryUnavailable,
+    latest_driver_state,
+    normalize_event,
+    telemetry_ingestor,
+    webhook_carrier,
+    write_events,
+)
 
 router = APIRouter(prefix="/motive", tags=["motive"])
 
 # Configuration
 MOTIVE_API_KEY = os.getenv("MOTIVE_API_KEY", "")
 MOTIVE_API_SECRET = os.getenv("MOTIVE_API_SECRET", "")
-MOTIVE_API_BASE_URL = "https://api.gomotive.com/v1"
 
 
 # Pydantic Models
@@ -80,23 +93,42 @@ class TripData(BaseModel):
 @router.get("/location/{driver_id}", response_model=DriverLocation)
 def get_driver_location(
     driver_id: int,
+    response: Response,
+    live: bool = Query(False, description="Fetch from Motive instead of the last webhook location"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get current GPS location for a driver
+
+    Served from the latest webhook location (X-Location-Source: local) unless
+    live=true or none has been received; live results update the local state.
     """
+    # Get driver from database
+    driver = db.query(Driver).filter(Driver.id == driver_id).first()
+    if not driver:
+        raise HTTPException(status_code=404, detail="Driver not found")
+
+    state = None if live else latest_driver_state(db, driver)
+    if state is not None and state.located_at is not None:
+        response.headers["X-Location-Source"] = "local"
+        return DriverLocation(
+            driver_id=driver_id,
+            driver_name=driver.name,
+            latitude=state.latitude,
+            longitude=state.longitude,
+            speed=state.speed or 0,
+            heading=state.heading,
+            timestamp=state.located_at,
+            address=state.address
+        )
+
     if not MOTIVE_API_KEY:
         raise HTTPException(
             status_code=500,
             detail="Motive API not configured. Set MOTIVE_API_KEY environment variable."
         )
     
-    # Get driver from database
-    driver = db.query(Driver).filter(Driver.id == driver_id).first()
-    if not driver:
-        raise HTTPException(status_code=404, detail="Driver not found")
-    
     # Call Motive API
     headers = {
         "Authorization": f"Bearer {MOTIVE_API_KEY}",
@@ -105,32 +137,36 @@ def get_driver_location(
     
     try:
         # Note: Actual Motive API endpoint may differ
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/drivers/{driver.external_id}/location",
+        api_response = motive_http.get(
+            f"/drivers/{driver.external_id}/location",
             headers=headers,
             timeout=30
         )
         
-        if response.status_code == 200:
-            location_data = response.json()
+        if api_response.status_code == 200:
+            location_data = api_response.json()
+            event = normalize_event({**location_data, "event_type": "location_poll", "driver_id": driver.external_id})
+            write_events(db, driver.carrier_id, [event])
+            db.commit()
             
+            response.headers["X-Location-Source"] = "live"
             return DriverLocation(
                 driver_id=driver_id,
-                driver_name=f"{driver.first_name} {driver.last_name}",
+                driver_name=driver.name,
                 latitude=location_data.get("latitude"),
                 longitude=location_data.get("longitude"),
                 speed=location_data.get("speed", 0),
                 heading=location_data.get("heading"),
-                timestamp=datetime.fromisoformat(location_data.get("timestamp")),
+                timestamp=event["occurred_at"],
                 address=location_data.get("address")
             )
         else:
             raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Motive API error: {response.text}"
+                status_code=api_response.status_code,
+                detail=f"Motive API error: {api_response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch location: {str(e)}"
@@ -139,76 +175,81 @@ def get_driver_location(
 
 @router.get("/locations/all", response_model=List[DriverLocation])
 def get_all_driver_locations(
+    response: Response,
+    refresh: bool = Query(False, description="Fetch from Motive instead of the cached snapshot"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get current locations for all active drivers
+    Get current locations for all Motive-linked drivers
+
+    Served from a per-carrier snapshot; X-Snapshot-Age, X-Snapshot-State
+    (fresh, stale, fetched) and X-Snapshot-Source (bulk, per_driver) describe it.
     """
     if not MOTIVE_API_KEY:
         return []
-    
-    carrier_id = current_user.carrier_id
-    
-    # Get all active drivers
-    drivers = db.query(Driver).filter(
-        Driver.carrier_id == carrier_id,
-        Driver.is_active == True
-    ).all()
-    
-    locations = []
-    headers = {
-        "Authorization": f"Bearer {MOTIVE_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    for driver in drivers:
-        if not driver.external_id:
-            continue
-            
-        try:
-            response = requests.get(
-                f"{MOTIVE_API_BASE_URL}/drivers/{driver.external_id}/location",
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                location_data = response.json()
-                locations.append(DriverLocation(
-                    driver_id=driver.id,
-                    driver_name=f"{driver.first_name} {driver.last_name}",
-                    latitude=location_data.get("latitude"),
-                    longitude=location_data.get("longitude"),
-                    speed=location_data.get("speed", 0),
-                    heading=location_data.get("heading"),
-                    timestamp=datetime.fromisoformat(location_data.get("timestamp")),
-                    address=location_data.get("address")
-                ))
-        except:
-            continue  # Skip drivers with errors
-    
+
+    locations, snapshot = fleet_locations.get(db, current_user.carrier_id, MOTIVE_API_KEY, force=refresh)
+    response.headers["X-Snapshot-Age"] = str(snapshot["age_seconds"])
+    response.headers["X-Snapshot-State"] = snapshot["state"]
+    response.headers["X-Snapshot-Source"] = snapshot["source"]
     return locations
 
 
+HISTORY_LIST_KEYS = ("locations", "breadcrumbs", "data")
+
+
 @router.get("/location/history/{driver_id}")
 def get_location_history(
     driver_id: int,
     start_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(..., description="End date (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="End date (YYYY-MM-DD), inclusive"),
+    max_points: int = Query(1000, ge=2, le=20000, description="Downsample the trail to at most this many points"),
+    live: bool = Query(False, description="Fetch the range from Motive and store it before reading"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get location history for a driver over a date range
+
+    Read from the local breadcrumb store and simplified with Douglas-Peucker
+    to max_points. Points are [unix_seconds, latitude, longitude]. Motive is
+    called only with live=true or when nothing is stored for the range.
     """
-    if not MOTIVE_API_KEY:
-        raise HTTPException(status_code=500, detail="Motive API not configured")
-    
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+
     driver = db.query(Driver).filter(Driver.id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
-    
+
+    result = breadcrumbs.trail(db, driver.id, start, end, max_points)
+    source = "local"
+    if live or not result["total_points"]:
+        if not MOTIVE_API_KEY:
+            if live:
+                raise HTTPException(status_code=500, detail="Motive API not configured")
+        elif driver.external_id:
+            _fetch_location_history(db, driver, start_date, end_date)
+            result = breadcrumbs.trail(db, driver.id, start, end, max_points)
+            source = "live"
+
+    return {
+        "driver_id": driver.id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "source": source,
+        **result,
+    }
+
+
+def _fetch_location_history(db: Session, driver: Driver, start_date: str, end_date: str) -> None:
+    """Pull a range from Motive into the telemetry log and breadcrumb store."""
     headers = {
         "Authorization": f"Bearer {MOTIVE_API_KEY}",
         "Content-Type": "application/json"
@@ -220,47 +261,78 @@ def get_location_history(
     }
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/drivers/{driver.external_id}/location/history",
+        response = motive_http.get(
+            f"/drivers/{driver.external_id}/location/history",
             headers=headers,
             params=params,
             timeout=30
         )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Motive API error: {response.text}"
-            )
-            
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch location history: {str(e)}"
         )
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Motive API error: {response.text}"
+        )
+
+    data = response.json()
+    items = next((data[key] for key in HISTORY_LIST_KEYS if isinstance(data, dict) and isinstance(data.get(key), list)),
+                 data if isinstance(data, list) else [])
+    events = []
+    for item in items:
+        point = item.get("location", item) if isinstance(item, dict) else None
+        # Undated points would all land at "now" in the trail, so they are skipped
+        if isinstance(point, dict) and parse_time(point.get("located_at") or point.get("timestamp")):
+            events.append(normalize_event({**point, "event_type": "location_history", "driver_id": driver.external_id}))
+    write_events(db, driver.carrier_id, [event for event in events if event["latitude"] is not None])
+    db.commit()
 
 
 # ============================================================================
 # HOURS OF SERVICE (HOS)
 # ============================================================================
 
+def _hos_status(driver: Driver, hos_data: dict, last_updated: datetime) -> HOSStatus:
+    return HOSStatus(
+        driver_id=driver.id,
+        driver_name=driver.name,
+        status=hos_data.get("current_status", "off_duty"),
+        time_until_break=hos_data.get("time_until_break"),
+        driving_hours_remaining=hos_data.get("driving_hours_remaining", 0),
+        shift_hours_remaining=hos_data.get("shift_hours_remaining", 0),
+        cycle_hours_remaining=hos_data.get("cycle_hours_remaining", 0),
+        last_updated=last_updated
+    )
+
+
 @router.get("/hos/{driver_id}", response_model=HOSStatus)
 def get_driver_hos_status(
     driver_id: int,
+    response: Response,
+    live: bool = Query(False, description="Fetch from Motive instead of the last webhook HOS status"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get current HOS (Hours of Service) status for a driver
+
+    Served from the latest webhook HOS status (X-HOS-Source: local) unless
+    live=true or none has been received; live results update the local state.
     """
-    if not MOTIVE_API_KEY:
-        raise HTTPException(status_code=500, detail="Motive API not configured")
-    
     driver = db.query(Driver).filter(Driver.id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
+
+    state = None if live else latest_driver_state(db, driver)
+    if state is not None and state.hos:
+        response.headers["X-HOS-Source"] = "local"
+        return _hos_status(driver, state.hos, state.hos_updated_at)
+
+    if not MOTIVE_API_KEY:
+        raise HTTPException(status_code=500, detail="Motive API not configured")
     
     headers = {
         "Authorization": f"Bearer {MOTIVE_API_KEY}",
@@ -268,32 +340,28 @@ def get_driver_hos_status(
     }
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/drivers/{driver.external_id}/hos",
+        api_response = motive_http.get(
+            f"/drivers/{driver.external_id}/hos",
             headers=headers,
             timeout=30
         )
         
-        if response.status_code == 200:
-            hos_data = response.json()
+        if api_response.status_code == 200:
+            hos_data = api_response.json()
+            event = normalize_event({"event_type": "hos_poll", "driver_id": driver.external_id,
+                                     "last_updated": hos_data.get("last_updated"), "hos": hos_data})
+            write_events(db, driver.carrier_id, [event])
+            db.commit()
             
-            return HOSStatus(
-                driver_id=driver_id,
-                driver_name=f"{driver.first_name} {driver.last_name}",
-                status=hos_data.get("current_status", "off_duty"),
-                time_until_break=hos_data.get("time_until_break"),
-                driving_hours_remaining=hos_data.get("driving_hours_remaining", 0),
-                shift_hours_remaining=hos_data.get("shift_hours_remaining", 0),
-                cycle_hours_remaining=hos_data.get("cycle_hours_remaining", 0),
-                last_updated=datetime.fromisoformat(hos_data.get("last_updated"))
-            )
+            response.headers["X-HOS-Source"] = "live"
+            return _hos_status(driver, hos_data, event["occurred_at"])
         else:
             raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Motive API error: {response.text}"
+                status_code=api_response.status_code,
+                detail=f"Motive API error: {api_response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch HOS status: {str(e)}"
@@ -327,8 +395,8 @@ def get_hos_violations(
         params["end_date"] = end_date
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/hos/violations",
+        response = motive_http.get(
+            "/hos/violations",
             headers=headers,
             params=params,
             timeout=30
@@ -339,7 +407,7 @@ def get_hos_violations(
         else:
             return {"violations": [], "error": response.text}
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         return {"violations": [], "error": str(e)}
 
 
@@ -365,8 +433,8 @@ def get_vehicle_data(
     }
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/vehicles/{vehicle_id}",
+        response = motive_http.get(
+            f"/vehicles/{vehicle_id}",
             headers=headers,
             timeout=30
         )
@@ -390,7 +458,7 @@ def get_vehicle_data(
                 detail=f"Motive API error: {response.text}"
             )
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch vehicle data: {str(e)}"
@@ -414,8 +482,8 @@ def get_all_vehicles(
     }
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/vehicles",
+        response = motive_http.get(
+            "/vehicles",
             headers=headers,
             timeout=30
         )
@@ -425,7 +493,7 @@ def get_all_vehicles(
         else:
             return []
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         return []
 
 
@@ -462,8 +530,8 @@ def get_driver_trips(
     }
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/drivers/{driver.external_id}/trips",
+        response = motive_http.get(
+            f"/drivers/{driver.external_id}/trips",
             headers=headers,
             params=params,
             timeout=30
@@ -474,7 +542,7 @@ def get_driver_trips(
         else:
             return {"trips": [], "error": response.text}
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         return {"trips": [], "error": str(e)}
 
 
@@ -486,12 +554,34 @@ def get_driver_trips(
 def get_ifta_mileage(
     start_date: str = Query(...),
     end_date: str = Query(...),
+    live: bool = Query(False, description="Use Motive's IFTA report instead of local breadcrumbs"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get IFTA mileage report (miles by state)
+
+    Computed from stored breadcrumbs when boundary data is installed
+    (source: local); otherwise, or with live=true, Motive's IFTA report.
     """
+    if not live:
+        try:
+            start = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end = datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+        try:
+            result = ifta_mileage.carrier_miles(db, current_user.carrier_id, start, end)
+        except ifta_mileage.BoundaryDataMissing:
+            result = None
+        if result is not None:
+            return {
+                "states": ifta_mileage.summarize(result["rows"]),
+                "total_miles": round(result["total_miles"], 2),
+                "unassigned_miles": round(result["unassigned_miles"], 2),
+                "source": "local"
+            }
+
     if not MOTIVE_API_KEY:
         return {
             "states": [],
@@ -511,8 +601,8 @@ def get_ifta_mileage(
     }
     
     try:
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/reports/ifta",
+        response = motive_http.get(
+            "/reports/ifta",
             headers=headers,
             params=params,
             timeout=30
@@ -527,7 +617,7 @@ def get_ifta_mileage(
                 "error": response.text
             }
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         return {
             "states": [],
             "total_miles": 0,
@@ -559,8 +649,8 @@ def get_motive_status(
     
     try:
         # Test API connection
-        response = requests.get(
-            f"{MOTIVE_API_BASE_URL}/company",
+        response = motive_http.get(
+            "/company",
             headers=headers,
             timeout=10
         )
@@ -580,7 +670,7 @@ def get_motive_status(
                 "message": f"API error: {response.status_code}"
             }
             
-    except requests.exceptions.RequestException as e:
+    except HTTPError as e:
         return {
             "configured": True,
             "connected": False,
@@ -589,24 +679,51 @@ def get_motive_status(
 
 
 @router.post("/webhook")
-def motive_webhook(
-    webhook_data: dict,
+async def motive_webhook(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Receive webhooks from Motive (for real-time updates)
+
+    Accepts one event or a list, signed with the carrier's secret from
+    MOTIVE_WEBHOOK_SECRETS. Events (location_update, hos_violation,
+    trip_completed, ...) are matched to that carrier's drivers, queued and
+    written in batches to the telemetry log and the latest driver/vehicle state.
+    While telemetry writes are failing the webhook answers 503 so Motive
+    redelivers instead of the events being lost.
     """
-    # Process webhook events
-    event_type = webhook_data.get("event_type")
-    
-    if event_type == "hos_violation":
-        # Handle HOS violation
-        pass
-    elif event_type == "location_update":
-        # Handle location update
-        pass
-    elif event_type == "trip_completed":
-        # Handle trip completion
-        pass
-    
-    return {"success": True, "message": "Webhook received"}
+    body = await request.body()
+    if not settings.MOTIVE_WEBHOOK_SECRETS:
+        raise HTTPException(status_code=503, detail="Motive webhook secret not configured")
+    carrier_id = webhook_carrier(body, request.headers.get(SIGNATURE_HEADER), settings.MOTIVE_WEBHOOK_SECRETS)
+    if carrier_id is None:
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        webhook_data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not valid JSON")
+    events = webhook_data if isinstance(webhook_data, list) else [webhook_data]
+    if not all(isinstance(event, dict) for event in events):
+        raise HTTPException(status_code=422, detail="Webhook events must be JSON objects")
+    try:
+        queued = telemetry_ingestor.submit(db.get_bind(), carrier_id, events)
+    except InvalidTelemetryEvent as e:
+        raise HTTPException(status_code=422, detail=f"Malformed webhook event: {e}")
+    except TelemetryUnavailable:
+        raise HTTPException(status_code=503, detail="Telemetry writes are failing, retry later")
+    if events and not queued:
+        raise HTTPException(status_code=503, detail="Telemetry queue full, retry later")
+
+    return {"success": True, "message": "Webhook received", "queued": queued}
+
+
+@router.get("/webhook/stats")
+def motive_webhook_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Webhook ingestion counters for this worker
+    """
+    return telemetry_ingestor.stats()
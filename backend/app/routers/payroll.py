@@ -1,12 +1,16 @@
+import csv
+import io
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import func
 
 from app.core.database import get_db
 from app.core.security import verify_token
 from app import models
+from app.services.address import format_city_state
 from app.schemas.payroll import (
     PayeeResponse,
     DriverDetailResponse,
@@ -15,10 +19,15 @@ from app.schemas.payroll import (
     DriverPayProfileCreate,
     DriverAdditionalPayeeCreate,
     RecurringSettlementItemCreate,
+    PayRecalculateRequest,
 )
 from app.services.email_service import EmailService
+from app.services.jobs import job_registry
+from app.services.pay_engine import recalc_loads_pay
 from app.services.payroll_reports import payroll_reports
 from app.services.quickbooks_service import quickbooks_service
+from app.services.settlement_engine import run_batch_settlements
+from app.utils.pagination import encode_cursor, keyset_after
 
 router = APIRouter(prefix="/payroll", tags=["payroll"])
 
@@ -74,49 +83,91 @@ def get_payables_grouped(token: dict = Depends(verify_token), db: Session = Depe
     return result
 
 
-@router.get("/payables-grouped/{payee_id}/lines")
-def get_payee_ledger_lines(payee_id: int, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
-    """
-    Get all unpaid ledger lines for a specific payee with load details.
-    """
-    carrier_id = token.get("carrier_id")
-    if not carrier_id:
-        raise HTTPException(status_code=400, detail="Missing carrier_id")
-    
-    # Verify payee belongs to carrier
+def _pending_line_filters(payee_id: int) -> list:
+    return [
+        models.SettlementLedgerLine.payee_id == payee_id,
+        models.SettlementLedgerLine.settlement_id.is_(None),
+        models.SettlementLedgerLine.locked_at.is_(None),
+        models.SettlementLedgerLine.voided_at.is_(None),
+    ]
+
+
+def _pending_lines_with_loads(db: Session, payee_id: int):
+    """Pending ledger lines joined to the load columns shown alongside them."""
+    return (
+        db.query(
+            models.SettlementLedgerLine,
+            models.Load.load_number,
+            models.Load.pickup_city,
+            models.Load.pickup_state,
+            models.Load.delivery_city,
+            models.Load.delivery_state,
+            models.Load.status,
+        )
+        .outerjoin(models.Load, models.Load.id == models.SettlementLedgerLine.load_id)
+        .filter(*_pending_line_filters(payee_id))
+        .order_by(models.SettlementLedgerLine.created_at.asc(), models.SettlementLedgerLine.id.asc())
+    )
+
+
+def _get_carrier_payee(db: Session, payee_id: int, carrier_id: int) -> models.Payee:
     payee = db.query(models.Payee).filter(
         models.Payee.id == payee_id,
         models.Payee.carrier_id == carrier_id
     ).first()
-    
     if not payee:
         raise HTTPException(status_code=404, detail="Payee not found")
+    return payee
+
+
+@router.get("/payables-grouped/{payee_id}/lines")
+def get_payee_ledger_lines(
+    payee_id: int,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """
+    Get unpaid ledger lines for a specific payee with load details.
+    Lines are paged oldest first; pass `next_cursor` back as `cursor` for the next page.
+    `total` and `line_count` always cover every pending line, not just the page.
+    """
+    carrier_id = token.get("carrier_id")
+    if not carrier_id:
+        raise HTTPException(status_code=400, detail="Missing carrier_id")
     
-    # Get unpaid lines
-    lines = (
-        db.query(models.SettlementLedgerLine)
-        .filter(
-            models.SettlementLedgerLine.payee_id == payee_id,
-            models.SettlementLedgerLine.settlement_id.is_(None),
-            models.SettlementLedgerLine.locked_at.is_(None),
-            models.SettlementLedgerLine.voided_at.is_(None)
+    payee = _get_carrier_payee(db, payee_id, carrier_id)
+
+    total, line_count = (
+        db.query(
+            func.coalesce(func.sum(models.SettlementLedgerLine.amount), 0.0),
+            func.count(models.SettlementLedgerLine.id),
         )
-        .all()
+        .filter(*_pending_line_filters(payee_id))
+        .one()
     )
-    
+
+    query = _pending_lines_with_loads(db, payee_id)
+    after = keyset_after(
+        models.SettlementLedgerLine.created_at, models.SettlementLedgerLine.id, cursor, descending=False
+    )
+    if after is not None:
+        query = query.filter(after)
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+
     result = []
-    for line in lines:
+    for line, load_number, pickup_city, pickup_state, delivery_city, delivery_state, load_status in page:
         load_info = None
-        if line.load_id:
-            load = db.query(models.Load).filter(models.Load.id == line.load_id).first()
-            if load:
-                load_info = {
-                    "id": load.id,
-                    "load_number": load.load_number,
-                    "pickup_location": load.pickup_location,
-                    "delivery_location": load.delivery_location,
-                    "status": load.status,
-                }
+        if line.load_id and load_number is not None:
+            load_info = {
+                "id": line.load_id,
+                "load_number": load_number,
+                "pickup_location": format_city_state(pickup_city, pickup_state),
+                "delivery_location": format_city_state(delivery_city, delivery_state),
+                "status": load_status,
+            }
         
         result.append({
             "id": line.id,
@@ -127,16 +178,71 @@ def get_payee_ledger_lines(payee_id: int, token: dict = Depends(verify_token), d
             "amount": float(line.amount),
             "created_at": line.created_at.isoformat() if line.created_at else None,
         })
+
+    next_cursor = None
+    if len(rows) > limit:
+        last_line = page[-1][0]
+        next_cursor = encode_cursor(last_line.created_at, last_line.id)
     
     return {
         "payee_id": payee.id,
         "payee_name": payee.name,
         "payee_type": payee.payee_type,
         "lines": result,
-        "total": sum(float(line.amount) for line in lines)
+        "total": float(total),
+        "line_count": line_count,
+        "next_cursor": next_cursor,
     }
 
 
+@router.get("/payables-grouped/{payee_id}/lines/export")
+def export_payee_ledger_lines(payee_id: int, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
+    """Stream every pending ledger line for a payee as CSV."""
+    carrier_id = token.get("carrier_id")
+    if not carrier_id:
+        raise HTTPException(status_code=400, detail="Missing carrier_id")
+
+    payee = _get_carrier_payee(db, payee_id, carrier_id)
+    filename = f"payables_{payee.id}_{datetime.utcnow().strftime('%Y%m%d')}.csv"
+
+    def generate_rows():
+        # The body streams after the endpoint returns; release the session's connection when done
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([
+                "line_id", "created_at", "load_id", "load_number", "pickup", "delivery",
+                "load_status", "category", "description", "amount",
+            ])
+            rows = _pending_lines_with_loads(db, payee_id).yield_per(500)
+            for line, load_number, pickup_city, pickup_state, delivery_city, delivery_state, load_status in rows:
+                writer.writerow([
+                    line.id,
+                    line.created_at.isoformat() if line.created_at else "",
+                    line.load_id or "",
+                    load_number or "",
+                    format_city_state(pickup_city, pickup_state) or "",
+                    format_city_state(delivery_city, delivery_state) or "",
+                    load_status or "",
+                    line.category,
+                    line.description or "",
+                    f"{float(line.amount):.2f}",
+                ])
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @router.get("/drivers/{driver_id}", response_model=DriverDetailResponse)
 def get_driver_detail(driver_id: int, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
     carrier_id = token.get("carrier_id")
@@ -171,9 +277,11 @@ def create_or_update_pay_profile(
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     
-    # Deactivate existing pay profile
-    if driver.pay_profile:
-        driver.pay_profile.active = False
+    # Deactivate existing pay profiles
+    db.query(models.DriverPayProfile).filter(
+        models.DriverPayProfile.driver_id == driver_id,
+        models.DriverPayProfile.active == True
+    ).update({"active": False}, synchronize_session=False)
     
     # Create new pay profile
     pay_profile = models.DriverPayProfile(
@@ -376,6 +484,34 @@ def delete_recurring_item(
     return {"message": "Recurring item deactivated"}
 
 
+@router.post("/recalculate")
+def recalculate_pay(
+    payload: PayRecalculateRequest,
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """
+    Recalculate ledger lines for many loads, e.g. after a pay profile rate change.
+    Select loads by load_ids and/or driver_id with an optional pickup date range.
+    With dry_run=true the computed diff is returned without writing anything.
+    """
+    carrier_id = token.get("carrier_id")
+    if not carrier_id:
+        raise HTTPException(status_code=400, detail="Missing carrier_id")
+    if not payload.load_ids and payload.driver_id is None and payload.date_from is None and payload.date_to is None:
+        raise HTTPException(status_code=400, detail="Provide load_ids, driver_id or a date range")
+
+    return recalc_loads_pay(
+        db,
+        carrier_id,
+        load_ids=payload.load_ids,
+        driver_id=payload.driver_id,
+        date_from=payload.date_from,
+        date_to=payload.date_to,
+        dry_run=payload.dry_run,
+    )
+
+
 @router.get("/settlements", response_model=list[SettlementStatusResponse])
 def list_settlements(token: dict = Depends(verify_token), db: Session = Depends(get_db)):
     """Get all settlements for the carrier"""
@@ -560,169 +696,61 @@ def create_settlement(
     return settlement
 
 
+def _send_batch_summary(db: Session, user_id: Optional[int], result: dict) -> None:
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user and user.email:
+        EmailService.send_batch_settlement_summary(
+            user.email,
+            result["settlements_created"],
+            result["total_amount"],
+            [s["payee_name"] for s in result["settlements"]]
+        )
+
+
 @router.post("/settlements/batch")
 def create_batch_settlements(
     period_start: datetime,
     period_end: datetime,
     payee_ids: List[int] = None,
+    background: bool = False,
     token: dict = Depends(verify_token),
     db: Session = Depends(get_db)
 ):
     """
     Create settlements for multiple payees at once.
     If payee_ids is not provided, creates settlements for all payees with pending lines.
+    With background=true the run is queued and a job id is returned; poll GET /jobs/{job_id}.
     """
     carrier_id = token.get("carrier_id")
     if not carrier_id:
         raise HTTPException(status_code=400, detail="Missing carrier_id")
-    
-    # Get payees to create settlements for
-    if payee_ids:
-        # Use specified payee list
-        payees = db.query(models.Payee).filter(
-            models.Payee.id.in_(payee_ids),
-            models.Payee.carrier_id == carrier_id
-        ).all()
-    else:
-        # Get all payees with pending lines
-        payees_with_pending = (
-            db.query(models.Payee)
-            .join(models.SettlementLedgerLine, models.Payee.id == models.SettlementLedgerLine.payee_id)
-            .filter(
-                models.Payee.carrier_id == carrier_id,
-                models.SettlementLedgerLine.settlement_id.is_(None),
-                models.SettlementLedgerLine.locked_at.is_(None),
-                models.SettlementLedgerLine.voided_at.is_(None)
-            )
-            .distinct()
-            .all()
-        )
-        payees = payees_with_pending
-    
-    if not payees:
-        raise HTTPException(status_code=404, detail="No payees found with pending lines")
-    
-    created_settlements = []
-    total_amount = 0
-    payee_names = []
-    
-    for payee in payees:
-        # Create settlement
-        settlement = models.PayrollSettlement(
-            payee_id=payee.id,
-            period_start=period_start,
-            period_end=period_end,
-            status="draft",
-        )
-        db.add(settlement)
-        db.flush()  # Get settlement ID without committing
-        
-        # Attach pending lines
-        pending_lines = (
-            db.query(models.SettlementLedgerLine)
-            .filter(
-                models.SettlementLedgerLine.payee_id == payee.id,
-                models.SettlementLedgerLine.settlement_id.is_(None),
-                models.SettlementLedgerLine.locked_at.is_(None),
-                models.SettlementLedgerLine.voided_at.is_(None),
-            )
-            .all()
-        )
-        
-        if not pending_lines:
-            continue  # Skip if no pending lines
-        
-        for line in pending_lines:
-            line.settlement_id = settlement.id
-        
-        # Process recurring items
-        driver = db.query(models.Driver).filter(models.Driver.payee_id == payee.id).first()
-        if driver:
-            recurring_items = (
-                db.query(models.RecurringSettlementItem)
-                .filter(
-                    models.RecurringSettlementItem.driver_id == driver.id,
-                    models.RecurringSettlementItem.active == True,
-                    models.RecurringSettlementItem.payee_id == payee.id,
-                )
-                .all()
-            )
-            
-            for item in recurring_items:
-                if item.next_date and item.next_date > period_end:
-                    continue
-                
-                amount = item.amount
-                if item.item_type in ["deduction", "loan"]:
-                    amount = -abs(amount)
-                elif item.item_type in ["addition", "bonus"]:
-                    amount = abs(amount)
-                
-                recurring_line = models.SettlementLedgerLine(
-                    load_id=None,
-                    payee_id=payee.id,
-                    settlement_id=settlement.id,
-                    category=item.item_type,
-                    description=item.description or f"{item.item_type.replace('_', ' ').title()}",
-                    amount=amount,
+    user_id = token.get("user_id")
+
+    if background:
+        session_factory = sessionmaker(bind=db.get_bind())
+
+        def run(job):
+            job_db = session_factory()
+            try:
+                result = run_batch_settlements(
+                    job_db, carrier_id, period_start, period_end, payee_ids,
+                    progress=lambda step, total, message: job.update(step, total, message),
                 )
-                db.add(recurring_line)
-                
-                # Update next_date
-                if item.schedule == "weekly":
-                    from datetime import timedelta
-                    item.next_date = period_end + timedelta(days=7)
-                elif item.schedule == "biweekly":
-                    from datetime import timedelta
-                    item.next_date = period_end + timedelta(days=14)
-                elif item.schedule == "monthly":
-                    from datetime import timedelta
-                    item.next_date = period_end + timedelta(days=30)
-        
-        # Calculate total for this settlement
-        all_lines = db.query(models.SettlementLedgerLine).filter(models.SettlementLedgerLine.settlement_id == settlement.id).all()
-        settlement_total = sum(float(line.amount) for line in all_lines)
-        
-        created_settlements.append({
-            "id": settlement.id,
-            "payee_id": payee.id,
-            "payee_name": payee.name,
-            "total": settlement_total,
-            "line_count": len(all_lines)
-        })
-        
-        total_amount += settlement_total
-        payee_names.append(payee.name)
-        
-        # Send email notification to driver
-        if driver and driver.email:
-            EmailService.send_settlement_created_notification(
-                driver.email,
-                driver.name,
-                settlement.id,
-                period_start.strftime('%m/%d/%Y'),
-                period_end.strftime('%m/%d/%Y'),
-                settlement_total
-            )
-    
-    db.commit()
-    
-    # Send summary email to admin
-    user = db.query(models.User).filter(models.User.id == token.get("user_id")).first()
-    if user and user.email:
-        EmailService.send_batch_settlement_summary(
-            user.email,
-            len(created_settlements),
-            total_amount,
-            payee_names
-        )
-    
-    return {
-        "ok": True,
-        "settlements_created": len(created_settlements),
-        "total_amount": total_amount,
-        "settlements": created_settlements
-    }
+                _send_batch_summary(job_db, user_id, result)
+                return result
+            finally:
+                job_db.close()
+
+        job = job_registry.submit("batch_settlements", carrier_id, run)
+        return {"ok": True, "job_id": job.id, "status_url": f"/jobs/{job.id}"}
+
+    result = run_batch_settlements(db, carrier_id, period_start, period_end, payee_ids)
+    if not result["settlements_created"]:
+        raise HTTPException(status_code=404, detail="No payees found with pending lines")
+
+    _send_batch_summary(db, user_id, result)
+
+    return {"ok": True, **result}
 
 
 @router.post("/settlements/{settlement_id}/approve", response_model=SettlementStatusResponse)
@@ -731,6 +759,7 @@ def approve_settlement(settlement_id: int, token: dict = Depends(verify_token),
     if not settlement:
         raise HTTPException(status_code=404, detail="Settlement not found")
     settlement.status = "approved"
+    payroll_reports.refresh_settlement_rollups(db, [settlement.id])
     db.commit()
     db.refresh(settlement)
     
@@ -766,6 +795,7 @@ def pay_settlement(settlement_id: int, token: dict = Depends(verify_token), db:
     for line in lines:
         line.locked_at = datetime.utcnow()
         line.locked_reason = "included_in_paid_settlement"
+    payroll_reports.refresh_settlement_rollups(db, [settlement.id])
     db.commit()
     db.refresh(settlement)
     
@@ -856,6 +886,7 @@ def export_settlement(
         if result.get("success") or result.get("stub_mode"):
             settlement.status = "exported"
             settlement.exported_at = datetime.utcnow()
+            payroll_reports.refresh_settlement_rollups(db, [settlement.id])
             db.commit()
             db.refresh(settlement)
             
@@ -1054,6 +1085,7 @@ def void_settlement(
         line.settlement_id = None
         line.voided_at = datetime.utcnow()
     
+    payroll_reports.refresh_settlement_rollups(db, [settlement.id])
     db.commit()
     db.refresh(settlement)
     return settlement
@@ -1151,6 +1183,23 @@ def get_payroll_summary_report(
     return payroll_reports.generate_payroll_summary(db, carrier_id, start_date, end_date)
 
 
+@router.get("/reports/ytd")
+def get_ytd_payroll_report(
+    year: Optional[int] = None,
+    token: dict = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """
+    Year-to-date payroll totals for approved, paid and exported settlements.
+    Served from the per-settlement rollup table rather than the ledger lines.
+    """
+    carrier_id = token.get("carrier_id")
+    if not carrier_id:
+        raise HTTPException(status_code=400, detail="Missing carrier_id")
+    
+    return payroll_reports.generate_ytd_summary(db, carrier_id, year or datetime.utcnow().year)
+
+
 @router.get("/reports/driver/{driver_id}/history")
 def get_driver_pay_history_report(
     driver_id: int,
@@ -1,12 +1,15 @@
 import io
+from datetime import datetime
 from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.security import verify_token
 from app.core.config import settings
 from app.core.database import get_db
 from app.services.dropbox import DropboxService
+from app.services.jobs import job_registry
+from app.services.pod_uploads import SIGNATURE_FILENAME, complete_pod_upload, complete_spooled_upload, spool_uploads
 from app.services.scanning import scan_images_to_pdf
 from app import models
 from app.schemas.pod import PodHistoryItem, DocumentExchangeItem, DocumentExchangeUpdate
@@ -19,9 +22,17 @@ def upload_pod(
     load_id: str = Form(...),
     files: List[UploadFile] = File(...),
     signature: Optional[UploadFile] = File(None),
+    background: bool = Form(False),
     token: dict = Depends(verify_token),
     db: Session = Depends(get_db),
 ):
+    """
+    Upload POD files (and an optional signature) to Dropbox, several at a time.
+    The POD record and its document exchange rows are created up front with a
+    per-file upload status that is filled in as each file finishes; with
+    background=true the upload is queued and a job id is returned, poll
+    GET /jobs/{job_id} or the POD history.
+    """
     carrier_id = token.get("carrier_id")
     user_id = token.get("user_id")
     if not carrier_id or not user_id:
@@ -38,47 +49,76 @@ def upload_pod(
     if token.get("role") == "driver" and token.get("driver_id") and load.driver_id != token.get("driver_id"):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    dropbox = DropboxService()
+    # Fail before creating records if Dropbox is not configured
+    try:
+        DropboxService()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     base_path = f"{settings.DROPBOX_ROOT_FOLDER}/{carrier_id}/loads/{load_id}/POD"
 
-    upload_items = []
-    for f in files:
-        upload_items.append((f.filename, f.file.read()))
-
-    links = dropbox.upload_files(upload_items, base_path)
-
-    signature_link = None
-    if signature:
-        sig_path = f"{base_path}/signature.png"
-        dropbox.upload_file(signature.file.read(), sig_path)
-        signature_link = dropbox.create_shared_link(sig_path)
+    upload_items = [(f.filename, f.file) for f in files]
+    has_signature = signature is not None
+    if has_signature:
+        upload_items.append((SIGNATURE_FILENAME, signature.file))
 
     pod_record = models.PodRecord(
         load_id=load_id_int,
         uploaded_by_user_id=user_id,
-        file_links=links,
-        signature_link=signature_link,
+        file_links=[],
+        upload_status="queued" if background else "uploading",
+        file_status=[
+            {"filename": filename, "status": "pending", "url": None, "bytes": 0, "error": None}
+            for filename, _ in upload_items
+        ],
     )
     db.add(pod_record)
 
-    # Also create document exchange records for each uploaded file (for admin review)
+    # Also create document exchange records for each uploaded file (for admin review);
+    # attachment_url is filled in when the file's upload finishes
     driver_id = load.driver_id or token.get("driver_id")
+    documents = []
     if driver_id:
-        for link in links:
+        for f in files:
             doc_exchange = models.DocumentExchange(
                 carrier_id=carrier_id,
                 load_id=load_id_int,
                 driver_id=driver_id,
                 uploaded_by_user_id=user_id,
                 doc_type="Other",  # Default type, can be updated by admin
-                attachment_url=link,
+                attachment_url="",
+                filename=f.filename,
+                upload_status="pending",
                 status="Pending"
             )
             db.add(doc_exchange)
+            documents.append(doc_exchange)
 
     db.commit()
+    pod_id = pod_record.id
+    document_ids = [doc.id for doc in documents]
+
+    if background:
+        directory, spooled = spool_uploads(upload_items)
+        session_factory = sessionmaker(bind=db.get_bind())
+
+        def run(job):
+            job_db = session_factory()
+            try:
+                return complete_spooled_upload(
+                    job_db, pod_id, directory, spooled, base_path, document_ids,
+                    has_signature=has_signature,
+                    progress=lambda done, total: job.update(done, total, "Uploading files"),
+                )
+            finally:
+                job_db.close()
+
+        job = job_registry.submit("pod_upload", carrier_id, run)
+        return {"ok": True, "job_id": job.id, "status_url": f"/jobs/{job.id}", "pod_id": pod_id}
 
-    return {"links": links, "signature_link": signature_link}
+    result = complete_pod_upload(db, pod_id, upload_items, base_path, document_ids, has_signature=has_signature)
+    if result["upload_status"] == "failed":
+        raise HTTPException(status_code=502, detail={"message": "Dropbox upload failed", "files": result["files"]})
+    return result
 
 
 @router.post("/scan")
@@ -113,6 +153,8 @@ def pod_history(token: dict = Depends(verify_token), db: Session = Depends(get_d
             "uploaded_by_email": user.email,
             "file_links": pod.file_links or [],
             "signature_link": pod.signature_link,
+            "upload_status": pod.upload_status,
+            "files": pod.file_status,
             "created_at": pod.created_at.isoformat() if pod.created_at else "",
         })
     return results
@@ -160,6 +202,7 @@ def get_documents_exchange(
             "load_number": load.load_number,
             "type": doc.doc_type,
             "attachment_url": doc.attachment_url,
+            "upload_status": doc.upload_status,
             "status": doc.status,
             "notes": doc.notes,
             "created_at": doc.created_at.isoformat() if doc.created_at else "",
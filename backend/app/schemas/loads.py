@@ -53,6 +53,8 @@ class LoadStopCreate(LoadStopBase):
 class LoadStopResponse(LoadStopBase):
     id: int
     load_id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: Optional[datetime] = None
     
     class Config:
@@ -146,10 +148,16 @@ class LoadResponse(LoadBase):
     pickup_location: Optional[str] = None
     pickup_city: Optional[str] = None
     pickup_state: Optional[str] = None
+    pickup_zip: Optional[str] = None
+    pickup_latitude: Optional[float] = None
+    pickup_longitude: Optional[float] = None
     pickup_date: Optional[datetime] = None
     delivery_location: Optional[str] = None
     delivery_city: Optional[str] = None
     delivery_state: Optional[str] = None
+    delivery_zip: Optional[str] = None
+    delivery_latitude: Optional[float] = None
+    delivery_longitude: Optional[float] = None
     delivery_date: Optional[datetime] = None
     
     # Document attachments
@@ -157,4 +157,12 @@ class RecurringSettlementItemCreate(BaseModel):
     description: Optional[str] = None
 
 
+class PayRecalculateRequest(BaseModel):
+    load_ids: Optional[list[int]] = None
+    driver_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    dry_run: bool = False
+
+
 DriverDetailResponse.model_rebuild()
@@ -2,9 +2,20 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 
+class PodUploadFileStatus(BaseModel):
+    filename: str
+    status: str  # pending, uploaded, failed
+    url: Optional[str] = None
+    bytes: int = 0
+    error: Optional[str] = None
+
+
 class PodUploadResponse(BaseModel):
     links: List[str]
     signature_link: Optional[str] = None
+    pod_id: Optional[int] = None
+    upload_status: Optional[str] = None
+    files: List[PodUploadFileStatus] = []
 
 
 class PodScanResponse(BaseModel):
@@ -18,6 +29,8 @@ class PodHistoryItem(BaseModel):
     uploaded_by_email: Optional[str] = None
     file_links: List[str]
     signature_link: Optional[str] = None
+    upload_status: Optional[str] = None  # queued, uploading, completed, partial, failed
+    files: Optional[List[PodUploadFileStatus]] = None
     created_at: str
 
 
@@ -30,6 +43,7 @@ class DocumentExchangeItem(BaseModel):
     load_number: Optional[str] = None
     type: str  # BOL, Lumper, Receipt, Other
     attachment_url: str
+    upload_status: Optional[str] = None  # pending, completed, failed
     status: str  # Pending, Accepted, Rejected
     notes: Optional[str] = None
     created_at: str
@@ -0,0 +1,181 @@
+"""
+Backfill parsed city/state/zip columns and coordinates on loads and load stops.
+
+Coordinates come from the geocode cache; with --geocode, addresses not cached
+yet are geocoded first (as warm_geocode_cache does). Rows whose address is
+not in the cache keep empty coordinates.
+
+Usage:
+    python -m app.scripts.backfill_load_locations [--all] [--geocode] [--batch-size 1000]
+"""
+import argparse
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import or_, update
+
+from app.core.database import get_session_factory
+from app.models import GeocodeCacheEntry, Load, LoadStop
+from app.scripts.warm_geocode_cache import warm
+from app.services.address import normalize_address_key, parse_address
+
+
+def _backfill_loads(db, batch_size: int, refresh_all: bool) -> int:
+    query = db.query(Load.id, Load.pickup_address, Load.delivery_address)
+    if not refresh_all:
+        query = query.filter(or_(Load.pickup_city.is_(None), Load.delivery_city.is_(None)))
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = query.filter(Load.id > last_id).order_by(Load.id).limit(batch_size).all()
+        if not rows:
+            break
+        mappings = []
+        for load_id, pickup_address, delivery_address in rows:
+            pickup = parse_address(pickup_address)
+            delivery = parse_address(delivery_address)
+            mappings.append({
+                "id": load_id,
+                "pickup_city": pickup.city,
+                "pickup_state": pickup.state,
+                "pickup_zip": pickup.zip_code,
+                "delivery_city": delivery.city,
+                "delivery_state": delivery.state,
+                "delivery_zip": delivery.zip_code,
+            })
+        db.execute(update(Load), mappings)
+        db.commit()
+        updated += len(mappings)
+        last_id = rows[-1][0]
+    return updated
+
+
+def _backfill_stops(db, batch_size: int, refresh_all: bool) -> int:
+    query = db.query(LoadStop.id, LoadStop.address, LoadStop.city, LoadStop.state, LoadStop.zip_code).filter(
+        LoadStop.address.isnot(None)
+    )
+    if not refresh_all:
+        query = query.filter(or_(LoadStop.city.is_(None), LoadStop.state.is_(None)))
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = query.filter(LoadStop.id > last_id).order_by(LoadStop.id).limit(batch_size).all()
+        if not rows:
+            break
+        mappings = []
+        for stop_id, address, city, state, zip_code in rows:
+            parsed = parse_address(address)
+            mappings.append({
+                "id": stop_id,
+                "city": parsed.city if refresh_all else (city or parsed.city),
+                "state": parsed.state if refresh_all else (state or parsed.state),
+                "zip_code": parsed.zip_code if refresh_all else (zip_code or parsed.zip_code),
+            })
+        db.execute(update(LoadStop), mappings)
+        db.commit()
+        updated += len(mappings)
+        last_id = rows[-1][0]
+    return updated
+
+
+def _cached_coordinates(db, addresses: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+    """(latitude, longitude) per normalized address key, for addresses the geocode cache found."""
+    keys = {normalize_address_key(address) for address in addresses} - {""}
+    if not keys:
+        return {}
+    rows = db.query(GeocodeCacheEntry.address_key, GeocodeCacheEntry.latitude, GeocodeCacheEntry.longitude).filter(
+        GeocodeCacheEntry.address_key.in_(keys),
+        GeocodeCacheEntry.found.is_(True),
+    )
+    return {key: (lat, lon) for key, lat, lon in rows if lat is not None and lon is not None}
+
+
+def _backfill_load_coordinates(db, batch_size: int, refresh_all: bool) -> int:
+    query = db.query(Load.id, Load.pickup_address, Load.delivery_address,
+                     Load.pickup_latitude, Load.pickup_longitude, Load.delivery_latitude, Load.delivery_longitude)
+    if not refresh_all:
+        query = query.filter(or_(Load.pickup_latitude.is_(None), Load.delivery_latitude.is_(None)))
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = query.filter(Load.id > last_id).order_by(Load.id).limit(batch_size).all()
+        if not rows:
+            break
+        found = _cached_coordinates(db, [address for row in rows for address in (row[1], row[2])])
+        mappings = []
+        for load_id, pickup_address, delivery_address, *stored in rows:
+            pickup = found.get(normalize_address_key(pickup_address))
+            delivery = found.get(normalize_address_key(delivery_address))
+            if not pickup and not delivery:
+                continue
+            pickup_lat, pickup_lon = pickup if pickup and (refresh_all or stored[0] is None) else stored[:2]
+            delivery_lat, delivery_lon = delivery if delivery and (refresh_all or stored[2] is None) else stored[2:]
+            mappings.append({
+                "id": load_id,
+                "pickup_latitude": pickup_lat,
+                "pickup_longitude": pickup_lon,
+                "delivery_latitude": delivery_lat,
+                "delivery_longitude": delivery_lon,
+            })
+        if mappings:
+            db.execute(update(Load), mappings)
+            db.commit()
+        updated += len(mappings)
+        last_id = rows[-1][0]
+    return updated
+
+
+def _backfill_stop_coordinates(db, batch_size: int, refresh_all: bool) -> int:
+    query = db.query(LoadStop.id, LoadStop.address).filter(LoadStop.address.isnot(None))
+    if not refresh_all:
+        query = query.filter(LoadStop.latitude.is_(None))
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = query.filter(LoadStop.id > last_id).order_by(LoadStop.id).limit(batch_size).all()
+        if not rows:
+            break
+        found = _cached_coordinates(db, [address for _, address in rows])
+        mappings = []
+        for stop_id, address in rows:
+            coordinates = found.get(normalize_address_key(address))
+            if coordinates:
+                mappings.append({"id": stop_id, "latitude": coordinates[0], "longitude": coordinates[1]})
+        if mappings:
+            db.execute(update(LoadStop), mappings)
+            db.commit()
+        updated += len(mappings)
+        last_id = rows[-1][0]
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill parsed location columns on loads and stops")
+    parser.add_argument("--all", action="store_true",
+                        help="Re-parse every row, not only rows missing city/state or coordinates")
+    parser.add_argument("--geocode", action="store_true", help="Geocode addresses missing from the geocode cache first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Geocoding requests in flight with --geocode")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    SessionLocal = get_session_factory()
+    db = SessionLocal()
+    try:
+        loads = _backfill_loads(db, args.batch_size, args.all)
+        stops = _backfill_stops(db, args.batch_size, args.all)
+        print(f"Updated {loads} loads and {stops} stops")
+        if args.geocode:
+            result = warm(db, None, args.concurrency, force=False)
+            print(f"Geocoded {result['geocoded']} addresses ({result['errors']} errors)")
+        loads = _backfill_load_coordinates(db, args.batch_size, args.all)
+        stops = _backfill_stop_coordinates(db, args.batch_size, args.all)
+        print(f"Set coordinates on {loads} loads and {stops} stops")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark POD PDF rendering: a browser launched per PDF vs the shared pool.
+
+Renders the POD template (pdf_service.render_pod_html) --renders times with
+  * per-call: Playwright and Chromium started and stopped for every PDF
+    (what generate_pod_pdf did before the pool)
+  * pool: browser_pool.render_pdf one after another; the first render pays
+    the launch and is reported separately
+  * packet: browser_pool.render_many with --renders documents at once
+and prints median / p95 latency per PDF.
+
+Needs Playwright and Chromium (pip install playwright && playwright install chromium).
+
+Usage:
+    python -m app.scripts.bench_browser_pool --renders 20
+    python -m app.scripts.bench_browser_pool --renders 50 --max-pages 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from app.services.browser_pool import LAUNCH_ARGS, BrowserPool, BrowserUnavailable
+from app.services.pdf_service import POD_PDF_OPTIONS, PDFService
+
+
+def _html(index: int) -> str:
+    return PDFService().render_pod_html(
+        load_data={"id": index, "load_number": f"FF-{index:05d}", "pickup_location": "Dallas, TX",
+                   "delivery_location": "Austin, TX"},
+        pod_data={"receiver_name": "Dock 4", "delivery_date": "10/18/2026", "notes": "No exceptions"},
+        company_data={"company_name": "Summit Freight Lines", "phone": "(555) 201-7788"},
+    )
+
+
+def _report(label: str, timings: List[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<16} n={len(timings):>4}  median={statistics.median(timings) * 1000:8.1f}ms"
+          f"  p95={p95 * 1000:8.1f}ms  total={sum(timings):7.2f}s")
+
+
+async def _per_call(html: str) -> bytes:
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        try:
+            page = await browser.new_page()
+            await page.set_content(html, wait_until="load")
+            return await page.pdf(**POD_PDF_OPTIONS)
+        finally:
+            await browser.close()
+
+
+async def run(renders: int, max_pages: int) -> None:
+    htmls = [_html(index) for index in range(renders)]
+
+    timings = []
+    for html in htmls:
+        start = time.perf_counter()
+        await _per_call(html)
+        timings.append(time.perf_counter() - start)
+    _report("per-call", timings)
+
+    pool = BrowserPool(max_pages=max_pages)
+    try:
+        start = time.perf_counter()
+        await pool.render_pdf(htmls[0], **POD_PDF_OPTIONS)
+        _report("pool (launch)", [time.perf_counter() - start])
+
+        timings = []
+        for html in htmls:
+            start = time.perf_counter()
+            await pool.render_pdf(html, **POD_PDF_OPTIONS)
+            timings.append(time.perf_counter() - start)
+        _report("pool", timings)
+
+        start = time.perf_counter()
+        await pool.render_many(htmls, **POD_PDF_OPTIONS)
+        elapsed = time.perf_counter() - start
+        print(f"{'packet':<16} n={renders:>4}  {elapsed:7.2f}s  {renders / elapsed:6.1f} PDFs/s"
+              f"  (max_pages={max_pages})")
+        print(f"pool stats: {pool.stats()}")
+    finally:
+        await pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark POD PDF rendering with and without the browser pool")
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--max-pages", type=int, default=4)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.renders, args.max_pages))
+    except (BrowserUnavailable, ImportError) as e:
+        raise SystemExit(f"Playwright is required: {e}")
+
+
+if __name__ == "__main__":
+    main()
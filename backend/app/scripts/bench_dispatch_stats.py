@@ -0,0 +1,124 @@
+"""
+Benchmark /dispatch/stats aggregation: statement count and latency.
+
+Seeds a throwaway SQLite database (or --database-url) with N loads for one
+carrier and times the uncached aggregate query and the cached path.
+
+Usage:
+    python -m app.scripts.bench_dispatch_stats --loads 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app import models
+from app.services import dispatch_stats
+
+STATUSES = ["Created", "Available", "Assigned", "In Transit", "Picked Up", "Delivered", "Cancelled"]
+
+
+def _seed(db, n_loads: int, n_drivers: int = 150, n_trucks: int = 120) -> int:
+    carrier = models.Carrier(name="Bench Carrier", internal_code=f"BENCH{n_loads}")
+    db.add(carrier)
+    db.flush()
+    db.execute(insert(models.Driver), [
+        {"carrier_id": carrier.id, "name": f"Driver {i}", "created_at": datetime.utcnow()} for i in range(n_drivers)
+    ])
+    db.execute(insert(models.Equipment), [
+        {"carrier_id": carrier.id, "equipment_type": "truck", "identifier": f"T{i}", "status": "available",
+         "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()} for i in range(n_trucks)
+    ])
+    driver_ids = [d.id for d in db.query(models.Driver.id).filter(models.Driver.carrier_id == carrier.id)]
+    truck_ids = [t.id for t in db.query(models.Equipment.id).filter(models.Equipment.carrier_id == carrier.id)]
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    batch = []
+    for i in range(n_loads):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        batch.append({
+            "carrier_id": carrier.id,
+            "load_number": f"B-{i}",
+            "status": rng.choice(STATUSES),
+            "load_type": "Full",
+            "driver_id": rng.choice(driver_ids),
+            "truck_id": rng.choice(truck_ids),
+            "pickup_address": "Dallas, TX",
+            "delivery_address": "Austin, TX",
+            "created_at": created,
+            "updated_at": created,
+        })
+        if len(batch) == 5000:
+            db.execute(insert(models.Load), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.Load), batch)
+    db.commit()
+    return carrier.id
+
+
+def _time(fn, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(n_loads: int, database_url: str, repeat: int) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    carrier_id = _seed(db, n_loads)
+
+    statements = {"count": 0}
+
+    def _count(*_args):
+        statements["count"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+
+    uncached = _time(lambda: dispatch_stats.compute_dispatch_stats(db, carrier_id), repeat)
+    per_call = statements["count"] / repeat
+
+    dispatch_stats.invalidate_dispatch_stats(carrier_id)
+    statements["count"] = 0
+    cached = _time(lambda: dispatch_stats.get_dispatch_stats(db, carrier_id), repeat)
+    cached_statements = statements["count"]
+
+    event.remove(engine, "before_cursor_execute", _count)
+    db.close()
+    engine.dispose()
+
+    print(f"loads={n_loads:>7}  queries/call={per_call:.0f}  "
+          f"uncached median={statistics.median(uncached):.2f}ms p95={sorted(uncached)[int(repeat * 0.95) - 1]:.2f}ms  "
+          f"cached median={statistics.median(cached):.3f}ms ({cached_statements} queries over {repeat} calls)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dispatch board stats")
+    parser.add_argument("--loads", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file per run")
+    args = parser.parse_args()
+
+    for n_loads in args.loads:
+        if args.database_url:
+            run(n_loads, args.database_url, args.repeat)
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            run(n_loads, f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.repeat)
+
+
+if __name__ == "__main__":
+    main()
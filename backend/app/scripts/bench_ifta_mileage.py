@@ -0,0 +1,105 @@
+"""
+Benchmark the IFTA mileage engine on a synthetic fleet quarter.
+
+Builds --drivers random-walk tracks pinging every --interval seconds for
+--days, packs them into breadcrumb blobs, and times index construction and
+jurisdiction_miles (decode + point-in-polygon + aggregation). Boundaries come
+from --boundaries or, by default, a synthetic 8x6 grid of "states" over the
+lower 48 whose borders are jagged polylines of --edge-points vertices, so
+border cells behave like real boundary data.
+
+Usage:
+    python -m app.scripts.bench_ifta_mileage --drivers 80 --days 91
+    python -m app.scripts.bench_ifta_mileage --boundaries app/data/ifta_jurisdictions.geojson
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.breadcrumbs import encode_arrays
+from app.services.ifta_mileage import IFTA_JURISDICTIONS, JurisdictionIndex, jurisdiction_miles
+
+WEST, EAST, SOUTH, NORTH = -124.0, -67.0, 25.0, 49.0
+
+
+def _synthetic_boundaries(edge_points: int, rng) -> dict:
+    columns, rows = 8, 6
+    xs = np.linspace(WEST, EAST, columns + 1)
+    ys = np.linspace(SOUTH, NORTH, rows + 1)
+    # Shared jagged borders so neighbours tile without gaps; the jitter fades
+    # out towards the corners so crossing borders never overlap
+    taper = np.sin(np.linspace(0, np.pi, edge_points))
+    vertical = {(c, r): np.column_stack((xs[c] + taper * rng.normal(0, 0.05, edge_points),
+                                         np.linspace(ys[r], ys[r + 1], edge_points)))
+                for c in range(columns + 1) for r in range(rows)}
+    horizontal = {(c, r): np.column_stack((np.linspace(xs[c], xs[c + 1], edge_points),
+                                           ys[r] + taper * rng.normal(0, 0.05, edge_points)))
+                  for c in range(columns) for r in range(rows + 1)}
+    codes = list(IFTA_JURISDICTIONS)
+    features = []
+    for r in range(rows):
+        for c in range(columns):
+            ring = np.concatenate((horizontal[(c, r)], vertical[(c + 1, r)][1:], horizontal[(c, r + 1)][::-1][1:],
+                                   vertical[(c, r)][::-1][1:]))
+            features.append({"properties": {"code": codes[r * columns + c]},
+                             "geometry": {"type": "Polygon", "coordinates": [ring.tolist()]}})
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _fleet(drivers: int, days: int, interval: int, rng):
+    start = datetime(2026, 7, 1)
+    per_day = 86400 // interval
+    step = 55 / 69.0 * interval / 3600  # degrees per ping at ~55 mph
+    blobs = []
+    for driver_id in range(1, drivers + 1):
+        lon, lat = rng.uniform(WEST + 5, EAST - 5), rng.uniform(SOUTH + 3, NORTH - 3)
+        heading = rng.uniform(0, 2 * np.pi)
+        for day in range(days):
+            headings = heading + np.cumsum(rng.normal(0, 0.05, per_day))
+            lons = np.clip(lon + np.cumsum(step * np.cos(headings)), WEST, EAST)
+            lats = np.clip(lat + np.cumsum(step * np.sin(headings)), SOUTH, NORTH)
+            heading, lon, lat = headings[-1], lons[-1], lats[-1]
+            base = int((start + timedelta(days=day) - datetime(1970, 1, 1)).total_seconds())
+            times = base + interval * np.arange(per_day)
+            blobs.append((driver_id, encode_arrays(times, lats, lons)))
+    return blobs, start, start + timedelta(days=days)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark IFTA jurisdiction mileage")
+    parser.add_argument("--drivers", type=int, default=80)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between pings")
+    parser.add_argument("--boundaries", default=None, help="Boundary GeoJSON instead of the synthetic grid")
+    parser.add_argument("--edge-points", type=int, default=400)
+    parser.add_argument("--cell", type=float, default=0.1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    if args.boundaries:
+        with open(args.boundaries, encoding="utf-8") as f:
+            boundaries = json.load(f)
+    else:
+        boundaries = _synthetic_boundaries(args.edge_points, rng)
+
+    started = time.perf_counter()
+    index = JurisdictionIndex.from_geojson(boundaries, args.cell)
+    print(f"index: {len(index.codes)} jurisdictions, {index.nx}x{index.ny} cells, "
+          f"built in {time.perf_counter() - started:.2f}s")
+
+    blobs, start, end = _fleet(args.drivers, args.days, args.interval, rng)
+    megabytes = sum(len(data) for _, data in blobs) / 1_000_000
+    started = time.perf_counter()
+    result = jurisdiction_miles(index, blobs, start, end)
+    elapsed = time.perf_counter() - started
+    print(f"{result['points']:,} points ({megabytes:.1f} MB packed) in {elapsed:.2f}s "
+          f"= {result['points'] / elapsed:,.0f} points/s")
+    print(f"{len(result['rows']):,} driver-day-jurisdiction rows, {result['total_miles']:,.0f} miles, "
+          f"{result['unassigned_miles']:,.0f} unassigned")
+
+
+if __name__ == "__main__":
+    main()
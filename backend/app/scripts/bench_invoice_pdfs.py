@@ -0,0 +1,102 @@
+"""
+Benchmark batch invoice PDF rendering in pages per second.
+
+Generates synthetic invoices (--lines line items each) and times
+  * per-call: a fresh PDFGenerator and style sheet per invoice, one process
+    (what the single-invoice endpoints did for every document)
+  * cached: one PDFGenerator with the shared style sheet, one process
+  * pool: invoice_batch.render_invoices with --workers processes
+and, with --merge, the merged-PDF step on top of the pool render.
+
+Usage:
+    python -m app.scripts.bench_invoice_pdfs --invoices 300 --workers 2 4
+    python -m app.scripts.bench_invoice_pdfs --invoices 500 --lines 40 --workers 4 --merge
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services import invoice_batch, pdf_generator
+
+CARRIER_INFO = {
+    "company_name": "Summit Freight Lines",
+    "address": "1200 Industrial Blvd, Dallas, TX 75207",
+    "phone": "(555) 201-7788",
+    "email": "billing@summitfreight.test",
+}
+
+
+def _invoice(index: int, lines: int) -> dict:
+    items = [
+        {"description": f"Load FF-{index}-{line}: Dallas, TX to Austin, TX", "quantity": 1,
+         "unit_price": 1850.0 + line, "amount": 1850.0 + line}
+        for line in range(lines)
+    ]
+    subtotal = sum(item["amount"] for item in items)
+    return {
+        "invoice_number": f"INV-{index:05d}",
+        "invoice_date": "09/30/2026",
+        "due_date": "10/30/2026",
+        "payment_terms": "Net 30",
+        "customer_name": f"Customer {index % 40}",
+        "subtotal": subtotal,
+        "tax_amount": 0,
+        "total_amount": subtotal,
+        "amount_paid": 0,
+        "balance_due": subtotal,
+        "line_items": items,
+    }
+
+
+def _report(label: str, pages: int, elapsed: float) -> None:
+    print(f"{label:<22} pages={pages:>5}  {elapsed:7.2f}s  {pages / elapsed:8.1f} pages/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batch invoice PDF rendering")
+    parser.add_argument("--invoices", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=6)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--merge", action="store_true")
+    args = parser.parse_args()
+
+    items = [(f"invoice_{index}.pdf", _invoice(index, args.lines)) for index in range(args.invoices)]
+
+    start = time.perf_counter()
+    pages = 0
+    for _, data in items:
+        pdf_generator.shared_styles.cache_clear()
+        pages += pdf_generator.PDFGenerator().render_invoice(data, CARRIER_INFO)[1]
+    _report("per-call", pages, time.perf_counter() - start)
+
+    generator = pdf_generator.PDFGenerator()
+    start = time.perf_counter()
+    pages = sum(generator.render_invoice(data, CARRIER_INFO)[1] for _, data in items)
+    _report("cached", pages, time.perf_counter() - start)
+
+    for workers in args.workers:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=invoice_batch._init_worker,
+        )
+        try:
+            # Start the worker processes so spawn cost is not counted
+            list(executor.map(abs, range(workers)))
+            start = time.perf_counter()
+            rendered = list(invoice_batch.render_invoices(items, CARRIER_INFO, executor=executor))
+            elapsed = time.perf_counter() - start
+            pages = sum(count for _, _, count in rendered)
+            _report(f"pool workers={workers}", pages, elapsed)
+            if args.merge:
+                start = time.perf_counter()
+                merged, pages = invoice_batch.merge_pdfs(rendered)
+                merged.close()
+                _report("  + merge", pages, elapsed + time.perf_counter() - start)
+        finally:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
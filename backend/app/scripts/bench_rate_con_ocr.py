@@ -0,0 +1,111 @@
+"""
+Benchmark rate-con OCR: the old in-request loop against the page pool.
+
+Generates image-only (scanned) rate-con PDFs, or uses --pdf files, and times
+  * sequential: convert_from_bytes + pytesseract page by page in one process
+    (what /loads/auto-create used to do inside the request)
+  * pool: ocr_pipeline.ocr_files with --workers processes at --dpi
+Requires the tesseract and poppler (pdftoppm) binaries.
+
+Usage:
+    python -m app.scripts.bench_rate_con_ocr --docs 4 --pages 8 --workers 2 4
+    python -m app.scripts.bench_rate_con_ocr --pdf scans/*.pdf --dpi 150 200 300
+"""
+import argparse
+import io
+import multiprocessing
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.services import ocr_pipeline
+
+SAMPLE_LINES = [
+    "RATE CONFIRMATION",
+    "Load # {doc}-{page}    PO # 88{doc}{page}1",
+    "Broker: Summit Freight Brokerage LLC   MC# 123456",
+    "Carrier Ref: FF-{doc}{page}",
+    "Pickup: 1200 Industrial Blvd, Dallas, TX 75207",
+    "Pickup Date: 03/0{page}/2026  08:00",
+    "Delivery: 455 Commerce St, Austin, TX 78701",
+    "Delivery Date: 03/1{page}/2026  14:00",
+    "Rate: $2,450.00 USD   Fuel surcharge included",
+    "Equipment: 53' Dry Van   Weight: 42,000 lbs",
+]
+
+
+def _sample_pdf(doc: int, pages: int) -> bytes:
+    """Letter-size pages rendered at 200 DPI and saved without a text layer."""
+    font = ImageFont.load_default(size=34)
+    images = []
+    for page in range(1, pages + 1):
+        image = Image.new("RGB", (1700, 2200), "white")
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(SAMPLE_LINES * 3):
+            draw.text((120, 120 + row * 62), line.format(doc=doc, page=page), fill="black", font=font)
+        images.append(image)
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=200)
+    return buffer.getvalue()
+
+
+def _sequential(files) -> int:
+    import pytesseract
+    from pdf2image import convert_from_bytes
+
+    pages = 0
+    for _, content, _ in files:
+        for image in convert_from_bytes(content):
+            pytesseract.image_to_string(image)
+            pages += 1
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark rate-con OCR")
+    parser.add_argument("--pdf", nargs="*", default=[], help="Scanned PDFs to use instead of generated samples")
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--dpi", type=int, nargs="+", default=[200])
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    missing = [binary for binary in ("tesseract", "pdftoppm") if not shutil.which(binary)]
+    if missing:
+        raise SystemExit(f"Missing binaries: {', '.join(missing)}")
+
+    if args.pdf:
+        files = [(path, open(path, "rb").read(), "application/pdf") for path in args.pdf]
+    else:
+        files = [(f"sample-{doc}.pdf", _sample_pdf(doc, args.pages), "application/pdf") for doc in range(args.docs)]
+
+    if not args.skip_sequential:
+        start = time.perf_counter()
+        pages = _sequential(files)
+        elapsed = time.perf_counter() - start
+        print(f"sequential            pages={pages:>4}  {elapsed:7.2f}s  {pages / elapsed:6.2f} pages/s")
+
+    for workers in args.workers:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=ocr_pipeline._init_worker,
+        )
+        try:
+            # Start the worker processes so spawn cost is not counted
+            list(executor.map(abs, range(workers)))
+            for dpi in args.dpi:
+                start = time.perf_counter()
+                result = ocr_pipeline.ocr_files(files, dpi=dpi, executor=executor)
+                elapsed = time.perf_counter() - start
+                print(f"pool workers={workers:<2} dpi={dpi:<3} pages={result['ocr_pages']:>4}  {elapsed:7.2f}s  "
+                      f"{result['ocr_pages'] / elapsed:6.2f} pages/s  errors={result['ocr_errors']}")
+        finally:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
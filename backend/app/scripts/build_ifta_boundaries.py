@@ -0,0 +1,119 @@
+"""
+Build the IFTA jurisdiction boundary file used by the mileage engine.
+
+Takes GeoJSON FeatureCollections of US states and/or Canadian provinces, for
+example the Census cartographic boundary file (cb_2023_us_state_5m) and
+Statistics Canada's province boundaries, converted from shapefiles with
+    ogr2ogr -f GeoJSON -t_srs EPSG:4326 states.geojson cb_2023_us_state_5m.shp
+
+Features are matched to IFTA jurisdictions by postal code property (STUSPS,
+postal, code, PREABBR) or by name (NAME, PRENAME); everything else (AK, HI,
+DC, territories) is dropped. Rings smaller than --min-ring-area square
+degrees (islands no truck reaches) are dropped, the rest are simplified to at
+most --max-ring-points vertices with Douglas-Peucker and coordinates are
+rounded to 5 decimals (~1 m).
+
+The bundled app/data/ifta_jurisdictions.geojson was built from the Census
+cb_2016_us_state_500k states (public domain) and the MIT-licensed ECharts
+Canada province map (echarts-countries-js), with
+    --max-ring-points 1000 --min-ring-area 0.002
+
+Usage:
+    python -m app.scripts.build_ifta_boundaries states.geojson provinces.geojson
+    python -m app.scripts.build_ifta_boundaries states.geojson --max-ring-points 1000 --output /srv/ifta.geojson
+"""
+import argparse
+import json
+import os
+import unicodedata
+
+from app.services.ifta_mileage import DEFAULT_BOUNDARIES_PATH, IFTA_JURISDICTIONS
+from app.utils.geo import simplify_to_count
+
+CODE_PROPERTIES = ("STUSPS", "postal", "code", "PREABBR")
+NAME_PROPERTIES = ("NAME", "name", "PRENAME", "PRNAME")
+
+
+def _plain(name: str) -> str:
+    return unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().strip().lower()
+
+
+CODES_BY_NAME = {_plain(name): code for code, name in IFTA_JURISDICTIONS.items()}
+
+
+def jurisdiction_code(properties: dict):
+    for key in CODE_PROPERTIES:
+        code = str(properties.get(key) or "").upper().replace("CA-", "").replace("US-", "")
+        if code in IFTA_JURISDICTIONS:
+            return code
+    for key in NAME_PROPERTIES:
+        if properties.get(key):
+            # StatCan names are bilingual ("Quebec / Québec")
+            for part in str(properties[key]).split("/"):
+                code = CODES_BY_NAME.get(_plain(part))
+                if code:
+                    return code
+    return None
+
+
+def simplify_ring(ring, max_points: int):
+    if len(ring) > max_points:
+        ring = simplify_to_count(ring, max_points, lat_index=1, lon_index=0)
+    return [[round(lon, 5), round(lat, 5)] for lon, lat, *_ in ring]
+
+
+def ring_area(ring) -> float:
+    """Unsigned area in square degrees (shoelace)."""
+    return abs(sum(x1 * y2 - x2 * y1 for (x1, y1, *_), (x2, y2, *_) in zip(ring, ring[1:] + ring[:1]))) / 2
+
+
+def build(paths, max_ring_points: int, min_ring_area: float = 0.0) -> dict:
+    features = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for feature in data.get("features", []):
+            code = jurisdiction_code(feature.get("properties") or {})
+            geometry = feature.get("geometry") or {}
+            if code is None or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+                continue
+            polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+            polygons = [
+                [simplify_ring(ring, max_ring_points) for ring in rings if ring_area(ring) >= min_ring_area]
+                for rings in polygons
+                if rings and ring_area(rings[0]) >= min_ring_area
+            ]
+            features.setdefault(code, []).extend(polygons)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"code": code, "name": IFTA_JURISDICTIONS[code]},
+                "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+            }
+            for code, polygons in sorted(features.items())
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the IFTA jurisdiction boundary file")
+    parser.add_argument("inputs", nargs="+", help="GeoJSON FeatureCollections (WGS84)")
+    parser.add_argument("--max-ring-points", type=int, default=2000)
+    parser.add_argument("--min-ring-area", type=float, default=0.0, help="square degrees")
+    parser.add_argument("--output", default=DEFAULT_BOUNDARIES_PATH)
+    args = parser.parse_args()
+
+    result = build(args.inputs, args.max_ring_points, args.min_ring_area)
+    missing = sorted(set(IFTA_JURISDICTIONS) - {f["properties"]["code"] for f in result["features"]})
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, separators=(",", ":"))
+    print(f"Wrote {len(result['features'])} jurisdictions to {args.output}")
+    if missing:
+        print(f"Not in the inputs: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
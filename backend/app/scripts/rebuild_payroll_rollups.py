@@ -0,0 +1,52 @@
+"""
+Rebuild payroll_period_rollups from settlements and ledger lines.
+
+Run once after the migration that creates the table, or any time the rollup
+is suspected to be out of date.
+
+Usage:
+    python -m app.scripts.rebuild_payroll_rollups [--batch-size 500]
+"""
+import argparse
+
+from app.core.database import get_session_factory
+from app.models import PayrollSettlement
+from app.services.payroll_reports import payroll_reports
+
+
+def _rebuild(db, batch_size: int) -> int:
+    rebuilt = 0
+    last_id = 0
+    while True:
+        ids = [
+            row[0]
+            for row in db.query(PayrollSettlement.id)
+            .filter(PayrollSettlement.id > last_id)
+            .order_by(PayrollSettlement.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        payroll_reports.refresh_settlement_rollups(db, ids)
+        db.commit()
+        rebuilt += len(ids)
+        last_id = ids[-1]
+    return rebuilt
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the payroll period rollup table")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    SessionLocal = get_session_factory()
+    db = SessionLocal()
+    try:
+        rebuilt = _rebuild(db, args.batch_size)
+        print(f"Rebuilt rollups for {rebuilt} settlements")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Warm the geocode cache with every distinct load, stop and customer address.
+
+Addresses already cached (and not expired) are skipped; the rest are
+geocoded concurrently, bounded by --concurrency and the Mapbox client's rate
+limit, and written to geocode_cache in batches.
+
+Usage:
+    python -m app.scripts.warm_geocode_cache [--carrier-id 1] [--concurrency 8] [--force]
+"""
+import argparse
+import asyncio
+from typing import Dict, List, Optional
+
+from app.core.database import get_session_factory
+from app.models import Customer, Load, LoadStop
+from app.services.address import normalize_address_key
+from app.services.geocode_cache import geocode_cache
+from app.services.mapbox import MapboxService, mapbox_http
+
+
+def collect_addresses(db, carrier_id: Optional[int] = None) -> Dict[str, str]:
+    """Distinct addresses keyed by normalized key (first spelling wins)."""
+    addresses: Dict[str, str] = {}
+
+    def add(address: Optional[str]) -> None:
+        key = normalize_address_key(address)
+        if key and key not in addresses:
+            addresses[key] = address.strip()
+
+    load_query = db.query(Load.pickup_address, Load.delivery_address)
+    stop_query = db.query(LoadStop.address).join(Load, LoadStop.load_id == Load.id).filter(LoadStop.address.isnot(None))
+    customer_query = db.query(Customer.address, Customer.city, Customer.state, Customer.zip_code)
+    if carrier_id is not None:
+        load_query = load_query.filter(Load.carrier_id == carrier_id)
+        stop_query = stop_query.filter(Load.carrier_id == carrier_id)
+        customer_query = customer_query.filter(Customer.carrier_id == carrier_id)
+
+    for pickup, delivery in load_query.distinct():
+        add(pickup)
+        add(delivery)
+    for (address,) in stop_query.distinct():
+        add(address)
+    for street, city, state, zip_code in customer_query.distinct():
+        if street or city:
+            state_zip = " ".join(part for part in (state, zip_code) if part)
+            add(", ".join(part for part in (street, city, state_zip) if part))
+    return addresses
+
+
+async def geocode_all(service: MapboxService, addresses: List[str], concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+    errors = 0
+
+    async def one(address: str):
+        nonlocal errors
+        async with semaphore:
+            try:
+                results.append((address, await service.afetch_geocode(address)))
+            except Exception as e:
+                errors += 1
+                print(f"  failed: {address!r}: {e}")
+
+    try:
+        await asyncio.gather(*(one(address) for address in addresses))
+    finally:
+        await mapbox_http.aclose()
+    return results, errors
+
+
+def warm(db, carrier_id: Optional[int], concurrency: int, force: bool, batch_size: int = 500) -> dict:
+    addresses = collect_addresses(db, carrier_id)
+    keys = list(addresses)
+    cached = set() if force else geocode_cache.fresh_keys(db, keys)
+    pending = [addresses[key] for key in keys if key not in cached]
+
+    service = MapboxService(db)
+    geocoded = 0
+    errors = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        results, batch_errors = asyncio.run(geocode_all(service, batch, concurrency))
+        geocode_cache.put_many(db, results)
+        db.commit()
+        geocoded += len(results)
+        errors += batch_errors
+
+    return {
+        "distinct_addresses": len(keys),
+        "already_cached": len(cached),
+        "geocoded": geocoded,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Warm the geocode cache")
+    parser.add_argument("--carrier-id", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--force", action="store_true", help="Re-geocode addresses that are already cached")
+    args = parser.parse_args()
+
+    SessionLocal = get_session_factory()
+    db = SessionLocal()
+    try:
+        result = warm(db, args.carrier_id, args.concurrency, args.force, args.batch_size)
+        print(
+            f"{result['distinct_addresses']} distinct addresses, {result['already_cached']} already cached, "
+            f"{result['geocoded']} geocoded, {result['errors']} errors"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Address parsing for structured load/stop location columns.
+
+Addresses are entered free-form ("Shipper Co, Dallas, TX 75001", "Dallas, TX",
+"123 Main St, Dallas, TX, 75001, USA"). They are parsed once when a load or
+stop is written and the pieces are stored in indexed columns, so listings and
+lane queries never re-split address strings.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import inspect
+
+_ZIP_RE = re.compile(r"^\d{5}(?:-\d{4})?$")
+_STATE_ZIP_RE = re.compile(r"^(?:(.*?)\s+)?([A-Za-z]{2})(?:\s+(\d{5}(?:-\d{4})?))?$")
+_COUNTRY_SUFFIXES = {"USA", "US", "U.S.", "U.S.A.", "UNITED STATES"}
+# US states, DC and territories, and Canadian provinces; anything else in the
+# state position ("St", "Dr", "Ln") is a street suffix, not a state
+_STATE_CODES = frozenset("""
+    AL AK AZ AR CA CO CT DE FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ NM NY NC ND
+    OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY DC PR VI GU AS MP
+    AB BC MB NB NL NS NT NU ON PE QC SK YT
+""".split())
+_KEY_PUNCT_RE = re.compile(r"[.,;:#'\"()]+")
+_KEY_SPACE_RE = re.compile(r"\s+")
+_KEY_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd",
+    "highway": "hwy", "parkway": "pkwy", "lane": "ln", "court": "ct", "suite": "ste",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "usa": "",
+}
+
+
+@dataclass(frozen=True)
+class ParsedAddress:
+    street: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip_code: Optional[str] = None
+
+
+def parse_address(address: Optional[str]) -> ParsedAddress:
+    """Split a free-form US address into street, city, state and ZIP."""
+    if not address:
+        return ParsedAddress()
+
+    parts = [p.strip() for p in address.split(",") if p.strip()]
+    if len(parts) > 1 and parts[-1].upper() in _COUNTRY_SUFFIXES:
+        parts.pop()
+
+    zip_code = None
+    if len(parts) > 1 and _ZIP_RE.match(parts[-1]):
+        zip_code = parts.pop()
+
+    state = None
+    city = None
+    if parts:
+        match = _STATE_ZIP_RE.match(parts[-1])
+        if match and match.group(2).upper() in _STATE_CODES and (len(parts) > 1 or match.group(1)):
+            prefix, state, tail_zip = match.groups()
+            state = state.upper()
+            zip_code = zip_code or tail_zip
+            parts.pop()
+            if prefix:
+                # "Dallas TX 75001" with no comma between city and state
+                city = prefix.strip()
+
+    if city is None and parts and state:
+        city = parts.pop()
+
+    street = ", ".join(parts) if parts else None
+    if not state and len(parts) == 1 and not street[0].isdigit():
+        # Single token like "Dallas" - treat as a city, not a street
+        city, street = street, None
+
+    return ParsedAddress(street=street, city=city, state=state, zip_code=zip_code)
+
+
+def format_city_state(city: Optional[str], state: Optional[str]) -> Optional[str]:
+    """Lane display text ("Dallas, TX") from stored columns."""
+    if city and state:
+        return f"{city}, {state}"
+    return city or state
+
+
+def normalize_address_key(address: Optional[str]) -> str:
+    """
+    Cache key for an address: lowercase, no punctuation, single spaces and
+    common street suffixes abbreviated, so "123 Main Street, Dallas, TX" and
+    "123 main st dallas tx" share a key.
+    """
+    if not address:
+        return ""
+    text = _KEY_PUNCT_RE.sub(" ", address.lower())
+    text = text.replace("united states", "")
+    words = [_KEY_ABBREVIATIONS.get(word, word) for word in _KEY_SPACE_RE.split(text)]
+    return " ".join(word for word in words if word)
+
+
+def _address_changed(obj, attr: str) -> bool:
+    history = inspect(obj).attrs[attr].history
+    return bool(history.added) and list(history.added) != list(history.deleted)
+
+
+def apply_load_address_fields(load) -> None:
+    """
+    Populate pickup_*/delivery_* location columns on a Load from its addresses.
+    Coordinates of an address that changed are cleared until it is geocoded again.
+    """
+    for prefix in ("pickup", "delivery"):
+        parsed = parse_address(getattr(load, f"{prefix}_address"))
+        setattr(load, f"{prefix}_city", parsed.city)
+        setattr(load, f"{prefix}_state", parsed.state)
+        setattr(load, f"{prefix}_zip", parsed.zip_code)
+        if _address_changed(load, f"{prefix}_address"):
+            setattr(load, f"{prefix}_latitude", None)
+            setattr(load, f"{prefix}_longitude", None)
+
+
+def apply_stop_address_fields(stop) -> None:
+    """Fill a LoadStop's city/state/zip_code from its address when not given."""
+    if not stop.address:
+        return
+    parsed = parse_address(stop.address)
+    if not stop.city:
+        stop.city = parsed.city
+    if not stop.state:
+        stop.state = parsed.state
+    if not stop.zip_code:
+        stop.zip_code = parsed.zip_code
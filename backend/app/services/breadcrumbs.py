@@ -0,0 +1,165 @@
+"""
+Compact GPS breadcrumb store.
+
+Each driver's track is kept as one row per UTC day whose `data` column packs
+the day's points: timestamps (seconds), latitude and longitude (1e-5 degree,
+about 1 m) are delta-encoded against the previous point and written as
+zigzag varints. A 30-second ping usually costs 4-6 bytes instead of a
+~100-byte telemetry row, and a week-long trail is read from 7 rows.
+
+Points arrive through the Motive telemetry writer (webhooks and live
+history fetches); appending merges into the day's blob, dropping repeated
+timestamps, so replays are idempotent. Writers can race on the same day, so
+an append first makes sure the day rows exist and then reads them FOR
+UPDATE: a concurrent append waits for this transaction and merges into its
+result instead of overwriting it. The caller commits.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import DriverBreadcrumbDay
+from app.utils.geo import simplify_to_count
+from app.utils.upsert import upsert
+
+COORDINATE_SCALE = 100_000
+FORMAT_VERSION = 1
+
+Point = Tuple[int, float, float]  # (unix seconds, lat, lon)
+
+
+def encode_arrays(timestamps: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> bytes:
+    """Pack time-ordered points as [version][dt, dlat, dlon]* zigzag varints."""
+    columns = np.column_stack((
+        np.asarray(timestamps, dtype=np.int64),
+        np.round(np.asarray(lat, dtype=float) * COORDINATE_SCALE).astype(np.int64),
+        np.round(np.asarray(lon, dtype=float) * COORDINATE_SCALE).astype(np.int64),
+    ))
+    values = np.diff(columns, axis=0, prepend=np.zeros((1, 3), dtype=np.int64)).ravel()
+    zigzag = ((values << 1) ^ (values >> 63)).astype(np.uint64)  # small negatives stay small
+    lengths = np.ones(len(zigzag), dtype=np.int64)
+    for bits in range(7, 64, 7):
+        lengths += zigzag >= np.uint64(1 << bits)
+    starts = np.cumsum(lengths) - lengths
+    byte_index, value_index = np.arange(int(lengths.sum())), np.repeat(np.arange(len(zigzag)), lengths)
+    position = byte_index - starts[value_index]
+    out = ((zigzag[value_index] >> (7 * position).astype(np.uint64)) & np.uint64(0x7F)).astype(np.uint8)
+    out[position < lengths[value_index] - 1] |= 0x80
+    return bytes([FORMAT_VERSION]) + out.tobytes()
+
+
+def encode_points(points: Iterable[Point]) -> bytes:
+    points = list(points)
+    if not points:
+        return bytes([FORMAT_VERSION])
+    timestamps, lat, lon = zip(*points)
+    return encode_arrays(np.array(timestamps), np.array(lat), np.array(lon))
+
+
+def decode_arrays(data: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized decode into (unix seconds, lat, lon) arrays."""
+    if not data:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Unknown breadcrumb format {data[0]}")
+    raw = np.frombuffer(data, dtype=np.uint8, offset=1)
+    if not len(raw):
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    last_byte = raw < 0x80
+    starts = np.flatnonzero(np.concatenate(([True], last_byte[:-1])))
+    group = np.cumsum(np.concatenate(([0], last_byte[:-1].astype(np.int64))))
+    shift = (7 * (np.arange(len(raw)) - starts[group])).astype(np.uint64)
+    zigzag = np.add.reduceat((raw & 0x7F).astype(np.uint64) << shift, starts)
+    values = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    columns = np.cumsum(values[: len(values) // 3 * 3].reshape(-1, 3), axis=0)
+    return columns[:, 0], columns[:, 1] / COORDINATE_SCALE, columns[:, 2] / COORDINATE_SCALE
+
+
+def decode_points(data: bytes) -> List[Point]:
+    timestamps, lat, lon = decode_arrays(data)
+    return list(zip(timestamps.tolist(), lat.tolist(), lon.tolist()))
+
+
+def _epoch(moment: datetime) -> int:
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _day(timestamp: int) -> date:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).date()
+
+
+def append_points(db: Session, carrier_id: int, driver_id: int, points: Iterable[Tuple[datetime, float, float]]) -> int:
+    """Merge (naive UTC time, lat, lon) points into the driver's day rows; returns points added."""
+    by_day: Dict[date, Dict[int, Point]] = {}
+    for moment, lat, lon in points:
+        timestamp = _epoch(moment)
+        by_day.setdefault(_day(timestamp), {})[timestamp] = (timestamp, lat, lon)
+    if not by_day:
+        return 0
+
+    now = datetime.utcnow()
+    # Empty rows for new days give the lock below something to hold
+    placeholders = []
+    for day, new_points in by_day.items():
+        first = datetime.utcfromtimestamp(min(new_points))
+        placeholders.append({"carrier_id": carrier_id, "driver_id": driver_id, "day": day, "point_count": 0,
+                             "start_at": first, "end_at": first, "data": encode_points([]), "updated_at": now})
+    upsert(db, DriverBreadcrumbDay, placeholders, ["driver_id", "day"], [])
+    existing = {
+        row.day: row.data
+        for row in db.query(DriverBreadcrumbDay.day, DriverBreadcrumbDay.data).filter(
+            DriverBreadcrumbDay.driver_id == driver_id,
+            DriverBreadcrumbDay.day.in_(list(by_day)),
+        ).with_for_update()
+    }
+    rows = []
+    added = 0
+    for day, new_points in by_day.items():
+        merged = {point[0]: point for point in decode_points(existing.get(day))}
+        before = len(merged)
+        for timestamp, point in new_points.items():
+            merged.setdefault(timestamp, point)
+        if len(merged) == before:
+            continue
+        added += len(merged) - before
+        ordered = [merged[timestamp] for timestamp in sorted(merged)]
+        rows.append({
+            "carrier_id": carrier_id,
+            "driver_id": driver_id,
+            "day": day,
+            "point_count": len(ordered),
+            "start_at": datetime.utcfromtimestamp(ordered[0][0]),
+            "end_at": datetime.utcfromtimestamp(ordered[-1][0]),
+            "data": encode_points(ordered),
+            "updated_at": now,
+        })
+    upsert(db, DriverBreadcrumbDay, rows, ["driver_id", "day"],
+           ["point_count", "start_at", "end_at", "data", "updated_at"])
+    return added
+
+
+def query_range(db: Session, driver_id: int, start: datetime, end: datetime) -> List[Point]:
+    """The driver's points with start <= time < end (naive UTC), in time order."""
+    first, last = _epoch(start), _epoch(end)
+    rows = db.query(DriverBreadcrumbDay.data).filter(
+        DriverBreadcrumbDay.driver_id == driver_id,
+        DriverBreadcrumbDay.day >= start.date(),
+        DriverBreadcrumbDay.day <= (end - timedelta(microseconds=1)).date(),
+    ).order_by(DriverBreadcrumbDay.day)
+    points = []
+    for (data,) in rows:
+        points.extend(point for point in decode_points(data) if first <= point[0] < last)
+    return points
+
+
+def trail(db: Session, driver_id: int, start: datetime, end: datetime, max_points: int) -> dict:
+    """Range query downsampled with Douglas-Peucker to at most max_points."""
+    points = query_range(db, driver_id, start, end)
+    simplified = simplify_to_count(points, max_points)
+    return {
+        "total_points": len(points),
+        "returned_points": len(simplified),
+        "points": [[timestamp, lat, lon] for timestamp, lat, lon in simplified],
+    }
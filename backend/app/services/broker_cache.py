@@ -0,0 +1,342 @@
+"""
+Cached FMCSA broker authority lookups.
+
+SAFER snapshots are stored in broker_authority_cache keyed by "dot:<number>"
+or "mc:<number>". A lookup younger than FMCSA_CACHE_TTL_HOURS (or
+FMCSA_CACHE_NEGATIVE_TTL_HOURS for "no record") is served as is; an older one
+is served stale while a background thread refetches it, and only entries past
+FMCSA_CACHE_MAX_AGE_DAYS (or missing) are fetched in the request. If SAFER is
+down, whatever is cached is served instead of an error.
+
+Batches (bulk verification, the refresher) fetch concurrently on the async
+face of the FMCSA client, bounded by FMCSA_CONCURRENCY and its rate limit.
+The refresher re-checks brokers on recently touched loads before their
+entries go stale, so verifications during dispatch rarely wait on SAFER.
+
+Writes go through the caller's session; the caller commits.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.http_client import HTTPError
+from app.models import BrokerAuthorityEntry, Load
+from app.services.fmcsa import FMCSAService, FMCSAUnavailable, clean_number, fmcsa_http, verification_result
+from app.utils.upsert import upsert
+
+CLOSED_LOAD_STATUSES = ("Delivered", "Cancelled")
+UNAVAILABLE = object()
+
+
+def lookup_key(kind: str, number: Optional[str]) -> Optional[str]:
+    cleaned = clean_number(kind, number)
+    return f"{kind}:{cleaned}" if cleaned else None
+
+
+def broker_keys(mc_number: Optional[str], dot_number: Optional[str]) -> List[str]:
+    """Keys in the order verification tries them: DOT first (most reliable), then MC."""
+    return [key for key in (lookup_key("dot", dot_number), lookup_key("mc", mc_number)) if key]
+
+
+def _entry_result(entry: BrokerAuthorityEntry) -> Optional[Dict[str, Any]]:
+    return dict(entry.data) if entry.found and entry.data else None
+
+
+class BrokerAuthorityCache:
+    def __init__(self, ttl_hours: float, negative_ttl_hours: float, max_age_days: float, concurrency: int):
+        self.ttl = timedelta(hours=ttl_hours)
+        self.negative_ttl = timedelta(hours=negative_ttl_hours)
+        self.max_age = timedelta(days=max_age_days)
+        self.concurrency = concurrency
+        self.service = FMCSAService()
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._refresher: Optional[threading.Thread] = None
+        self.counts = {"fresh": 0, "stale": 0, "fetched": 0, "unavailable": 0, "background_refreshes": 0}
+
+    def _incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += amount
+
+    def _state(self, entry: Optional[BrokerAuthorityEntry], now: datetime, ttl_fraction: float = 1.0) -> str:
+        if entry is None:
+            return "missing"
+        age = now - entry.updated_at
+        ttl = self.ttl if entry.found else self.negative_ttl
+        if age < ttl * ttl_fraction:
+            return "fresh"
+        return "stale" if age < self.max_age else "expired"
+
+    # -- fetching ------------------------------------------------------------
+
+    def _fetch_many(self, keys: List[str]) -> Dict[str, Any]:
+        """SAFER result (dict, or None for "no record") or UNAVAILABLE per key, fetched concurrently."""
+        if not keys:
+            return {}
+
+        async def run() -> Dict[str, Any]:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results: Dict[str, Any] = {}
+
+            async def one(key: str) -> None:
+                kind, number = key.split(":", 1)
+                async with semaphore:
+                    try:
+                        results[key] = await self.service.afetch(kind, number)
+                    except (HTTPError, FMCSAUnavailable):
+                        results[key] = UNAVAILABLE
+
+            try:
+                await asyncio.gather(*(one(key) for key in keys))
+            finally:
+                await fmcsa_http.aclose()
+            return results
+
+        return asyncio.run(run())
+
+    def _store(self, db: Session, fetched: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        rows = []
+        for key, result in fetched.items():
+            if result is UNAVAILABLE:
+                continue
+            rows.append({
+                "lookup_key": key,
+                "found": result is not None,
+                "legal_name": result.get("legal_name") if result else None,
+                "dot_number": result.get("dot_number") if result else None,
+                "mc_number": result.get("mc_number") if result else None,
+                "is_broker": bool(result and result.get("is_broker")),
+                "operating_status": result.get("operating_status") if result else None,
+                "data": result,
+                "created_at": now,
+                "updated_at": now,
+            })
+        upsert(db, BrokerAuthorityEntry, rows, ["lookup_key"],
+               ["found", "legal_name", "dot_number", "mc_number", "is_broker", "operating_status", "data", "updated_at"])
+
+    def _refresh_in_background(self, bind, keys: Iterable[str]) -> None:
+        with self._lock:
+            keys = [key for key in keys if key not in self._refreshing]
+            self._refreshing.update(keys)
+        if not keys:
+            return
+
+        def run():
+            db = sessionmaker(bind=bind, autoflush=False)()
+            try:
+                self._store(db, self._fetch_many(keys))
+                db.commit()
+                self._incr("background_refreshes", len(keys))
+            except Exception:
+                db.rollback()  # keep serving the stale entries; the next read retries
+            finally:
+                db.close()
+                with self._lock:
+                    self._refreshing.difference_update(keys)
+
+        threading.Thread(target=run, name="fmcsa-refresh", daemon=True).start()
+
+    # -- reads -----------------------------------------------------------------
+
+    def resolve(self, db: Session, keys: Iterable[str], force: bool = False) -> Dict[str, Tuple[Optional[dict], str]]:
+        """
+        (result, state) per key; state is fresh, stale (refresh scheduled),
+        fetched, or unavailable (SAFER down and nothing cached).
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        entries = {
+            entry.lookup_key: entry
+            for entry in db.query(BrokerAuthorityEntry).filter(BrokerAuthorityEntry.lookup_key.in_(keys))
+        }
+        now = datetime.utcnow()
+        resolved: Dict[str, Tuple[Optional[dict], str]] = {}
+        stale, pending = [], []
+        for key in keys:
+            entry = entries.get(key)
+            state = "expired" if force else self._state(entry, now)
+            if state in ("fresh", "stale"):
+                resolved[key] = (_entry_result(entry), state)
+                if state == "stale":
+                    stale.append(key)
+            else:
+                pending.append(key)
+
+        fetched = self._fetch_many(pending)
+        self._store(db, fetched)
+        for key, result in fetched.items():
+            if result is not UNAVAILABLE:
+                resolved[key] = (result, "fetched")
+            elif key in entries:
+                resolved[key] = (_entry_result(entries[key]), "stale")
+            else:
+                resolved[key] = (None, "unavailable")
+        for _, state in resolved.values():
+            self._incr(state)
+        if stale:
+            self._refresh_in_background(db.get_bind(), stale)
+        return resolved
+
+    def lookup(self, db: Session, kind: str, number: str, force: bool = False) -> Tuple[Optional[dict], str]:
+        key = lookup_key(kind, number)
+        if key is None:
+            return None, "fresh"
+        return self.resolve(db, [key], force)[key]
+
+    def _verify_resolved(self, resolved: Dict[str, Tuple[Optional[dict], str]], keys: List[str]) -> Dict[str, Any]:
+        states = []
+        for key in keys:
+            result, state = resolved[key]
+            states.append(state)
+            if result:
+                return {**verification_result(result), "cache": state}
+        if keys and all(state == "unavailable" for state in states):
+            return {"verified": False, "status": "unavailable", "message": "FMCSA SAFER is unavailable",
+                    "cache": "unavailable"}
+        return {**verification_result(None), "cache": states[-1] if states else "fresh"}
+
+    def verify(self, db: Session, mc_number: Optional[str] = None, dot_number: Optional[str] = None,
+               name: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """FMCSAService.verify_broker() over the cache, plus "cache": the state of the lookup used."""
+        dot_key, mc_key = lookup_key("dot", dot_number), lookup_key("mc", mc_number)
+        resolved = {}
+        if dot_key:
+            resolved.update(self.resolve(db, [dot_key], force))
+        # MC is only asked when DOT is missing or has no record, as in verify_broker()
+        if mc_key and not (dot_key and resolved[dot_key][0]):
+            resolved.update(self.resolve(db, [mc_key], force))
+        keys = [key for key in (dot_key, mc_key) if key in resolved]
+        verification = self._verify_resolved(resolved, keys)
+        if verification["status"] == "not_found" and name:
+            # Name search is not cached
+            return {**self.service.verify_broker(name=name), "cache": "fetched"}
+        return verification
+
+    def verify_many(self, db: Session, brokers: Iterable[Tuple[Optional[str], Optional[str]]],
+                    force: bool = False) -> Dict[tuple, Dict[str, Any]]:
+        """Verification per (mc, dot) pair: DOT keys fetched together, then the MC fallbacks."""
+        brokers = list(dict.fromkeys(brokers))
+        primary = {broker: broker_keys(*broker)[:1] for broker in brokers}
+        resolved = self.resolve(db, [key for keys in primary.values() for key in keys], force)
+        fallbacks = {}
+        for broker in brokers:
+            mc_key = lookup_key("mc", broker[0])
+            keys = primary[broker]
+            if mc_key and keys and keys[0] != mc_key and not resolved[keys[0]][0]:
+                fallbacks[broker] = mc_key
+        resolved.update(self.resolve(db, fallbacks.values(), force))
+        return {
+            broker: self._verify_resolved(resolved, primary[broker] + ([fallbacks[broker]] if broker in fallbacks else []))
+            for broker in brokers
+            if primary[broker]
+        }
+
+    # -- loads -------------------------------------------------------------------
+
+    def verify_open_loads(self, db: Session, carrier_id: int, force: bool = False) -> Dict[str, Any]:
+        """Verify every broker on the carrier's open loads and stamp the loads with the outcome."""
+        started = time.perf_counter()
+        loads = db.query(Load.id, Load.broker_name, Load.broker_mc, Load.broker_dot).filter(
+            Load.carrier_id == carrier_id,
+            Load.status.notin_(CLOSED_LOAD_STATUSES),
+            (Load.broker_mc.isnot(None)) | (Load.broker_dot.isnot(None)),
+        ).all()
+        by_broker: Dict[tuple, List[int]] = {}
+        names: Dict[tuple, Optional[str]] = {}
+        for load_id, broker_name, mc_number, dot_number in loads:
+            broker = (clean_number("mc", mc_number), clean_number("dot", dot_number))
+            if broker == (None, None):
+                continue
+            by_broker.setdefault(broker, []).append(load_id)
+            names.setdefault(broker, broker_name)
+
+        verifications = self.verify_many(db, by_broker, force)
+        now = datetime.utcnow()
+        brokers = []
+        for broker, verification in verifications.items():
+            load_ids = by_broker[broker]
+            if verification["status"] != "unavailable":
+                db.query(Load).filter(Load.id.in_(load_ids)).update(
+                    {Load.broker_verified: verification["verified"], Load.broker_verified_at: now},
+                    synchronize_session=False,
+                )
+            data = verification.get("data") or {}
+            brokers.append({
+                "mc_number": broker[0],
+                "dot_number": broker[1],
+                "broker_name": data.get("legal_name") or names[broker],
+                "verified": verification["verified"],
+                "status": verification["status"],
+                "cache": verification["cache"],
+                "load_ids": load_ids,
+            })
+        brokers.sort(key=lambda row: (row["verified"], row["broker_name"] or ""))
+        return {
+            "brokers": brokers,
+            "verified": sum(1 for row in brokers if row["verified"]),
+            "unverified": sum(1 for row in brokers if not row["verified"]),
+            "loads": sum(len(row["load_ids"]) for row in brokers),
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    def refresh_recent(self, db: Session, days: int) -> Dict[str, int]:
+        """
+        Refetch brokers on open loads and loads touched in the last `days`
+        whose entries are past half their TTL, so reads keep hitting fresh ones.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        rows = db.query(Load.broker_mc, Load.broker_dot).filter(
+            (Load.broker_mc.isnot(None)) | (Load.broker_dot.isnot(None)),
+            (Load.updated_at >= cutoff) | Load.status.notin_(CLOSED_LOAD_STATUSES),
+        ).distinct()
+        keys = {key for mc_number, dot_number in rows for key in broker_keys(mc_number, dot_number)[:1]}
+        entries = {
+            entry.lookup_key: entry
+            for entry in db.query(BrokerAuthorityEntry).filter(BrokerAuthorityEntry.lookup_key.in_(keys))
+        } if keys else {}
+        now = datetime.utcnow()
+        due = sorted(key for key in keys if self._state(entries.get(key), now, ttl_fraction=0.5) != "fresh")
+        fetched = self._fetch_many(due)
+        self._store(db, fetched)
+        failed = sum(1 for result in fetched.values() if result is UNAVAILABLE)
+        return {"brokers": len(keys), "refreshed": len(fetched) - failed, "failed": failed}
+
+    def start_refresher(self, session_factory, interval_seconds: float, days: int) -> None:
+        """Run refresh_recent() every interval_seconds on a daemon thread (once per process)."""
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+
+            def run():
+                while True:
+                    time.sleep(interval_seconds)
+                    db = session_factory()
+                    try:
+                        self.refresh_recent(db, days)
+                        db.commit()
+                    except Exception:
+                        db.rollback()  # try again next round
+                    finally:
+                        db.close()
+
+            self._refresher = threading.Thread(target=run, name="fmcsa-refresher", daemon=True)
+            self._refresher.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counts, "refreshing": len(self._refreshing)}
+
+
+broker_authority = BrokerAuthorityCache(
+    ttl_hours=settings.FMCSA_CACHE_TTL_HOURS,
+    negative_ttl_hours=settings.FMCSA_CACHE_NEGATIVE_TTL_HOURS,
+    max_age_days=settings.FMCSA_CACHE_MAX_AGE_DAYS,
+    concurrency=settings.FMCSA_CONCURRENCY,
+)
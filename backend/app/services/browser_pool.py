@@ -0,0 +1,217 @@
+"""
+Long-lived headless Chromium for HTML-to-PDF rendering.
+
+Launching Chromium costs far more than rendering a page, so one browser is
+started on first use and kept. Pages are handed out under a concurrency cap
+(PDF_BROWSER_MAX_PAGES), returned to an idle list after each render and
+closed after PDF_BROWSER_PAGE_REUSE renders so a leaking page never lives
+long. Each acquire checks the browser is still connected and the page still
+open; a crashed or disconnected browser is relaunched, and a render that hit
+the crash is retried once on the new browser.
+
+Playwright objects belong to the event loop that created them, so the pool
+runs its own loop on a daemon thread and every render is submitted to it;
+callers on any loop (the app's, or scripts calling asyncio.run repeatedly)
+share the one browser. close() shuts the browser down on that loop and
+stops the thread; the next render starts both again.
+
+Playwright is optional (pip install playwright && playwright install
+chromium); rendering raises BrowserUnavailable without it.
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+
+LAUNCH_ARGS = ["--no-sandbox", "--disable-setuid-sandbox", "--disable-dev-shm-usage"]
+
+
+class BrowserUnavailable(Exception):
+    pass
+
+
+class BrowserPool:
+    def __init__(self, max_pages: int = 4, page_reuse: int = 50, render_timeout: float = 30.0) -> None:
+        self.max_pages = max_pages
+        self.page_reuse = page_reuse
+        self.render_timeout = render_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._idle: List[Any] = []
+        self._uses: Dict[int, int] = {}
+        self._in_use = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.counts = {"launches": 0, "restarts": 0, "renders": 0, "retries": 0, "pages_created": 0,
+                       "pages_recycled": 0, "errors": 0}
+
+    async def _launch(self):
+        """Start Playwright and Chromium; returns (playwright, browser)."""
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError:
+            raise BrowserUnavailable("Playwright not installed. Run: pip install playwright && playwright install")
+        playwright = await async_playwright().start()
+        try:
+            browser = await playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        except Exception:
+            await playwright.stop()
+            raise
+        return playwright, browser
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """The pool's event loop, started on its own thread on first use."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                self._lock = asyncio.Lock()
+                self._semaphore = asyncio.Semaphore(self.max_pages)
+                self._thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _on_pool_loop(self, coro):
+        """Run coro on the pool's loop and wait for it from the caller's loop."""
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _shutdown_browser(self) -> None:
+        browser, playwright = self._browser, self._playwright
+        self._browser = self._playwright = None
+        self._idle, self._uses = [], {}
+        for closer in (browser and browser.close, playwright and playwright.stop):
+            if closer:
+                try:
+                    await closer()
+                except Exception:
+                    pass
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if self.healthy():
+                return self._browser
+            if self._browser is not None:
+                self.counts["restarts"] += 1
+                await self._shutdown_browser()
+            self._playwright, self._browser = await self._launch()
+            self._generation += 1
+            self.counts["launches"] += 1
+            return self._browser
+
+    async def _close_page(self, page) -> None:
+        self._uses.pop(id(page), None)
+        try:
+            await page.context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Any]:
+        """
+        A ready page from the pool; it is recycled afterwards, or discarded if
+        the render failed. Only usable on the pool's loop (see render_pdf).
+        """
+        async with self._semaphore:
+            browser = await self._ensure_browser()
+            generation = self._generation
+            page = None
+            while self._idle and page is None:
+                candidate = self._idle.pop()
+                if candidate.is_closed():
+                    self._uses.pop(id(candidate), None)
+                else:
+                    page = candidate
+            if page is None:
+                context = await browser.new_context(viewport={"width": 850, "height": 1100})
+                page = await context.new_page()
+                self._uses[id(page)] = 0
+                self.counts["pages_created"] += 1
+
+            self._in_use += 1
+            ok = False
+            try:
+                yield page
+                ok = True
+            finally:
+                self._in_use -= 1
+                self._uses[id(page)] = self._uses.get(id(page), 0) + 1
+                if ok and generation == self._generation and not page.is_closed() and self._uses[id(page)] < self.page_reuse:
+                    self._idle.append(page)
+                else:
+                    if ok:
+                        self.counts["pages_recycled"] += 1
+                    await self._close_page(page)
+
+    async def render_pdf(self, html: str, **pdf_options) -> bytes:
+        """Render HTML to PDF; retried once on a fresh browser if Chromium crashed mid-render."""
+        return await self._on_pool_loop(self._render_pdf(html, **pdf_options))
+
+    async def _render_pdf(self, html: str, **pdf_options) -> bytes:
+        for attempt in range(2):
+            try:
+                async with self.page() as page:
+                    await page.set_content(html, wait_until="load", timeout=self.render_timeout * 1000)
+                    pdf_bytes = await page.pdf(**pdf_options)
+                self.counts["renders"] += 1
+                return pdf_bytes
+            except BrowserUnavailable:
+                raise
+            except Exception:
+                self.counts["errors"] += 1
+                if attempt or self.healthy():
+                    raise
+                self.counts["retries"] += 1
+
+    async def render_many(self, htmls: List[str], **pdf_options) -> List[bytes]:
+        """Render several documents concurrently (at most max_pages at a time), in input order."""
+        async def run() -> List[bytes]:
+            return list(await asyncio.gather(*(self._render_pdf(html, **pdf_options) for html in htmls)))
+
+        return await self._on_pool_loop(run())
+
+    async def _close(self) -> None:
+        for page in list(self._idle):
+            await self._close_page(page)
+        await self._shutdown_browser()
+
+    async def close(self) -> None:
+        """Close the browser and stop the pool's loop; safe to call from any loop."""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close(), loop))
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            await asyncio.to_thread(thread.join)
+            loop.close()
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "connected": self.healthy(),
+            "idle_pages": len(self._idle),
+            "in_use": self._in_use,
+            "max_pages": self.max_pages,
+        }
+
+
+browser_pool = BrowserPool(
+    max_pages=settings.PDF_BROWSER_MAX_PAGES,
+    page_reuse=settings.PDF_BROWSER_PAGE_REUSE,
+    render_timeout=settings.PDF_BROWSER_RENDER_TIMEOUT,
+)
@@ -0,0 +1,87 @@
+"""
+Dispatch board statistics.
+
+All counters come from one SELECT: conditional aggregation over the carrier's
+loads plus correlated NOT EXISTS counts for idle drivers and trucks. Results
+are cached per carrier for a few seconds because the board polls constantly;
+any load mutation should call invalidate_dispatch_stats(carrier_id).
+"""
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import and_, case, exists, func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import Driver, Equipment, Load
+
+AVAILABLE_STATUSES = ("Available", "Created")
+ASSIGNED_STATUSES = ("Assigned",)
+IN_TRANSIT_STATUSES = ("In Transit", "Picked Up")
+ACTIVE_STATUSES = ASSIGNED_STATUSES + IN_TRANSIT_STATUSES
+
+_stats_cache = TTLCache(ttl_seconds=settings.DISPATCH_STATS_CACHE_TTL, maxsize=1024)
+
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def compute_dispatch_stats(db: Session, carrier_id: int) -> Dict[str, int]:
+    """Run the single aggregate query behind /dispatch/stats."""
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    load_counts = (
+        select(
+            _count_where(Load.status.in_(AVAILABLE_STATUSES)).label("available_loads"),
+            _count_where(Load.status.in_(ASSIGNED_STATUSES)).label("assigned_loads"),
+            _count_where(Load.status.in_(IN_TRANSIT_STATUSES)).label("in_transit_loads"),
+            _count_where(and_(Load.status == "Delivered", Load.updated_at >= today_start)).label("delivered_today"),
+        )
+        .where(Load.carrier_id == carrier_id)
+        .subquery()
+    )
+
+    driver_busy = exists().where(
+        Load.carrier_id == carrier_id,
+        Load.driver_id == Driver.id,
+        Load.status.in_(ACTIVE_STATUSES),
+    )
+    available_drivers = (
+        select(func.count(Driver.id))
+        .where(Driver.carrier_id == carrier_id, ~driver_busy)
+        .scalar_subquery()
+    )
+
+    truck_busy = exists().where(
+        Load.carrier_id == carrier_id,
+        Load.truck_id == Equipment.id,
+        Load.status.in_(ACTIVE_STATUSES),
+    )
+    available_trucks = (
+        select(func.count(Equipment.id))
+        .where(Equipment.carrier_id == carrier_id, Equipment.equipment_type == "truck", ~truck_busy)
+        .scalar_subquery()
+    )
+
+    row = db.execute(
+        select(
+            load_counts.c.available_loads,
+            load_counts.c.assigned_loads,
+            load_counts.c.in_transit_loads,
+            load_counts.c.delivered_today,
+            available_drivers.label("available_drivers"),
+            available_trucks.label("available_trucks"),
+        )
+    ).one()
+    return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+def get_dispatch_stats(db: Session, carrier_id: int) -> Dict[str, int]:
+    """Cached dispatch stats for a carrier."""
+    return _stats_cache.get_or_set(carrier_id, lambda: compute_dispatch_stats(db, carrier_id))
+
+
+def invalidate_dispatch_stats(carrier_id: int) -> None:
+    _stats_cache.invalidate(carrier_id)
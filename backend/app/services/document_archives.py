@@ -0,0 +1,181 @@
+"""
+Document packets for loads: all documents of a load, or the PODs of a
+customer's loads in a period, as ZipEntry lists for ZipService.stream_zip().
+
+Entries are resolved up front to plain data (names, blob digests, URLs) so
+the archive can stream after the request's session is closed; file bytes are
+read only when stream_zip() reaches each entry. Sources are documents in the
+document store, POD files uploaded to Dropbox (PodRecord links) and Dropbox
+links in the load's document columns. Remote files are only fetched from
+Dropbox hosts (ALLOWED_REMOTE_HOSTS, https only), redirects are followed only
+within those hosts, and requests go through the Dropbox client's rate limiter
+and circuit breaker; any other link is listed in MISSING.txt unfetched.
+"""
+import os
+from datetime import date, datetime, time
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import Load, PodRecord, StoredDocument
+from app.services.document_storage import DocumentStorage, document_url
+from app.services.dropbox import dropbox_http
+from app.services.zip_service import ZipEntry, unique_names
+
+POD_DOC_TYPE = "Proof of Delivery"
+LOAD_DOCUMENT_COLUMNS = {
+    "rc_document": "Rate Confirmation",
+    "bol_document": "Bill of Lading",
+    "pod_document": POD_DOC_TYPE,
+    "invoice_document": "Invoice",
+    "receipt_document": "Receipt",
+    "other_document": "Other",
+}
+REMOTE_CHUNK_SIZE = 256 * 1024
+REMOTE_MAX_REDIRECTS = 5
+ALLOWED_REMOTE_SCHEMES = ("https",)
+ALLOWED_REMOTE_HOSTS = ("dropbox.com", "dropboxusercontent.com")
+
+
+class RemoteDocumentRefused(Exception):
+    pass
+
+
+def _remote_allowed(url: str) -> bool:
+    parts = urlparse(url)
+    host = (parts.hostname or "").lower()
+    return parts.scheme in ALLOWED_REMOTE_SCHEMES and any(
+        host == allowed or host.endswith(f".{allowed}") for allowed in ALLOWED_REMOTE_HOSTS
+    )
+
+
+def _stored_chunks(storage: DocumentStorage, digest: str, chunk_size: int) -> Iterator[bytes]:
+    with storage.open(digest) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _download_url(url: str) -> str:
+    # Dropbox shared links render a preview page unless dl=1
+    parts = urlparse(url)
+    if not (parts.hostname or "").endswith("dropbox.com"):
+        return url
+    query = dict(parse_qsl(parts.query))
+    query["dl"] = "1"
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def _remote_chunks(url: str) -> Iterator[bytes]:
+    url = _download_url(url)
+    for _ in range(REMOTE_MAX_REDIRECTS + 1):
+        if not _remote_allowed(url):
+            raise RemoteDocumentRefused(f"not a Dropbox link: {url}")
+        with dropbox_http.stream("GET", url, follow_redirects=False) as res:
+            if res.is_redirect:
+                url = str(res.next_request.url)
+                continue
+            res.raise_for_status()
+            yield from res.iter_bytes(REMOTE_CHUNK_SIZE)
+            return
+    raise RemoteDocumentRefused(f"too many redirects: {url}")
+
+
+def _url_name(url: str, fallback: str) -> str:
+    return os.path.basename(urlparse(url).path) or fallback
+
+
+def _stored_entry(storage: DocumentStorage, document: StoredDocument, name: str) -> ZipEntry:
+    digest, chunk_size = document.blob.sha256, getattr(storage, "chunk_size", REMOTE_CHUNK_SIZE)
+    return ZipEntry(name, lambda: _stored_chunks(storage, digest, chunk_size), document.blob.size, document.created_at)
+
+
+def _remote_entry(url: str, name: str, modified: Optional[datetime]) -> ZipEntry:
+    return ZipEntry(name, lambda: _remote_chunks(url), None, modified)
+
+
+def _entries_for_load(
+    storage: DocumentStorage,
+    load: Load,
+    documents: List[StoredDocument],
+    pods: List[PodRecord],
+    folder: str = "",
+    pods_only: bool = False,
+) -> List[ZipEntry]:
+    named = []  # (name, build(name))
+    seen_urls = set()
+    for document in documents:
+        if pods_only and document.doc_type != POD_DOC_TYPE:
+            continue
+        seen_urls.add(document_url(document))
+        named.append((document.filename, lambda name, document=document: _stored_entry(storage, document, name)))
+    for pod in pods:
+        links = list(pod.file_links or []) + ([pod.signature_link] if pod.signature_link else [])
+        for url in links:
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            named.append((_url_name(url, f"pod-{pod.id}"),
+                          lambda name, url=url, pod=pod: _remote_entry(url, name, pod.created_at)))
+    for column, doc_type in LOAD_DOCUMENT_COLUMNS.items():
+        url = getattr(load, column)
+        if not url or url in seen_urls or (pods_only and doc_type != POD_DOC_TYPE):
+            continue
+        seen_urls.add(url)
+        if url.startswith(("http://", "https://")):
+            named.append((_url_name(url, column), lambda name, url=url: _remote_entry(url, name, None)))
+
+    names = unique_names(name for name, _ in named)
+    prefix = f"{folder}/" if folder else ""
+    return [build(f"{prefix}{name}") for name, (_, build) in zip(names, named)]
+
+
+def _documents_by_load(db: Session, load_ids: List[int]) -> Dict[int, List[StoredDocument]]:
+    grouped: Dict[int, List[StoredDocument]] = {}
+    documents = db.query(StoredDocument).options(joinedload(StoredDocument.blob)).filter(
+        StoredDocument.load_id.in_(load_ids)
+    ).order_by(StoredDocument.id)
+    for document in documents:
+        grouped.setdefault(document.load_id, []).append(document)
+    return grouped
+
+
+def _pods_by_load(db: Session, load_ids: List[int]) -> Dict[int, List[PodRecord]]:
+    grouped: Dict[int, List[PodRecord]] = {}
+    for pod in db.query(PodRecord).filter(PodRecord.load_id.in_(load_ids)).order_by(PodRecord.id):
+        grouped.setdefault(pod.load_id, []).append(pod)
+    return grouped
+
+
+def load_document_entries(db: Session, storage: DocumentStorage, load: Load) -> List[ZipEntry]:
+    """Every document attached to the load."""
+    return _entries_for_load(
+        storage, load,
+        _documents_by_load(db, [load.id]).get(load.id, []),
+        _pods_by_load(db, [load.id]).get(load.id, []),
+    )
+
+
+def customer_pod_entries(
+    db: Session, storage: DocumentStorage, carrier_id: int, customer_id: int, start_date: date, end_date: date
+) -> List[ZipEntry]:
+    """PODs of the customer's loads delivered between start_date and end_date, one folder per load."""
+    loads = db.query(Load).filter(
+        Load.carrier_id == carrier_id,
+        Load.customer_id == customer_id,
+        Load.delivery_date >= datetime.combine(start_date, time.min),
+        Load.delivery_date <= datetime.combine(end_date, time.max),
+    ).order_by(Load.delivery_date, Load.id).all()
+    load_ids = [load.id for load in loads]
+    documents, pods = _documents_by_load(db, load_ids), _pods_by_load(db, load_ids)
+
+    entries = []
+    folders = unique_names(load.load_number or f"load-{load.id}" for load in loads)
+    for load, folder in zip(loads, folders):
+        entries.extend(_entries_for_load(
+            storage, load, documents.get(load.id, []), pods.get(load.id, []), folder=folder, pods_only=True,
+        ))
+    return entries
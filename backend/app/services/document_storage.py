@@ -0,0 +1,226 @@
+"""
+Document storage for uploaded load documents.
+
+Files are content-addressed: an upload is streamed in chunks
+(DOCUMENT_STORAGE_CHUNK_SIZE) through SHA-256 into the backend, and the
+digest is its key. The same bytes uploaded for another load, or again, are
+stored once (DocumentBlob) and referenced by each StoredDocument, so repeat
+uploads cost no disk and nothing is ever held whole in memory.
+
+Backends subclass DocumentStorage and are picked by DOCUMENT_STORAGE_BACKEND;
+register_backend() adds others (Dropbox, S3) behind the same interface. The
+local backend shards files as <root>/ab/cd/<digest> and serves them with
+FileResponse (sendfile where the server supports it) plus single byte-range
+requests, with the digest as ETag.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Callable, Dict, NamedTuple, Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import DocumentBlob, StoredDocument
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    size: int
+    created: bool  # False when the content was already stored
+
+
+class DocumentStorage(ABC):
+    """Content-addressed blob store; keys are lowercase hex SHA-256 digests."""
+
+    name = ""
+
+    @abstractmethod
+    def save(self, fileobj: BinaryIO) -> StoredBlob:
+        """Stream the file into the store; returns its digest and size."""
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool:
+        """True if a blob with this digest is stored."""
+
+    @abstractmethod
+    def open(self, digest: str) -> BinaryIO:
+        """Binary file object reading the blob from the start."""
+
+    @abstractmethod
+    def response(self, digest: str, request: Request, filename: str, media_type: Optional[str]) -> Response:
+        """HTTP response serving the blob, honouring conditional and range headers where supported."""
+
+
+class LocalDocumentStorage(DocumentStorage):
+    name = "local"
+
+    def __init__(self, root: str, chunk_size: int = 1024 * 1024) -> None:
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def save(self, fileobj: BinaryIO) -> StoredBlob:
+        staging = os.path.join(self.root, "tmp")
+        os.makedirs(staging, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=staging)
+        try:
+            with os.fdopen(handle, "wb") as out:
+                while True:
+                    chunk = fileobj.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = sha.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                return StoredBlob(digest, size, False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomic; a concurrent upload of the same bytes just replaces identical content
+            os.replace(temp_path, path)
+            return StoredBlob(digest, size, True)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def open(self, digest: str) -> BinaryIO:
+        return open(self.path(digest), "rb")
+
+    def _iter_range(self, path: str, start: int, length: int):
+        with open(path, "rb") as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(self.chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    def response(self, digest: str, request: Request, filename: str, media_type: Optional[str]) -> Response:
+        path = self.path(digest)
+        size = os.path.getsize(path)
+        headers = {"Accept-Ranges": "bytes", "ETag": f'"{digest}"', "Cache-Control": "private, max-age=31536000, immutable"}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+
+        byte_range = _parse_range(request.headers.get("range"), size)
+        if_range = request.headers.get("if-range")
+        if byte_range is not None and (not if_range or if_range == headers["ETag"]):
+            if byte_range == "unsatisfiable":
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            start, end = byte_range
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+                "Content-Disposition": content_disposition(filename),
+            })
+            return StreamingResponse(self._iter_range(path, start, end - start + 1), status_code=206,
+                                     media_type=media_type, headers=headers)
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers,
+                            content_disposition_type="inline")
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    """Content-Disposition value; names with quotes, spaces or non-ASCII get an ASCII fallback and RFC 5987 filename*."""
+    quoted = quote(filename, safe="")
+    if quoted == filename:
+        return f'{disposition}; filename="{filename}"'
+    fallback = re.sub(r'[^\x20-\x7e]|["/\\]', "_", filename)
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quoted}"
+
+
+def _parse_range(header: Optional[str], size: int):
+    """(start, end) inclusive for a single "bytes=" range, "unsatisfiable", or None to send everything."""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None  # multiple or malformed ranges: ignore and send the whole file
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix:
+            return "unsatisfiable"
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+_BACKENDS: Dict[str, Callable[[], DocumentStorage]] = {
+    "local": lambda: LocalDocumentStorage(settings.DOCUMENT_STORAGE_PATH, settings.DOCUMENT_STORAGE_CHUNK_SIZE),
+}
+
+
+def register_backend(name: str, factory: Callable[[], DocumentStorage]) -> None:
+    _BACKENDS[name] = factory
+
+
+def get_document_storage() -> DocumentStorage:
+    backend = settings.DOCUMENT_STORAGE_BACKEND
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown DOCUMENT_STORAGE_BACKEND {backend!r}")
+    return _BACKENDS[backend]()
+
+
+def _find_blob(db: Session, digest: str) -> Optional[DocumentBlob]:
+    return db.query(DocumentBlob).filter(DocumentBlob.sha256 == digest).first()
+
+
+def store_document(
+    db: Session,
+    storage: DocumentStorage,
+    fileobj: BinaryIO,
+    filename: str,
+    carrier_id: int,
+    load_id: Optional[int] = None,
+    doc_type: Optional[str] = None,
+    content_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+) -> StoredDocument:
+    """Save the file (deduplicated by content) and record it for the carrier/load; the caller commits."""
+    stored = storage.save(fileobj)
+    blob = _find_blob(db, stored.sha256)
+    if blob is None:
+        try:
+            with db.begin_nested():
+                blob = DocumentBlob(sha256=stored.sha256, size=stored.size, backend=storage.name)
+                db.add(blob)
+        except IntegrityError:
+            # A concurrent upload of the same bytes inserted the blob first
+            blob = db.query(DocumentBlob).filter(DocumentBlob.sha256 == stored.sha256).one()
+    document = StoredDocument(
+        carrier_id=carrier_id,
+        load_id=load_id,
+        blob_id=blob.id,
+        doc_type=doc_type,
+        filename=os.path.basename(filename or "") or stored.sha256,
+        content_type=content_type,
+        uploaded_by_user_id=user_id,
+    )
+    db.add(document)
+    db.flush()
+    return document
+
+
+def document_url(document: StoredDocument) -> str:
+    return f"/document-uploads/files/{document.id}"
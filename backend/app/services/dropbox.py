@@ -1,6 +1,71 @@
-import requests
-from typing import List
+"""
+Dropbox uploads and shared links.
+
+Files are streamed from file objects: anything up to one chunk
+(DROPBOX_UPLOAD_CHUNK_SIZE) goes up in a single files/upload call, larger
+files through an upload session (start / append_v2 / finish), so only one
+chunk per file is in memory. If Dropbox reports an incorrect offset (a retry
+after a chunk that did land, or a dropped connection), the session resumes
+from the offset Dropbox has instead of starting over.
+
+upload_many() runs uploads and shared-link creation for a batch with
+DROPBOX_UPLOAD_CONCURRENCY in flight, and reports per-file status rather
+than failing the batch on the first error. Files in a batch that share a
+name get distinct paths ("image.jpg", "image (2).jpg", ...), since uploads
+overwrite whatever is at their path.
+"""
+import asyncio
+import io
+import json
+import os
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
 from app.core.config import settings
+from app.core.http_client import HTTPError, http_client
+from app.services.zip_service import unique_names
+
+DROPBOX_API_URL = "https://api.dropboxapi.com/2"
+DROPBOX_CONTENT_URL = "https://content.dropboxapi.com/2"
+
+# Uploads are POSTs; retry them too since "overwrite" mode makes them idempotent
+dropbox_http = http_client(
+    "dropbox",
+    timeout=60,
+    rate_per_second=10,
+    burst=10,
+    retry_methods=("GET", "POST"),
+)
+
+
+class DropboxUploadError(Exception):
+    pass
+
+
+def _api_arg(arg: Dict[str, Any]) -> str:
+    # Header values must be ASCII; json.dumps escapes everything else as \uXXXX
+    return json.dumps(arg)
+
+
+def _size(fileobj: BinaryIO) -> int:
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size - position
+
+
+def _correct_offset(response) -> Optional[int]:
+    """Offset Dropbox already has when it rejects an append/finish with incorrect_offset."""
+    if response.status_code != 409:
+        return None
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return None
+    error = error.get("lookup_failed", error)
+    if error.get(".tag") == "incorrect_offset" and "correct_offset" in error:
+        return int(error["correct_offset"])
+    return None
 
 
 class DropboxService:
@@ -10,26 +75,27 @@ class DropboxService:
         if not settings.DROPBOX_ACCESS_TOKEN:
             raise ValueError("DROPBOX_ACCESS_TOKEN is required")
         self.token = settings.DROPBOX_ACCESS_TOKEN
+        self.chunk_size = settings.DROPBOX_UPLOAD_CHUNK_SIZE
+        self.concurrency = settings.DROPBOX_UPLOAD_CONCURRENCY
 
     def _headers(self) -> dict:
         return {"Authorization": f"Bearer {self.token}"}
 
+    def _content_headers(self, arg: Dict[str, Any]) -> dict:
+        return {**self._headers(), "Dropbox-API-Arg": _api_arg(arg), "Content-Type": "application/octet-stream"}
+
     def upload_file(self, content: bytes, dropbox_path: str) -> None:
-        headers = {
-            **self._headers(),
-            "Dropbox-API-Arg": f'{{"path":"{dropbox_path}","mode":"overwrite"}}',
-            "Content-Type": "application/octet-stream",
-        }
-        res = requests.post("https://content.dropboxapi.com/2/files/upload", headers=headers, data=content, timeout=60)
+        headers = self._content_headers({"path": dropbox_path, "mode": "overwrite"})
+        res = dropbox_http.post(f"{DROPBOX_CONTENT_URL}/files/upload", headers=headers, content=content)
         res.raise_for_status()
 
     def create_shared_link(self, dropbox_path: str) -> str:
         headers = {**self._headers(), "Content-Type": "application/json"}
         body = {"path": dropbox_path, "settings": {"requested_visibility": "public"}}
-        res = requests.post("https://api.dropboxapi.com/2/sharing/create_shared_link_with_settings", headers=headers, json=body, timeout=30)
+        res = dropbox_http.post(f"{DROPBOX_API_URL}/sharing/create_shared_link_with_settings", headers=headers, json=body, timeout=30)
         if res.status_code == 409:
             # Link exists
-            list_res = requests.post("https://api.dropboxapi.com/2/sharing/list_shared_links", headers=headers, json={"path": dropbox_path}, timeout=30)
+            list_res = dropbox_http.post(f"{DROPBOX_API_URL}/sharing/list_shared_links", headers=headers, json={"path": dropbox_path}, timeout=30)
             list_res.raise_for_status()
             links = list_res.json().get("links", [])
             if links:
@@ -37,10 +103,104 @@ class DropboxService:
         res.raise_for_status()
         return res.json()["url"]
 
+    # -- streaming / concurrent ------------------------------------------------
+
+    async def aupload_stream(self, fileobj: BinaryIO, dropbox_path: str) -> int:
+        """Upload from the file object's current position; returns bytes sent."""
+        start = fileobj.tell()
+        size = _size(fileobj)
+        commit = {"path": dropbox_path, "mode": "overwrite"}
+        if size <= self.chunk_size:
+            res = await dropbox_http.apost(
+                f"{DROPBOX_CONTENT_URL}/files/upload",
+                headers=self._content_headers(commit),
+                content=fileobj.read(),
+            )
+            res.raise_for_status()
+            return size
+
+        res = await dropbox_http.apost(
+            f"{DROPBOX_CONTENT_URL}/files/upload_session/start",
+            headers=self._content_headers({"close": False}),
+            content=fileobj.read(self.chunk_size),
+        )
+        res.raise_for_status()
+        session_id = res.json()["session_id"]
+        offset = fileobj.tell() - start
+        resumes = 0
+        while True:
+            last = size - offset <= self.chunk_size
+            cursor = {"session_id": session_id, "offset": offset}
+            fileobj.seek(start + offset)
+            chunk = fileobj.read(self.chunk_size)
+            if last:
+                url, arg = "/files/upload_session/finish", {"cursor": cursor, "commit": commit}
+            else:
+                url, arg = "/files/upload_session/append_v2", {"cursor": cursor, "close": False}
+            res = await dropbox_http.apost(f"{DROPBOX_CONTENT_URL}{url}", headers=self._content_headers(arg), content=chunk)
+            correct_offset = _correct_offset(res)
+            if correct_offset is not None and resumes < 3:
+                resumes += 1
+                offset = correct_offset
+                continue
+            res.raise_for_status()
+            if last:
+                return size
+            offset += len(chunk)
+
+    async def acreate_shared_link(self, dropbox_path: str) -> str:
+        headers = {**self._headers(), "Content-Type": "application/json"}
+        body = {"path": dropbox_path, "settings": {"requested_visibility": "public"}}
+        res = await dropbox_http.apost(f"{DROPBOX_API_URL}/sharing/create_shared_link_with_settings", headers=headers, json=body, timeout=30)
+        if res.status_code == 409:
+            # Link exists
+            list_res = await dropbox_http.apost(f"{DROPBOX_API_URL}/sharing/list_shared_links", headers=headers, json={"path": dropbox_path}, timeout=30)
+            list_res.raise_for_status()
+            links = list_res.json().get("links", [])
+            if links:
+                return links[0]["url"]
+        res.raise_for_status()
+        return res.json()["url"]
+
+    def upload_many(self, items: List[Tuple[str, BinaryIO]], base_path: str, on_result=None) -> List[Dict[str, Any]]:
+        """
+        Upload (filename, file object) pairs under base_path and share them,
+        DROPBOX_UPLOAD_CONCURRENCY at a time; repeated filenames are numbered
+        so no file overwrites another. Returns one
+        {filename, path, status: uploaded|failed, url, bytes, error} per item,
+        in input order; on_result(index, result) is called as each finishes.
+        """
+        async def run() -> List[Dict[str, Any]]:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results: List[Dict[str, Any]] = [{} for _ in items]
+
+            async def one(index: int, filename: str, path: str, fileobj: BinaryIO) -> None:
+                result = {"filename": filename, "path": path, "status": "failed", "url": None, "bytes": 0, "error": None}
+                async with semaphore:
+                    try:
+                        result["bytes"] = await self.aupload_stream(fileobj, path)
+                        result["url"] = await self.acreate_shared_link(path)
+                        result["status"] = "uploaded"
+                    except (HTTPError, KeyError, ValueError) as e:
+                        result["error"] = f"{type(e).__name__}: {e}"
+                results[index] = result
+                if on_result is not None:
+                    on_result(index, result)
+
+            try:
+                paths = [f"{base_path}/{name}" for name in unique_names(filename for filename, _ in items)]
+                await asyncio.gather(*(one(index, filename, path, fileobj)
+                                       for index, ((filename, fileobj), path) in enumerate(zip(items, paths))))
+            finally:
+                await dropbox_http.aclose()
+            return results
+
+        return asyncio.run(run())
+
     def upload_files(self, files: List[tuple], base_path: str) -> List[str]:
-        links = []
-        for filename, content in files:
-            path = f"{base_path}/{filename}"
-            self.upload_file(content, path)
-            links.append(self.create_shared_link(path))
-        return links
+        """Upload (filename, bytes) pairs concurrently; returns shared links in order, raising on any failure."""
+        results = self.upload_many([(filename, io.BytesIO(content)) for filename, content in files], base_path)
+        failed = [result for result in results if result["status"] != "uploaded"]
+        if failed:
+            raise DropboxUploadError(f"{len(failed)} of {len(results)} upload(s) failed: {failed[0]['error']}")
+        return [result["url"] for result in results]
@@ -1,21 +1,123 @@
 """
 FMCSA Safer API integration for broker verification
 """
-import requests
+import re
 from typing import Optional, Dict, Any
+from urllib.parse import quote
 from app.core.config import settings
+from app.core.http_client import HTTPError, http_client
+
+# SAFER is public but throttles aggressive clients
+fmcsa_http = http_client("fmcsa", base_url="https://safer.fmcsa.dot.gov", timeout=15, rate_per_second=2, burst=2)
+
+# Browser-like headers (FMCSA blocks automated requests)
+SAFER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+SAFER_QUERY_PARAMS = {"mc": "MC_MX", "dot": "USDOT"}
+NOT_FOUND_MARKERS = ("The information you have requested is not available", "RECORD NOT FOUND")
+
+
+class FMCSAUnavailable(Exception):
+    """SAFER could not answer (transport error or non-200); not the same as "not found"."""
+
+
+def clean_number(kind: str, number: Optional[str]) -> Optional[str]:
+    """Digits of an MC or DOT number ("MC-123456" -> "123456"), or None."""
+    if number is None:
+        return None
+    value = str(number).upper().strip()
+    if kind == "mc":
+        value = value.replace("MC-", "").replace("MC", "")
+    value = re.sub(r"\D", "", value)
+    return value or None
+
+
+def verification_result(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Verification status for a parsed lookup (None = not found)."""
+    if not result:
+        return {
+            "verified": False,
+            "status": "not_found",
+            "message": "Broker not found in FMCSA database"
+        }
+
+    # Check if broker authority is active
+    is_broker = result.get("is_broker", False)
+    operating_status = (result.get("operating_status") or "").upper()
+
+    if not is_broker:
+        return {
+            "verified": False,
+            "status": "not_broker",
+            "message": "Entity found but does not have broker authority",
+            "data": result
+        }
+
+    if operating_status != "ACTIVE":
+        return {
+            "verified": False,
+            "status": "inactive",
+            "message": f"Broker is {operating_status}",
+            "data": result
+        }
+
+    return {
+        "verified": True,
+        "status": "active",
+        "message": "Broker verified and active",
+        "data": result
+    }
 
 
 class FMCSAService:
     """FMCSA Safer Company Snapshot API integration"""
     
-    # FMCSA Safer API endpoints (using the web query interface)
-    SAFER_WEB_URL = "https://safer.fmcsa.dot.gov/query.asp"
+    # FMCSA Safer web query interface (relative to fmcsa_http base_url)
+    SAFER_WEB_URL = "/query.asp"
+    # SAFER has no name search; FMCSA's QCMobile API does, with a webKey (FMCSA_API_KEY)
+    NAME_SEARCH_URL = "https://mobile.fmcsa.dot.gov/qc/services/carriers/name"
     
     def __init__(self):
         # FMCSA Safer API is public, but rate-limited
         self.api_key = settings.FMCSA_API_KEY  # Optional for higher rate limits
-    
+
+    def _query(self, kind: str, number: str) -> Dict[str, str]:
+        return {
+            "searchtype": "ANY",
+            "query_type": "queryCarrierSnapshot",
+            "query_param": SAFER_QUERY_PARAMS[kind],
+            "query_string": number
+        }
+
+    def _parse_snapshot(self, response) -> Optional[Dict[str, Any]]:
+        if response.status_code != 200:
+            raise FMCSAUnavailable(f"SAFER returned {response.status_code}")
+        html = response.text
+        if any(marker.upper() in html.upper() for marker in NOT_FOUND_MARKERS):
+            return None
+        return self._parse_html_response(html)
+
+    def fetch(self, kind: str, number: str) -> Optional[Dict[str, Any]]:
+        """
+        Company snapshot by "mc" or "dot" number; None if SAFER has no record.
+
+        Raises FMCSAUnavailable (or HTTPError) when SAFER could not be asked,
+        so callers can tell outages from missing records.
+        """
+        response = fmcsa_http.get(self.SAFER_WEB_URL, params=self._query(kind, number), headers=SAFER_HEADERS)
+        return self._parse_snapshot(response)
+
+    async def afetch(self, kind: str, number: str) -> Optional[Dict[str, Any]]:
+        """Async fetch() for concurrent lookups."""
+        response = await fmcsa_http.aget(self.SAFER_WEB_URL, params=self._query(kind, number), headers=SAFER_HEADERS)
+        return self._parse_snapshot(response)
+
     def lookup_by_mc_number(self, mc_number: str) -> Optional[Dict[str, Any]]:
         """
         Look up carrier/broker by MC number using FMCSA web scraping
@@ -29,45 +131,12 @@ class FMCSAService:
         Returns:
             Carrier/broker information or None if not found
         """
-        # Clean MC number - remove any prefix
-        mc_clean = mc_number.upper().replace("MC-", "").replace("MC", "").strip()
-        
+        mc_clean = clean_number("mc", mc_number)
+        if not mc_clean:
+            return None
         try:
-            # Use the actual FMCSA SAFER query page
-            params = {
-                "searchtype": "ANY",
-                "query_type": "queryCarrierSnapshot",
-                "query_param": "MC_MX",
-                "query_string": mc_clean
-            }
-            
-            # Add headers to mimic a real browser (FMCSA blocks automated requests)
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1"
-            }
-            
-            response = requests.get(self.SAFER_WEB_URL, params=params, headers=headers, timeout=15)
-            
-            if response.status_code != 200:
-                return None
-            
-            # Parse HTML response to extract data
-            html = response.text
-            
-            # Check if carrier was found
-            if "The information you have requested is not available" in html or "RECORD NOT FOUND" in html.upper():
-                return None
-            
-            # Extract data from HTML
-            return self._parse_html_response(html)
-        
-        except requests.exceptions.RequestException as e:
+            return self.fetch("mc", mc_clean)
+        except (HTTPError, FMCSAUnavailable) as e:
             print(f"FMCSA MC lookup error: {e}")
             return None
     
@@ -81,39 +150,12 @@ class FMCSAService:
         Returns:
             Carrier/broker information or None if not found
         """
-        dot_clean = str(dot_number).strip()
-        
+        dot_clean = clean_number("dot", dot_number)
+        if not dot_clean:
+            return None
         try:
-            # Use FMCSA SAFER query with USDOT parameter (most reliable)
-            params = {
-                "searchtype": "ANY",
-                "query_type": "queryCarrierSnapshot",
-                "query_param": "USDOT",
-                "query_string": dot_clean
-            }
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1"
-            }
-            
-            response = requests.get(self.SAFER_WEB_URL, params=params, headers=headers, timeout=15)
-            
-            if response.status_code != 200:
-                return None
-            
-            html = response.text
-            
-            if "RECORD NOT FOUND" in html.upper():
-                return None
-            
-            return self._parse_html_response(html)
-        
-        except requests.exceptions.RequestException as e:
+            return self.fetch("dot", dot_clean)
+        except (HTTPError, FMCSAUnavailable) as e:
             print(f"FMCSA DOT lookup error: {e}")
             return None
     
@@ -125,13 +167,13 @@ class FMCSAService:
             name: Company name to search
         
         Returns:
-            First matching carrier/broker or None
+            First matching carrier/broker or None (also without FMCSA_API_KEY)
         """
+        if not self.api_key:
+            return None
         try:
-            url = f"{self.SAFER_BASE_URL}/name/{requests.utils.quote(name)}"
-            params = {"webKey": self.api_key} if self.api_key else {}
-            
-            response = requests.get(url, params=params, timeout=15)
+            url = f"{self.NAME_SEARCH_URL}/{quote(name)}"
+            response = fmcsa_http.get(url, params={"webKey": self.api_key})
             
             if response.status_code == 404:
                 return None
@@ -140,20 +182,18 @@ class FMCSAService:
             data = response.json()
             
             # Return first result if multiple matches
-            if isinstance(data, list) and len(data) > 0:
-                return self._parse_carrier_data(data[0])
-            elif isinstance(data, dict):
-                return self._parse_carrier_data(data)
-            
-            return None
+            content = data.get("content") if isinstance(data, dict) else data
+            if isinstance(content, list):
+                content = content[0] if content else None
+            if not content:
+                return None
+            return self._parse_carrier_data({"content": content})
         
-        except requests.exceptions.RequestException:
+        except (HTTPError, ValueError):
             return None
     
     def _parse_html_response(self, html: str) -> Dict[str, Any]:
         """Parse FMCSA HTML response (simple text extraction)"""
-        import re
-        
         # Extract basic info using regex
         def extract_field(pattern, html_text):
             match = re.search(pattern, html_text, re.DOTALL | re.IGNORECASE)
@@ -294,36 +334,4 @@ class FMCSAService:
         if not result and name:
             result = self.lookup_by_name(name)
         
-        if not result:
-            return {
-                "verified": False,
-                "status": "not_found",
-                "message": "Broker not found in FMCSA database"
-            }
-        
-        # Check if broker authority is active
-        is_broker = result.get("is_broker", False)
-        operating_status = result.get("operating_status", "").upper()
-        
-        if not is_broker:
-            return {
-                "verified": False,
-                "status": "not_broker",
-                "message": "Entity found but does not have broker authority",
-                "data": result
-            }
-        
-        if operating_status != "ACTIVE":
-            return {
-                "verified": False,
-                "status": "inactive",
-                "message": f"Broker is {operating_status}",
-                "data": result
-            }
-        
-        return {
-            "verified": True,
-            "status": "active",
-            "message": "Broker verified and active",
-            "data": result
-        }
+        return verification_result(result)
@@ -0,0 +1,138 @@
+"""
+Two-level cache for geocoding results.
+
+Addresses are keyed by normalize_address_key(). Lookups check an in-process
+LRU first, then the geocode_cache table; only misses reach Mapbox. "No match"
+results are cached too (with a shorter max age) so bad addresses are not
+retried on every recalculation.
+
+Writes go through the caller's session; the caller commits.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import GeocodeCacheEntry
+from app.services.address import normalize_address_key
+from app.utils.upsert import upsert
+
+MISSING = object()
+
+
+def _entry_result(entry) -> Optional[Dict[str, Any]]:
+    if not entry.found:
+        return None
+    return {
+        "longitude": entry.longitude,
+        "latitude": entry.latitude,
+        "formatted_address": entry.formatted_address,
+        "place_type": entry.place_type.split(",") if entry.place_type else [],
+    }
+
+
+class GeocodeCache:
+    def __init__(self, maxsize: int, ttl_seconds: float, max_age_days: int, negative_max_age_days: int):
+        self.memory = TTLCache(ttl_seconds=ttl_seconds, maxsize=maxsize)
+        self.max_age = timedelta(days=max_age_days)
+        self.negative_max_age = timedelta(days=negative_max_age_days)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _is_fresh(self, entry, now: datetime) -> bool:
+        max_age = self.max_age if entry.found else self.negative_max_age
+        return entry.updated_at is not None and now - entry.updated_at < max_age
+
+    def get(self, db: Optional[Session], address: str) -> Any:
+        """Cached result (a dict, or None for "no match"), or MISSING."""
+        key = normalize_address_key(address)
+        value = self.memory.get(key, MISSING)
+        if value is not MISSING:
+            self._incr("memory_hits")
+            return dict(value) if value else None
+
+        if db is not None:
+            entry = db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.address_key == key).first()
+            if entry is not None and self._is_fresh(entry, datetime.utcnow()):
+                self._incr("db_hits")
+                result = _entry_result(entry)
+                self.memory.set(key, result)
+                return dict(result) if result else None
+
+        self._incr("misses")
+        return MISSING
+
+    def fresh_keys(self, db: Session, keys: Iterable[str]) -> set:
+        """Subset of keys with a fresh row in the table (used by the warm-up command)."""
+        keys = list(keys)
+        now = datetime.utcnow()
+        fresh = set()
+        for start in range(0, len(keys), 500):
+            for entry in db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.address_key.in_(keys[start:start + 500])):
+                if self._is_fresh(entry, now):
+                    fresh.add(entry.address_key)
+        return fresh
+
+    def put(self, db: Optional[Session], address: str, result: Optional[Dict[str, Any]]) -> None:
+        self.put_many(db, [(address, result)])
+
+    def put_many(self, db: Optional[Session], items: List[tuple]) -> None:
+        """Store (address, result-or-None) pairs in memory and, with a session, in the table."""
+        now = datetime.utcnow()
+        rows = {}
+        for address, result in items:
+            key = normalize_address_key(address)
+            if not key:
+                continue
+            self.memory.set(key, result)
+            rows[key] = {
+                "address_key": key,
+                "address": address,
+                "found": result is not None,
+                "longitude": result["longitude"] if result else None,
+                "latitude": result["latitude"] if result else None,
+                "formatted_address": result.get("formatted_address") if result else None,
+                "place_type": ",".join(result.get("place_type") or []) if result else None,
+                "provider": "mapbox",
+                "created_at": now,
+                "updated_at": now,
+            }
+        if db is not None and rows:
+            upsert(
+                db,
+                GeocodeCacheEntry,
+                list(rows.values()),
+                conflict_columns=["address_key"],
+                update_columns=["address", "found", "longitude", "latitude", "formatted_address", "place_type", "updated_at"],
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+                "memory_size": self.memory.stats()["size"],
+            }
+
+    def clear_memory(self) -> None:
+        self.memory.clear()
+
+
+geocode_cache = GeocodeCache(
+    maxsize=settings.GEOCODE_CACHE_SIZE,
+    ttl_seconds=settings.GEOCODE_CACHE_TTL,
+    max_age_days=settings.GEOCODE_CACHE_MAX_AGE_DAYS,
+    negative_max_age_days=settings.GEOCODE_CACHE_NEGATIVE_MAX_AGE_DAYS,
+)
@@ -0,0 +1,430 @@
+"""
+IFTA jurisdiction miles from stored GPS breadcrumbs.
+
+Every breadcrumb is assigned to a state/province by point-in-polygon against
+the bundled boundary file (IFTA_BOUNDARIES_PATH, built with
+app/scripts/build_ifta_boundaries.py). A uniform grid over the boundaries
+(IFTA_GRID_DEGREES) is the spatial index: cells no border passes through
+belong wholly to one jurisdiction (or none) and are resolved by lookup.
+A point in a border cell is resolved from the cell's reference point, whose
+jurisdiction is known, by counting crossings of only that cell's edges on
+the way to the point. Everything runs on numpy arrays for the whole fleet at
+once.
+
+Miles are great-circle distances between consecutive points of a driver,
+credited to the jurisdiction of both ends (split in half when a segment
+crosses a border) on the UTC day the segment starts. Segments implying more
+than MAX_SEGMENT_MPH are GPS jumps and are dropped; points outside every
+IFTA jurisdiction count as unassigned miles.
+"""
+import json
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import DriverBreadcrumbDay, IftaEntry, IftaReport
+from app.services.breadcrumbs import decode_arrays
+
+EARTH_RADIUS_MILES = 3958.8
+MAX_SEGMENT_MPH = 100
+PIP_CHUNK_CELLS = 2_000_000  # points x edges evaluated per numpy step
+DEFAULT_BOUNDARIES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ifta_jurisdictions.geojson")
+
+IFTA_JURISDICTIONS = {
+    "AL": "Alabama", "AZ": "Arizona", "AR": "Arkansas", "CA": "California", "CO": "Colorado",
+    "CT": "Connecticut", "DE": "Delaware", "FL": "Florida", "GA": "Georgia", "ID": "Idaho",
+    "IL": "Illinois", "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky",
+    "LA": "Louisiana", "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan",
+    "MN": "Minnesota", "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska",
+    "NV": "Nevada", "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+    "AB": "Alberta", "BC": "British Columbia", "MB": "Manitoba", "NB": "New Brunswick",
+    "NL": "Newfoundland and Labrador", "NT": "Northwest Territories", "NS": "Nova Scotia",
+    "NU": "Nunavut", "ON": "Ontario", "PE": "Prince Edward Island", "QC": "Quebec",
+    "SK": "Saskatchewan", "YT": "Yukon",
+}
+
+_OUTSIDE = -1
+_BORDER = -2
+_REFERENCE_JITTER = 0.0123456789  # fraction of a cell
+
+
+def _side(turn: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """turn > 0, with zeros decided by the sign of the (dx, dy) derivative in that order."""
+    tie = np.where(dx != 0, dx, dy)
+    return (turn > 0) | ((turn == 0) & (tie > 0))
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Flatten ranges [start, start + count): (values, owning range index)."""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    step = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + step, owner
+
+
+class BoundaryDataMissing(Exception):
+    """No jurisdiction boundary file is installed."""
+
+
+class JurisdictionIndex:
+    def __init__(self, polygons: Sequence[Tuple[str, Sequence[Sequence[Sequence[float]]]]], cell_degrees: float = 0.1):
+        """polygons: (code, rings) pairs; rings are [lon, lat] lists, the first outer and the rest holes."""
+        self.codes: List[str] = sorted({code for code, _ in polygons})
+        code_index = {code: index for index, code in enumerate(self.codes)}
+        self._edges: List[Tuple[np.ndarray, ...]] = []
+        polygon_codes = []
+        boxes = []
+        for code, rings in polygons:
+            x1, y1, x2, y2 = [], [], [], []
+            for ring in rings:
+                points = np.asarray(ring, dtype=float)
+                if len(points) < 3:
+                    continue
+                x1.append(points[:, 0])
+                y1.append(points[:, 1])
+                x2.append(np.roll(points[:, 0], -1))
+                y2.append(np.roll(points[:, 1], -1))
+            if not x1:
+                continue
+            edges = tuple(np.concatenate(part) for part in (x1, y1, x2, y2))
+            rise = edges[3] - edges[1]
+            slope = np.divide(edges[2] - edges[0], rise, out=np.zeros_like(rise), where=rise != 0)
+            polygon_codes.append(code_index[code])
+            self._edges.append(edges + (slope,))
+            boxes.append((min(edges[0].min(), edges[2].min()), edges[1].min(),
+                          max(edges[0].max(), edges[2].max()), edges[1].max()))
+        if not boxes:
+            raise ValueError("No polygons")
+        self._boxes = np.array(boxes)
+        self._polygon_codes = polygon_codes
+        self._build_grid(cell_degrees)
+
+    # -- construction --------------------------------------------------------
+
+    def _build_grid(self, cell: float) -> None:
+        self.cell = cell
+        self.min_x = math.floor(self._boxes[:, 0].min() / cell) * cell
+        self.min_y = math.floor(self._boxes[:, 1].min() / cell) * cell
+        self.nx = int(math.ceil((self._boxes[:, 2].max() - self.min_x) / cell)) + 1
+        self.ny = int(math.ceil((self._boxes[:, 3].max() - self.min_y) / cell)) + 1
+
+        # Edges are bucketed (CSR layout) twice: by grid row per polygon, for
+        # full ray casts, and by every cell their bounding box touches, for
+        # border lookups. A cell with no edges lies wholly inside one polygon
+        # or outside all of them.
+        self._row_edges = []
+        edge_polygons, cell_ids = [], []
+        edge_offset = 0
+        for polygon, (x1, y1, x2, y2, _slope) in enumerate(self._edges):
+            ix0, iy0 = self._cell_of(np.minimum(x1, x2), np.minimum(y1, y2))
+            ix1, iy1 = self._cell_of(np.maximum(x1, x2), np.maximum(y1, y2))
+            rows, edge_ids = _expand(iy0, iy1 - iy0 + 1)
+            order = np.argsort(rows, kind="stable")
+            self._row_edges.append((edge_ids[order], np.searchsorted(rows[order], np.arange(self.ny + 1))))
+
+            width, height = ix1 - ix0 + 1, iy1 - iy0 + 1
+            step, edge_ids = _expand(np.zeros_like(ix0), width * height)
+            cell_ids.append((iy0[edge_ids] + step // width[edge_ids]) * self.nx + ix0[edge_ids] + step % width[edge_ids])
+            edge_polygons.append(np.full(len(edge_ids), polygon, dtype=np.int32))
+            cell_ids[-1] = np.stack((cell_ids[-1], edge_ids + edge_offset))
+            edge_offset += len(x1)
+
+        pairs = np.concatenate(cell_ids, axis=1)
+        order = np.argsort(pairs[0], kind="stable")
+        self._cell_edges = pairs[1][order]
+        self._cell_offsets = np.searchsorted(pairs[0][order], np.arange(self.ny * self.nx + 1))
+        self._edge_polygon = np.concatenate(edge_polygons)[order]
+        all_edges = [np.concatenate([edges[i] for edges in self._edges]) for i in range(4)]
+        self._flat_edges = tuple(part[self._cell_edges] for part in all_edges)
+        self._polygon_code_array = np.array(self._polygon_codes + [_OUTSIDE], dtype=np.int32)
+
+        # Every cell gets a reference point whose polygon is known; the offset
+        # keeps it off gridded or rounded boundary vertices
+        cells = np.arange(self.ny * self.nx)
+        self._reference_x = self.min_x + (cells % self.nx + 0.5 + _REFERENCE_JITTER) * cell
+        self._reference_y = self.min_y + (cells // self.nx + 0.5 + _REFERENCE_JITTER) * cell
+        self._reference = self._polygon_at(self._reference_x, self._reference_y)
+        owner = self._polygon_code_array[self._reference]
+        owner[np.diff(self._cell_offsets) > 0] = _BORDER
+        self._owner = owner
+
+    def _cell_of(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return (np.floor((x - self.min_x) / self.cell).astype(np.int64),
+                np.floor((y - self.min_y) / self.cell).astype(np.int64))
+
+    # -- lookup ----------------------------------------------------------------
+
+    def _polygon_at(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Index of the polygon holding each point by a full even-odd ray cast, or -1."""
+        result = np.full(len(x), _OUTSIDE, dtype=np.int32)
+        rows = self._cell_of(x, y)[1]
+        for index, (x1, y1, _x2, y2, slope) in enumerate(self._edges):
+            min_x, min_y, max_x, max_y = self._boxes[index]
+            candidates = np.flatnonzero(
+                (result == _OUTSIDE) & (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+            )
+            if not len(candidates):
+                continue
+            edge_ids, offsets = self._row_edges[index]
+            candidates = candidates[np.argsort(rows[candidates], kind="stable")]
+            bounds = np.flatnonzero(np.diff(rows[candidates])) + 1
+            for group in np.split(candidates, bounds):
+                row = rows[group[0]]
+                edges = edge_ids[offsets[row]:offsets[row + 1]]
+                if not len(edges):
+                    continue
+                ex1, ey1, ey2, eslope = x1[edges], y1[edges], y2[edges], slope[edges]
+                step = max(1, PIP_CHUNK_CELLS // len(edges))
+                for start in range(0, len(group), step):
+                    chunk = group[start:start + step]
+                    px, py = x[chunk, None], y[chunk, None]
+                    crosses = ((ey1 > py) != (ey2 > py)) & (px < ex1 + (py - ey1) * eslope)
+                    result[chunk[np.count_nonzero(crosses, axis=1) % 2 == 1]] = index
+        return result
+
+    def _ray_cast(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Index into self.codes by a full ray cast, or -1."""
+        return self._polygon_code_array[self._polygon_at(x, y)]
+
+    def _resolve_border(self, x: np.ndarray, y: np.ndarray, cell: np.ndarray) -> np.ndarray:
+        """
+        Polygon per point in a border cell: walk from the cell's reference
+        point to the point, flipping membership of each polygon whose edge the
+        walk crosses. Only the cell's own edges can be crossed. Points on an
+        edge resolve as if nudged right and up, like the ray cast.
+        """
+        result = np.full(len(x), _OUTSIDE, dtype=np.int32)
+        counts = self._cell_offsets[cell + 1] - self._cell_offsets[cell]
+        ends = np.cumsum(counts)
+        polygons = len(self._edges)
+        start = 0
+        while start < len(x):
+            stop = max(start + 1, int(np.searchsorted(ends, ends[start] - counts[start] + PIP_CHUNK_CELLS)))
+            span = slice(start, stop)
+            slot, point = _expand(self._cell_offsets[cell[span]], counts[span])
+            qx, qy = x[span][point], y[span][point]
+            cx, cy = self._reference_x[cell[span]][point], self._reference_y[cell[span]][point]
+            ax, ay, bx, by = (part[slot] for part in self._flat_edges)
+
+            # Orientation tests; ties break as if q moved by (e, e^2)
+            side_a = _side((qx - cx) * (ay - cy) - (qy - cy) * (ax - cx), ay - cy, cx - ax)
+            side_b = _side((qx - cx) * (by - cy) - (qy - cy) * (bx - cx), by - cy, cx - bx)
+            side_c = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax) > 0
+            side_q = _side((bx - ax) * (qy - ay) - (by - ay) * (qx - ax), ay - by, bx - ax)
+            crossed = (side_a != side_b) & (side_c != side_q)
+
+            keys, flips = np.unique(point[crossed] * polygons + self._edge_polygon[slot[crossed]],
+                                    return_counts=True)
+            odd = keys[flips % 2 == 1]
+            flipped_point, flipped_polygon = odd // polygons, (odd % polygons).astype(np.int32)
+            reference = self._reference[cell[span]]
+            left = np.ones(stop - start, dtype=bool)
+            entered = flipped_polygon != reference[flipped_point]
+            left[flipped_point[~entered]] = False
+            chunk = np.full(stop - start, _OUTSIDE, dtype=np.int32)
+            chunk[flipped_point[entered]] = flipped_polygon[entered]
+            stayed = left & (reference >= 0)
+            chunk[stayed] = reference[stayed]
+            result[span] = chunk
+            start = stop
+        return result
+
+    def locate(self, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Index into self.codes per point, -1 outside every jurisdiction."""
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        ix, iy = self._cell_of(lon, lat)
+        in_grid = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        cell = np.where(in_grid, iy * self.nx + ix, 0)
+        result = np.where(in_grid, self._owner[cell], _OUTSIDE).astype(np.int32)
+        border = np.flatnonzero(result == _BORDER)
+        result[border] = self._polygon_code_array[self._resolve_border(lon[border], lat[border], cell[border])]
+        return result
+
+    @classmethod
+    def from_geojson(cls, data: dict, cell_degrees: float = 0.1) -> "JurisdictionIndex":
+        """FeatureCollection of Polygon/MultiPolygon features with a "code" property."""
+        polygons = []
+        for feature in data.get("features", []):
+            code = (feature.get("properties") or {}).get("code")
+            geometry = feature.get("geometry") or {}
+            if not code:
+                continue
+            if geometry.get("type") == "Polygon":
+                polygons.append((code, geometry["coordinates"]))
+            elif geometry.get("type") == "MultiPolygon":
+                polygons.extend((code, rings) for rings in geometry["coordinates"])
+        return cls(polygons, cell_degrees)
+
+
+_index: Optional[JurisdictionIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_jurisdiction_index() -> JurisdictionIndex:
+    """Index over the boundary file, loaded once per worker."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = settings.IFTA_BOUNDARIES_PATH or DEFAULT_BOUNDARIES_PATH
+            if not os.path.exists(path):
+                raise BoundaryDataMissing(
+                    f"IFTA boundary file not found at {path}; build it with python -m app.scripts.build_ifta_boundaries"
+                )
+            with open(path, encoding="utf-8") as f:
+                _index = JurisdictionIndex.from_geojson(json.load(f), settings.IFTA_GRID_DEGREES)
+        return _index
+
+
+def quarter_bounds(year: int, quarter: int) -> Tuple[date, date]:
+    """First day of the quarter and first day of the next one."""
+    start = date(year, 3 * quarter - 2, 1)
+    end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return start, end
+
+
+def _haversine_miles(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def jurisdiction_miles(
+    index: JurisdictionIndex,
+    blobs: Iterable[Tuple[int, bytes]],
+    start: datetime,
+    end: datetime,
+) -> dict:
+    """
+    Miles per (driver_id, day, jurisdiction) from (driver_id, breadcrumb blob)
+    pairs ordered by driver and day, counting points with start <= time < end.
+    """
+    started = time.perf_counter()
+    first = int((start - datetime(1970, 1, 1)).total_seconds())
+    last = int((end - datetime(1970, 1, 1)).total_seconds())
+    drivers, times, lats, lons = [], [], [], []
+    for driver_id, data in blobs:
+        timestamps, lat, lon = decode_arrays(data)
+        keep = (timestamps >= first) & (timestamps < last)
+        drivers.append(np.full(int(keep.sum()), driver_id, dtype=np.int64))
+        times.append(timestamps[keep])
+        lats.append(lat[keep])
+        lons.append(lon[keep])
+    if not times or not sum(len(t) for t in times):
+        return {"rows": [], "total_miles": 0.0, "unassigned_miles": 0.0, "points": 0,
+                "duration_ms": int((time.perf_counter() - started) * 1000)}
+
+    driver = np.concatenate(drivers)
+    timestamps = np.concatenate(times)
+    lat = np.concatenate(lats)
+    lon = np.concatenate(lons)
+    place = index.locate(lon, lat)
+
+    miles = _haversine_miles(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    hours = (timestamps[1:] - timestamps[:-1]) / 3600.0
+    valid = (driver[1:] == driver[:-1]) & (hours > 0)
+    valid &= miles <= MAX_SEGMENT_MPH * np.where(hours > 0, hours, 0)
+    miles, seg_driver, seg_day = miles[valid], driver[:-1][valid], timestamps[:-1][valid] // 86400
+    origin, destination = place[:-1][valid], place[1:][valid]
+
+    # Each segment credits half its miles to each end's jurisdiction
+    credit_place = np.concatenate((origin, destination))
+    credit_miles = np.concatenate((miles, miles)) / 2
+    credit_driver = np.concatenate((seg_driver, seg_driver))
+    credit_day = np.concatenate((seg_day, seg_day))
+    assigned = credit_place >= 0
+
+    # Pack (driver, day, jurisdiction) into one int64 so grouping is a 1-D unique
+    places = len(index.codes)
+    days = credit_day[assigned] - seg_day.min()
+    day_span = int(days.max()) + 1 if len(days) else 1
+    keys = (credit_driver[assigned] * day_span + days) * places + credit_place[assigned]
+    groups, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=credit_miles[assigned], minlength=len(groups))
+    first_day = int(seg_day.min()) if len(seg_day) else 0
+    rows = []
+    for key, total in zip(groups.tolist(), totals.tolist()):
+        rest, code = divmod(key, places)
+        driver_id, day = divmod(rest, day_span)
+        rows.append((driver_id, date(1970, 1, 1) + timedelta(days=first_day + day), index.codes[code], total))
+    return {
+        "rows": rows,
+        "total_miles": float(miles.sum()),
+        "unassigned_miles": float(credit_miles[~assigned].sum()),
+        "points": int(len(timestamps)),
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+def carrier_miles(db: Session, carrier_id: int, start: date, end: date, index: Optional[JurisdictionIndex] = None) -> dict:
+    """jurisdiction_miles over a carrier's breadcrumbs for start <= day < end."""
+    index = index or get_jurisdiction_index()
+    blobs = db.query(DriverBreadcrumbDay.driver_id, DriverBreadcrumbDay.data).filter(
+        DriverBreadcrumbDay.carrier_id == carrier_id,
+        DriverBreadcrumbDay.day >= start,
+        DriverBreadcrumbDay.day < end,
+    ).order_by(DriverBreadcrumbDay.driver_id, DriverBreadcrumbDay.day).yield_per(500)
+    start_at = datetime.combine(start, datetime.min.time())
+    end_at = datetime.combine(end, datetime.min.time())
+    return jurisdiction_miles(index, ((driver_id, data) for driver_id, data in blobs), start_at, end_at)
+
+
+def summarize(rows: List[tuple]) -> List[dict]:
+    by_code: Dict[str, float] = {}
+    for _driver_id, _day, code, miles in rows:
+        by_code[code] = by_code.get(code, 0.0) + miles
+    return [{"jurisdiction": code, "miles": round(miles, 2)} for code, miles in sorted(by_code.items())]
+
+
+def populate_report_entries(db: Session, report: IftaReport, index: Optional[JurisdictionIndex] = None) -> dict:
+    """
+    Replace the report's GPS-derived IftaEntry rows (one per driver, day and
+    jurisdiction) with freshly computed miles. Manual entries and fuel
+    gallons are left alone; the caller commits and updates report totals.
+    """
+    start, end = quarter_bounds(report.year, report.quarter)
+    result = carrier_miles(db, report.carrier_id, start, end, index)
+
+    deleted = db.query(IftaEntry).filter(
+        IftaEntry.report_id == report.id,
+        IftaEntry.source == "gps",
+    ).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    entries = [
+        {
+            "report_id": report.id,
+            "carrier_id": report.carrier_id,
+            "driver_id": driver_id,
+            "jurisdiction": code,
+            "entry_date": datetime.combine(day, datetime.min.time()),
+            "miles": round(miles, 2),
+            "gallons": 0.0,
+            "source": "gps",
+            "created_at": now,
+        }
+        for driver_id, day, code, miles in result["rows"]
+        if round(miles, 2) > 0
+    ]
+    if entries:
+        db.bulk_insert_mappings(IftaEntry, entries)
+    return {
+        "period_start": start.isoformat(),
+        "period_end": (end - timedelta(days=1)).isoformat(),
+        "entries_replaced": deleted,
+        "entries_created": len(entries),
+        "points": result["points"],
+        "total_miles": round(result["total_miles"], 2),
+        "unassigned_miles": round(result["unassigned_miles"], 2),
+        "jurisdictions": summarize(result["rows"]),
+        "duration_ms": result["duration_ms"],
+    }
@@ -0,0 +1,123 @@
+"""
+Batch invoice PDF rendering.
+
+Invoices are rendered in a process pool (INVOICE_RENDER_WORKERS) whose
+workers build the ReportLab style sheet, table styles and font metrics once
+at start-up and reuse one PDFGenerator for every invoice they render, so
+per-invoice cost is layout and drawing only. Small batches render in the
+calling process with the same cached generator.
+
+Results come back in input order as (filename, pdf_bytes, pages) and can be
+written as a ZIP through ZipService.stream_zip() while later invoices are
+still rendering, or concatenated into one PDF. The merged PDF is not
+streamed: pypdf holds every page in memory until the last invoice is
+rendered, then the file is written out (spooled to disk when large).
+"""
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BytesIO
+from itertools import repeat
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+from app.core.config import settings
+from app.services.pdf_generator import PDFGenerator
+from app.services.zip_service import ZipEntry
+
+Rendered = Tuple[str, bytes, int]  # (filename, pdf bytes, pages)
+MERGE_SPOOL_BYTES = 16 * 1024 * 1024
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_worker_generator: Optional[PDFGenerator] = None
+
+
+def _init_worker() -> None:
+    global _worker_generator
+    from reportlab.pdfbase import pdfmetrics
+
+    _worker_generator = PDFGenerator()
+    for font in ("Helvetica", "Helvetica-Bold"):
+        pdfmetrics.getFont(font)
+
+
+def _render(item: Tuple[str, dict], carrier_info: dict) -> Rendered:
+    if _worker_generator is None:
+        _init_worker()
+    filename, invoice_data = item
+    pdf_bytes, pages = _worker_generator.render_invoice(invoice_data, carrier_info)
+    return filename, pdf_bytes, pages
+
+
+def get_invoice_render_executor() -> Executor:
+    """Process pool shared by all batch renders in this worker, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.INVOICE_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def shutdown_invoice_render_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def render_invoices(
+    items: List[Tuple[str, dict]],
+    carrier_info: dict,
+    executor: Optional[Executor] = None,
+) -> Iterator[Rendered]:
+    """Render (filename, invoice_data) pairs; yields results in input order as they are ready."""
+    if executor is None and (len(items) < settings.INVOICE_RENDER_MIN_BATCH or settings.INVOICE_RENDER_WORKERS <= 1):
+        for item in items:
+            yield _render(item, carrier_info)
+        return
+    executor = executor or get_invoice_render_executor()
+    workers = getattr(executor, "_max_workers", settings.INVOICE_RENDER_WORKERS)
+    chunksize = max(1, len(items) // (workers * 4))
+    yield from executor.map(_render, items, repeat(carrier_info), chunksize=chunksize)
+
+
+def zip_entries(rendered: Iterable[Rendered]) -> Iterator[ZipEntry]:
+    for filename, pdf_bytes, _ in rendered:
+        yield ZipEntry(filename, lambda pdf_bytes=pdf_bytes: [pdf_bytes], len(pdf_bytes))
+
+
+def merge_pdfs(rendered: Iterable[Rendered]) -> Tuple[BinaryIO, int]:
+    """
+    Concatenate rendered invoices into one PDF; returns (file, pages).
+
+    Every page stays in the PdfWriter, in memory, until the whole batch is
+    appended; only the finished file is spooled to disk when large.
+    """
+    writer = PdfWriter()
+    pages = 0
+    for _, pdf_bytes, count in rendered:
+        writer.append(PdfReader(BytesIO(pdf_bytes)))
+        pages += count
+    out = tempfile.SpooledTemporaryFile(max_size=MERGE_SPOOL_BYTES)
+    writer.write(out)
+    out.seek(0)
+    return out, pages
+
+
+def file_chunks(fileobj: BinaryIO, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        fileobj.close()
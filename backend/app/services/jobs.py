@@ -0,0 +1,109 @@
+"""
+In-process background jobs with progress polling.
+
+Long-running work (batch settlements, bulk recalculation, ...) is submitted
+to a small thread pool and tracked by id. Handlers receive a Job and report
+progress through job.update(); callers poll GET /jobs/{job_id}.
+
+Jobs live in the worker process that accepted them, so with several uvicorn
+workers the status endpoint must be served by the same worker (or use a
+single worker for job-heavy deployments).
+"""
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+
+class Job:
+    def __init__(self, kind: str, carrier_id: Optional[int]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.carrier_id = carrier_id
+        self.status = "queued"  # queued, running, succeeded, failed
+        self.progress = 0
+        self.total = 0
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def update(self, progress: Optional[int] = None, total: Optional[int] = None, message: Optional[str] = None):
+        with self._lock:
+            if progress is not None:
+                self.progress = progress
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "total": self.total,
+                "message": self.message,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            }
+
+
+class JobRegistry:
+    def __init__(self, max_workers: int, max_jobs: int = 500):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._max_jobs = max_jobs
+
+    def submit(self, kind: str, carrier_id: Optional[int], fn: Callable[[Job], Any]) -> Job:
+        """Run fn(job) in the background; its return value becomes job.result."""
+        job = Job(kind, carrier_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        try:
+            job.result = fn(job)
+            job.status = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            traceback.print_exc()
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs once the registry is full
+        if len(self._jobs) <= self._max_jobs:
+            return
+        finished = sorted(
+            (j for j in self._jobs.values() if j.finished_at is not None),
+            key=lambda j: j.finished_at,
+        )
+        for job in finished[: len(self._jobs) - self._max_jobs]:
+            del self._jobs[job.id]
+
+
+job_registry = JobRegistry(max_workers=settings.BACKGROUND_JOB_WORKERS)
@@ -1,17 +1,35 @@
 """
 Mapbox service for commercial truck routing and geocoding
 """
-import requests
 from typing import List, Dict, Any, Optional
+from urllib.parse import quote
+from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.http_client import http_client
+from app.services.geocode_cache import MISSING, geocode_cache
+from app.services.route_cache import route_cache
+
+# Directions allows 300 requests/minute, geocoding 600/minute
+mapbox_http = http_client("mapbox", base_url="https://api.mapbox.com", timeout=30, rate_per_second=5, burst=5)
+
+# Directions API limit for the driving profile
+MAX_ROUTE_COORDINATES = 25
+
+
+def _leg_summary(distance_meters: float, duration_seconds: float) -> Dict[str, Any]:
+    return {
+        "distance_meters": distance_meters,
+        "distance_miles": round(distance_meters * 0.000621371, 2),
+        "duration_seconds": duration_seconds,
+        "duration_hours": round(duration_seconds / 3600, 2),
+    }
 
 
 class MapboxService:
     """Mapbox API integration for truck routing and geocoding"""
     
-    BASE_URL = "https://api.mapbox.com"
-    
-    def __init__(self):
+    def __init__(self, db: Optional[Session] = None):
+        self.db = db
         self.api_key = settings.MAPBOX_API_KEY
         if not self.api_key:
             raise ValueError("MAPBOX_API_KEY is not configured")
@@ -38,7 +56,7 @@ class MapboxService:
         coords_str = ";".join([f"{lon},{lat}" for lon, lat in coordinates])
         
         # Use driving-traffic profile with truck restrictions
-        url = f"{self.BASE_URL}/directions/v5/mapbox/driving/{coords_str}"
+        url = f"/directions/v5/mapbox/driving/{coords_str}"
         
         params = {
             "access_token": self.api_key,
@@ -54,7 +72,7 @@ class MapboxService:
         if waypoints:
             params["waypoints"] = ";".join([str(i) for i in waypoints])
         
-        response = requests.get(url, params=params, timeout=30)
+        response = mapbox_http.get(url, params=params)
         response.raise_for_status()
         
         data = response.json()
@@ -65,14 +83,15 @@ class MapboxService:
         route = data["routes"][0]
         
         # Parse legs for segment-by-segment breakdown
-        legs = []
-        for leg in route.get("legs", []):
-            legs.append({
-                "distance_meters": leg["distance"],
-                "distance_miles": round(leg["distance"] * 0.000621371, 2),
-                "duration_seconds": leg["duration"],
-                "duration_hours": round(leg["duration"] / 3600, 2),
-            })
+        legs = [_leg_summary(leg["distance"], leg["duration"]) for leg in route.get("legs", [])]
+        
+        # Legs follow the coordinate order unless waypoints were given, so
+        # the map view's fetch also warms the distance cache
+        if not waypoints and len(legs) == len(coordinates) - 1:
+            route_cache.put_many(self.db, [
+                (origin, destination, (leg["distance_meters"], leg["duration_seconds"]))
+                for origin, destination, leg in zip(coordinates, coordinates[1:], legs)
+            ])
         
         return {
             "total_distance_miles": round(route["distance"] * 0.000621371, 2),
@@ -82,29 +101,94 @@ class MapboxService:
             "waypoint_order": route.get("waypoint_order", []),
         }
     
-    def geocode_address(self, address: str) -> Optional[Dict[str, Any]]:
+    def _fetch_leg_distances(self, coordinates: List[tuple], profile: str) -> List[tuple]:
+        """(meters, seconds) per consecutive pair in one Directions call, without geometry"""
+        coords_str = ";".join([f"{lon},{lat}" for lon, lat in coordinates])
+        params = {
+            "access_token": self.api_key,
+            "overview": "false",
+            "steps": "false",
+            "alternatives": "false",
+            "exclude": "ferry",
+        }
+        response = mapbox_http.get(f"/directions/v5/mapbox/{profile}/{coords_str}", params=params)
+        response.raise_for_status()
+        
+        routes = response.json().get("routes")
+        if not routes:
+            raise ValueError("No route found")
+        legs = routes[0].get("legs", [])
+        if len(legs) != len(coordinates) - 1:
+            raise ValueError("Route legs do not match the requested coordinates")
+        return [(leg["distance"], leg["duration"]) for leg in legs]
+    
+    def get_leg_distances(self, coordinates: List[tuple], profile: str = "driving") -> List[tuple]:
         """
-        Geocode an address to coordinates
+        Distance and duration for each consecutive pair of coordinates
+        
+        Legs come from the route cache where possible; each run of
+        consecutive uncached legs is fetched with a single geometry-free
+        Directions call and written back to the cache.
         
         Args:
-            address: Street address to geocode
+            coordinates: List of (longitude, latitude) tuples
+            profile: Mapbox routing profile
         
         Returns:
-            Dictionary with coordinates and formatted address
+            List of (distance_meters, duration_seconds), one per leg
         """
-        url = f"{self.BASE_URL}/geocoding/v5/mapbox.places/{requests.utils.quote(address)}.json"
+        if len(coordinates) < 2:
+            raise ValueError("At least 2 coordinates required for routing")
         
+        pairs = list(zip(coordinates, coordinates[1:]))
+        cached = route_cache.get_many(self.db, pairs, profile)
+        legs = [cached.get(route_cache.leg_key(origin, destination, profile)) for origin, destination in pairs]
+        
+        fetched = []
+        start = 0
+        while start < len(pairs):
+            if legs[start] is not None:
+                start += 1
+                continue
+            end = start
+            while end < len(pairs) and legs[end] is None and end - start < MAX_ROUTE_COORDINATES - 1:
+                end += 1
+            for offset, leg in enumerate(self._fetch_leg_distances(coordinates[start:end + 1], profile)):
+                legs[start + offset] = leg
+                fetched.append((*pairs[start + offset], leg))
+            start = end
+        
+        route_cache.put_many(self.db, fetched, profile)
+        return legs
+    
+    def get_route_summary(self, coordinates: List[tuple]) -> Dict[str, Any]:
+        """
+        Route totals and per-leg breakdown assembled from cached legs
+        
+        Same shape as get_truck_route, with geometry set to None.
+        """
+        legs = [_leg_summary(distance, duration) for distance, duration in self.get_leg_distances(coordinates)]
+        total_distance = sum(leg["distance_meters"] for leg in legs)
+        total_duration = sum(leg["duration_seconds"] for leg in legs)
+        return {
+            "total_distance_miles": round(total_distance * 0.000621371, 2),
+            "total_duration_hours": round(total_duration / 3600, 2),
+            "geometry": None,
+            "legs": legs,
+            "waypoint_order": [],
+        }
+    
+    def _geocode_request(self, address: str) -> tuple:
+        url = f"/geocoding/v5/mapbox.places/{quote(address)}.json"
         params = {
             "access_token": self.api_key,
             "limit": 1,
             "types": "address,poi"
         }
-        
-        response = requests.get(url, params=params, timeout=20)
-        response.raise_for_status()
-        
-        data = response.json()
-        
+        return url, params
+    
+    @staticmethod
+    def _parse_geocode(address: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not data.get("features"):
             return None
         
@@ -118,6 +202,41 @@ class MapboxService:
             "place_type": feature.get("place_type", []),
         }
     
+    def fetch_geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        """Geocode through the Mapbox API, bypassing the cache"""
+        url, params = self._geocode_request(address)
+        response = mapbox_http.get(url, params=params, timeout=20)
+        response.raise_for_status()
+        return self._parse_geocode(address, response.json())
+    
+    async def afetch_geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        """Async variant of fetch_geocode for bulk geocoding"""
+        url, params = self._geocode_request(address)
+        response = await mapbox_http.aget(url, params=params, timeout=20)
+        response.raise_for_status()
+        return self._parse_geocode(address, response.json())
+    
+    def geocode_address(self, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Geocode an address to coordinates
+        
+        Results (including "not found") are cached by normalized address in
+        memory and, when the service has a session, in the geocode_cache table.
+        
+        Args:
+            address: Street address to geocode
+        
+        Returns:
+            Dictionary with coordinates and formatted address
+        """
+        cached = geocode_cache.get(self.db, address)
+        if cached is not MISSING:
+            return cached
+        
+        result = self.fetch_geocode(address)
+        geocode_cache.put(self.db, address, result)
+        return result
+    
     def autocomplete_address(self, query: str, proximity: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """
         Get address autocomplete suggestions
@@ -129,7 +248,7 @@ class MapboxService:
         Returns:
             List of address suggestions
         """
-        url = f"{self.BASE_URL}/geocoding/v5/mapbox.places/{requests.utils.quote(query)}.json"
+        url = f"/geocoding/v5/mapbox.places/{quote(query)}.json"
         
         params = {
             "access_token": self.api_key,
@@ -141,7 +260,7 @@ class MapboxService:
         if proximity:
             params["proximity"] = f"{proximity[0]},{proximity[1]}"
         
-        response = requests.get(url, params=params, timeout=20)
+        response = mapbox_http.get(url, params=params, timeout=20)
         response.raise_for_status()
         
         data = response.json()
@@ -159,12 +278,14 @@ class MapboxService:
         
         return suggestions
     
-    def calculate_route_with_stops(self, addresses: List[str]) -> Dict[str, Any]:
+    def calculate_route_with_stops(self, addresses: List[str], include_geometry: bool = True) -> Dict[str, Any]:
         """
         Calculate route through multiple addresses
         
         Args:
             addresses: List of addresses in order
+            include_geometry: Fetch the full route line for drawing on a map;
+                when False, distances come from the leg cache only
         
         Returns:
             Complete route information with leg-by-leg breakdown
@@ -182,7 +303,10 @@ class MapboxService:
             geocoded_addresses.append(result["formatted_address"])
         
         # Get route
-        route_data = self.get_truck_route(coordinates)
+        if include_geometry:
+            route_data = self.get_truck_route(coordinates)
+        else:
+            route_data = self.get_route_summary(coordinates)
         
         # Add address info to legs
         for i, leg in enumerate(route_data["legs"]):
@@ -190,6 +314,7 @@ class MapboxService:
             leg["to_address"] = geocoded_addresses[i + 1]
         
         route_data["addresses"] = geocoded_addresses
+        route_data["coordinates"] = coordinates
         
         return route_data
 
@@ -1,5 +1,7 @@
-import requests
 from app.core.config import settings
+from app.core.http_client import http_client
+
+google_maps_http = http_client("google_maps", base_url="https://maps.googleapis.com", timeout=20, rate_per_second=10, burst=10)
 
 
 def get_route(from_address: str, to_address: str) -> dict:
@@ -12,7 +14,7 @@ def get_route(from_address: str, to_address: str) -> dict:
         "destinations": to_address,
         "key": settings.GOOGLE_MAPS_API_KEY,
     }
-    res = requests.get("https://maps.googleapis.com/maps/api/distancematrix/json", params=params, timeout=20)
+    res = google_maps_http.get("/maps/api/distancematrix/json", params=params)
     res.raise_for_status()
     data = res.json()
     element = data["rows"][0]["elements"][0]
@@ -0,0 +1,247 @@
+"""
+Motive (KeepTruckin) fleet locations.
+
+The map polls for every driver's position, so locations are served from a
+per-carrier snapshot:
+  * fresh (younger than MOTIVE_LOCATION_SNAPSHOT_TTL): returned as is
+  * stale (up to MOTIVE_LOCATION_SNAPSHOT_MAX_AGE): returned as is while one
+    background thread refreshes it
+  * missing or too old: fetched in the request
+
+A refresh lists all vehicle locations in a few paginated calls and maps each
+vehicle's current driver to Driver.external_id. If the bulk listing is not
+available to the account, it falls back to per-driver location calls run
+concurrently (MOTIVE_LOCATION_CONCURRENCY). Each call gets one attempt, with
+no retries, under a hard deadline (MOTIVE_LOCATION_DEADLINE, covering the
+rate-limiter wait and every httpx phase together). A driver that misses it
+is skipped and counted as a circuit-breaker failure, so a slow or hung
+driver cannot stall the whole fleet.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.http_client import HTTPError, http_client
+from app.models import Driver
+
+MOTIVE_API_BASE_URL = "https://api.gomotive.com/v1"
+VEHICLE_LOCATIONS_PAGE_SIZE = 100
+
+motive_http = http_client("motive", base_url=MOTIVE_API_BASE_URL, timeout=30, rate_per_second=10, burst=10)
+
+DriverRef = Tuple[int, str]  # (driver id, name)
+
+
+def motive_headers(api_key: str) -> dict:
+    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Motive ISO timestamp as naive UTC, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _location(driver: DriverRef, latitude, longitude, speed, heading, timestamp, address) -> Optional[dict]:
+    if latitude is None or longitude is None:
+        return None
+    return {
+        "driver_id": driver[0],
+        "driver_name": driver[1],
+        "latitude": float(latitude),
+        "longitude": float(longitude),
+        "speed": float(speed or 0),
+        "heading": int(heading) if heading is not None else None,
+        "timestamp": parse_time(timestamp) or datetime.utcnow(),
+        "address": address,
+    }
+
+
+class BulkLocationsUnavailable(Exception):
+    """The account cannot list vehicle locations; use per-driver calls."""
+
+
+async def fetch_vehicle_locations(api_key: str, drivers: Dict[str, DriverRef]) -> List[dict]:
+    """All located drivers from the paginated /vehicle_locations listing."""
+    locations = []
+    page_no = 1
+    while True:
+        try:
+            response = await motive_http.aget(
+                "/vehicle_locations",
+                headers=motive_headers(api_key),
+                params={"per_page": VEHICLE_LOCATIONS_PAGE_SIZE, "page_no": page_no},
+            )
+        except HTTPError as e:
+            raise BulkLocationsUnavailable(str(e)) from e
+        if response.status_code != 200:
+            raise BulkLocationsUnavailable(f"status {response.status_code}")
+        data = response.json()
+        vehicles = data.get("vehicles") or []
+        for item in vehicles:
+            vehicle = item.get("vehicle", item)
+            current_driver = vehicle.get("current_driver") or {}
+            driver = drivers.get(str(current_driver.get("id")))
+            point = vehicle.get("current_location") or {}
+            if driver is None or not point:
+                continue
+            location = _location(driver, point.get("lat"), point.get("lon"), point.get("speed"),
+                                 point.get("bearing"), point.get("located_at"), point.get("description"))
+            if location:
+                locations.append(location)
+        total = (data.get("pagination") or {}).get("total")
+        if len(vehicles) < VEHICLE_LOCATIONS_PAGE_SIZE or (total is not None and page_no * VEHICLE_LOCATIONS_PAGE_SIZE >= total):
+            return locations
+        page_no += 1
+
+
+async def fetch_driver_locations(
+    api_key: str,
+    drivers: Dict[str, DriverRef],
+    concurrency: int,
+    deadline: float,
+) -> Tuple[List[dict], int]:
+    """Per-driver location calls, at most `concurrency` at a time; returns (locations, drivers skipped)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = motive_headers(api_key)
+    skipped = 0
+
+    async def one(external_id: str, driver: DriverRef) -> Optional[dict]:
+        nonlocal skipped
+        async with semaphore:
+            try:
+                # The httpx timeout bounds each phase separately; asyncio.timeout bounds the whole call
+                async with asyncio.timeout(deadline):
+                    response = await motive_http.aget(
+                        f"/drivers/{external_id}/location", headers=headers, timeout=deadline, max_retries=0
+                    )
+            except TimeoutError:
+                motive_http.record_deadline_miss()
+                skipped += 1
+                return None
+            except HTTPError:
+                skipped += 1
+                return None
+        if response.status_code != 200:
+            skipped += 1
+            return None
+        data = response.json()
+        return _location(driver, data.get("latitude"), data.get("longitude"), data.get("speed"),
+                         data.get("heading"), data.get("timestamp"), data.get("address"))
+
+    results = await asyncio.gather(*(one(external_id, driver) for external_id, driver in drivers.items()))
+    return [location for location in results if location], skipped
+
+
+class FleetLocationSnapshots:
+    def __init__(self, ttl_seconds: float, max_age_seconds: float, concurrency: int, deadline: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._snapshots: Dict[int, dict] = {}
+        self._refreshing: set = set()
+
+    def _fetch(self, api_key: str, drivers: Dict[str, DriverRef]) -> dict:
+        async def run() -> dict:
+            try:
+                try:
+                    locations = await fetch_vehicle_locations(api_key, drivers)
+                    source, skipped = "bulk", 0
+                except BulkLocationsUnavailable:
+                    locations, skipped = await fetch_driver_locations(
+                        api_key, drivers, self.concurrency, self.deadline
+                    )
+                    source = "per_driver"
+            finally:
+                await motive_http.aclose()
+            locations.sort(key=lambda location: (location["driver_name"], location["driver_id"]))
+            return {"locations": locations, "source": source, "skipped": skipped}
+
+        started = time.monotonic()
+        snapshot = asyncio.run(run())
+        snapshot["fetched_at"] = time.monotonic()
+        snapshot["duration_ms"] = int((snapshot["fetched_at"] - started) * 1000)
+        return snapshot
+
+    def refresh(self, carrier_id: int, api_key: str, drivers: Dict[str, DriverRef]) -> dict:
+        snapshot = self._fetch(api_key, drivers)
+        with self._lock:
+            self._snapshots[carrier_id] = snapshot
+        return snapshot
+
+    def _refresh_in_background(self, carrier_id: int, api_key: str, drivers: Dict[str, DriverRef]) -> None:
+        with self._lock:
+            if carrier_id in self._refreshing:
+                return
+            self._refreshing.add(carrier_id)
+
+        def run():
+            try:
+                self.refresh(carrier_id, api_key, drivers)
+            except Exception:
+                pass  # keep serving the stale snapshot; the next poll retries
+            finally:
+                with self._lock:
+                    self._refreshing.discard(carrier_id)
+
+        threading.Thread(target=run, name=f"motive-locations-{carrier_id}", daemon=True).start()
+
+    def get(self, db: Session, carrier_id: int, api_key: str, force: bool = False) -> Tuple[List[dict], dict]:
+        """Locations for the carrier's Motive-linked drivers plus {age_seconds, state, source, skipped}."""
+        rows = db.query(Driver.id, Driver.name, Driver.external_id).filter(
+            Driver.carrier_id == carrier_id,
+            Driver.external_id.isnot(None),
+        ).all()
+        drivers = {str(external_id): (driver_id, name) for driver_id, name, external_id in rows}
+
+        with self._lock:
+            snapshot = self._snapshots.get(carrier_id)
+        age = time.monotonic() - snapshot["fetched_at"] if snapshot else None
+
+        if snapshot is None or force or age > self.max_age_seconds:
+            snapshot, state, age = self.refresh(carrier_id, api_key, drivers), "fetched", 0.0
+        elif age > self.ttl_seconds:
+            self._refresh_in_background(carrier_id, api_key, drivers)
+            state = "stale"
+        else:
+            state = "fresh"
+
+        # Drivers unlinked or moved to another carrier since the snapshot was taken are dropped
+        known = {driver_id for driver_id, _ in drivers.values()}
+        locations = [location for location in snapshot["locations"] if location["driver_id"] in known]
+        return locations, {
+            "age_seconds": round(age, 1),
+            "state": state,
+            "source": snapshot["source"],
+            "skipped": snapshot["skipped"],
+        }
+
+    def invalidate(self, carrier_id: int) -> None:
+        with self._lock:
+            self._snapshots.pop(carrier_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+fleet_locations = FleetLocationSnapshots(
+    ttl_seconds=settings.MOTIVE_LOCATION_SNAPSHOT_TTL,
+    max_age_seconds=settings.MOTIVE_LOCATION_SNAPSHOT_MAX_AGE,
+    concurrency=settings.MOTIVE_LOCATION_CONCURRENCY,
+    deadline=settings.MOTIVE_LOCATION_DEADLINE,
+)
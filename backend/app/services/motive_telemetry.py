@@ -0,0 +1,383 @@
+"""
+Motive webhook ingestion.
+
+Webhook payloads are normalized and queued in the request; one writer thread
+drains the queue in batches (up to MOTIVE_WEBHOOK_BATCH_SIZE events per
+transaction), so a burst of location pings costs a few multi-row INSERTs
+instead of a commit per event and never blocks the webhook response.
+
+Every event belongs to the carrier whose webhook secret signed it. Each
+batch appends every event to motive_telemetry_events, adds linked drivers'
+positions to the breadcrumb store and upserts motive_latest_state, one row
+per carrier and Motive driver or vehicle; Motive ids are only matched to
+that carrier's drivers. Location and HOS columns are updated independently
+and only by events newer than what is stored, so late or replayed webhooks
+cannot move a driver backwards.
+
+Queued events live in this worker's memory until written; a queue that is
+full (MOTIVE_WEBHOOK_QUEUE_SIZE) rejects new events so Motive retries them.
+A batch that fails to write is retried one event at a time, so one bad
+event is counted as failed without losing the rest of the batch. A batch
+that fails because the database is unreachable is held and written again
+every MOTIVE_WEBHOOK_RETRY_SECONDS; until it lands, new webhooks are
+refused so Motive redelivers them.
+
+Requests are authenticated by the X-KT-Webhook-Signature header, the
+HMAC-SHA1 hex digest of the raw body keyed with the carrier's secret in
+MOTIVE_WEBHOOK_SECRETS.
+"""
+import hashlib
+import hmac
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DisconnectionError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.models import Driver, MotiveLatestState, MotiveTelemetryEvent
+from app.services.breadcrumbs import append_points
+from app.services.motive import parse_time
+from app.utils.upsert import upsert
+
+HOS_FIELDS = (
+    "current_status",
+    "time_until_break",
+    "driving_hours_remaining",
+    "shift_hours_remaining",
+    "cycle_hours_remaining",
+)
+SIGNATURE_HEADER = "X-KT-Webhook-Signature"
+STATE_KEY = ["carrier_id", "entity_type", "external_id"]
+LOCATION_COLUMNS = ["driver_id", "latitude", "longitude", "speed", "heading", "address", "located_at", "updated_at"]
+HOS_COLUMNS = ["driver_id", "hos_status", "hos", "hos_updated_at", "updated_at"]
+# The database could not be reached; the same write can succeed later
+TRANSIENT_ERRORS = (OperationalError, DisconnectionError, PoolTimeoutError)
+
+
+class InvalidTelemetryEvent(ValueError):
+    pass
+
+
+class TelemetryUnavailable(Exception):
+    """Writes are failing (database outage); new webhooks are refused until held events land."""
+
+
+def sign_webhook(body: bytes, secret: str) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_webhook(body, secret), signature.strip().lower())
+
+
+def webhook_carrier(body: bytes, signature: Optional[str], secrets: Dict[int, str]) -> Optional[int]:
+    """The carrier whose webhook secret signed the body, or None."""
+    for carrier_id, secret in secrets.items():
+        if verify_webhook_signature(body, signature, secret):
+            return carrier_id
+    return None
+
+
+def _first(sources: Iterable[dict], *keys: str) -> Any:
+    for source in sources:
+        for key in keys:
+            if source.get(key) is not None:
+                return source[key]
+    return None
+
+
+def _external_id(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def normalize_event(payload: dict, received_at: Optional[datetime] = None) -> dict:
+    """Flatten a Motive webhook (or API) payload into telemetry columns."""
+    received_at = received_at or datetime.utcnow()
+    driver = payload.get("driver") if isinstance(payload.get("driver"), dict) else {}
+    vehicle = payload.get("vehicle") if isinstance(payload.get("vehicle"), dict) else {}
+    location = payload.get("location") if isinstance(payload.get("location"), dict) else {}
+    sources = (location, payload)
+
+    latitude = _first(sources, "lat", "latitude")
+    longitude = _first(sources, "lon", "longitude")
+    heading = _first(sources, "bearing", "heading")
+    hos = payload.get("hos") if isinstance(payload.get("hos"), dict) else {
+        field: payload[field] for field in HOS_FIELDS if field in payload
+    }
+    occurred_at = parse_time(_first(sources, "located_at", "timestamp", "occurred_at", "last_updated"))
+    return {
+        "event_type": str(payload.get("event_type") or payload.get("action") or "unknown")[:50],
+        "driver_external_id": _external_id(payload.get("driver_id") or driver.get("id")),
+        "vehicle_external_id": _external_id(payload.get("vehicle_id") or vehicle.get("id")),
+        "latitude": float(latitude) if latitude is not None else None,
+        "longitude": float(longitude) if longitude is not None else None,
+        "speed": float(_first(sources, "speed") or 0),
+        "heading": int(heading) if heading is not None else None,
+        "address": _first(sources, "description", "address"),
+        "hos": hos or None,
+        "occurred_at": occurred_at or received_at,
+        "received_at": received_at,
+        "payload": payload,
+    }
+
+
+def _keep_newest(found: Dict[tuple, dict], key: tuple, event: dict) -> None:
+    current = found.get(key)
+    if current is None or event["occurred_at"] >= current["occurred_at"]:
+        found[key] = event
+
+
+def write_events(db: Session, carrier_id: int, events: List[dict]) -> int:
+    """Append one carrier's normalized events and fold them into its latest state; the caller commits."""
+    if not events:
+        return 0
+    driver_ids = {event["driver_external_id"] for event in events if event["driver_external_id"]}
+    linked = {}
+    if driver_ids:
+        rows = db.query(Driver.external_id, Driver.id).filter(
+            Driver.carrier_id == carrier_id,
+            Driver.external_id.in_(driver_ids),
+        )
+        linked = dict(rows)
+
+    locations: Dict[tuple, dict] = {}
+    hos_updates: Dict[tuple, dict] = {}
+    event_rows = []
+    for event in events:
+        driver_id = linked.get(event["driver_external_id"])
+        event_rows.append({
+            "carrier_id": carrier_id,
+            "driver_id": driver_id,
+            "event_type": event["event_type"],
+            "driver_external_id": event["driver_external_id"],
+            "vehicle_external_id": event["vehicle_external_id"],
+            "latitude": event["latitude"],
+            "longitude": event["longitude"],
+            "occurred_at": event["occurred_at"],
+            "received_at": event["received_at"],
+            "payload": event["payload"],
+        })
+        keys = [("driver", event["driver_external_id"]), ("vehicle", event["vehicle_external_id"])]
+        keys = [key for key in keys if key[1]]
+        if event["latitude"] is not None and event["longitude"] is not None:
+            for key in keys:
+                _keep_newest(locations, key, event)
+        if event["hos"] and event["driver_external_id"]:
+            _keep_newest(hos_updates, ("driver", event["driver_external_id"]), event)
+    db.execute(insert(MotiveTelemetryEvent), event_rows)
+
+    trails: Dict[int, list] = {}
+    for row in event_rows:
+        if row["driver_id"] and row["latitude"] is not None and row["longitude"] is not None:
+            trails.setdefault(row["driver_id"], []).append((row["occurred_at"], row["latitude"], row["longitude"]))
+    for driver_id, points in trails.items():
+        append_points(db, carrier_id, driver_id, points)
+
+    external_ids = {key[1] for key in list(locations) + list(hos_updates)}
+    stored = {}
+    if external_ids:
+        rows = db.query(
+            MotiveLatestState.entity_type,
+            MotiveLatestState.external_id,
+            MotiveLatestState.located_at,
+            MotiveLatestState.hos_updated_at,
+        ).filter(MotiveLatestState.carrier_id == carrier_id, MotiveLatestState.external_id.in_(external_ids))
+        stored = {(entity_type, external_id): (located_at, hos_updated_at)
+                  for entity_type, external_id, located_at, hos_updated_at in rows}
+
+    now = datetime.utcnow()
+    location_rows = []
+    for key, event in locations.items():
+        located_at = stored.get(key, (None, None))[0]
+        if located_at is not None and located_at > event["occurred_at"]:
+            continue
+        location_rows.append({
+            "entity_type": key[0],
+            "external_id": key[1],
+            "carrier_id": carrier_id,
+            "driver_id": linked.get(key[1]) if key[0] == "driver" else None,
+            "latitude": event["latitude"],
+            "longitude": event["longitude"],
+            "speed": event["speed"],
+            "heading": event["heading"],
+            "address": event["address"],
+            "located_at": event["occurred_at"],
+            "updated_at": now,
+        })
+    hos_rows = []
+    for key, event in hos_updates.items():
+        hos_updated_at = stored.get(key, (None, None))[1]
+        if hos_updated_at is not None and hos_updated_at > event["occurred_at"]:
+            continue
+        hos_rows.append({
+            "entity_type": key[0],
+            "external_id": key[1],
+            "carrier_id": carrier_id,
+            "driver_id": linked.get(key[1]),
+            "hos_status": event["hos"].get("current_status"),
+            "hos": event["hos"],
+            "hos_updated_at": event["occurred_at"],
+            "updated_at": now,
+        })
+    upsert(db, MotiveLatestState, location_rows, STATE_KEY, LOCATION_COLUMNS)
+    upsert(db, MotiveLatestState, hos_rows, STATE_KEY, HOS_COLUMNS)
+    return len(event_rows)
+
+
+def latest_driver_state(db: Session, driver: Driver) -> Optional[MotiveLatestState]:
+    if not driver.external_id:
+        return None
+    return db.query(MotiveLatestState).filter(
+        MotiveLatestState.carrier_id == driver.carrier_id,
+        MotiveLatestState.entity_type == "driver",
+        MotiveLatestState.external_id == driver.external_id,
+    ).first()
+
+
+class TelemetryIngestor:
+    def __init__(self, batch_size: int, max_queue: int, retry_seconds: float = 5.0):
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._done = threading.Condition()
+        self._pending = 0
+        self._held: List[tuple] = []  # batch items waiting out a database outage
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error: Optional[str] = None
+
+    def submit(self, bind, carrier_id: int, payloads: List[dict]) -> int:
+        """
+        Queue one carrier's webhook payloads for the writer thread; returns how many were accepted.
+
+        Every payload is normalized before any is queued, so a malformed one
+        raises InvalidTelemetryEvent and nothing from the request is queued.
+        While held events are waiting out a database outage nothing is
+        queued and TelemetryUnavailable is raised.
+        """
+        with self._done:
+            if self._held:
+                raise TelemetryUnavailable(self.last_error or "telemetry writes are failing")
+        received_at = datetime.utcnow()
+        events = []
+        for index, payload in enumerate(payloads):
+            try:
+                events.append(normalize_event(payload, received_at))
+            except (AttributeError, TypeError, ValueError) as e:
+                raise InvalidTelemetryEvent(f"event {index}: {type(e).__name__}: {e}")
+        accepted = 0
+        for event in events:
+            with self._done:
+                self._pending += 1
+            try:
+                self._queue.put_nowait((bind, carrier_id, event))
+                accepted += 1
+            except queue.Full:
+                with self._done:
+                    self._pending -= 1
+                    self.dropped += 1
+        with self._done:
+            self.received += accepted
+            if accepted and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="motive-telemetry", daemon=True)
+                self._thread.start()
+        return accepted
+
+    def _next_batch(self) -> List[tuple]:
+        with self._done:
+            held, self._held = self._held, []
+        if held:
+            time.sleep(self.retry_seconds)
+            return held
+        # Whatever queued up while the previous batch was being written goes into this one
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._write(self._next_batch())
+
+    def _write_events(self, bind, carrier_id: int, events: List[dict]) -> Optional[Exception]:
+        """Write events in one transaction; returns the error, or None once committed."""
+        db = sessionmaker(bind=bind, autoflush=False)()
+        try:
+            write_events(db, carrier_id, events)
+            db.commit()
+            return None
+        except Exception as e:
+            db.rollback()
+            return e
+        finally:
+            db.close()
+
+    def _write(self, batch: List[tuple]) -> None:
+        groups: Dict[tuple, List[dict]] = {}
+        for bind, carrier_id, event in batch:
+            groups.setdefault((bind, carrier_id), []).append(event)
+        held = []
+        for (bind, carrier_id), events in groups.items():
+            written, failed = len(events), 0
+            error = self._write_events(bind, carrier_id, events)
+            if isinstance(error, TRANSIENT_ERRORS):
+                # Not the events' fault: keep them and write them again later
+                held.extend((bind, carrier_id, event) for event in events)
+                written = 0
+            elif error and len(events) > 1:
+                # Find the bad events; the rest of the batch still lands
+                errors = [self._write_events(bind, carrier_id, [event]) for event in events]
+                failed = sum(1 for e in errors if e)
+                written -= failed
+                error = next((e for e in errors if e), None)
+            elif error:
+                written, failed = 0, 1
+            with self._done:
+                self.written += written
+                self.failed += failed
+                self.batches += 1
+                if error:
+                    self.last_error = f"{type(error).__name__}: {error}"
+        with self._done:
+            self._held.extend(held)
+            self._pending -= len(batch) - len(held)
+            self._done.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far is written; False on timeout."""
+        with self._done:
+            return self._done.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self) -> dict:
+        with self._done:
+            return {
+                "received": self.received,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "queued": self._pending,
+                "held": len(self._held),
+                "last_error": self.last_error,
+            }
+
+
+telemetry_ingestor = TelemetryIngestor(
+    batch_size=settings.MOTIVE_WEBHOOK_BATCH_SIZE,
+    max_queue=settings.MOTIVE_WEBHOOK_QUEUE_SIZE,
+    retry_seconds=settings.MOTIVE_WEBHOOK_RETRY_SECONDS,
+)
@@ -0,0 +1,145 @@
+"""
+Parallel OCR for uploaded rate confirmations.
+
+PDFs with a usable text layer are read directly. Scanned PDFs are split into
+single-page documents and each page is rendered (grayscale, OCR_DPI) and
+OCR'd in a bounded process pool, so pages of one scan run in parallel and
+tesseract never blocks a request worker. Images are OCR'd in the same pool.
+
+Per-page failures (corrupt page, tesseract/poppler missing) yield empty text
+and are counted rather than failing the whole document.
+"""
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+from app.core.config import settings
+
+# PDFs whose text layer is shorter than this are treated as scans
+MIN_TEXT_LAYER_CHARS = 50
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    # Tesseract's OpenMP threads oversubscribe the CPU when pages already run in parallel
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def get_ocr_executor() -> Executor:
+    """Process pool shared by all OCR jobs in this worker, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def shutdown_ocr_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def ocr_pdf_page(page_pdf: bytes, dpi: int) -> str:
+    """Render a single-page PDF and OCR it (runs in a pool process)."""
+    import pytesseract  # type: ignore
+    from pdf2image import convert_from_bytes  # type: ignore
+
+    images = convert_from_bytes(page_pdf, dpi=dpi, grayscale=True, thread_count=1)
+    return "\n".join(pytesseract.image_to_string(image) or "" for image in images)
+
+
+def ocr_image(content: bytes) -> str:
+    """OCR a JPEG/PNG upload (runs in a pool process)."""
+    import pytesseract  # type: ignore
+    from PIL import Image
+
+    return pytesseract.image_to_string(Image.open(io.BytesIO(content))) or ""
+
+
+def read_pdf(content: bytes) -> Tuple[str, Optional[PdfReader]]:
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        return "\n".join([page.extract_text() or "" for page in reader.pages]), reader
+    except Exception:
+        return "", None
+
+
+def split_pdf_pages(reader: PdfReader) -> List[bytes]:
+    pages = []
+    for page in reader.pages:
+        writer = PdfWriter()
+        writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        pages.append(buffer.getvalue())
+    return pages
+
+
+def ocr_files(
+    files: List[Tuple[str, bytes, str]],
+    dpi: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, object]:
+    """
+    Extract text from (filename, content, content_type) uploads.
+
+    Returns the combined text (text layers first, then OCR output, in upload
+    and page order) with page counts and timing. progress(done, total) is
+    called as OCR pages finish.
+    """
+    started = time.perf_counter()
+    dpi = dpi or settings.OCR_DPI
+    executor = executor or get_ocr_executor()
+
+    text_parts: List[str] = []
+    tasks: List[tuple] = []  # (fn, *args) in output order
+    page_count = 0
+    for _filename, content, content_type in files:
+        if content_type == "application/pdf":
+            text, reader = read_pdf(content)
+            text_parts.append(text)
+            page_count += len(reader.pages) if reader else 0
+            if len(text.strip()) < MIN_TEXT_LAYER_CHARS and reader is not None:
+                tasks.extend((ocr_pdf_page, page, dpi) for page in split_pdf_pages(reader))
+        elif content_type in {"image/jpeg", "image/png"}:
+            page_count += 1
+            tasks.append((ocr_image, content))
+
+    futures = {executor.submit(*task): index for index, task in enumerate(tasks)}
+    ocr_parts = [""] * len(tasks)
+    errors = 0
+    for done, future in enumerate(as_completed(futures), start=1):
+        try:
+            ocr_parts[futures[future]] = future.result()
+        except Exception:
+            errors += 1
+        if progress:
+            progress(done, len(tasks))
+
+    combined = "\n".join(text_parts)
+    ocr_text = "\n".join(part for part in ocr_parts if part)
+    if ocr_text.strip():
+        combined = combined + "\n" + ocr_text
+    return {
+        "text": combined.strip(),
+        "page_count": page_count,
+        "ocr_pages": len(tasks),
+        "ocr_errors": errors,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
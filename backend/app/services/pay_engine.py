@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from typing import List
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
 
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 
 from app import models
+from app.services.payroll_reports import payroll_reports
+
+IN_CHUNK_SIZE = 500
+
+Line = models.SettlementLedgerLine
 
 
 class LedgerLineDraft:
@@ -20,20 +28,24 @@ def _percent(amount: float, rate: float) -> float:
     return round(amount * rate / 100.0, 2)
 
 
-def compute_load_ledger_lines(load: models.Load) -> List[LedgerLineDraft]:
+def _compute_lines(
+    rate_amount: Optional[float],
+    driver_payee_id: Optional[int],
+    pay_profile: Optional[models.DriverPayProfile],
+    additional_payees: Iterable[models.DriverAdditionalPayee],
+    charges: Iterable[models.LoadCharge],
+) -> List[LedgerLineDraft]:
     lines: List[LedgerLineDraft] = []
-    rate_amount = load.rate_amount or 0.0
+    rate_amount = rate_amount or 0.0
 
-    driver = load.driver
-    if not driver or not driver.payee_id:
+    if not driver_payee_id:
         return lines
 
-    pay_profile = driver.pay_profile
     if pay_profile and pay_profile.pay_type == "percent":
         driver_pay = _percent(rate_amount, pay_profile.rate)
         lines.append(
             LedgerLineDraft(
-                payee_id=driver.payee_id,
+                payee_id=driver_payee_id,
                 category="base_pay",
                 description=f"Freight % ({pay_profile.rate:.0f}%)",
                 amount=driver_pay,
@@ -43,7 +55,7 @@ def compute_load_ledger_lines(load: models.Load) -> List[LedgerLineDraft]:
         driver_pay = 0.0
 
     # Additional payees (equipment owner, etc.)
-    for additional in driver.additional_payees:
+    for additional in additional_payees:
         if not additional.active:
             continue
         owner_pay = _percent(rate_amount, additional.pay_rate_percent)
@@ -68,10 +80,10 @@ def compute_load_ledger_lines(load: models.Load) -> List[LedgerLineDraft]:
             )
 
     # Load charges as adjustments to driver payee
-    for charge in load.charges:
+    for charge in charges:
         lines.append(
             LedgerLineDraft(
-                payee_id=driver.payee_id,
+                payee_id=driver_payee_id,
                 category=charge.category,
                 description=charge.description or charge.category.replace("_", " ").title(),
                 amount=round(charge.amount, 2),
@@ -81,6 +93,42 @@ def compute_load_ledger_lines(load: models.Load) -> List[LedgerLineDraft]:
     return lines
 
 
+def active_pay_profiles(db: Session, driver_ids: Iterable[int]) -> Dict[int, models.DriverPayProfile]:
+    """Pay profile per driver id, for single and batch recalculation alike."""
+    profiles: Dict[int, models.DriverPayProfile] = {}
+    for chunk in _chunks(sorted(set(driver_ids))):
+        # Latest active profile wins; the pay-profile endpoint deactivates older ones
+        for profile in (
+            db.query(models.DriverPayProfile)
+            .filter(models.DriverPayProfile.driver_id.in_(chunk), models.DriverPayProfile.active == True)
+            .order_by(models.DriverPayProfile.id)
+        ):
+            profiles[profile.driver_id] = profile
+    return profiles
+
+
+def compute_load_ledger_lines(
+    load: models.Load, pay_profile: Optional[models.DriverPayProfile]
+) -> List[LedgerLineDraft]:
+    driver = load.driver
+    if not driver or not driver.payee_id:
+        return []
+    return _compute_lines(
+        load.rate_amount,
+        driver.payee_id,
+        pay_profile,
+        driver.additional_payees,
+        load.charges,
+    )
+
+
+def _refresh_rollups(db: Session, deleted: Iterable) -> None:
+    """Rebuild the period rollups of settlements that just lost ledger lines (caller commits)."""
+    settlement_ids = sorted({line.settlement_id for line in deleted if line.settlement_id is not None})
+    if settlement_ids:
+        payroll_reports.refresh_settlement_rollups(db, settlement_ids)
+
+
 def recalc_load_pay(db: Session, load: models.Load) -> List[models.SettlementLedgerLine]:
     existing = (
         db.query(models.SettlementLedgerLine)
@@ -90,12 +138,14 @@ def recalc_load_pay(db: Session, load: models.Load) -> List[models.SettlementLed
     locked = [line for line in existing if line.locked_at is not None]
     unlocked = [line for line in existing if line.locked_at is None]
 
-    computed = compute_load_ledger_lines(load)
+    pay_profile = active_pay_profiles(db, [load.driver_id]).get(load.driver_id) if load.driver_id else None
+    computed = compute_load_ledger_lines(load, pay_profile)
 
     if not locked:
         for line in unlocked:
             db.delete(line)
         db.flush()
+        _refresh_rollups(db, unlocked)
         created = []
         for draft in computed:
             created.append(
@@ -115,6 +165,7 @@ def recalc_load_pay(db: Session, load: models.Load) -> List[models.SettlementLed
     for line in unlocked:
         db.delete(line)
     db.flush()
+    _refresh_rollups(db, unlocked)
 
     locked_totals: dict[int, float] = {}
     for line in locked:
@@ -147,3 +198,216 @@ def recalc_load_pay(db: Session, load: models.Load) -> List[models.SettlementLed
         db.commit()
 
     return created
+
+
+def _chunks(values: List[int], size: int = IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _line_key(payee_id: int, category: str, description: Optional[str], amount: float) -> Tuple:
+    return (payee_id, category, description, round(amount or 0.0, 2))
+
+
+def _desired_lines(existing: List, computed: List[LedgerLineDraft]) -> Tuple[List[LedgerLineDraft], bool]:
+    """Lines a load should carry next to its locked lines (same rules as recalc_load_pay)."""
+    locked = [line for line in existing if line.locked_at is not None]
+    if not locked:
+        return computed, False
+
+    locked_totals: Dict[int, float] = defaultdict(float)
+    for line in locked:
+        locked_totals[line.payee_id] += line.amount
+    desired_totals: Dict[int, float] = defaultdict(float)
+    for draft in computed:
+        desired_totals[draft.payee_id] += draft.amount
+
+    adjustments = []
+    for payee_id, desired_total in desired_totals.items():
+        diff = round(desired_total - locked_totals.get(payee_id, 0.0), 2)
+        if abs(diff) < 0.01:
+            continue
+        adjustments.append(
+            LedgerLineDraft(
+                payee_id=payee_id,
+                category="adjustment",
+                description="Adjustment for locked settlement",
+                amount=diff,
+            )
+        )
+    return adjustments, True
+
+
+def _diff_load_lines(existing: List, desired: List[LedgerLineDraft]) -> Tuple[List, List[LedgerLineDraft], int]:
+    """Match desired drafts against the load's unlocked lines; returns (delete, create, unchanged)."""
+    reusable: Dict[Tuple, List] = defaultdict(list)
+    to_delete = []
+    for line in existing:
+        if line.locked_at is not None:
+            continue
+        if line.voided_at is not None:
+            to_delete.append(line)
+            continue
+        reusable[_line_key(line.payee_id, line.category, line.description, line.amount)].append(line)
+
+    to_create = []
+    unchanged = 0
+    for draft in desired:
+        matches = reusable.get(_line_key(draft.payee_id, draft.category, draft.description, draft.amount))
+        if matches:
+            matches.pop()
+            unchanged += 1
+        else:
+            to_create.append(draft)
+
+    for lines in reusable.values():
+        to_delete.extend(lines)
+    return to_delete, to_create, unchanged
+
+
+def recalc_loads_pay(
+    db: Session,
+    carrier_id: int,
+    load_ids: Optional[List[int]] = None,
+    driver_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Recalculate pay for many loads at once.
+
+    Loads are selected by id and/or driver and pickup date range. Drivers, pay
+    profiles, additional payees, charges and existing ledger lines are loaded
+    with one query each, computed lines are diffed against the existing
+    unlocked lines in memory, and only the differences are written with a
+    bulk DELETE and a bulk INSERT in one transaction. Unchanged lines keep
+    their ids (and any draft settlement they are attached to); settlements
+    that lose lines get their period rollups rebuilt in the same
+    transaction. With dry_run=True nothing is written and the diff is
+    returned.
+    """
+    load_query = db.query(models.Load.id, models.Load.load_number, models.Load.driver_id, models.Load.rate_amount).filter(
+        models.Load.carrier_id == carrier_id
+    )
+    if load_ids:
+        load_query = load_query.filter(models.Load.id.in_(load_ids))
+    if driver_id is not None:
+        load_query = load_query.filter(models.Load.driver_id == driver_id)
+    if date_from is not None:
+        load_query = load_query.filter(models.Load.pickup_date >= date_from)
+    if date_to is not None:
+        load_query = load_query.filter(models.Load.pickup_date <= date_to)
+    loads = load_query.order_by(models.Load.id).all()
+
+    result: Dict[str, Any] = {
+        "dry_run": dry_run,
+        "loads_checked": len(loads),
+        "loads_changed": 0,
+        "lines_created": 0,
+        "lines_deleted": 0,
+        "lines_unchanged": 0,
+        "changes": [],
+    }
+    if not loads:
+        return result
+
+    all_load_ids = [load.id for load in loads]
+    driver_ids = sorted({load.driver_id for load in loads if load.driver_id})
+
+    driver_payees: Dict[int, Optional[int]] = {}
+    profiles: Dict[int, models.DriverPayProfile] = {}
+    additional_by_driver: Dict[int, List[models.DriverAdditionalPayee]] = defaultdict(list)
+    if driver_ids:
+        driver_payees = dict(
+            db.query(models.Driver.id, models.Driver.payee_id)
+            .filter(models.Driver.id.in_(driver_ids), models.Driver.carrier_id == carrier_id)
+            .all()
+        )
+        profiles = active_pay_profiles(db, driver_ids)
+        for additional in (
+            db.query(models.DriverAdditionalPayee)
+            .filter(models.DriverAdditionalPayee.driver_id.in_(driver_ids))
+            .order_by(models.DriverAdditionalPayee.id)
+        ):
+            additional_by_driver[additional.driver_id].append(additional)
+
+    charges_by_load: Dict[int, List[models.LoadCharge]] = defaultdict(list)
+    existing_by_load: Dict[int, List] = defaultdict(list)
+    for chunk in _chunks(all_load_ids):
+        for charge in (
+            db.query(models.LoadCharge)
+            .filter(models.LoadCharge.load_id.in_(chunk))
+            .order_by(models.LoadCharge.id)
+        ):
+            charges_by_load[charge.load_id].append(charge)
+        for line in db.query(
+            Line.id, Line.load_id, Line.payee_id, Line.category, Line.description,
+            Line.amount, Line.locked_at, Line.voided_at, Line.settlement_id,
+        ).filter(Line.load_id.in_(chunk)):
+            existing_by_load[line.load_id].append(line)
+
+    deleted: List = []
+    insert_rows: List[Dict[str, Any]] = []
+    now = datetime.utcnow()
+    for load in loads:
+        existing = existing_by_load.get(load.id, [])
+        computed = _compute_lines(
+            load.rate_amount,
+            driver_payees.get(load.driver_id),
+            profiles.get(load.driver_id),
+            additional_by_driver.get(load.driver_id, []),
+            charges_by_load.get(load.id, []),
+        )
+        desired, is_adjustment = _desired_lines(existing, computed)
+        to_delete, to_create, unchanged = _diff_load_lines(existing, desired)
+        result["lines_unchanged"] += unchanged
+        if not to_delete and not to_create:
+            continue
+
+        adjustment_group = str(uuid4()) if is_adjustment and to_create else None
+        deleted.extend(to_delete)
+        insert_rows.extend(
+            {
+                "load_id": load.id,
+                "payee_id": draft.payee_id,
+                "category": draft.category,
+                "description": draft.description,
+                "amount": draft.amount,
+                "adjustment_group_id": adjustment_group,
+                "created_at": now,
+            }
+            for draft in to_create
+        )
+        result["loads_changed"] += 1
+        result["changes"].append({
+            "load_id": load.id,
+            "load_number": load.load_number,
+            "delete": [
+                {"id": line.id, "payee_id": line.payee_id, "category": line.category,
+                 "description": line.description, "amount": line.amount}
+                for line in to_delete
+            ],
+            "create": [
+                {"payee_id": draft.payee_id, "category": draft.category,
+                 "description": draft.description, "amount": draft.amount}
+                for draft in to_create
+            ],
+        })
+
+    result["lines_created"] = len(insert_rows)
+    result["lines_deleted"] = len(deleted)
+    if dry_run or not result["loads_changed"]:
+        return result
+
+    try:
+        for chunk in _chunks([line.id for line in deleted]):
+            db.execute(delete(Line).where(Line.id.in_(chunk)).execution_options(synchronize_session=False))
+        if insert_rows:
+            db.execute(insert(Line), insert_rows)
+        _refresh_rollups(db, deleted)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
@@ -2,10 +2,24 @@
 Payroll reporting service for generating various payroll analytics and reports.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, delete, distinct, insert, literal, select
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
 from app import models
+from app.services.address import format_city_state
+
+Line = models.SettlementLedgerLine
+
+# Settlement statuses that count toward year-to-date totals
+ROLLUP_STATUSES = ("approved", "paid", "exported")
+
+
+def _settlement_filters(carrier_id: int, start_date: datetime, end_date: datetime) -> list:
+    return [
+        models.Payee.carrier_id == carrier_id,
+        models.PayrollSettlement.period_start >= start_date,
+        models.PayrollSettlement.period_end <= end_date,
+    ]
 
 
 class PayrollReports:
@@ -23,54 +37,59 @@ class PayrollReports:
             - Average pay per driver
             - Breakdown by category
         """
-        # Get all settlements in date range
-        settlements = (
-            db.query(models.PayrollSettlement)
-            .join(models.Payee)
-            .filter(
-                models.Payee.carrier_id == carrier_id,
-                models.PayrollSettlement.period_start >= start_date,
-                models.PayrollSettlement.period_end <= end_date
+        settlement_filters = _settlement_filters(carrier_id, start_date, end_date)
+
+        # Status breakdown: settlements outer-joined to their lines, grouped by status
+        status_rows = (
+            db.query(
+                models.PayrollSettlement.status,
+                func.count(distinct(models.PayrollSettlement.id)),
+                func.coalesce(func.sum(Line.amount), 0.0),
+                func.count(Line.id),
             )
+            .join(models.Payee, models.PayrollSettlement.payee_id == models.Payee.id)
+            .outerjoin(Line, Line.settlement_id == models.PayrollSettlement.id)
+            .filter(*settlement_filters)
+            .group_by(models.PayrollSettlement.status)
             .all()
         )
-        
-        # Get all lines for these settlements
-        settlement_ids = [s.id for s in settlements]
-        lines = (
-            db.query(models.SettlementLedgerLine)
-            .filter(models.SettlementLedgerLine.settlement_id.in_(settlement_ids))
-            .all()
-        ) if settlement_ids else []
-        
-        # Calculate totals
-        total_paid = sum(float(line.amount) for line in lines)
-        
+
         # Category breakdown
-        category_totals = {}
-        for line in lines:
-            cat = line.category or "uncategorized"
-            if cat not in category_totals:
-                category_totals[cat] = 0
-            category_totals[cat] += float(line.amount)
-        
+        category_rows = (
+            db.query(
+                func.coalesce(Line.category, "uncategorized"),
+                func.sum(Line.amount),
+            )
+            .join(models.PayrollSettlement, Line.settlement_id == models.PayrollSettlement.id)
+            .join(models.Payee, models.PayrollSettlement.payee_id == models.Payee.id)
+            .filter(*settlement_filters)
+            .group_by(func.coalesce(Line.category, "uncategorized"))
+            .all()
+        )
+
         # Driver count (unique payees)
-        unique_payees = set(s.payee_id for s in settlements)
-        driver_count = len(unique_payees)
-        
+        driver_count = (
+            db.query(func.count(distinct(models.PayrollSettlement.payee_id)))
+            .join(models.Payee, models.PayrollSettlement.payee_id == models.Payee.id)
+            .filter(*settlement_filters)
+            .scalar()
+        ) or 0
+
+        status_breakdown = {}
+        total_paid = 0.0
+        settlement_count = 0
+        line_count = 0
+        for status, count, total, lines in status_rows:
+            status_breakdown[status] = {"count": count, "total": float(total)}
+            total_paid += float(total)
+            settlement_count += count
+            line_count += lines
+
+        category_totals = {category: float(total or 0) for category, total in category_rows}
+
         # Average per driver
         avg_per_driver = total_paid / driver_count if driver_count > 0 else 0
         
-        # Status breakdown
-        status_breakdown = {}
-        for s in settlements:
-            if s.status not in status_breakdown:
-                status_breakdown[s.status] = {"count": 0, "total": 0}
-            status_breakdown[s.status]["count"] += 1
-            # Calculate settlement total
-            s_lines = [l for l in lines if l.settlement_id == s.id]
-            status_breakdown[s.status]["total"] += sum(float(l.amount) for l in s_lines)
-        
         return {
             "period": {
                 "start": start_date.isoformat(),
@@ -78,10 +97,10 @@ class PayrollReports:
             },
             "summary": {
                 "total_paid": total_paid,
-                "settlement_count": len(settlements),
+                "settlement_count": settlement_count,
                 "driver_count": driver_count,
                 "average_per_driver": avg_per_driver,
-                "total_line_items": len(lines)
+                "total_line_items": line_count
             },
             "category_breakdown": category_totals,
             "status_breakdown": status_breakdown
@@ -99,9 +118,15 @@ class PayrollReports:
         if not driver:
             return {"error": "Driver not found"}
         
-        # Query settlements
-        query = db.query(models.PayrollSettlement).filter(
-            models.PayrollSettlement.payee_id == driver.payee_id
+        # Settlements with their totals in one grouped query
+        query = (
+            db.query(
+                models.PayrollSettlement,
+                func.coalesce(func.sum(Line.amount), 0.0),
+                func.count(Line.id),
+            )
+            .outerjoin(Line, Line.settlement_id == models.PayrollSettlement.id)
+            .filter(models.PayrollSettlement.payee_id == driver.payee_id)
         )
         
         if start_date:
@@ -109,35 +134,39 @@ class PayrollReports:
         if end_date:
             query = query.filter(models.PayrollSettlement.period_end <= end_date)
         
-        settlements = query.order_by(models.PayrollSettlement.period_start.desc()).all()
-        
-        # Build detailed history
-        history = []
-        total_earned = 0
-        
-        for settlement in settlements:
-            lines = (
-                db.query(models.SettlementLedgerLine)
-                .filter(models.SettlementLedgerLine.settlement_id == settlement.id)
+        settlements = (
+            query.group_by(models.PayrollSettlement.id)
+            .order_by(models.PayrollSettlement.period_start.desc())
+            .all()
+        )
+
+        # Every line for those settlements, with load info, in one query
+        lines_by_settlement: Dict[int, List[Dict[str, Any]]] = {}
+        settlement_ids = [settlement.id for settlement, _, _ in settlements]
+        if settlement_ids:
+            line_rows = (
+                db.query(
+                    Line,
+                    models.Load.load_number,
+                    models.Load.pickup_city,
+                    models.Load.pickup_state,
+                    models.Load.delivery_city,
+                    models.Load.delivery_state,
+                )
+                .outerjoin(models.Load, Line.load_id == models.Load.id)
+                .filter(Line.settlement_id.in_(settlement_ids))
+                .order_by(Line.id)
                 .all()
             )
-            
-            settlement_total = sum(float(line.amount) for line in lines)
-            total_earned += settlement_total if settlement.status == "paid" else 0
-            
-            line_details = []
-            for line in lines:
+            for line, load_number, pickup_city, pickup_state, delivery_city, delivery_state in line_rows:
                 load_info = None
-                if line.load_id:
-                    load = db.query(models.Load).filter(models.Load.id == line.load_id).first()
-                    if load:
-                        load_info = {
-                            "load_number": load.load_number,
-                            "pickup_location": load.pickup_location,
-                            "delivery_location": load.delivery_location
-                        }
-                
-                line_details.append({
+                if load_number is not None:
+                    load_info = {
+                        "load_number": load_number,
+                        "pickup_location": format_city_state(pickup_city, pickup_state),
+                        "delivery_location": format_city_state(delivery_city, delivery_state)
+                    }
+                lines_by_settlement.setdefault(line.settlement_id, []).append({
                     "id": line.id,
                     "category": line.category,
                     "description": line.description,
@@ -146,6 +175,20 @@ class PayrollReports:
                     "locked": line.locked_at is not None,
                     "created_at": line.created_at.isoformat() if line.created_at else None
                 })
+        
+        # Build detailed history
+        history = []
+        total_earned = 0.0
+        pending_amount = 0.0
+        paid_settlements = 0
+        
+        for settlement, settlement_total, line_count in settlements:
+            settlement_total = float(settlement_total)
+            if settlement.status == "paid":
+                total_earned += settlement_total
+                paid_settlements += 1
+            else:
+                pending_amount += settlement_total
             
             history.append({
                 "settlement_id": settlement.id,
@@ -154,8 +197,8 @@ class PayrollReports:
                 "status": settlement.status,
                 "paid_at": settlement.paid_at.isoformat() if settlement.paid_at else None,
                 "total": settlement_total,
-                "line_count": len(lines),
-                "lines": line_details
+                "line_count": line_count,
+                "lines": lines_by_settlement.get(settlement.id, [])
             })
         
         return {
@@ -167,8 +210,8 @@ class PayrollReports:
             "summary": {
                 "total_earned": total_earned,
                 "settlement_count": len(settlements),
-                "paid_settlements": len([s for s in settlements if s.status == "paid"]),
-                "pending_amount": sum(float(line.amount) for s in settlements if s.status != "paid" for line in db.query(models.SettlementLedgerLine).filter(models.SettlementLedgerLine.settlement_id == s.id).all())
+                "paid_settlements": paid_settlements,
+                "pending_amount": pending_amount
             },
             "history": history
         }
@@ -180,43 +223,50 @@ class PayrollReports:
         
         Shows all adjustment lines created during the period, grouped by reason.
         """
-        # Get all payees for this carrier
-        payees = db.query(models.Payee).filter(models.Payee.carrier_id == carrier_id).all()
-        payee_ids = [p.id for p in payees]
-        
-        # Get adjustment lines
-        adjustments = (
-            db.query(models.SettlementLedgerLine)
-            .filter(
-                models.SettlementLedgerLine.payee_id.in_(payee_ids),
-                models.SettlementLedgerLine.category == "adjustment",
-                models.SettlementLedgerLine.created_at >= start_date,
-                models.SettlementLedgerLine.created_at <= end_date
+        adjustment_filters = [
+            models.Payee.carrier_id == carrier_id,
+            Line.category == "adjustment",
+            Line.created_at >= start_date,
+            Line.created_at <= end_date,
+        ]
+
+        # Increase/decrease totals in one aggregate
+        summary = (
+            db.query(
+                func.count(Line.id),
+                func.coalesce(func.sum(case((Line.amount > 0, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Line.amount < 0, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Line.amount > 0, Line.amount), else_=0.0)), 0.0),
+                func.coalesce(func.sum(case((Line.amount < 0, -Line.amount), else_=0.0)), 0.0),
+                func.coalesce(func.sum(Line.amount), 0.0),
             )
+            .join(models.Payee, Line.payee_id == models.Payee.id)
+            .filter(*adjustment_filters)
+            .one()
+        )
+        total, increases, decreases, increase_amount, decrease_amount, net = summary
+
+        # Detail list with payee and load joined in
+        rows = (
+            db.query(Line, models.Payee.name, models.Load.load_number)
+            .join(models.Payee, Line.payee_id == models.Payee.id)
+            .outerjoin(models.Load, Line.load_id == models.Load.id)
+            .filter(*adjustment_filters)
+            .order_by(Line.created_at, Line.id)
             .all()
         )
-        
-        # Group by type (positive vs negative)
-        increases = [a for a in adjustments if a.amount > 0]
-        decreases = [a for a in adjustments if a.amount < 0]
-        
-        # Build detail list
-        adjustment_details = []
-        for adj in adjustments:
-            payee = db.query(models.Payee).filter(models.Payee.id == adj.payee_id).first()
-            load = None
-            if adj.load_id:
-                load = db.query(models.Load).filter(models.Load.id == adj.load_id).first()
-            
-            adjustment_details.append({
+        adjustment_details = [
+            {
                 "id": adj.id,
-                "payee_name": payee.name if payee else None,
-                "load_number": load.load_number if load else None,
+                "payee_name": payee_name,
+                "load_number": load_number,
                 "amount": float(adj.amount),
                 "description": adj.description,
                 "created_at": adj.created_at.isoformat() if adj.created_at else None,
                 "replaces_line_id": adj.replaces_line_id
-            })
+            }
+            for adj, payee_name, load_number in rows
+        ]
         
         return {
             "period": {
@@ -224,15 +274,134 @@ class PayrollReports:
                 "end": end_date.isoformat()
             },
             "summary": {
-                "total_adjustments": len(adjustments),
-                "increases_count": len(increases),
-                "decreases_count": len(decreases),
-                "total_increase_amount": sum(float(a.amount) for a in increases),
-                "total_decrease_amount": sum(abs(float(a.amount)) for a in decreases),
-                "net_adjustment": sum(float(a.amount) for a in adjustments)
+                "total_adjustments": total,
+                "increases_count": int(increases),
+                "decreases_count": int(decreases),
+                "total_increase_amount": float(increase_amount),
+                "total_decrease_amount": float(decrease_amount),
+                "net_adjustment": float(net)
             },
             "adjustments": adjustment_details
         }
+
+    @staticmethod
+    def refresh_settlement_rollups(db: Session, settlement_ids: List[int]) -> None:
+        """
+        Rebuild the payroll_period_rollups rows for the given settlements.
+
+        Called when a settlement is approved, paid, exported or voided, and
+        when pay recalculation deletes lines attached to a settlement. Adds
+        the DELETE and INSERT ... SELECT to the caller's transaction; the
+        caller commits.
+        """
+        db.flush()
+        db.execute(
+            delete(models.PayrollPeriodRollup)
+            .where(models.PayrollPeriodRollup.settlement_id.in_(settlement_ids))
+            .execution_options(synchronize_session=False)
+        )
+        category = func.coalesce(Line.category, "uncategorized")
+        aggregate = (
+            select(
+                models.PayrollSettlement.id,
+                models.Payee.carrier_id,
+                models.PayrollSettlement.payee_id,
+                models.PayrollSettlement.period_start,
+                models.PayrollSettlement.period_end,
+                models.PayrollSettlement.status,
+                category,
+                func.sum(Line.amount),
+                func.count(Line.id),
+                literal(datetime.utcnow()),
+            )
+            .join(models.Payee, models.PayrollSettlement.payee_id == models.Payee.id)
+            .join(Line, Line.settlement_id == models.PayrollSettlement.id)
+            .where(models.PayrollSettlement.id.in_(settlement_ids))
+            .group_by(
+                models.PayrollSettlement.id,
+                models.Payee.carrier_id,
+                models.PayrollSettlement.payee_id,
+                models.PayrollSettlement.period_start,
+                models.PayrollSettlement.period_end,
+                models.PayrollSettlement.status,
+                category,
+            )
+        )
+        db.execute(
+            insert(models.PayrollPeriodRollup).from_select(
+                [
+                    "settlement_id", "carrier_id", "payee_id", "period_start", "period_end",
+                    "status", "category", "total_amount", "line_count", "refreshed_at",
+                ],
+                aggregate,
+            )
+        )
+
+    @staticmethod
+    def generate_ytd_summary(db: Session, carrier_id: int, year: int) -> Dict[str, Any]:
+        """
+        Year-to-date totals for approved, paid and exported settlements.
+
+        Reads from payroll_period_rollups instead of the ledger lines.
+        """
+        Rollup = models.PayrollPeriodRollup
+        filters = [
+            Rollup.carrier_id == carrier_id,
+            Rollup.period_start >= datetime(year, 1, 1),
+            Rollup.period_start < datetime(year + 1, 1, 1),
+            Rollup.status.in_(ROLLUP_STATUSES),
+        ]
+
+        totals = (
+            db.query(
+                func.coalesce(func.sum(Rollup.total_amount), 0.0),
+                func.coalesce(func.sum(Rollup.line_count), 0),
+                func.count(distinct(Rollup.settlement_id)),
+                func.count(distinct(Rollup.payee_id)),
+            )
+            .filter(*filters)
+            .one()
+        )
+        category_rows = (
+            db.query(Rollup.category, func.sum(Rollup.total_amount))
+            .filter(*filters)
+            .group_by(Rollup.category)
+            .all()
+        )
+        payee_rows = (
+            db.query(
+                Rollup.payee_id,
+                models.Payee.name,
+                func.sum(Rollup.total_amount),
+                func.count(distinct(Rollup.settlement_id)),
+            )
+            .join(models.Payee, Rollup.payee_id == models.Payee.id)
+            .filter(*filters)
+            .group_by(Rollup.payee_id, models.Payee.name)
+            .order_by(func.sum(Rollup.total_amount).desc())
+            .all()
+        )
+
+        total_paid, line_count, settlement_count, payee_count = totals
+        return {
+            "year": year,
+            "summary": {
+                "total_paid": float(total_paid),
+                "settlement_count": settlement_count,
+                "payee_count": payee_count,
+                "total_line_items": int(line_count),
+            },
+            "category_breakdown": {category: float(total or 0) for category, total in category_rows},
+            "by_payee": [
+                {
+                    "payee_id": payee_id,
+                    "payee_name": name,
+                    "total": float(total or 0),
+                    "settlement_count": count,
+                }
+                for payee_id, name, total, count in payee_rows
+            ],
+        }
     
     @staticmethod
     def generate_recurring_items_report(db: Session, carrier_id: int) -> Dict[str, Any]:
@@ -10,46 +10,90 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from io import BytesIO
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+def _add_custom_styles(styles):
+    if 'CompanyName' in styles:
+        return
+    styles.add(ParagraphStyle(
+        name='CompanyName',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#0abf53'),
+        spaceAfter=6,
+        alignment=TA_LEFT
+    ))
+
+    styles.add(ParagraphStyle(
+        name='DocumentTitle',
+        parent=styles['Heading2'],
+        fontSize=18,
+        textColor=colors.HexColor('#1a1a1a'),
+        spaceAfter=12,
+        spaceBefore=12,
+        alignment=TA_CENTER
+    ))
+
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading3'],
+        fontSize=14,
+        textColor=colors.HexColor('#0abf53'),
+        spaceAfter=6,
+        spaceBefore=12
+    ))
+
+
+@lru_cache(maxsize=1)
+def shared_styles():
+    """Sample style sheet plus the custom styles, built once per process."""
+    styles = getSampleStyleSheet()
+    _add_custom_styles(styles)
+    return styles
+
+
+INVOICE_INFO_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+])
+
+INVOICE_ITEMS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0abf53')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+INVOICE_TOTALS_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
 
 
 class PDFGenerator:
     """Generate professional PDF documents"""
     
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
-    
+        # The style sheet is shared and never modified after it is built
+        self.styles = shared_styles()
+
     def setup_custom_styles(self):
         """Setup custom paragraph styles"""
-        self.styles.add(ParagraphStyle(
-            name='CompanyName',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#0abf53'),
-            spaceAfter=6,
-            alignment=TA_LEFT
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='DocumentTitle',
-            parent=self.styles['Heading2'],
-            fontSize=18,
-            textColor=colors.HexColor('#1a1a1a'),
-            spaceAfter=12,
-            spaceBefore=12,
-            alignment=TA_CENTER
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading3'],
-            fontSize=14,
-            textColor=colors.HexColor('#0abf53'),
-            spaceAfter=6,
-            spaceBefore=12
-        ))
-    
+        _add_custom_styles(self.styles)
+
     def generate_rate_confirmation(self, load_data: dict, carrier_info: dict) -> BytesIO:
         """
         Generate a Rate Confirmation PDF
@@ -283,6 +327,11 @@ class PDFGenerator:
         Returns:
             BytesIO buffer containing the PDF
         """
+        pdf_bytes, _ = self.render_invoice(invoice_data, carrier_info)
+        return BytesIO(pdf_bytes)
+
+    def render_invoice(self, invoice_data: dict, carrier_info: dict) -> Tuple[bytes, int]:
+        """Invoice PDF bytes and page count."""
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
         story = []
@@ -305,13 +354,7 @@ class PDFGenerator:
             ['Payment Terms:', invoice_data.get('payment_terms', 'Net 30')],
         ]
         info_table = Table(invoice_info, colWidths=[2*inch, 4*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        info_table.setStyle(INVOICE_INFO_STYLE)
         story.append(info_table)
         story.append(Spacer(1, 0.3*inch))
         
@@ -332,17 +375,8 @@ class PDFGenerator:
                 f"${item.get('amount', 0):,.2f}"
             ])
         
-        items_table = Table(line_items, colWidths=[3.5*inch, 0.75*inch, 1.25*inch, 1.25*inch])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0abf53')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
+        items_table = Table(line_items, colWidths=[3.5*inch, 0.75*inch, 1.25*inch, 1.25*inch], repeatRows=1)
+        items_table.setStyle(INVOICE_ITEMS_STYLE)
         story.append(items_table)
         story.append(Spacer(1, 0.3*inch))
         
@@ -355,14 +389,7 @@ class PDFGenerator:
             ['Balance Due:', f"${invoice_data.get('balance_due', 0):,.2f}"],
         ]
         totals_table = Table(totals_data, colWidths=[4.75*inch, 1.5*inch])
-        totals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        totals_table.setStyle(INVOICE_TOTALS_STYLE)
         story.append(totals_table)
         
         # Payment instructions
@@ -377,5 +404,42 @@ class PDFGenerator:
         story.append(Paragraph(footer_text, self.styles['Normal']))
         
         doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return buffer.getvalue(), doc.page
+
+
+def invoice_pdf_data(invoice, customer, line_items) -> dict:
+    """Plain invoice_data dict for PDFGenerator.render_invoice (picklable for the batch renderer)."""
+    return {
+        'invoice_number': invoice.invoice_number,
+        'invoice_date': invoice.invoice_date.strftime('%m/%d/%Y') if invoice.invoice_date else 'N/A',
+        'due_date': invoice.due_date.strftime('%m/%d/%Y') if invoice.due_date else 'N/A',
+        'payment_terms': invoice.payment_terms or 'Net 30',
+        'customer_name': customer.company_name if customer else 'N/A',
+        'subtotal': invoice.subtotal or 0,
+        'tax_amount': invoice.tax_amount or 0,
+        'total_amount': invoice.total_amount or 0,
+        'amount_paid': invoice.amount_paid or 0,
+        'balance_due': invoice.balance_due or 0,
+        'line_items': [
+            {
+                'description': item.description,
+                'quantity': item.quantity,
+                'unit_price': item.unit_price,
+                'amount': item.amount,
+            }
+            for item in line_items
+        ],
+    }
+
+
+@lru_cache(maxsize=1)
+def _generator() -> PDFGenerator:
+    return PDFGenerator()
+
+
+def generate_invoice_pdf(invoice, customer, line_items, carrier_name: str) -> bytes:
+    """Invoice PDF for ORM invoice/customer/line item rows."""
+    pdf_bytes, _ = _generator().render_invoice(
+        invoice_pdf_data(invoice, customer, line_items), {'company_name': carrier_name}
+    )
+    return pdf_bytes
@@ -1,8 +1,13 @@
+"""
+POD packet PDFs rendered from HTML in the shared headless browser
+(app.services.browser_pool). The template is compiled once at import.
+"""
 import io
 import base64
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from jinja2 import Template
-from app.services.dropbox_service import DropboxService
+from pypdf import PdfReader, PdfWriter
+from app.services.browser_pool import browser_pool
 
 
 PDF_TEMPLATE = """
@@ -196,26 +201,37 @@ PDF_TEMPLATE = """
 """
 
 
+POD_TEMPLATE = Template(PDF_TEMPLATE)
+
+POD_PDF_OPTIONS = {
+    "format": "Letter",
+    "margin": {"top": "0.5in", "bottom": "0.5in", "left": "0.5in", "right": "0.5in"},
+}
+
+
 class PDFService:
     """Service for PDF generation."""
     
     def __init__(self):
-        self.dropbox_service = DropboxService()
-    
-    async def generate_pod_pdf(
+        self._dropbox_service = None
+
+    @property
+    def dropbox_service(self):
+        # Created on first use so PDF rendering does not require Dropbox settings
+        if self._dropbox_service is None:
+            from app.services.dropbox import DropboxService
+            self._dropbox_service = DropboxService()
+        return self._dropbox_service
+
+    def render_pod_html(
         self,
         load_data: dict,
         pod_data: dict,
         company_data: dict,
         bol_image_data: Optional[bytes] = None,
         photo_image_data: Optional[bytes] = None,
-    ) -> bytes:
-        """Generate POD PDF using Playwright."""
-        try:
-            from playwright.async_api import async_playwright
-        except ImportError:
-            raise Exception("Playwright not installed. Run: pip install playwright && playwright install")
-        
+    ) -> str:
+        """Fill the POD template."""
         # Prepare template data
         context = {
             "company_name": company_data.get("company_name", "FleetFlow"),
@@ -240,27 +256,34 @@ class PDFService:
             "generated_date": self._get_current_date(),
         }
         
-        # Render template
-        template = Template(PDF_TEMPLATE)
-        html_content = template.render(**context)
-        
-        # Generate PDF using Playwright
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=["--no-sandbox", "--disable-setuid-sandbox"]
-            )
-            page = await browser.new_page(
-                viewport={"width": 850, "height": 1100}
-            )
-            await page.set_content(html_content)
-            pdf_bytes = await page.pdf(
-                format="Letter",
-                margin={"top": "0.5in", "bottom": "0.5in", "left": "0.5in", "right": "0.5in"}
-            )
-            await browser.close()
-        
-        return pdf_bytes
+        return POD_TEMPLATE.render(**context)
+
+    async def generate_pod_pdf(
+        self,
+        load_data: dict,
+        pod_data: dict,
+        company_data: dict,
+        bol_image_data: Optional[bytes] = None,
+        photo_image_data: Optional[bytes] = None,
+    ) -> bytes:
+        """Generate POD PDF in the shared browser."""
+        html_content = self.render_pod_html(load_data, pod_data, company_data, bol_image_data, photo_image_data)
+        return await browser_pool.render_pdf(html_content, **POD_PDF_OPTIONS)
+
+    async def generate_pod_packet(self, pods: List[dict]) -> bytes:
+        """
+        Render several PODs concurrently and merge them into one PDF.
+
+        Args:
+            pods: dicts of generate_pod_pdf keyword arguments
+        """
+        htmls = [self.render_pod_html(**pod) for pod in pods]
+        writer = PdfWriter()
+        for pdf_bytes in await browser_pool.render_many(htmls, **POD_PDF_OPTIONS):
+            writer.append(PdfReader(io.BytesIO(pdf_bytes)))
+        out = io.BytesIO()
+        writer.write(out)
+        return out.getvalue()
     
     def _image_to_data_uri(self, image_data: bytes) -> str:
         """Convert image bytes to data URI."""
@@ -0,0 +1,158 @@
+"""
+POD upload pipeline.
+
+The POD record and one pending DocumentExchange row per file are created
+before anything is sent, then files stream to Dropbox through
+DropboxService.upload_many() (bounded concurrency, upload sessions for
+large files). Each finished file updates its entry in PodRecord.file_status
+and its DocumentExchange row, so clients polling the POD or the job see
+files arrive one by one and a failed file does not lose the others. Those
+writes happen on a status thread that commits whatever has finished since
+its last commit, so database round trips never hold up the upload event
+loop.
+
+For background uploads the request spools its UploadFiles to a temporary
+directory in chunks (UploadFile objects are closed once the response is
+sent); the job streams from there and removes the directory when done.
+"""
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from typing import BinaryIO, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import DocumentExchange, PodRecord
+from app.services.dropbox import DropboxService
+
+SIGNATURE_FILENAME = "signature.png"
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+def spool_uploads(items: Sequence[Tuple[str, BinaryIO]]) -> Tuple[str, List[Tuple[str, str]]]:
+    """Copy (filename, file object) pairs to a temp dir in chunks; returns (dir, [(filename, path)])."""
+    directory = tempfile.mkdtemp(prefix="pod-upload-")
+    spooled = []
+    for index, (filename, fileobj) in enumerate(items):
+        path = os.path.join(directory, str(index))
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, SPOOL_CHUNK_SIZE)
+        spooled.append((filename, path))
+    return directory, spooled
+
+
+def _pod_status(file_status: List[dict]) -> str:
+    uploaded = sum(1 for entry in file_status if entry["status"] == "uploaded")
+    if uploaded == len(file_status):
+        return "completed"
+    return "partial" if uploaded else "failed"
+
+
+def complete_pod_upload(
+    db: Session,
+    pod_id: int,
+    items: Sequence[Tuple[str, BinaryIO]],
+    base_path: str,
+    document_ids: Sequence[Optional[int]],
+    has_signature: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Upload items for an existing POD record; with has_signature the last
+    item is the signature. document_ids[i] is the DocumentExchange row for
+    items[i] (or None). File statuses are committed as uploads finish.
+    """
+    pod = db.get(PodRecord, pod_id)
+    pod.upload_status = "uploading"
+    db.commit()
+
+    def apply(index: int, result: dict) -> None:
+        file_status = list(pod.file_status or [])
+        file_status[index] = {key: result[key] for key in ("filename", "status", "url", "bytes", "error")}
+        pod.file_status = file_status
+        document_id = document_ids[index] if index < len(document_ids) else None
+        if document_id:
+            document = db.get(DocumentExchange, document_id)
+            document.upload_status = "completed" if result["status"] == "uploaded" else "failed"
+            document.attachment_url = result["url"] or ""
+            document.upload_error = result["error"]
+            document.updated_at = datetime.utcnow()
+
+    # upload_many() calls on_result on its event loop; the session is only
+    # touched by the status thread until it is joined
+    finished: "queue.Queue[Optional[Tuple[int, dict]]]" = queue.Queue()
+    errors: List[BaseException] = []
+
+    def write_statuses() -> None:
+        done, closing = 0, False
+        while not closing:
+            batch = [finished.get()]
+            while True:
+                try:
+                    batch.append(finished.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for entry in batch:
+                    if entry is None:
+                        closing = True
+                    elif not errors:
+                        apply(*entry)
+                        done += 1
+                if not errors:
+                    db.commit()
+                    if progress:
+                        progress(done, len(items))
+            except Exception as e:
+                db.rollback()
+                errors.append(e)
+
+    writer = threading.Thread(target=write_statuses, name="pod-upload-status", daemon=True)
+    writer.start()
+    try:
+        results = DropboxService().upload_many(
+            list(items), base_path, on_result=lambda index, result: finished.put((index, result))
+        )
+    finally:
+        finished.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+    file_results = results[:-1] if has_signature else results
+    pod.file_links = [result["url"] for result in file_results if result["status"] == "uploaded"]
+    if has_signature and results[-1]["status"] == "uploaded":
+        pod.signature_link = results[-1]["url"]
+    pod.upload_status = _pod_status(pod.file_status)
+    db.commit()
+    return {
+        "pod_id": pod.id,
+        "upload_status": pod.upload_status,
+        "links": pod.file_links,
+        "signature_link": pod.signature_link,
+        "files": pod.file_status,
+    }
+
+
+def complete_spooled_upload(db: Session, pod_id: int, directory: str, spooled: Sequence[Tuple[str, str]],
+                            base_path: str, document_ids: Sequence[Optional[int]], has_signature: bool = False,
+                            progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """complete_pod_upload() from spool_uploads() output; the spool directory is removed afterwards."""
+    handles = []
+    try:
+        for filename, path in spooled:
+            handles.append((filename, open(path, "rb")))
+        return complete_pod_upload(db, pod_id, handles, base_path, document_ids, has_signature, progress)
+    except Exception:
+        pod = db.get(PodRecord, pod_id)
+        if pod is not None:
+            pod.upload_status = "failed"
+            db.commit()
+        raise
+    finally:
+        for _, handle in handles:
+            handle.close()
+        shutil.rmtree(directory, ignore_errors=True)
@@ -3,11 +3,17 @@ QuickBooks Online API integration for payroll export.
 Supports OAuth 2.0 authentication and journal entry creation for settlements.
 """
 import os
-import requests
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from decimal import Decimal
 
+from app.core.http_client import http_client
+
+QB_TOKEN_URL = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
+
+# QuickBooks Online allows 500 requests/minute per realm
+quickbooks_http = http_client("quickbooks", timeout=30, rate_per_second=8, burst=8)
+
 
 class QuickBooksService:
     """
@@ -55,16 +61,14 @@ class QuickBooksService:
     
     def exchange_code_for_tokens(self, code: str) -> Dict[str, str]:
         """Exchange authorization code for access and refresh tokens."""
-        token_url = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
-        
         data = {
             "grant_type": "authorization_code",
             "code": code,
             "redirect_uri": self.redirect_uri
         }
         
-        response = requests.post(
-            token_url,
+        response = quickbooks_http.post(
+            QB_TOKEN_URL,
             auth=(self.client_id, self.client_secret),
             data=data,
             headers={"Accept": "application/json"}
@@ -82,15 +86,13 @@ class QuickBooksService:
     
     def refresh_access_token(self) -> Dict[str, str]:
         """Refresh the access token using refresh token."""
-        token_url = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
-        
         data = {
             "grant_type": "refresh_token",
             "refresh_token": self.refresh_token
         }
         
-        response = requests.post(
-            token_url,
+        response = quickbooks_http.post(
+            QB_TOKEN_URL,
             auth=(self.client_id, self.client_secret),
             data=data,
             headers={"Accept": "application/json"}
@@ -120,21 +122,16 @@ class QuickBooksService:
             "Content-Type": "application/json"
         }
         
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        else:
+        if method not in ("GET", "POST"):
             raise ValueError(f"Unsupported method: {method}")
         
+        response = quickbooks_http.request(method, url, headers=headers, json=data)
+        
         if response.status_code == 401:
             # Token expired, refresh and retry
             self.refresh_access_token()
             headers["Authorization"] = f"Bearer {self.access_token}"
-            if method == "GET":
-                response = requests.get(url, headers=headers)
-            elif method == "POST":
-                response = requests.post(url, headers=headers, json=data)
+            response = quickbooks_http.request(method, url, headers=headers, json=data)
         
         if response.status_code in [200, 201]:
             return response.json()
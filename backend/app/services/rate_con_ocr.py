@@ -2,65 +2,189 @@
 AI-powered OCR service for rate confirmation extraction
 """
 import re
-from typing import Dict, Any, Optional, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import pytesseract
 from PIL import Image
 import io
 
 
+# Field patterns in priority order, each with the confidence of a match.
+# Every pattern must start with a literal label (see FieldExtractor).
+RATE_CON_FIELDS: Dict[str, List[Tuple[str, float]]] = {
+    # Load number patterns
+    "load_number": [
+        (r"Load\s*#?\s*:?\s*([A-Z0-9\-]+)", 0.9),
+        (r"Load\s*Number\s*:?\s*([A-Z0-9\-]+)", 0.9),
+        (r"Load\s*ID\s*:?\s*([A-Z0-9\-]+)", 0.85),
+        (r"Reference\s*#?\s*:?\s*([A-Z0-9\-]+)", 0.6),
+    ],
+    # Broker/Carrier name patterns
+    "broker_name": [
+        (r"Broker\s*:?\s*([A-Z][A-Za-z\s&\.,]+?)(?:\n|MC|DOT)", 0.9),
+        (r"Carrier\s*:?\s*([A-Z][A-Za-z\s&\.,]+?)(?:\n|MC|DOT)", 0.5),
+        (r"Company\s*:?\s*([A-Z][A-Za-z\s&\.,]+?)(?:\n|MC|DOT)", 0.6),
+    ],
+    # MC number patterns
+    "mc_number": [
+        (r"MC\s*#?\s*:?\s*(\d{5,7})", 0.95),
+        (r"MC-(\d{5,7})", 0.95),
+        (r"Motor\s*Carrier\s*#?\s*:?\s*(\d{5,7})", 0.9),
+    ],
+    # DOT number patterns
+    "dot_number": [
+        (r"DOT\s*#?\s*:?\s*(\d{5,8})", 0.95),
+        (r"DOT-(\d{5,8})", 0.95),
+        (r"USDOT\s*#?\s*:?\s*(\d{5,8})", 0.95),
+    ],
+    # Rate amount patterns
+    "rate_amount": [
+        (r"\$\s*([0-9,]+\.?\d{0,2})\s*(?:USD|Total|Rate)", 0.9),
+        (r"Rate\s*:?\s*\$\s*([0-9,]+\.?\d{0,2})", 0.9),
+        (r"Amount\s*:?\s*\$\s*([0-9,]+\.?\d{0,2})", 0.8),
+        (r"Total\s*:?\s*\$\s*([0-9,]+\.?\d{0,2})", 0.8),
+    ],
+    # PO number patterns
+    "po_number": [
+        (r"PO\s*#?\s*:?\s*([A-Z0-9\-]+)", 0.85),
+        (r"Purchase\s*Order\s*:?\s*([A-Z0-9\-]+)", 0.9),
+    ],
+    # Date patterns
+    "pickup_date": [
+        (r"Pickup\s*Date\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 0.9),
+        (r"Pick\s*Up\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 0.85),
+    ],
+    "delivery_date": [
+        (r"Delivery\s*Date\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 0.9),
+        (r"Drop\s*Off\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 0.85),
+    ],
+}
+
+ADDRESS_RE = re.compile(
+    r"([A-Z][A-Za-z\s&\.,]{3,50})\n([0-9]+\s+[A-Za-z\s\.]{3,50})\n([A-Za-z\s]+),\s*([A-Z]{2})\s*(\d{5})",
+    re.MULTILINE,
+)
+
+
+def is_amount(value: str) -> bool:
+    try:
+        return float(value.replace(",", "").lstrip("$")) > 0
+    except ValueError:
+        return False
+
+
+def is_date(value: str) -> bool:
+    for fmt in ("%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%m-%d-%y"):
+        try:
+            datetime.strptime(value, fmt)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+FIELD_VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "rate_amount": is_amount,
+    "pickup_date": is_date,
+    "delivery_date": is_date,
+}
+
+
+def _literal_label(pattern: str) -> str:
+    """Leading literal text of a pattern, lowercased ("Load\\s*#" -> "load", "(\\$[\\d" -> "$")."""
+    label = []
+    i = 0
+    while i < len(pattern) and pattern[i] == "(" and not pattern.startswith("(?", i):
+        i += 1
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            label.append(pattern[i + 1])
+            i += 2
+        elif char.isalnum() or char in " -#:":
+            label.append(char)
+            i += 1
+        else:
+            break
+    # A following quantifier applies to the last literal character only
+    if i < len(pattern) and pattern[i] in "?*{" and label:
+        label.pop()
+    return "".join(label).lower()
+
+
+class FieldExtractor:
+    """
+    Extract labelled fields from rate-con text with patterns compiled once.
+
+    Every pattern starts with a literal label ("load", "mc", "$", ...). The
+    text is lowercased once, and each pattern is only tried, via match(), at
+    positions where its label occurs (found with str.find). It never scans
+    the document with the regex engine. A field takes its highest-priority
+    pattern's earliest match, as calling re.search per pattern in order
+    would. Labels glued to a preceding letter or digit ("po" in "tempor")
+    are skipped.
+
+    One alternation over all labels reads the text only once, but CPython's
+    re runs it slower than several C-level substring searches.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, List[Tuple[str, float]]],
+        flags: int = re.IGNORECASE,
+        validators: Optional[Dict[str, Callable[[str], bool]]] = None,
+    ):
+        self.validators = validators or {}
+        self._fields = []  # (field, [(label, compiled, confidence), ...]) in priority order
+        for field, entries in fields.items():
+            compiled = []
+            for pattern, confidence in entries:
+                label = _literal_label(pattern)
+                if not label:
+                    raise ValueError(f"Pattern for {field} must start with a literal label: {pattern}")
+                compiled.append((label, re.compile(pattern, flags), confidence))
+            self._fields.append((field, compiled))
+
+    def extract(self, text: str) -> Dict[str, Dict[str, Any]]:
+        """{field: {"value": str, "confidence": float}} for every field found."""
+        lowered = text.lower()
+        find = lowered.find
+        # lower() can change offsets for some non-ASCII text; fall back to plain searches
+        indexed = len(lowered) == len(text)
+
+        results = {}
+        for field, entries in self._fields:
+            for label, compiled, confidence in entries:
+                if not indexed:
+                    match = compiled.search(text)
+                else:
+                    match = None
+                    word_label = label[0].isalnum()
+                    start = find(label)
+                    while start != -1:
+                        if not (word_label and start and lowered[start - 1].isalnum()):
+                            match = compiled.match(text, start)
+                            if match:
+                                break
+                        start = find(label, start + 1)
+                if match:
+                    value = match.group(1).strip()
+                    validator = self.validators.get(field)
+                    if validator and not validator(value):
+                        confidence *= 0.5
+                    results[field] = {"value": value, "confidence": round(confidence, 2)}
+                    break
+        return results
+
+
+rate_con_extractor = FieldExtractor(RATE_CON_FIELDS, re.IGNORECASE | re.MULTILINE, FIELD_VALIDATORS)
+
+
 class RateConfirmationOCR:
     """Extract structured data from rate confirmation PDFs"""
     
-    def __init__(self):
-        self.patterns = {
-            # Load number patterns
-            "load_number": [
-                r"Load\s*#?\s*:?\s*([A-Z0-9\-]+)",
-                r"Load\s*Number\s*:?\s*([A-Z0-9\-]+)",
-                r"Load\s*ID\s*:?\s*([A-Z0-9\-]+)",
-                r"Reference\s*#?\s*:?\s*([A-Z0-9\-]+)",
-            ],
-            # Broker/Carrier name patterns
-            "broker_name": [
-                r"Broker\s*:?\s*([A-Z][A-Za-z\s&\.,]+?)(?:\n|MC|DOT)",
-                r"Carrier\s*:?\s*([A-Z][A-Za-z\s&\.,]+?)(?:\n|MC|DOT)",
-                r"Company\s*:?\s*([A-Z][A-Za-z\s&\.,]+?)(?:\n|MC|DOT)",
-            ],
-            # MC number patterns
-            "mc_number": [
-                r"MC\s*#?\s*:?\s*(\d{5,7})",
-                r"MC-(\d{5,7})",
-                r"Motor\s*Carrier\s*#?\s*:?\s*(\d{5,7})",
-            ],
-            # DOT number patterns
-            "dot_number": [
-                r"DOT\s*#?\s*:?\s*(\d{5,8})",
-                r"DOT-(\d{5,8})",
-                r"USDOT\s*#?\s*:?\s*(\d{5,8})",
-            ],
-            # Rate amount patterns
-            "rate_amount": [
-                r"\$\s*([0-9,]+\.?\d{0,2})\s*(?:USD|Total|Rate)",
-                r"Rate\s*:?\s*\$\s*([0-9,]+\.?\d{0,2})",
-                r"Amount\s*:?\s*\$\s*([0-9,]+\.?\d{0,2})",
-                r"Total\s*:?\s*\$\s*([0-9,]+\.?\d{0,2})",
-            ],
-            # PO number patterns
-            "po_number": [
-                r"PO\s*#?\s*:?\s*([A-Z0-9\-]+)",
-                r"Purchase\s*Order\s*:?\s*([A-Z0-9\-]+)",
-            ],
-            # Date patterns
-            "pickup_date": [
-                r"Pickup\s*Date\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})",
-                r"Pick\s*Up\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})",
-            ],
-            "delivery_date": [
-                r"Delivery\s*Date\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})",
-                r"Drop\s*Off\s*:?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})",
-            ],
-        }
+    def __init__(self, extractor: Optional[FieldExtractor] = None):
+        self.extractor = extractor or rate_con_extractor
     
     def extract_from_image(self, image_bytes: bytes) -> Dict[str, Any]:
         """
@@ -97,12 +221,13 @@ class RateConfirmationOCR:
             "confidence_scores": {},
         }
         
-        # Extract each field
-        for field_name, patterns in self.patterns.items():
-            result = self._extract_field(text, patterns)
-            if result:
-                extracted["data"][field_name] = result["value"]
-                extracted["confidence_scores"][field_name] = result["confidence"]
+        # One substring search per pattern label, tried in priority order per field
+        for field_name, result in self.extractor.extract(text).items():
+            value = result["value"]
+            if field_name == "rate_amount":
+                value = value.replace(",", "")
+            extracted["data"][field_name] = value
+            extracted["confidence_scores"][field_name] = result["confidence"]
         
         # Extract addresses (more complex)
         addresses = self._extract_addresses(text)
@@ -119,24 +244,6 @@ class RateConfirmationOCR:
         
         return extracted
     
-    def _extract_field(self, text: str, patterns: List[str]) -> Optional[Dict[str, Any]]:
-        """Extract a single field using multiple patterns"""
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                value = match.group(1).strip()
-                
-                # Clean up the value
-                if "amount" in pattern.lower():
-                    value = value.replace(",", "")
-                
-                return {
-                    "value": value,
-                    "confidence": 0.9,  # High confidence when pattern matches
-                }
-        
-        return None
-    
     def _extract_addresses(self, text: str) -> List[Dict[str, str]]:
         """
         Extract pickup and delivery addresses from text
@@ -145,11 +252,7 @@ class RateConfirmationOCR:
         addresses = []
         
         # Look for address blocks (company name, street, city, state, zip)
-        address_pattern = r"([A-Z][A-Za-z\s&\.,]{3,50})\n([0-9]+\s+[A-Za-z\s\.]{3,50})\n([A-Za-z\s]+),\s*([A-Z]{2})\s*(\d{5})"
-        
-        matches = re.finditer(address_pattern, text, re.MULTILINE)
-        
-        for match in matches:
+        for match in ADDRESS_RE.finditer(text):
             company, street, city, state, zip_code = match.groups()
             addresses.append({
                 "company": company.strip(),
@@ -0,0 +1,136 @@
+"""
+Two-level cache for driving distances between coordinate pairs.
+
+Each leg is keyed by profile plus origin/destination rounded to
+ROUTE_CACHE_PRECISION decimals, so the same lane resolves to the same key
+no matter which load it belongs to. Only distance and duration are stored;
+route geometry is fetched on demand for map views and never cached.
+
+Writes go through the caller's session; the caller commits.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import RouteLegCacheEntry
+from app.utils.upsert import upsert
+
+Coordinate = Tuple[float, float]  # (lon, lat)
+Leg = Tuple[float, float]  # (distance_meters, duration_seconds)
+
+
+class RouteLegCache:
+    def __init__(self, maxsize: int, ttl_seconds: float, max_age_days: int, precision: int):
+        self.memory = TTLCache(ttl_seconds=ttl_seconds, maxsize=maxsize)
+        self.max_age = timedelta(days=max_age_days)
+        self.precision = precision
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _incr(self, name: str, amount: int = 1) -> None:
+        if amount:
+            with self._lock:
+                setattr(self, name, getattr(self, name) + amount)
+
+    def _round(self, point: Coordinate) -> Coordinate:
+        return round(point[0], self.precision), round(point[1], self.precision)
+
+    def leg_key(self, origin: Coordinate, destination: Coordinate, profile: str = "driving") -> str:
+        (olon, olat), (dlon, dlat) = self._round(origin), self._round(destination)
+        return f"{profile}:{olon},{olat};{dlon},{dlat}"
+
+    def get_many(
+        self,
+        db: Optional[Session],
+        pairs: Iterable[Tuple[Coordinate, Coordinate]],
+        profile: str = "driving",
+    ) -> Dict[str, Leg]:
+        """Cached legs by leg_key for the given (origin, destination) pairs; misses are absent."""
+        keys = list(dict.fromkeys(self.leg_key(o, d, profile) for o, d in pairs))
+        found: Dict[str, Leg] = {}
+        for key in keys:
+            value = self.memory.get(key)
+            if value is not None:
+                found[key] = value
+        self._incr("memory_hits", len(found))
+
+        remaining = [key for key in keys if key not in found]
+        if db is not None and remaining:
+            cutoff = datetime.utcnow() - self.max_age
+            rows = db.query(
+                RouteLegCacheEntry.leg_key,
+                RouteLegCacheEntry.distance_meters,
+                RouteLegCacheEntry.duration_seconds,
+            ).filter(
+                RouteLegCacheEntry.leg_key.in_(remaining),
+                RouteLegCacheEntry.updated_at >= cutoff,
+            ).all()
+            for key, distance, duration in rows:
+                found[key] = (distance, duration)
+                self.memory.set(key, (distance, duration))
+            self._incr("db_hits", len(rows))
+
+        self._incr("misses", len(keys) - len(found))
+        return found
+
+    def put_many(
+        self,
+        db: Optional[Session],
+        legs: List[Tuple[Coordinate, Coordinate, Leg]],
+        profile: str = "driving",
+    ) -> None:
+        """Store (origin, destination, (meters, seconds)) legs in memory and, with a session, in the table."""
+        now = datetime.utcnow()
+        rows = {}
+        for origin, destination, (distance, duration) in legs:
+            key = self.leg_key(origin, destination, profile)
+            self.memory.set(key, (distance, duration))
+            (olon, olat), (dlon, dlat) = self._round(origin), self._round(destination)
+            rows[key] = {
+                "leg_key": key,
+                "profile": profile,
+                "origin_longitude": olon,
+                "origin_latitude": olat,
+                "destination_longitude": dlon,
+                "destination_latitude": dlat,
+                "distance_meters": distance,
+                "duration_seconds": duration,
+                "created_at": now,
+                "updated_at": now,
+            }
+        if db is not None and rows:
+            upsert(
+                db,
+                RouteLegCacheEntry,
+                list(rows.values()),
+                conflict_columns=["leg_key"],
+                update_columns=["distance_meters", "duration_seconds", "updated_at"],
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+                "memory_size": self.memory.stats()["size"],
+            }
+
+    def clear_memory(self) -> None:
+        self.memory.clear()
+
+
+route_cache = RouteLegCache(
+    maxsize=settings.ROUTE_CACHE_SIZE,
+    ttl_seconds=settings.ROUTE_CACHE_TTL,
+    max_age_days=settings.ROUTE_CACHE_MAX_AGE_DAYS,
+    precision=settings.ROUTE_CACHE_PRECISION,
+)
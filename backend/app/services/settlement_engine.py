@@ -0,0 +1,224 @@
+"""
+Set-based batch settlement engine.
+
+Creates settlements for many payees with a fixed number of statements:
+one INSERT for the settlements, one correlated UPDATE that attaches every
+pending ledger line to its payee's new settlement, one INSERT for due
+recurring items, one UPDATE per recurring schedule, and one aggregate for
+per-payee totals. Everything runs in a single transaction; notification
+emails go out after commit.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.email_service import EmailService
+
+SCHEDULE_INTERVALS = {
+    "weekly": timedelta(days=7),
+    "biweekly": timedelta(days=14),
+    "monthly": timedelta(days=30),
+}
+
+Line = models.SettlementLedgerLine
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def _pending_filters() -> list:
+    return [
+        Line.settlement_id.is_(None),
+        Line.locked_at.is_(None),
+        Line.voided_at.is_(None),
+    ]
+
+
+def _recurring_amount(item_type: str, amount: float) -> float:
+    if item_type in ["deduction", "loan"]:
+        return -abs(amount)
+    if item_type in ["addition", "bonus"]:
+        return abs(amount)
+    return amount
+
+
+def run_batch_settlements(
+    db: Session,
+    carrier_id: int,
+    period_start: datetime,
+    period_end: datetime,
+    payee_ids: Optional[List[int]] = None,
+    progress: Optional[ProgressCallback] = None,
+    notify: bool = True,
+) -> Dict[str, Any]:
+    """Create draft settlements for every payee (or the given payees) with pending lines."""
+    steps = 6
+
+    def report(step: int, message: str):
+        if progress:
+            progress(step, steps, message)
+
+    # 1. Payees with pending lines
+    report(0, "Selecting payees with pending lines")
+    payee_query = (
+        db.query(models.Payee.id, models.Payee.name)
+        .join(Line, Line.payee_id == models.Payee.id)
+        .filter(models.Payee.carrier_id == carrier_id, *_pending_filters())
+        .group_by(models.Payee.id, models.Payee.name)
+        .order_by(models.Payee.id)
+    )
+    if payee_ids:
+        payee_query = payee_query.filter(models.Payee.id.in_(payee_ids))
+    payees = payee_query.all()
+    if not payees:
+        return {"settlements_created": 0, "total_amount": 0, "settlements": []}
+    payee_names = {payee_id: name for payee_id, name in payees}
+    target_ids = list(payee_names)
+
+    # 2. Settlements, one row per payee
+    report(1, f"Creating {len(target_ids)} settlements")
+    now = datetime.utcnow()
+    settlement_rows = db.execute(
+        insert(models.PayrollSettlement).returning(
+            models.PayrollSettlement.id, models.PayrollSettlement.payee_id
+        ),
+        [
+            {
+                "payee_id": payee_id,
+                "period_start": period_start,
+                "period_end": period_end,
+                "status": "draft",
+                "created_at": now,
+            }
+            for payee_id in target_ids
+        ],
+    ).all()
+    settlement_by_payee = {row.payee_id: row.id for row in settlement_rows}
+    settlement_ids = list(settlement_by_payee.values())
+
+    # 3. Attach pending lines to their payee's new settlement
+    report(2, "Attaching pending ledger lines")
+    new_settlement_id = (
+        select(models.PayrollSettlement.id)
+        .where(
+            models.PayrollSettlement.payee_id == Line.payee_id,
+            models.PayrollSettlement.id.in_(settlement_ids),
+        )
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Line)
+        .where(Line.payee_id.in_(target_ids), *_pending_filters())
+        .values(settlement_id=new_settlement_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    # 4. Due recurring items for each payee's driver
+    report(3, "Adding recurring items")
+    due_items = (
+        db.query(
+            models.RecurringSettlementItem.id,
+            models.RecurringSettlementItem.payee_id,
+            models.RecurringSettlementItem.item_type,
+            models.RecurringSettlementItem.amount,
+            models.RecurringSettlementItem.description,
+            models.RecurringSettlementItem.schedule,
+        )
+        .join(models.Driver, models.Driver.id == models.RecurringSettlementItem.driver_id)
+        .filter(
+            models.Driver.payee_id == models.RecurringSettlementItem.payee_id,
+            models.RecurringSettlementItem.payee_id.in_(target_ids),
+            models.RecurringSettlementItem.active == True,
+            or_(
+                models.RecurringSettlementItem.next_date.is_(None),
+                models.RecurringSettlementItem.next_date <= period_end,
+            ),
+        )
+        .all()
+    )
+    if due_items:
+        db.execute(
+            insert(Line),
+            [
+                {
+                    "load_id": None,
+                    "payee_id": item.payee_id,
+                    "settlement_id": settlement_by_payee[item.payee_id],
+                    "category": item.item_type,
+                    "description": item.description or item.item_type.replace("_", " ").title(),
+                    "amount": _recurring_amount(item.item_type, item.amount),
+                    "created_at": now,
+                }
+                for item in due_items
+            ],
+        )
+        for schedule, interval in SCHEDULE_INTERVALS.items():
+            item_ids = [item.id for item in due_items if item.schedule == schedule]
+            if item_ids:
+                db.execute(
+                    update(models.RecurringSettlementItem)
+                    .where(models.RecurringSettlementItem.id.in_(item_ids))
+                    .values(next_date=period_end + interval)
+                    .execution_options(synchronize_session=False)
+                )
+
+    # 5. Per-settlement totals in one aggregate
+    report(4, "Computing settlement totals")
+    totals = {
+        settlement_id: (float(total or 0), line_count)
+        for settlement_id, total, line_count in db.query(
+            Line.settlement_id, func.sum(Line.amount), func.count(Line.id)
+        )
+        .filter(Line.settlement_id.in_(settlement_ids))
+        .group_by(Line.settlement_id)
+        .all()
+    }
+
+    db.commit()
+
+    created_settlements = []
+    total_amount = 0.0
+    for payee_id in target_ids:
+        settlement_id = settlement_by_payee[payee_id]
+        settlement_total, line_count = totals.get(settlement_id, (0.0, 0))
+        created_settlements.append({
+            "id": settlement_id,
+            "payee_id": payee_id,
+            "payee_name": payee_names[payee_id],
+            "total": settlement_total,
+            "line_count": line_count,
+        })
+        total_amount += settlement_total
+
+    # 6. Notifications
+    if notify:
+        report(5, "Sending notifications")
+        drivers = (
+            db.query(models.Driver.payee_id, models.Driver.name, models.Driver.email)
+            .filter(models.Driver.payee_id.in_(target_ids), models.Driver.email.isnot(None))
+            .order_by(models.Driver.id)
+            .all()
+        )
+        notified = set()
+        for driver_payee_id, driver_name, driver_email in drivers:
+            if driver_payee_id in notified or not driver_email:
+                continue
+            notified.add(driver_payee_id)
+            settlement_id = settlement_by_payee[driver_payee_id]
+            EmailService.send_settlement_created_notification(
+                driver_email,
+                driver_name,
+                settlement_id,
+                period_start.strftime('%m/%d/%Y'),
+                period_end.strftime('%m/%d/%Y'),
+                totals.get(settlement_id, (0.0, 0))[0],
+            )
+
+    report(steps, "Done")
+    return {
+        "settlements_created": len(created_settlements),
+        "total_amount": total_amount,
+        "settlements": created_settlements,
+    }
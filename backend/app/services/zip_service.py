@@ -1,27 +1,138 @@
-import zipfile
+"""
+ZIP archives of documents.
+
+stream_zip() writes an archive incrementally and yields it in chunks for a
+StreamingResponse: each entry's source is opened only when its turn comes
+and copied chunk by chunk, and zipfile's data-descriptor mode (used for
+unseekable outputs) means nothing has to be rewound. Memory stays at about
+one chunk whatever the archive size. Already-compressed formats (PDF,
+images) are stored rather than deflated again.
+
+A source that cannot be opened (missing file, failed download) is skipped
+and listed in a MISSING.txt entry at the end, since the response status has
+been sent by then.
+"""
 import io
-from typing import List, Tuple
+import os
+import zipfile
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+STORED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".gif", ".heic", ".webp", ".zip", ".gz"}
+ZIP64_THRESHOLD = 2 ** 31
+
+
+class ZipEntry(NamedTuple):
+    name: str
+    open: Callable[[], Iterable[bytes]]  # called lazily; yields the file's bytes in chunks
+    size: Optional[int] = None
+    modified: Optional[datetime] = None
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable output that collects what zipfile writes until drained."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            chunks, self._chunks = self._chunks, []
+            yield b"".join(chunks)
+
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    """Make archive names unique: "pod.pdf", "pod (2).pdf", ..."""
+    seen = set()
+    result = []
+    for name in names:
+        candidate, stem, ext, n = name, *os.path.splitext(name), 1
+        while candidate in seen:
+            n += 1
+            candidate = f"{stem} ({n}){ext}"
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+def file_chunks(path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
 
 
 class ZipService:
     """Service for creating ZIP files."""
-    
+
     @staticmethod
     def create_zip_from_files(files: List[Tuple[str, bytes]]) -> bytes:
         """
         Create a ZIP file from a list of (filename, content) tuples.
-        
+
         Args:
             files: List of (filename, content_bytes) tuples
-        
+
         Returns:
             ZIP file as bytes
         """
         zip_buffer = io.BytesIO()
-        
+
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             for filename, content in files:
                 zip_file.writestr(filename, content)
-        
+
         zip_buffer.seek(0)
         return zip_buffer.getvalue()
+
+    @staticmethod
+    def stream_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+        """
+        Yield a ZIP archive of entries chunk by chunk, opening each source
+        only while it is being written.
+
+        Args:
+            entries: ZipEntry items (may be a generator)
+
+        Returns:
+            Iterator of archive bytes
+        """
+        sink = _Sink()
+        missing = []
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zip_file:
+            for entry in entries:
+                try:
+                    chunks = iter(entry.open())
+                    first = next(chunks, b"")
+                except Exception as e:
+                    missing.append(f"{entry.name}: {type(e).__name__}: {e}")
+                    continue
+
+                info = zipfile.ZipInfo(entry.name, (entry.modified or datetime.utcnow()).timetuple()[:6])
+                stored = os.path.splitext(entry.name)[1].lower() in STORED_EXTENSIONS
+                info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                force_zip64 = entry.size is None or entry.size >= ZIP64_THRESHOLD
+                with zip_file.open(info, "w", force_zip64=force_zip64) as out:
+                    try:
+                        out.write(first)
+                        yield from sink.drain()
+                        for chunk in chunks:
+                            out.write(chunk)
+                            yield from sink.drain()
+                    except Exception as e:
+                        # Headers are sent; keep the archive valid and note the truncated file
+                        missing.append(f"{entry.name}: truncated, {type(e).__name__}: {e}")
+                yield from sink.drain()
+
+            if missing:
+                zip_file.writestr("MISSING.txt", "\n".join(missing) + "\n")
+        yield from sink.drain()
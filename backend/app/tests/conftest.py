@@ -0,0 +1,121 @@
+# Shared fixtures: in-memory SQLite database, an authenticated test client and a stub HTTP server
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, get_db
+from app.core.security import verify_token
+from app.main import app
+from app import models
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def carrier(db):
+    carrier = models.Carrier(name="Test Carrier", internal_code="TEST")
+    db.add(carrier)
+    db.commit()
+    return carrier
+
+
+@pytest.fixture
+def client(db, carrier):
+    token = {"carrier_id": carrier.id, "role": "admin", "user_id": 1}
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[verify_token] = lambda: token
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def statement_counter(db):
+    """Count SQL statements issued through the test session's engine."""
+    counter = {"count": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request_body = self.rfile.read(length) if length else b""
+        server = self.server
+        path = self.path.split("?")[0]
+        with server.lock:
+            server.hits[path] = server.hits.get(path, 0) + 1
+            server.requests.append((path, dict(self.headers), request_body))
+            server.peers.add(self.client_address)
+            script = server.scripts.get(path)
+            if script is None:
+                # Fall back to the longest scripted prefix (e.g. "/directions/")
+                prefixes = [p for p in server.scripts if p.endswith("/") and path.startswith(p)]
+                script = server.scripts[max(prefixes, key=len)] if prefixes else []
+            status, body, *delay = script.pop(0) if len(script) > 1 else (script[0] if script else (404, {}))
+        if delay:
+            time.sleep(delay[0])
+        # String bodies are sent as HTML (e.g. scraped pages), everything else as JSON
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html" if isinstance(body, str) else "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server answering scripted (status, json-or-html[, delay_seconds]) responses per path; requests records (path, headers, body)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.lock = threading.Lock()
+    server.scripts = {}
+    server.hits = {}
+    server.requests = []
+    server.peers = set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
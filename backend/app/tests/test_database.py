@@ -0,0 +1,28 @@
+# Tests for connection pool configuration
+from app.core import database
+from app.core.config import settings
+
+
+def test_engine_kwargs_queue_mode(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "queue")
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    kwargs = database._engine_kwargs()
+    assert kwargs["poolclass"] is database.InstrumentedQueuePool
+    assert kwargs["pool_size"] == 7
+    assert kwargs["pool_pre_ping"] == settings.DB_POOL_PRE_PING
+
+
+def test_engine_kwargs_null_mode(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "null")
+    assert database._engine_kwargs() == {"poolclass": database.NullPool}
+
+
+def test_pool_metrics_snapshot():
+    metrics = database.PoolMetrics()
+    metrics.incr("checkouts")
+    metrics.record_wait(2.0)
+    metrics.record_wait(4.0)
+    snap = metrics.snapshot()
+    assert snap["checkouts"] == 1
+    assert snap["wait_avg_ms"] == 3.0
+    assert snap["wait_max_ms"] == 4.0
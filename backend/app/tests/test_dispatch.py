@@ -0,0 +1,55 @@
+# Tests for dispatch board stats
+from datetime import datetime, timedelta
+
+from app import models
+from app.services import dispatch_stats
+
+
+def _seed(db, carrier):
+    drivers = [models.Driver(carrier_id=carrier.id, name=f"Driver {i}") for i in range(3)]
+    trucks = [models.Equipment(carrier_id=carrier.id, equipment_type="truck", identifier=f"T{i}") for i in range(2)]
+    db.add_all(drivers + trucks)
+    db.flush()
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    db.add_all([
+        models.Load(carrier_id=carrier.id, load_number="A", status="Created", pickup_address="x", delivery_address="y"),
+        models.Load(carrier_id=carrier.id, load_number="B", status="Available", pickup_address="x", delivery_address="y"),
+        models.Load(carrier_id=carrier.id, load_number="C", status="Assigned", driver_id=drivers[0].id,
+                    truck_id=trucks[0].id, pickup_address="x", delivery_address="y"),
+        models.Load(carrier_id=carrier.id, load_number="D", status="In Transit", driver_id=drivers[1].id,
+                    pickup_address="x", delivery_address="y"),
+        models.Load(carrier_id=carrier.id, load_number="E", status="Delivered", driver_id=drivers[2].id,
+                    pickup_address="x", delivery_address="y"),
+        models.Load(carrier_id=carrier.id, load_number="F", status="Delivered", pickup_address="x",
+                    delivery_address="y", updated_at=yesterday),
+    ])
+    db.commit()
+
+
+def test_dispatch_stats_single_query(db, carrier, statement_counter):
+    _seed(db, carrier)
+    carrier_id = carrier.id
+    statement_counter["count"] = 0
+    stats = dispatch_stats.compute_dispatch_stats(db, carrier_id)
+    assert statement_counter["count"] == 1
+    assert stats == {
+        "available_loads": 2,
+        "assigned_loads": 1,
+        "in_transit_loads": 1,
+        "delivered_today": 1,
+        "available_drivers": 1,
+        "available_trucks": 1,
+    }
+
+
+def test_dispatch_stats_cache_invalidated_by_status_update(client, db, carrier):
+    _seed(db, carrier)
+    dispatch_stats.invalidate_dispatch_stats(carrier.id)
+
+    assert client.get("/dispatch/stats").json()["available_loads"] == 2
+    load = db.query(models.Load).filter(models.Load.load_number == "A").one()
+    res = client.post("/dispatch/update-load-status", params={"load_id": load.id, "status": "Assigned"})
+    assert res.status_code == 200
+    stats = client.get("/dispatch/stats").json()
+    assert stats["available_loads"] == 1
+    assert stats["assigned_loads"] == 2
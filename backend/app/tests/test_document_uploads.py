@@ -0,0 +1,267 @@
+# Tests for content-addressed load document storage
+import hashlib
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from app import models
+
+CONTENT = bytes(range(256)) * 40  # 10 KB
+
+
+@pytest.fixture
+def storage_root(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "DOCUMENT_STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "DOCUMENT_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "DOCUMENT_STORAGE_CHUNK_SIZE", 1024)
+    return tmp_path
+
+
+def _loads(db, carrier, count):
+    loads = [models.Load(carrier_id=carrier.id, load_number=f"L-{i}", pickup_address="x", delivery_address="y")
+             for i in range(count)]
+    db.add_all(loads)
+    db.commit()
+    return loads
+
+
+def _stored_files(root):
+    return [os.path.join(path, name) for path, _, names in os.walk(root) for name in names]
+
+
+def test_upload_is_content_addressed_and_deduplicated(client, db, carrier, storage_root):
+    first, second = _loads(db, carrier, 2)
+    digest = hashlib.sha256(CONTENT).hexdigest()
+
+    urls = []
+    for load in (first, second, second):
+        res = client.post(f"/document-uploads/loads/{load.id}/upload", data={"doc_type": "BOL"},
+                          files={"file": ("bol.pdf", CONTENT, "application/pdf")})
+        assert res.status_code == 200, res.text
+        urls.append(res.json()["file_url"])
+
+    assert _stored_files(storage_root) == [str(storage_root / digest[:2] / digest[2:4] / digest)]
+    assert db.query(models.DocumentBlob).count() == 1
+    assert db.query(models.StoredDocument).count() == 3
+    assert len(set(urls)) == 3
+    db.refresh(second)
+    assert second.bol_document == urls[2]
+
+    res = client.get(urls[0])
+    assert res.status_code == 200
+    assert res.content == CONTENT
+    assert res.headers["etag"] == f'"{digest}"'
+    assert res.headers["accept-ranges"] == "bytes"
+    assert res.headers["content-type"] == "application/pdf"
+    assert client.get(urls[0], headers={"If-None-Match": f'"{digest}"'}).status_code == 304
+
+
+def test_rejected_upload_stores_nothing(client, db, carrier, storage_root):
+    (load,) = _loads(db, carrier, 1)
+    # An admin upload of a type with no load column goes to approval, which needs a driver
+    res = client.post(f"/document-uploads/loads/{load.id}/upload", data={"doc_type": "LUMPER"},
+                      files={"file": ("lumper.pdf", CONTENT, "application/pdf")})
+    assert res.status_code == 400
+    assert _stored_files(storage_root) == []
+    assert db.query(models.DocumentBlob).count() == 0
+
+
+def test_concurrent_first_upload_reuses_blob(db, carrier, storage_root, monkeypatch):
+    from app.services import document_storage
+
+    storage = document_storage.get_document_storage()
+    existing = document_storage.store_document(db, storage, io.BytesIO(CONTENT), "a.pdf", carrier.id)
+    db.commit()
+    # The other upload's blob row lands between our lookup and our insert
+    monkeypatch.setattr(document_storage, "_find_blob", lambda db, digest: None)
+    (load,) = _loads(db, carrier, 1)
+    load.broker_name = "Pending Broker"
+    document = document_storage.store_document(db, storage, io.BytesIO(CONTENT), "b.pdf", carrier.id, load.id)
+    db.commit()
+
+    assert document.blob_id == existing.blob_id
+    assert db.query(models.DocumentBlob).count() == 1
+    db.refresh(load)
+    assert load.broker_name == "Pending Broker"  # only the savepoint was rolled back
+
+
+def test_storage_backends_must_implement_interface():
+    from app.services.document_storage import DocumentStorage
+
+    class Partial(DocumentStorage):
+        def save(self, fileobj):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_download_supports_range_requests(client, db, carrier, storage_root):
+    (load,) = _loads(db, carrier, 1)
+    url = client.post(f"/document-uploads/loads/{load.id}/upload", data={"doc_type": "POD"},
+                      files={"file": ("pod.pdf", CONTENT, "application/pdf")}).json()["file_url"]
+
+    res = client.get(url, headers={"Range": "bytes=1000-3999"})
+    assert res.status_code == 206
+    assert res.content == CONTENT[1000:4000]
+    assert res.headers["content-range"] == f"bytes 1000-3999/{len(CONTENT)}"
+
+    res = client.get(url, headers={"Range": "bytes=-100"})
+    assert res.status_code == 206 and res.content == CONTENT[-100:]
+    res = client.get(url, headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert res.status_code == 416
+    assert res.headers["content-range"] == f"bytes */{len(CONTENT)}"
+    # A stale If-Range validator gets the whole file
+    res = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert res.status_code == 200 and res.content == CONTENT
+
+
+def test_download_is_scoped_to_carrier(client, db, carrier, storage_root):
+    (load,) = _loads(db, carrier, 1)
+    url = client.post(f"/document-uploads/loads/{load.id}/upload", data={"doc_type": "RC"},
+                      files={"file": ("rc.pdf", CONTENT, "application/pdf")}).json()["file_url"]
+    other = models.Carrier(name="Other Carrier", internal_code="OTHER")
+    db.add(other)
+    db.commit()
+    document = db.query(models.StoredDocument).one()
+    document.carrier_id = other.id
+    db.commit()
+
+    assert client.get(url).status_code == 404
+
+
+def _upload(client, load, doc_type, filename, content):
+    res = client.post(f"/document-uploads/loads/{load.id}/upload", data={"doc_type": doc_type},
+                      files={"file": (filename, content, "application/pdf")})
+    assert res.status_code == 200, res.text
+    return res.json()["file_url"]
+
+
+def test_load_zip_streams_stored_and_dropbox_documents(client, db, carrier, storage_root, stub_server, monkeypatch):
+    from app.services import document_archives
+
+    # Treat the local stub as a Dropbox host
+    monkeypatch.setattr(document_archives, "ALLOWED_REMOTE_SCHEMES", ("http",))
+    monkeypatch.setattr(document_archives, "ALLOWED_REMOTE_HOSTS", ("127.0.0.1",))
+    (load,) = _loads(db, carrier, 1)
+    load.load_number = 'L-"1"/é'
+    _upload(client, load, "BOL", "bol.pdf", CONTENT)
+    _upload(client, load, "RC", "bol.pdf", b"rate con")
+    stub_server.scripts["/s/abc/pod-0.pdf"] = [(200, "dropbox pod")]
+    db.add(models.PodRecord(load_id=load.id, uploaded_by_user_id=1, file_links=[
+        f"{stub_server.url}/s/abc/pod-0.pdf", f"{stub_server.url}/s/gone/pod-1.pdf",
+        "http://169.254.169.254/latest/meta-data/pod-2.pdf",
+    ]))
+    db.commit()
+
+    with client.stream("GET", f"/document-uploads/loads/{load.id}/zip") as res:
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/zip"
+        assert res.headers["content-disposition"] == (
+            "attachment; filename=\"load-L-_1___-documents.zip\"; filename*=UTF-8''load-L-%221%22%2F%C3%A9-documents.zip"
+        )
+        chunks = list(res.iter_bytes())
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+    assert archive.namelist() == ["bol.pdf", "bol (2).pdf", "pod-0.pdf", "MISSING.txt"]
+    assert archive.read("bol.pdf") == CONTENT
+    assert archive.read("bol (2).pdf") == b"rate con"
+    assert archive.read("pod-0.pdf") == b"dropbox pod"
+    missing = archive.read("MISSING.txt").decode()
+    assert "pod-1.pdf" in missing
+    assert "pod-2.pdf: RemoteDocumentRefused" in missing
+    assert archive.testzip() is None
+
+
+def test_load_zip_only_fetches_dropbox_links(client, db, carrier, storage_root, stub_server):
+    (load,) = _loads(db, carrier, 1)
+    stub_server.scripts["/s/abc/pod-0.pdf"] = [(200, "internal")]
+    db.add(models.PodRecord(load_id=load.id, uploaded_by_user_id=1, file_links=[f"{stub_server.url}/s/abc/pod-0.pdf"]))
+    db.commit()
+
+    res = client.get(f"/document-uploads/loads/{load.id}/zip")
+    assert res.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(res.content))
+    assert archive.namelist() == ["MISSING.txt"]
+    assert b"not a Dropbox link" in archive.read("MISSING.txt")
+    assert stub_server.hits == {}
+
+
+def test_remote_links_must_be_dropbox_https():
+    from app.services.document_archives import _remote_allowed
+
+    assert _remote_allowed("https://www.dropbox.com/s/abc/pod.pdf?dl=0")
+    assert _remote_allowed("https://uc123.dl.dropboxusercontent.com/cd/0/get/pod.pdf")
+    assert not _remote_allowed("http://www.dropbox.com/s/abc/pod.pdf")
+    assert not _remote_allowed("https://dropbox.com.evil.test/pod.pdf")
+    assert not _remote_allowed("https://evildropbox.com/pod.pdf")
+    assert not _remote_allowed("file:///etc/passwd")
+
+
+def test_customer_pod_packet_covers_period(client, db, carrier, storage_root):
+    customer = models.Customer(carrier_id=carrier.id, company_name="Acme Shipping")
+    db.add(customer)
+    db.commit()
+    loads = _loads(db, carrier, 3)
+    for load, delivered in zip(loads, (datetime(2026, 1, 3), datetime(2026, 1, 31, 18), datetime(2026, 2, 10))):
+        load.customer_id = customer.id
+        load.delivery_date = delivered
+    db.commit()
+    for load in loads:
+        _upload(client, load, "POD", "pod.pdf", f"pod for {load.load_number}".encode())
+        _upload(client, load, "BOL", "bol.pdf", b"not a pod")
+
+    res = client.get(f"/document-uploads/customers/{customer.id}/pods/zip",
+                     params={"start_date": "2026-01-01", "end_date": "2026-01-31"})
+    assert res.status_code == 200, res.text
+    archive = zipfile.ZipFile(io.BytesIO(res.content))
+    assert archive.namelist() == ["L-0/pod.pdf", "L-1/pod.pdf"]
+    assert archive.read("L-1/pod.pdf") == b"pod for L-1"
+
+    res = client.get(f"/document-uploads/customers/{customer.id}/pods/zip",
+                     params={"start_date": "2026-02-01", "end_date": "2026-01-01"})
+    assert res.status_code == 400
+
+
+def test_stream_zip_opens_sources_lazily():
+    from app.services.zip_service import ZipEntry, ZipService
+
+    opened = []
+
+    def source(index):
+        def open_source():
+            opened.append(index)
+            for _ in range(4):
+                yield bytes([index]) * 1024
+        return open_source
+
+    stream = ZipService.stream_zip(ZipEntry(f"{i}.bin", source(i)) for i in range(3))
+    first = next(stream)
+    assert opened == [0] and first
+    rest = list(stream)
+    assert opened == [0, 1, 2]
+    archive = zipfile.ZipFile(io.BytesIO(first + b"".join(rest)))
+    assert archive.read("2.bin") == bytes([2]) * 4096
+
+
+def test_remote_redirects_stay_on_dropbox(monkeypatch):
+    import httpx
+
+    from app.services import document_archives
+
+    def handler(request):
+        if request.url.host == "www.dropbox.com":
+            target = "https://evil.test/x" if request.url.path == "/s/a" else "https://dl.dropboxusercontent.com/b"
+            return httpx.Response(302, headers={"Location": target})
+        assert request.url.host == "dl.dropboxusercontent.com"
+        return httpx.Response(200, content=b"pod bytes")
+
+    monkeypatch.setattr(document_archives.dropbox_http, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    assert b"".join(document_archives._remote_chunks("https://www.dropbox.com/s/b")) == b"pod bytes"
+    with pytest.raises(document_archives.RemoteDocumentRefused):
+        list(document_archives._remote_chunks("https://www.dropbox.com/s/a"))
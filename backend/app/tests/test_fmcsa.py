@@ -0,0 +1,176 @@
+# Tests for cached FMCSA broker lookups
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services.fmcsa import FMCSAUnavailable
+
+SNAPSHOT_HTML = (
+    "<TR><TH><A>Legal Name:</A></TH><TD>ACME LOGISTICS LLC&nbsp;</TD></TR>"
+    "<TR><TH><A>USDOT Number:</A></TH><TD>2233445</TD></TR>"
+    "<TR><TD>Operating Status: ACTIVE</TD></TR><TR><TD>AUTHORIZED FOR Property</TD></TR>"
+)
+
+
+def _load(carrier, number, status, **broker):
+    return models.Load(carrier_id=carrier.id, load_number=number, status=status, pickup_address="x",
+                       delivery_address="y", **broker)
+
+
+def _snapshot(number, broker=True):
+    return {"legal_name": f"BROKER {number}", "dot_number": number, "mc_number": None,
+            "operating_status": "ACTIVE", "is_broker": broker}
+
+
+@pytest.fixture
+def safer(monkeypatch):
+    """Fake SAFER behind the cache: records calls; "missing" numbers have no record."""
+    from app.services.broker_cache import broker_authority
+
+    fake = {"calls": [], "missing": set(), "down": False, "delay": 0.0}
+
+    async def afetch(kind, number):
+        fake["calls"].append(f"{kind}:{number}")
+        await asyncio.sleep(fake["delay"])
+        if fake["down"]:
+            raise FMCSAUnavailable("SAFER returned 503")
+        return None if number in fake["missing"] else _snapshot(number)
+
+    monkeypatch.setattr(broker_authority.service, "afetch", afetch)
+    return fake
+
+
+def _wait_for_refreshes():
+    from app.services.broker_cache import broker_authority
+
+    for _ in range(100):
+        if not broker_authority.stats()["refreshing"]:
+            return
+        time.sleep(0.02)
+
+
+def test_verify_serves_cache_and_refreshes_stale_in_background(client, db, safer):
+    response = client.post("/fmcsa/verify-broker", json={"dot_number": "2233445"})
+    assert response.json()["verified"] is True
+    assert response.headers["X-Cache"] == "fetched"
+    assert client.post("/fmcsa/verify-broker", json={"dot_number": "2233445"}).headers["X-Cache"] == "fresh"
+    assert safer["calls"] == ["dot:2233445"]
+
+    entry = db.query(models.BrokerAuthorityEntry).filter_by(lookup_key="dot:2233445").one()
+    entry.updated_at = datetime.utcnow() - timedelta(days=2)
+    db.commit()
+    safer["delay"] = 0.2
+    started = time.perf_counter()
+    stale = client.post("/fmcsa/verify-broker", json={"dot_number": "2233445"})
+    assert time.perf_counter() - started < 0.2
+    assert stale.headers["X-Cache"] == "stale" and stale.json()["verified"] is True
+
+    _wait_for_refreshes()
+    assert safer["calls"] == ["dot:2233445", "dot:2233445"]
+    db.expire_all()
+    assert datetime.utcnow() - entry.updated_at < timedelta(minutes=1)
+
+
+def test_dot_miss_falls_back_to_mc_and_outage_serves_cache(client, db, safer):
+    safer["missing"].add("999")
+    result = client.post("/fmcsa/verify-broker", json={"dot_number": "999", "mc_number": "MC-123456"}).json()
+    assert result["verified"] is True and result["data"]["legal_name"] == "BROKER 123456"
+    assert safer["calls"] == ["dot:999", "mc:123456"]
+
+    db.query(models.BrokerAuthorityEntry).update({models.BrokerAuthorityEntry.updated_at: datetime(2020, 1, 1)})
+    db.commit()
+    safer["down"] = True
+    during_outage = client.post("/fmcsa/verify-broker", json={"mc_number": "123456"})
+    assert during_outage.json()["verified"] is True and during_outage.headers["X-Cache"] == "stale"
+    unknown = client.post("/fmcsa/verify-broker", json={"dot_number": "5550001"}).json()
+    assert unknown["status"] == "unavailable"
+    assert client.get("/fmcsa/lookup/dot/5550001").status_code == 503
+
+
+def test_verify_open_loads_checks_brokers_concurrently(client, db, carrier, safer):
+    safer["delay"] = 0.2
+    safer["missing"].add("404")
+    loads = [
+        _load(carrier, "A", "Assigned", broker_dot="1001"),
+        _load(carrier, "B", "In Transit", broker_dot="1001"),
+        _load(carrier, "C", "Created", broker_dot="1002"),
+        _load(carrier, "D", "Available", broker_mc="MC-3003"),
+        _load(carrier, "E", "Assigned", broker_dot="404"),
+        _load(carrier, "F", "Delivered", broker_dot="1004"),
+    ]
+    db.add_all(loads)
+    db.commit()
+
+    started = time.perf_counter()
+    result = client.post("/fmcsa/verify-open-loads").json()
+    assert time.perf_counter() - started < 0.6
+    assert sorted(safer["calls"]) == ["dot:1001", "dot:1002", "dot:404", "mc:3003"]
+    assert result["verified"] == 3 and result["unverified"] == 1 and result["loads"] == 5
+    assert result["brokers"][0]["status"] == "not_found" and result["brokers"][0]["load_ids"] == [loads[4].id]
+
+    db.expire_all()
+    assert [load.broker_verified for load in loads] == [True, True, True, True, False, False]
+    assert loads[0].broker_verified_at is not None and loads[5].broker_verified_at is None
+    assert client.post("/fmcsa/verify-open-loads").json()["brokers"][0]["cache"] == "fresh"
+    assert len(safer["calls"]) == 4
+
+
+def test_refresh_recent_refetches_half_expired_entries(db, carrier, safer):
+    from app.services.broker_cache import broker_authority
+
+    db.add_all([
+        _load(carrier, "A", "Assigned", broker_dot="1001", broker_mc="77"),
+        _load(carrier, "B", "Delivered", broker_dot="1002", updated_at=datetime.utcnow() - timedelta(days=90)),
+    ])
+    db.commit()
+    assert broker_authority.refresh_recent(db, days=30) == {"brokers": 1, "refreshed": 1, "failed": 0}
+    assert broker_authority.refresh_recent(db, days=30)["refreshed"] == 0
+
+    db.query(models.BrokerAuthorityEntry).update(
+        {models.BrokerAuthorityEntry.updated_at: datetime.utcnow() - timedelta(hours=13)})
+    assert broker_authority.refresh_recent(db, days=30)["refreshed"] == 1
+    assert safer["calls"] == ["dot:1001", "dot:1001"]
+
+
+def test_lookup_parses_safer_page_once(client, stub_server):
+    from app.services.fmcsa import fmcsa_http
+
+    original = fmcsa_http.config
+    fmcsa_http.configure(base_url=stub_server.url, rate_per_second=None, max_retries=0)
+    stub_server.scripts["/query.asp"] = [(200, SNAPSHOT_HTML)]
+    try:
+        first = client.get("/fmcsa/lookup/dot/2233445")
+        assert first.json()["legal_name"] == "ACME LOGISTICS LLC" and first.json()["is_broker"] is True
+        assert client.get("/fmcsa/lookup/dot/2233445").headers["X-Cache"] == "fresh"
+        assert stub_server.hits == {"/query.asp": 1}
+    finally:
+        fmcsa_http.configure(**original.__dict__)
+
+
+def test_name_fallback_after_not_found(client, db, safer, stub_server, monkeypatch):
+    from app.services.broker_cache import broker_authority
+    from app.services.fmcsa import FMCSAService, fmcsa_http
+
+    safer["missing"].add("999")
+    # Without a QCMobile key the name search is skipped, not a 500
+    without_key = client.post("/fmcsa/verify-broker", json={"dot_number": "999", "name": "Acme Logistics"})
+    assert without_key.status_code == 200
+    assert without_key.json()["status"] == "not_found"
+
+    original = fmcsa_http.config
+    fmcsa_http.configure(rate_per_second=None, max_retries=0)
+    monkeypatch.setattr(FMCSAService, "NAME_SEARCH_URL", f"{stub_server.url}/qc/name")
+    monkeypatch.setattr(broker_authority.service, "api_key", "qc-key")
+    stub_server.scripts["/qc/name/Acme%20Logistics"] = [(200, {"content": [{"carrier": {
+        "legalName": "ACME LOGISTICS LLC", "dotNumber": 2233445, "carrierOperation": {"brokerAuthorityStatus": "A"},
+    }}]})]
+    try:
+        found = client.post("/fmcsa/verify-broker", json={"dot_number": "999", "name": "Acme Logistics"})
+    finally:
+        fmcsa_http.configure(**original.__dict__)
+    assert found.status_code == 200
+    assert found.json()["data"]["legal_name"] == "ACME LOGISTICS LLC"
+    assert stub_server.hits == {"/qc/name/Acme%20Logistics": 1}
@@ -0,0 +1,160 @@
+# Tests for the shared outbound HTTP client, run against a local stub server
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.http_client import CircuitOpenError, HttpClient, ProviderConfig, RateLimiter
+
+
+def _client(server, **overrides):
+    config = {"base_url": server.url, "timeout": 5, "backoff_base": 0, "backoff_max": 0}
+    config.update(overrides)
+    return HttpClient("stub", ProviderConfig(**config))
+
+
+def test_retries_retryable_status_on_one_pooled_connection(stub_server):
+    stub_server.scripts["/flaky"] = [(503, {}), (503, {}), (200, {"ok": True})]
+    client = _client(stub_server, max_retries=3)
+
+    response = client.get("/flaky")
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert stub_server.hits["/flaky"] == 3
+    assert len(stub_server.peers) == 1  # keep-alive reused the connection
+    stats = client.stats()
+    assert stats["retries"] == 2
+    assert stats["status_counts"] == {"503": 2, "200": 1}
+    client.close()
+
+
+def test_post_is_not_retried_and_last_response_is_returned(stub_server):
+    stub_server.scripts["/submit"] = [(503, {})]
+    client = _client(stub_server, max_retries=3)
+
+    assert client.post("/submit", json={"a": 1}).status_code == 503
+    assert stub_server.hits["/submit"] == 1
+    client.close()
+
+
+def test_circuit_opens_and_recovers(stub_server):
+    stub_server.scripts["/down"] = [(500, {}), (500, {}), (200, {})]
+    client = _client(stub_server, max_retries=0, failure_threshold=2, reset_timeout=0.05)
+
+    assert client.get("/down").status_code == 500
+    assert client.get("/down").status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.get("/down")
+    assert stub_server.hits["/down"] == 2
+
+    time.sleep(0.06)
+    assert client.get("/down").status_code == 200
+    assert client.stats()["circuit"] == "closed"
+    assert client.stats()["circuit_rejections"] == 1
+    client.close()
+
+
+def test_cancelled_trial_does_not_stick_half_open_circuit(stub_server):
+    stub_server.scripts["/down"] = [(500, {}), (200, {}, 0.5), (200, {})]
+    client = _client(stub_server, max_retries=0, failure_threshold=1, reset_timeout=0.05)
+    assert client.get("/down").status_code == 500
+    time.sleep(0.06)
+
+    async def cancelled_trial():
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.aget("/down"), 0.05)
+        finally:
+            await client.aclose()
+
+    asyncio.run(cancelled_trial())
+    assert client.stats()["circuit"] == "half_open"
+    assert client.get("/down").status_code == 200
+    assert client.stats()["circuit"] == "closed"
+    client.close()
+
+
+def test_redirects_are_followed(stub_server):
+    client = _client(stub_server)
+    assert client.client.follow_redirects is True
+    client.close()
+
+
+def test_async_face_shares_pool_settings(stub_server):
+    stub_server.scripts["/item"] = [(200, {"ok": True})]
+    client = _client(stub_server)
+
+    async def fetch_all():
+        try:
+            return await asyncio.gather(*(client.aget("/item") for _ in range(5)))
+        finally:
+            await client.aclose()
+
+    responses = asyncio.run(fetch_all())
+    assert [r.status_code for r in responses] == [200] * 5
+    assert client.stats()["requests"] == 5
+
+
+def test_close_closes_async_pools_on_their_loops(stub_server):
+    import threading
+
+    stub_server.scripts["/item"] = [(200, {"ok": True})]
+    client = _client(stub_server)
+    background = asyncio.new_event_loop()
+    thread = threading.Thread(target=background.run_forever, daemon=True)
+    thread.start()
+    idle = asyncio.new_event_loop()
+
+    async def fetch():
+        await client.aget("/item")
+        return client.async_client
+
+    try:
+        running_pool = asyncio.run_coroutine_threadsafe(fetch(), background).result(5)
+        idle_pool = idle.run_until_complete(fetch())
+        client.close()
+        assert running_pool.is_closed and idle_pool.is_closed
+
+        async def close_on_own_loop():
+            await client.aget("/item")
+            pool = client.async_client
+            client.close()
+            await asyncio.sleep(0)
+            return pool
+
+        assert asyncio.run(close_on_own_loop()).is_closed
+    finally:
+        background.call_soon_threadsafe(background.stop)
+        thread.join()
+        background.close()
+        idle.close()
+
+
+def test_rate_limiter_spaces_out_requests():
+    now = [0.0]
+    limiter = RateLimiter(rate_per_second=2, burst=2, clock=lambda: now[0])
+
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(0.5)
+    assert limiter.reserve() == pytest.approx(1.0)
+    now[0] = 5.0
+    assert limiter.reserve() == 0
+
+
+def test_mapbox_geocode_through_shared_client(stub_server, monkeypatch):
+    from app.services.mapbox import MapboxService, mapbox_http
+
+    stub_server.scripts["/geocoding/v5/mapbox.places/Dallas%2C%20TX.json"] = [(200, {
+        "features": [{"geometry": {"coordinates": [-96.8, 32.78]}, "place_name": "Dallas, Texas"}]
+    })]
+    monkeypatch.setattr(settings, "MAPBOX_API_KEY", "test-key")
+    original = mapbox_http.config
+    mapbox_http.configure(base_url=stub_server.url)
+    try:
+        result = MapboxService().geocode_address("Dallas, TX")
+    finally:
+        mapbox_http.configure(**original.__dict__)
+    assert result["latitude"] == 32.78
+    assert result["formatted_address"] == "Dallas, Texas"
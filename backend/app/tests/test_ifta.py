@@ -0,0 +1,122 @@
+# Tests for the IFTA mileage engine with synthetic jurisdiction boundaries
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import models
+
+# Two neighbouring "states" split at lon -98, and a third with a hole in it
+BOUNDARIES = {"type": "FeatureCollection", "features": [
+    {"properties": {"code": "TX"}, "geometry": {"type": "Polygon", "coordinates": [
+        [[-101, 29], [-98, 29], [-98, 33], [-101, 33], [-101, 29]]]}},
+    {"properties": {"code": "LA"}, "geometry": {"type": "MultiPolygon", "coordinates": [
+        [[[-98, 29], [-95, 29], [-95, 33], [-98, 33], [-98, 29]]],
+        [[[-94, 29], [-93, 29], [-93, 30], [-94, 30]]],
+    ]}},
+    {"properties": {"code": "OK"}, "geometry": {"type": "Polygon", "coordinates": [
+        [[-101, 33], [-95, 33], [-97.3, 36.2], [-101, 35.5]],
+        [[-99, 34], [-98, 34], [-98, 34.5], [-99, 34.5]],
+    ]}},
+]}
+
+
+@pytest.fixture
+def boundaries(monkeypatch):
+    from app.services import ifta_mileage
+
+    index = ifta_mileage.JurisdictionIndex.from_geojson(BOUNDARIES, cell_degrees=0.5)
+    monkeypatch.setattr(ifta_mileage, "_index", index)
+    return index
+
+
+def test_grid_lookup_matches_ray_casting(boundaries):
+    rng = np.random.default_rng(3)
+    lon = rng.uniform(-102, -92, 20000)
+    lat = rng.uniform(28, 37, 20000)
+
+    located = boundaries.locate(lon, lat)
+    expected = boundaries._ray_cast(lon, lat)
+    assert np.array_equal(located, expected)
+    codes = [boundaries.codes[i] if i >= 0 else None for i in boundaries.locate(
+        np.array([-99.5, -96.0, -93.5, -98.5, -98.5, -90.0]), np.array([31.0, 31.0, 29.5, 34.2, 33.5, 31.0]))]
+    assert codes == ["TX", "LA", "LA", None, "OK", None]
+
+
+def _drive(db, carrier, driver, start, lons, lat=31.0, minutes=10):
+    from app.services.breadcrumbs import append_points
+
+    points = [(start + timedelta(minutes=minutes * i), lat, lon) for i, lon in enumerate(lons)]
+    append_points(db, carrier.id, driver.id, points)
+    db.commit()
+
+
+def test_generate_report_miles_replaces_gps_entries(client, db, carrier, boundaries):
+    driver = models.Driver(carrier_id=carrier.id, name="Ana Diaz")
+    db.add(driver)
+    db.commit()
+    # Eastbound at ~0.1 degree (about 5.9 mi) per 10 minutes, crossing TX -> LA at -98
+    lons = [-99.0 + 0.1 * i for i in range(21)]
+    _drive(db, carrier, driver, datetime(2026, 7, 1, 12), lons)
+    _drive(db, carrier, driver, datetime(2026, 7, 2, 12), [-97.0, -97.0, -90.0, -89.9])  # parked, then a GPS jump
+    _drive(db, carrier, driver, datetime(2026, 10, 1, 12), [-99.0, -98.5])  # next quarter
+
+    report = models.IftaReport(carrier_id=carrier.id, quarter=3, year=2026, status="draft")
+    db.add(report)
+    db.commit()
+    db.add(models.IftaEntry(carrier_id=carrier.id, report_id=report.id, jurisdiction="TX",
+                            entry_date=datetime(2026, 7, 3), miles=0, gallons=120.0))
+    db.commit()
+
+    body = client.post(f"/ifta/reports/{report.id}/generate-miles").json()
+    summary = {row["jurisdiction"]: row["miles"] for row in body["jurisdictions"]}
+    assert set(summary) == {"TX", "LA"}
+    # The border point itself falls in LA, so the segment reaching it is split
+    assert summary["TX"] == pytest.approx(5.93 * 9.5, rel=0.01)
+    assert summary["LA"] == pytest.approx(5.93 * 10.5, rel=0.01)
+    assert body["entries_created"] == 2 and body["points"] == 25
+    assert body["unassigned_miles"] == pytest.approx(5.93, abs=0.01)  # the stretch east of every boundary
+    assert body["total_miles"] == pytest.approx(summary["TX"] + summary["LA"] + body["unassigned_miles"], abs=0.02)
+
+    again = client.post(f"/ifta/reports/{report.id}/generate-miles").json()
+    assert again["entries_replaced"] == 2 and again["entries_created"] == 2
+    entries = db.query(models.IftaEntry).filter_by(report_id=report.id).all()
+    assert sorted((e.source, e.jurisdiction) for e in entries) == [("gps", "LA"), ("gps", "TX"), ("manual", "TX")]
+
+    db.refresh(report)
+    assert report.total_gallons == 120.0
+    assert report.total_miles == pytest.approx(summary["TX"] + summary["LA"], abs=0.02)
+
+
+def test_generate_without_boundary_file(client, db, carrier, monkeypatch, tmp_path):
+    from app.core.config import settings
+    from app.services import ifta_mileage
+
+    monkeypatch.setattr(ifta_mileage, "_index", None)
+    monkeypatch.setattr(settings, "IFTA_BOUNDARIES_PATH", str(tmp_path / "missing.geojson"))
+    report = models.IftaReport(carrier_id=carrier.id, quarter=1, year=2026, status="draft")
+    db.add(report)
+    db.commit()
+
+    response = client.post(f"/ifta/reports/{report.id}/generate-miles")
+    assert response.status_code == 503
+    assert "build_ifta_boundaries" in response.json()["detail"]
+
+
+def test_bundled_boundary_file_locates_cities(monkeypatch):
+    from app.core.config import settings
+    from app.services import ifta_mileage
+
+    monkeypatch.setattr(ifta_mileage, "_index", None)
+    monkeypatch.setattr(settings, "IFTA_BOUNDARIES_PATH", "")
+    index = ifta_mileage.get_jurisdiction_index()
+    assert sorted(index.codes) == sorted(ifta_mileage.IFTA_JURISDICTIONS)
+
+    cities = {
+        "TX": (-96.80, 32.78), "MO": (-94.58, 39.10), "KS": (-94.68, 39.11), "AR": (-94.03, 33.44),
+        "MI": (-83.05, 42.33), "ON": (-83.02, 42.30), "QC": (-73.57, 45.50), "BC": (-123.12, 49.28),
+        "AB": (-114.07, 51.05), "CO": (-104.99, 39.74), "FL": (-80.19, 25.76), "NY": (-73.97, 40.78),
+    }
+    located = index.locate(np.array([lon for lon, _ in cities.values()]), np.array([lat for _, lat in cities.values()]))
+    assert [index.codes[i] for i in located] == list(cities)
+    assert index.locate(np.array([-60.0]), np.array([30.0]))[0] < 0  # Atlantic
@@ -0,0 +1,96 @@
+# Tests for invoice PDF rendering
+import io
+import zipfile
+from datetime import date
+
+import pytest
+from pypdf import PdfReader
+
+from app import models
+from app.routers.invoices import Invoice, InvoiceLineItem
+
+
+@pytest.fixture
+def invoices(db, carrier):
+    customer = models.Customer(carrier_id=carrier.id, company_name="Acme Shipping")
+    db.add(customer)
+    db.flush()
+    rows = []
+    for i in range(5):
+        invoice = Invoice(carrier_id=carrier.id, customer_id=customer.id, invoice_number=f"INV-{i:03d}",
+                          invoice_date=date(2026, 9, 1 + i), due_date=date(2026, 10, 1 + i),
+                          subtotal=100.0 * (i + 1), total_amount=100.0 * (i + 1), balance_due=100.0 * (i + 1))
+        db.add(invoice)
+        db.flush()
+        # The last invoice has enough lines to run over several pages
+        for line in range(60 if i == 4 else 2):
+            db.add(InvoiceLineItem(invoice_id=invoice.id, description=f"Load {i}-{line}", unit_price=50.0, amount=50.0))
+        rows.append(invoice)
+    db.commit()
+    return rows
+
+
+def test_single_invoice_pdf(client, invoices):
+    res = client.get(f"/invoices/{invoices[0].id}/pdf")
+    assert res.status_code == 200, res.text
+    assert res.content.startswith(b"%PDF")
+    assert "INV-000" in PdfReader(io.BytesIO(res.content)).pages[0].extract_text()
+
+
+def test_batch_zip_has_one_pdf_per_invoice(client, invoices):
+    res = client.post("/invoices/batch/pdf", json={"start_date": "2026-09-02", "end_date": "2026-09-30"})
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(res.content))
+    assert archive.namelist() == [f"invoice_INV-{i:03d}.pdf" for i in range(1, 5)]
+    text = PdfReader(io.BytesIO(archive.read("invoice_INV-002.pdf"))).pages[0].extract_text()
+    assert "INV-002" in text and "Acme Shipping" in text and "Test Carrier" in text
+
+
+def test_batch_merged_pdf_in_worker_pool(client, invoices, monkeypatch):
+    from app.core.config import settings
+    from app.services import invoice_batch
+
+    monkeypatch.setattr(settings, "INVOICE_RENDER_MIN_BATCH", 1)
+    monkeypatch.setattr(settings, "INVOICE_RENDER_WORKERS", 2)
+    try:
+        res = client.post("/invoices/batch/pdf", json={"invoice_ids": [invoice.id for invoice in invoices],
+                                                        "format": "pdf"})
+        assert invoice_batch._executor is not None
+    finally:
+        invoice_batch.shutdown_invoice_render_pool()
+    assert res.status_code == 200, res.text
+    pages = PdfReader(io.BytesIO(res.content)).pages
+    last = PdfReader(io.BytesIO(client.get(f"/invoices/{invoices[4].id}/pdf").content)).pages
+    assert len(last) > 1
+    assert len(pages) == 4 + len(last)  # four one-page invoices and the long one
+    assert "INV-000" in pages[0].extract_text() and "INV-004" in pages[4].extract_text()
+
+
+def test_batch_requires_selection(client, invoices):
+    assert client.post("/invoices/batch/pdf", json={}).status_code == 400
+    assert client.post("/invoices/batch/pdf", json={"invoice_ids": [999]}).status_code == 404
+    res = client.post("/invoices/batch/pdf", json={"start_date": "2026-09-31", "end_date": "2026-10-01"})
+    assert res.status_code == 400
+    assert client.post("/invoices/batch/pdf", json={"start_date": "09/01/2026", "end_date": "2026-10-01"}).status_code == 400
+
+
+def test_app_shutdown_stops_invoice_render_pool(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+    from app.services import invoice_batch
+
+    class FakePool:
+        stopped = False
+
+        def shutdown(self, wait=True):
+            self.stopped = wait
+
+    pool = FakePool()
+    monkeypatch.setattr(settings, "FMCSA_REFRESH_INTERVAL_MINUTES", 0)
+    monkeypatch.setattr(invoice_batch, "_executor", pool)
+    with TestClient(app):
+        pass
+    assert pool.stopped is True
+    assert invoice_batch._executor is None
@@ -1,4 +1,359 @@
-# Stub tests for loads module
+# Tests for loads module
+from datetime import datetime, timedelta
+
+from app import models
+from app.scripts.backfill_load_locations import _backfill_load_coordinates, _backfill_loads, _backfill_stop_coordinates
+from app.services.address import ParsedAddress, apply_load_address_fields, parse_address
+
 
 def test_loads_stub():
     assert True
+
+
+def _seed_loads(db, carrier, count=5):
+    base = datetime(2026, 1, 1)
+    loads = []
+    for i in range(count):
+        load = models.Load(
+            carrier_id=carrier.id,
+            load_number=f"L-{i}",
+            status="Delivered" if i % 2 else "Dispatched",
+            pickup_address=f"Shipper {i}, Dallas, TX 75001",
+            delivery_address=f"Receiver {i}, Austin, TX 73301",
+            pickup_date=base + timedelta(days=i),
+            created_at=base + timedelta(hours=i),
+        )
+        apply_load_address_fields(load)
+        db.add(load)
+        loads.append(load)
+    db.commit()
+    return loads
+
+
+def test_list_loads_keyset_pages(client, db, carrier):
+    _seed_loads(db, carrier, count=5)
+
+    first = client.get("/loads", params={"limit": 2}, headers={"Origin": "http://localhost:3000"})
+    assert first.status_code == 200
+    assert [l["load_number"] for l in first.json()] == ["L-4", "L-3"]
+    assert first.json()[0]["pickup_city"] == "Dallas"
+    # Browsers only let the frontend read the cursor if CORS exposes it
+    assert "x-next-cursor" in first.headers["Access-Control-Expose-Headers"].lower()
+
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/loads", params={"limit": 2, "cursor": cursor})
+    assert [l["load_number"] for l in second.json()] == ["L-2", "L-1"]
+
+    last = client.get("/loads", params={"limit": 2, "cursor": second.headers["X-Next-Cursor"]})
+    assert [l["load_number"] for l in last.json()] == ["L-0"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_list_loads_filters_and_projection(client, db, carrier):
+    _seed_loads(db, carrier, count=5)
+
+    res = client.get("/loads", params={"status": "Delivered", "fields": "load_number,status"})
+    assert res.status_code == 200
+    body = res.json()
+    assert [row["load_number"] for row in body] == ["L-3", "L-1"]
+    assert set(body[0]) == {"id", "load_number", "status"}
+
+    assert client.get("/loads", params={"fields": "bogus"}).status_code == 400
+
+
+def test_parse_address_variants():
+    parsed = parse_address("123 Main St, Dallas, TX, 75001, USA")
+    assert (parsed.street, parsed.city, parsed.state, parsed.zip_code) == ("123 Main St", "Dallas", "TX", "75001")
+    assert parse_address("Los Angeles, CA").city == "Los Angeles"
+    assert parse_address("Los Angeles, CA").state == "CA"
+    assert parse_address("Dallas TX 75201").zip_code == "75201"
+    assert parse_address(None).city is None
+    assert parse_address("Dallas").city == "Dallas"
+
+
+def test_parse_address_street_suffix_is_not_a_state():
+    assert parse_address("123 Main St") == ParsedAddress(street="123 Main St")
+    assert parse_address("Acme Foods, 100 Industrial Dr") == ParsedAddress(street="Acme Foods, 100 Industrial Dr")
+    assert parse_address("Acme Foods, 100 Industrial Dr, 75001").state is None
+    parsed = parse_address("100 Industrial Dr, Toronto ON")
+    assert (parsed.street, parsed.city, parsed.state) == ("100 Industrial Dr", "Toronto", "ON")
+
+
+def test_backfill_populates_missing_locations(db, carrier):
+    load = models.Load(
+        carrier_id=carrier.id,
+        load_number="OLD-1",
+        pickup_address="Acme, Memphis, TN 38101",
+        delivery_address="Atlanta, GA",
+    )
+    db.add(load)
+    db.commit()
+    assert load.pickup_city is None
+
+    assert _backfill_loads(db, batch_size=10, refresh_all=False) == 1
+    db.refresh(load)
+    assert (load.pickup_city, load.pickup_state, load.pickup_zip) == ("Memphis", "TN", "38101")
+    assert (load.delivery_city, load.delivery_state) == ("Atlanta", "GA")
+
+
+def test_backfill_fills_coordinates_from_geocode_cache(db, carrier):
+    from app.services.address import normalize_address_key
+
+    load = models.Load(carrier_id=carrier.id, load_number="OLD-2", pickup_address="Acme, Memphis, TN 38101",
+                       delivery_address="Nowhere, ZZ")
+    db.add(load)
+    db.flush()
+    db.add(models.LoadStop(load_id=load.id, stop_type="pickup", address="Acme, Memphis, TN 38101"))
+    db.add_all([
+        models.GeocodeCacheEntry(address_key=normalize_address_key("Acme, Memphis, TN 38101"),
+                                 address="Acme, Memphis, TN 38101", latitude=35.15, longitude=-90.05),
+        models.GeocodeCacheEntry(address_key=normalize_address_key("Nowhere, ZZ"), address="Nowhere, ZZ", found=False),
+    ])
+    db.commit()
+
+    assert _backfill_load_coordinates(db, batch_size=10, refresh_all=False) == 1
+    assert _backfill_stop_coordinates(db, batch_size=10, refresh_all=False) == 1
+    db.refresh(load)
+    assert (load.pickup_latitude, load.pickup_longitude) == (35.15, -90.05)
+    assert load.delivery_latitude is None
+    assert (load.stops[0].latitude, load.stops[0].longitude) == (35.15, -90.05)
+
+
+def test_address_edit_clears_its_coordinates(client, db, carrier):
+    (load,) = _seed_loads(db, carrier, count=1)
+    load.pickup_latitude, load.pickup_longitude = 32.78, -96.8
+    load.delivery_latitude, load.delivery_longitude = 30.27, -97.74
+    db.commit()
+
+    res = client.patch(f"/loads/{load.id}", json={"pickup_address": "Shipper 0, Dallas, TX 75001",
+                                                 "delivery_address": "Receiver 9, Houston, TX 77001"})
+    assert res.status_code == 200, res.text
+    db.refresh(load)
+    assert (load.pickup_latitude, load.pickup_longitude) == (32.78, -96.8)  # same address
+    assert (load.delivery_latitude, load.delivery_longitude) == (None, None)
+    assert load.delivery_city == "Houston"
+
+
+def test_pay_ledger_statement_count_is_bounded(client, db, carrier, statement_counter):
+    owner = models.Payee(carrier_id=carrier.id, name="Owner Op LLC", payee_type="company")
+    payees = [models.Payee(carrier_id=carrier.id, name=f"Driver Payee {i}") for i in range(4)]
+    db.add_all([owner] + payees)
+    db.flush()
+    for i, payee in enumerate(payees):
+        driver = models.Driver(carrier_id=carrier.id, name=f"Driver {i}", payee_id=payee.id)
+        db.add(driver)
+        db.flush()
+        db.add(models.DriverPayProfile(driver_id=driver.id, pay_type="percent", rate=25, driver_kind="company_driver"))
+    load = models.Load(carrier_id=carrier.id, load_number="PAY-1", pickup_address="x", delivery_address="y")
+    db.add(load)
+    db.flush()
+    for payee in payees:
+        db.add_all([
+            models.SettlementLedgerLine(load_id=load.id, payee_id=payee.id, category="base_pay", amount=500),
+            models.SettlementLedgerLine(load_id=load.id, payee_id=payee.id, category="detention", amount=50),
+            models.SettlementLedgerLine(load_id=load.id, payee_id=owner.id, category="pass_through",
+                                        description=f"Wages (from {payee.name})", amount=100),
+            models.SettlementLedgerLine(load_id=load.id, payee_id=payee.id, category="pass_through",
+                                        description="Wages → Owner Op LLC", amount=-100),
+        ])
+    db.commit()
+    load_id, owner_id = load.id, owner.id
+
+    statement_counter["count"] = 0
+    res = client.get(f"/loads/{load_id}/pay-ledger")
+    assert res.status_code == 200
+    # load, ledger lines, payees, driver pay profiles
+    assert statement_counter["count"] <= 4
+
+    body = res.json()
+    assert body["load_pay_total"] == 2200.0
+    by_payee = {p["payee_name"]: p for p in body["by_payee"]}
+    assert by_payee["Driver Payee 0"]["driver_kind"] == "company_driver"
+    assert by_payee["Driver Payee 0"]["subtotal"] == 450.0
+    deduction = by_payee["Driver Payee 0"]["pass_through_deductions"][0]
+    assert deduction["destination_payee_id"] == owner_id
+    assert len(by_payee["Owner Op LLC"]["lines"]) == 4
+
+
+def _scanned_pdf(widths):
+    """Image-only PDF (no text layer) with one page per width."""
+    import io
+    from PIL import Image
+
+    pages = [Image.new("L", (width, 100), color=255) for width in widths]
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=72)
+    return buffer.getvalue()
+
+
+def _fake_page_ocr(monkeypatch):
+    """Thread pool + fake page OCR keyed by page width; returns the list of rendered DPIs."""
+    import io
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from pypdf import PdfReader
+    from app.services import ocr_pipeline
+
+    page_text = {
+        100: "Load # RC-77\nBroker: Acme Logistics",
+        200: "Pickup: Dallas, TX",
+        300: "Deliver: Austin, TX\nRate $1,850.00",
+    }
+    rendered = []
+
+    def fake_ocr_page(page_pdf, dpi):
+        rendered.append(dpi)
+        width = int(PdfReader(io.BytesIO(page_pdf)).pages[0].mediabox.width)
+        time.sleep(0.01 * (4 - width // 100))  # finish out of order
+        return page_text[width]
+
+    executor = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(ocr_pipeline, "_executor", executor)
+    monkeypatch.setattr(ocr_pipeline, "ocr_pdf_page", fake_ocr_page)
+    return rendered
+
+
+def _auto_create(client, pdf_bytes, expect="succeeded"):
+    import time
+
+    res = client.post("/loads/auto-create", files=[("files", ("ratecon.pdf", pdf_bytes, "application/pdf"))])
+    assert res.status_code == 202
+    body = res.json()
+    for _ in range(100):
+        job = client.get(f"/jobs/{body['job_id']}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == expect, job
+    return body, job
+
+
+def test_auto_create_ocrs_pages_in_background_job(client, db, carrier, monkeypatch):
+    rendered = _fake_page_ocr(monkeypatch)
+
+    body, job = _auto_create(client, _scanned_pdf([100, 200, 300]))
+    assert job["progress"] == job["total"] == 3
+    assert rendered == [200, 200, 200]
+    assert job["result"]["broker"] == "Acme Logistics"
+    assert job["result"]["rate"] == "$1,850.00"
+
+    db.expire_all()
+    load = db.get(models.Load, body["load_id"])
+    assert load.load_number == "RC-77"
+    assert (load.pickup_city, load.delivery_city) == ("Dallas", "Austin")
+
+    extractions = client.get(f"/loads/{load.id}/extractions").json()
+    assert len(extractions) == 1
+    assert extractions[0]["status"] == "completed"
+    assert extractions[0]["job_id"] == body["job_id"]
+    assert (extractions[0]["page_count"], extractions[0]["ocr_pages"]) == (3, 3)
+    assert extractions[0]["raw_text"].index("RC-77") < extractions[0]["raw_text"].index("Austin")
+
+
+def test_auto_create_failure_after_ocr_marks_extraction_failed(client, db, carrier, monkeypatch):
+    from app.routers import loads
+
+    _fake_page_ocr(monkeypatch)
+
+    def broken_fields(text):
+        raise ValueError("unreadable rate")
+
+    monkeypatch.setattr(loads, "_rate_con_draft_fields", broken_fields)
+    body, _ = _auto_create(client, _scanned_pdf([100]), expect="failed")
+
+    extractions = client.get(f"/loads/{body['load_id']}/extractions").json()
+    assert [(e["status"], e["error"]) for e in extractions] == [("failed", "unreadable rate")]
+    assert extractions[0]["completed_at"] is not None
+
+
+def test_app_shutdown_stops_ocr_pool(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+    from app.services import ocr_pipeline
+
+    class FakePool:
+        stopped = False
+
+        def shutdown(self, wait=True):
+            self.stopped = wait
+
+    pool = FakePool()
+    monkeypatch.setattr(settings, "FMCSA_REFRESH_INTERVAL_MINUTES", 0)
+    monkeypatch.setattr(ocr_pipeline, "_executor", pool)
+    with TestClient(app):
+        pass
+    assert pool.stopped is True
+    assert ocr_pipeline._executor is None
+
+
+def test_repeat_upload_reuses_extraction_by_hash(client, db, carrier, monkeypatch):
+    rendered = _fake_page_ocr(monkeypatch)
+    pdf_bytes = _scanned_pdf([100, 200, 300])
+
+    first, _ = _auto_create(client, pdf_bytes)
+    second, job = _auto_create(client, pdf_bytes)
+    assert len(rendered) == 3  # no OCR for the repeat
+    assert second["duplicate_of"] == first["extraction_id"]
+    assert job["result"]["broker"] == "Acme Logistics"
+
+    db.expire_all()
+    load = db.get(models.Load, second["load_id"])
+    assert load.load_number == "RC-77"
+
+    # parse-rate-con finds the same file without rendering it (no poppler here)
+    res = client.post("/loads/parse-rate-con", files={"file": ("again.pdf", pdf_bytes, "application/pdf")})
+    assert res.status_code == 200
+    assert res.json()["duplicate_of"] == first["extraction_id"]
+    assert res.json()["data"]["load_number"] == "RC-77"
+
+    other, _ = _auto_create(client, _scanned_pdf([100, 200]))
+    assert other["duplicate_of"] is None
+
+    report = client.get("/loads/extractions/duplicates").json()
+    assert report["duplicate_groups"] == 1
+    assert report["redundant_uploads"] == 2
+    group = report["items"][0]
+    assert group["uploads"] == 3
+    assert [e["source"] for e in group["extractions"]] == ["auto_create", "auto_create", "parse_rate_con"]
+    assert [e["duplicate_of"] for e in group["extractions"]] == [None, first["extraction_id"], first["extraction_id"]]
+
+
+def test_field_extractor_priority_boundaries_and_confidence():
+    from app.services.rate_con_ocr import RateConfirmationOCR, rate_con_extractor
+
+    text = (
+        "Tracking via Macropoint required\n"
+        "Reference # REF-1\n"
+        "Load # LN-42\n"
+        "Pickup Date: 13/45/2026\n"
+        "Drop Off: 03/04/2026\n"
+        "Total: $2,450.00\n"
+    )
+    found = rate_con_extractor.extract(text)
+    assert found["load_number"] == {"value": "LN-42", "confidence": 0.9}  # priority beats position
+    assert "po_number" not in found  # "po" inside "Macropoint" is not a label
+    assert found["pickup_date"]["confidence"] == 0.45  # not a real date
+    assert found["delivery_date"] == {"value": "03/04/2026", "confidence": 0.85}
+
+    extracted = RateConfirmationOCR().extract_from_text(text)
+    assert extracted["data"]["rate_amount"] == "2450.00"
+    assert extracted["confidence_scores"]["rate_amount"] == 0.8
+
+
+def test_field_extractor_po_label_needs_word_boundary():
+    from app.scripts.bench_rate_con_extract import _legacy_extract
+    from app.services.rate_con_ocr import rate_con_extractor
+
+    filler = "Tracking via Macropoint is required.\nLumper receipts required for reimbursement.\n"
+    # The per-pattern re.search read "po" inside "Macropoint" as a PO label
+    assert _legacy_extract(filler)["po_number"] == "int"
+    assert "po_number" not in rate_con_extractor.extract(filler)
+
+    # A real label later in the document still wins over the glued one
+    text = filler + "PO # 48213\n"
+    assert _legacy_extract(text)["po_number"] == "int"
+    assert rate_con_extractor.extract(text)["po_number"]["value"] == "48213"
+    # Labels at the start of the text or after punctuation still count
+    assert rate_con_extractor.extract("PO: A-7")["po_number"]["value"] == "A-7"
+    assert rate_con_extractor.extract("Ref/PO# 9921")["po_number"]["value"] == "9921"
@@ -0,0 +1,165 @@
+# Tests for Mapbox geocoding cache against the local stub server
+import pytest
+
+from app import models
+from app.core.config import settings
+
+GEOCODE_PREFIX = "/geocoding/v5/mapbox.places/"
+DIRECTIONS_PREFIX = "/directions/v5/mapbox/driving/"
+
+
+def _geocode_hits(server) -> int:
+    return sum(count for path, count in server.hits.items() if path.startswith(GEOCODE_PREFIX))
+
+
+def _directions_hits(server) -> int:
+    return sum(count for path, count in server.hits.items() if path.startswith(DIRECTIONS_PREFIX))
+
+
+def _place(server, name, lon, lat):
+    server.scripts[f"{GEOCODE_PREFIX}{name}.json"] = [(200, {
+        "features": [{"geometry": {"coordinates": [lon, lat]}, "place_name": name}]
+    })]
+
+
+def _route(*legs):
+    return (200, {"routes": [{
+        "distance": sum(d for d, _ in legs), "duration": sum(t for _, t in legs),
+        "geometry": {"type": "LineString", "coordinates": []},
+        "legs": [{"distance": d, "duration": t} for d, t in legs],
+    }]})
+
+
+@pytest.fixture
+def mapbox_stub(stub_server, monkeypatch):
+    from app.services.geocode_cache import geocode_cache
+    from app.services.mapbox import mapbox_http
+    from app.services.route_cache import route_cache
+
+    stub_server.scripts[GEOCODE_PREFIX] = [(200, {
+        "features": [{"geometry": {"coordinates": [-96.8, 32.78]}, "place_name": "Somewhere, TX"}]
+    })]
+    stub_server.scripts[DIRECTIONS_PREFIX] = [(200, {
+        "routes": [{"distance": 321868, "duration": 10800, "geometry": {"type": "LineString", "coordinates": []},
+                    "legs": [{"distance": 321868, "duration": 10800}]}]
+    })]
+    monkeypatch.setattr(settings, "MAPBOX_API_KEY", "test-key")
+    original = mapbox_http.config
+    mapbox_http.configure(base_url=stub_server.url, backoff_base=0, backoff_max=0)
+    geocode_cache.clear_memory()
+    route_cache.clear_memory()
+    try:
+        yield stub_server
+    finally:
+        mapbox_http.configure(**original.__dict__)
+        geocode_cache.clear_memory()
+        route_cache.clear_memory()
+
+
+def test_repeat_recalc_needs_no_geocoding(db, carrier, mapbox_stub):
+    from app.routers.loads import update_load_metrics
+    from app.services.geocode_cache import geocode_cache
+
+    load = models.Load(carrier_id=carrier.id, load_number="G-1", rate_amount=1000,
+                       pickup_address="1 Dock Rd, Dallas, TX", delivery_address="9 Yard St, Austin, TX")
+    db.add(load)
+    db.commit()
+    before = geocode_cache.stats()
+
+    update_load_metrics(load, db)
+    assert _geocode_hits(mapbox_stub) == 2
+    assert load.total_miles == 200.0
+    assert db.query(models.GeocodeCacheEntry).count() == 2
+
+    update_load_metrics(load, db)
+    geocode_cache.clear_memory()  # a fresh worker still has the table
+    update_load_metrics(load, db)
+    assert _geocode_hits(mapbox_stub) == 2
+
+    stats = geocode_cache.stats()
+    assert stats["misses"] - before["misses"] == 2
+    assert stats["memory_hits"] - before["memory_hits"] == 2
+    assert stats["db_hits"] - before["db_hits"] == 2
+
+
+def test_cache_key_ignores_formatting(db, mapbox_stub):
+    from app.services.mapbox import MapboxService
+
+    service = MapboxService(db)
+    service.geocode_address("123 Main Street, Dallas, TX")
+    service.geocode_address("123 main st dallas tx")
+    assert _geocode_hits(mapbox_stub) == 1
+
+
+def test_warm_up_geocodes_distinct_addresses_once(db, carrier, mapbox_stub):
+    from app.scripts.warm_geocode_cache import warm
+
+    for i in range(3):
+        db.add(models.Load(carrier_id=carrier.id, load_number=f"W-{i}",
+                           pickup_address="1 Dock Rd, Dallas, TX", delivery_address=f"{i} Yard St, Austin, TX"))
+    db.add(models.Customer(carrier_id=carrier.id, company_name="Shipper", address="5 Mill Ave",
+                           city="Waco", state="TX", zip_code="76701"))
+    db.commit()
+
+    result = warm(db, carrier.id, concurrency=2, force=False)
+    assert result == {"distinct_addresses": 5, "already_cached": 0, "geocoded": 5, "errors": 0}
+    assert _geocode_hits(mapbox_stub) == 5
+
+    again = warm(db, carrier.id, concurrency=2, force=False)
+    assert again["already_cached"] == 5 and again["geocoded"] == 0
+    assert _geocode_hits(mapbox_stub) == 5
+
+
+def test_recurring_lane_reuses_cached_legs(db, carrier, mapbox_stub):
+    from app.routers.loads import update_load_metrics
+    from app.services.route_cache import route_cache
+
+    _place(mapbox_stub, "Dallas", -96.80001, 32.78)
+    _place(mapbox_stub, "Waco", -97.15, 31.55)
+    _place(mapbox_stub, "Austin", -97.74, 30.27)
+    mapbox_stub.scripts[DIRECTIONS_PREFIX] = [_route((160934, 5400), (160934, 5400))]
+
+    multi = models.Load(carrier_id=carrier.id, load_number="L-1", rate_amount=1200,
+                        pickup_address="Dallas", delivery_address="Austin")
+    multi.stops = [models.LoadStop(stop_number=1, stop_type="delivery", address="Waco")]
+    db.add(multi)
+    db.commit()
+
+    update_load_metrics(multi, db)
+    assert _directions_hits(mapbox_stub) == 1  # both uncached legs in one geometry-free call
+    assert multi.total_miles == 200.0
+    assert multi.stops[0].miles_to_next_stop == 100.0
+    assert db.query(models.RouteLegCacheEntry).count() == 2
+
+    # Same lane on another load, with the origin geocoded a few metres away
+    _place(mapbox_stub, "Dallas Yard", -96.80004, 32.78)
+    single = models.Load(carrier_id=carrier.id, load_number="L-2", rate_amount=500,
+                         pickup_address="Dallas Yard", delivery_address="Waco")
+    db.add(single)
+    db.commit()
+    update_load_metrics(single, db)
+    route_cache.clear_memory()
+    update_load_metrics(multi, db)
+    assert _directions_hits(mapbox_stub) == 1
+    assert single.total_miles == 100.0 and single.rate_per_mile == 5.0
+
+    paths = [path for path in mapbox_stub.hits if path.startswith(DIRECTIONS_PREFIX)]
+    assert paths == ["/directions/v5/mapbox/driving/-96.80001,32.78;-97.15,31.55;-97.74,30.27"]
+
+
+def test_map_view_fetches_geometry_and_fills_leg_cache(db, mapbox_stub):
+    from app.services.mapbox import MapboxService
+
+    _place(mapbox_stub, "Dallas", -96.8, 32.78)
+    _place(mapbox_stub, "Waco", -97.15, 31.55)
+    mapbox_stub.scripts[DIRECTIONS_PREFIX] = [_route((160934, 5400))]
+    service = MapboxService(db)
+
+    route = service.calculate_route_with_stops(["Dallas", "Waco"])
+    assert route["geometry"] == {"type": "LineString", "coordinates": []}
+
+    summary = service.calculate_route_with_stops(["Dallas", "Waco"], include_geometry=False)
+    assert summary["geometry"] is None
+    assert summary["total_distance_miles"] == 100.0
+    assert summary["legs"][0]["from_address"] == "Dallas"
+    assert _directions_hits(mapbox_stub) == 1
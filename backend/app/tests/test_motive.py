@@ -0,0 +1,387 @@
+# Tests for Motive fleet locations against the local stub server
+import json
+import time
+
+import pytest
+
+from app import models
+
+
+def _vehicle(external_id, lat, lon):
+    return {"vehicle": {
+        "id": 100 + int(external_id), "number": f"T{external_id}",
+        "current_driver": {"id": int(external_id)},
+        "current_location": {"lat": lat, "lon": lon, "bearing": 90, "speed": 61.5,
+                             "located_at": "2026-10-18T12:00:00Z", "description": "I-35, TX"},
+    }}
+
+
+WEBHOOK_SECRET = "whsec-test"
+
+
+def _post_webhook(client, events, secret=WEBHOOK_SECRET):
+    from app.services.motive_telemetry import SIGNATURE_HEADER, sign_webhook
+
+    body = json.dumps(events).encode()
+    return client.post("/motive/webhook", content=body, headers={
+        "Content-Type": "application/json", SIGNATURE_HEADER: sign_webhook(body, secret),
+    })
+
+
+@pytest.fixture
+def motive_stub(stub_server, monkeypatch, db, carrier):
+    from app.routers import motive
+    from app.services.motive import fleet_locations, motive_http
+
+    monkeypatch.setattr(motive, "MOTIVE_API_KEY", "test-key")
+    monkeypatch.setattr(motive.settings, "MOTIVE_WEBHOOK_SECRETS", {carrier.id: WEBHOOK_SECRET})
+    original = motive_http.config
+    motive_http.configure(base_url=stub_server.url, backoff_base=0, backoff_max=0, max_retries=0)
+    db.add_all([
+        models.Driver(carrier_id=carrier.id, name="Ana Diaz", external_id="1"),
+        models.Driver(carrier_id=carrier.id, name="Bo Chen", external_id="2"),
+        models.Driver(carrier_id=carrier.id, name="Cy Unlinked"),
+    ])
+    db.commit()
+    fleet_locations.clear()
+    try:
+        yield stub_server
+    finally:
+        motive_http.configure(**original.__dict__)
+        fleet_locations.clear()
+
+
+def test_bulk_listing_then_snapshot(client, motive_stub):
+    motive_stub.scripts["/vehicle_locations"] = [(200, {
+        "vehicles": [_vehicle("2", 30.27, -97.74), _vehicle("1", 32.78, -96.8), _vehicle("9", 0, 0)],
+        "pagination": {"per_page": 100, "page_no": 1, "total": 3},
+    })]
+
+    response = client.get("/motive/locations/all")
+    assert response.status_code == 200
+    assert response.headers["X-Snapshot-State"] == "fetched"
+    assert response.headers["X-Snapshot-Source"] == "bulk"
+    body = response.json()
+    assert [row["driver_name"] for row in body] == ["Ana Diaz", "Bo Chen"]
+    assert body[0]["latitude"] == 32.78 and body[0]["heading"] == 90 and body[0]["address"] == "I-35, TX"
+
+    again = client.get("/motive/locations/all")
+    assert again.headers["X-Snapshot-State"] == "fresh"
+    assert again.json() == body
+    assert motive_stub.hits == {"/vehicle_locations": 1}
+
+
+def test_per_driver_fallback_drops_slow_driver(client, motive_stub, monkeypatch):
+    from app.services.motive import fleet_locations
+
+    monkeypatch.setattr(fleet_locations, "deadline", 0.3)
+    motive_stub.scripts["/vehicle_locations"] = [(404, {"error": "not found"})]
+    motive_stub.scripts["/drivers/1/location"] = [(200, {
+        "latitude": 32.78, "longitude": -96.8, "speed": 55, "heading": 180,
+        "timestamp": "2026-10-18T12:00:00", "address": "Dallas, TX",
+    })]
+    motive_stub.scripts["/drivers/2/location"] = [(200, {"latitude": 1, "longitude": 1}, 2.0)]
+
+    started = time.perf_counter()
+    response = client.get("/motive/locations/all")
+    assert time.perf_counter() - started < 1.5
+    assert response.headers["X-Snapshot-Source"] == "per_driver"
+    assert [row["driver_name"] for row in response.json()] == ["Ana Diaz"]
+
+
+def test_per_driver_deadline_is_hard_and_not_retried(client, motive_stub, monkeypatch):
+    from app.services.motive import fleet_locations, motive_http
+
+    monkeypatch.setattr(fleet_locations, "deadline", 0.3)
+    # Retries are on for the provider; the per-driver calls must not use them
+    motive_http.configure(max_retries=2)
+    motive_stub.scripts["/vehicle_locations"] = [(404, {"error": "not found"})]
+    motive_stub.scripts["/drivers/1/location"] = [(200, {"latitude": 32.78, "longitude": -96.8})]
+    motive_stub.scripts["/drivers/2/location"] = [(200, {"latitude": 1, "longitude": 1}, 2.0)]
+
+    started = time.perf_counter()
+    response = client.get("/motive/locations/all")
+    assert time.perf_counter() - started < 1.0
+    assert [row["driver_name"] for row in response.json()] == ["Ana Diaz"]
+    assert motive_stub.hits["/drivers/2/location"] == 1
+    stats = motive_http.stats()
+    assert stats["failures"] >= 1 and stats["retries"] == 0
+
+
+def test_stale_snapshot_served_while_refreshing(client, motive_stub, monkeypatch):
+    from app.services.motive import fleet_locations
+
+    motive_stub.scripts["/vehicle_locations"] = [
+        (200, {"vehicles": [_vehicle("1", 32.78, -96.8)]}),
+        (200, {"vehicles": [_vehicle("1", 31.55, -97.15)]}, 0.2),
+    ]
+    client.get("/motive/locations/all")
+    monkeypatch.setattr(fleet_locations, "ttl_seconds", 0)
+
+    started = time.perf_counter()
+    stale = client.get("/motive/locations/all")
+    assert time.perf_counter() - started < 0.2
+    assert stale.headers["X-Snapshot-State"] == "stale"
+    assert stale.json()[0]["latitude"] == 32.78
+
+    monkeypatch.setattr(fleet_locations, "ttl_seconds", 60)
+    for _ in range(50):
+        if motive_stub.hits["/vehicle_locations"] == 2 and not fleet_locations._refreshing:
+            break
+        time.sleep(0.05)
+    assert client.get("/motive/locations/all").json()[0]["latitude"] == 31.55
+
+
+def _ping(driver_id, lat, at, vehicle_id=None):
+    event = {"event_type": "location_update", "driver_id": driver_id,
+             "location": {"lat": lat, "lon": -97.0, "bearing": 45, "speed": 60, "located_at": at}}
+    if vehicle_id:
+        event["vehicle"] = {"id": vehicle_id}
+    return event
+
+
+def test_webhook_burst_feeds_local_reads(client, db, motive_stub):
+    from app.services.motive_telemetry import telemetry_ingestor
+
+    driver = db.query(models.Driver).filter_by(external_id="1").one()
+    events = [
+        _ping(1, 32.0, "2026-10-18T12:05:00Z", vehicle_id=501),
+        _ping(1, 31.0, "2026-10-18T12:00:00Z", vehicle_id=501),  # arrives late
+        _ping(77, 29.0, "2026-10-18T12:00:00Z"),  # not linked to a driver here
+        {"event_type": "hos_violation", "driver": {"id": 1}, "timestamp": "2026-10-18T12:06:00Z",
+         "hos": {"current_status": "driving", "driving_hours_remaining": 0.5, "shift_hours_remaining": 2,
+                 "cycle_hours_remaining": 30}},
+    ]
+    response = _post_webhook(client, events)
+    assert response.json()["queued"] == 4
+    assert telemetry_ingestor.flush()
+
+    assert db.query(models.MotiveTelemetryEvent).count() == 4
+    assert db.query(models.MotiveTelemetryEvent).filter_by(driver_id=driver.id).count() == 3
+    vehicle = db.query(models.MotiveLatestState).filter_by(entity_type="vehicle", external_id="501").one()
+    assert vehicle.latitude == 32.0 and vehicle.carrier_id == driver.carrier_id
+
+    location = client.get(f"/motive/location/{driver.id}")
+    assert location.headers["X-Location-Source"] == "local"
+    assert location.json()["latitude"] == 32.0 and location.json()["heading"] == 45
+    hos = client.get(f"/motive/hos/{driver.id}")
+    assert hos.headers["X-HOS-Source"] == "local"
+    assert hos.json()["status"] == "driving" and hos.json()["driving_hours_remaining"] == 0.5
+    assert motive_stub.hits == {}
+
+
+def test_webhook_requires_valid_signature(client, db, motive_stub, monkeypatch):
+    from app.routers import motive
+
+    events = [_ping(1, 32.0, "2026-10-18T12:05:00Z")]
+    assert _post_webhook(client, events, secret="wrong").status_code == 401
+    assert client.post("/motive/webhook", json=events).status_code == 401
+    monkeypatch.setattr(motive.settings, "MOTIVE_WEBHOOK_SECRETS", {})
+    assert _post_webhook(client, events).status_code == 503
+    assert db.query(models.MotiveTelemetryEvent).count() == 0
+
+
+def test_malformed_webhook_event_is_rejected(client, db, motive_stub):
+    bad = {"event_type": "location_update", "driver_id": 1, "location": {"lat": "north", "lon": -97.0}}
+    response = _post_webhook(client, [_ping(1, 32.0, "2026-10-18T12:05:00Z"), bad])
+    assert response.status_code == 422
+    assert "event 1" in response.json()["detail"]
+    assert _post_webhook(client, ["not an event"]).status_code == 422
+    assert db.query(models.MotiveTelemetryEvent).count() == 0
+
+
+def test_failing_event_does_not_drop_its_batch(db, carrier, motive_stub, monkeypatch):
+    from app.services import motive_telemetry
+
+    ingestor = motive_telemetry.TelemetryIngestor(batch_size=10, max_queue=10)
+    write_events = motive_telemetry.write_events
+
+    def flaky(session, carrier_id, events):
+        if any(event["driver_external_id"] == "2" for event in events):
+            raise ValueError("bad row")
+        return write_events(session, carrier_id, events)
+
+    monkeypatch.setattr(motive_telemetry, "write_events", flaky)
+    events = [motive_telemetry.normalize_event(_ping(driver, 30.0, "2026-10-18T12:00:00Z")) for driver in (1, 2, 1)]
+    ingestor._pending = len(events)
+    ingestor._write([(db.get_bind(), carrier.id, event) for event in events])
+
+    stats = ingestor.stats()
+    assert stats["written"] == 2 and stats["failed"] == 1 and "bad row" in stats["last_error"]
+    assert db.query(models.MotiveTelemetryEvent).count() == 2
+
+
+def test_batch_is_held_through_database_outage(client, db, carrier, motive_stub, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+
+    from app.services import motive_telemetry
+
+    ingestor = motive_telemetry.TelemetryIngestor(batch_size=10, max_queue=10, retry_seconds=0)
+    monkeypatch.setattr(motive_telemetry, "telemetry_ingestor", ingestor)
+    monkeypatch.setattr("app.routers.motive.telemetry_ingestor", ingestor)
+    write_events = motive_telemetry.write_events
+    down = [True]
+
+    def outage(session, carrier_id, events):
+        if down[0]:
+            raise OperationalError("INSERT", {}, Exception("server closed the connection"))
+        return write_events(session, carrier_id, events)
+
+    monkeypatch.setattr(motive_telemetry, "write_events", outage)
+    events = [motive_telemetry.normalize_event(_ping(driver, 30.0, "2026-10-18T12:00:00Z")) for driver in (1, 2)]
+    ingestor._pending = len(events)
+    ingestor._write([(db.get_bind(), carrier.id, event) for event in events])
+
+    stats = ingestor.stats()
+    assert stats["held"] == 2 and stats["queued"] == 2 and stats["written"] == 0 and stats["failed"] == 0
+    assert _post_webhook(client, [_ping(1, 31.0, "2026-10-18T12:05:00Z")]).status_code == 503
+    assert not ingestor.flush(timeout=0)
+
+    down[0] = False
+    ingestor._write(ingestor._next_batch())
+    assert ingestor.flush(timeout=0)
+    assert ingestor.stats()["held"] == 0 and ingestor.stats()["written"] == 2
+    assert db.query(models.MotiveTelemetryEvent).count() == 2
+
+
+def test_same_motive_id_at_two_carriers_stays_separate(client, db, carrier, motive_stub, monkeypatch):
+    from app.routers import motive
+    from app.services.motive_telemetry import telemetry_ingestor
+
+    other = models.Carrier(name="Other Carrier", internal_code="OTHER")
+    db.add(other)
+    db.commit()
+    other_driver = models.Driver(carrier_id=other.id, name="Di Other", external_id="1")
+    db.add(other_driver)
+    db.commit()
+    monkeypatch.setattr(motive.settings, "MOTIVE_WEBHOOK_SECRETS", {carrier.id: WEBHOOK_SECRET, other.id: "whsec-other"})
+
+    assert _post_webhook(client, [_ping(1, 32.0, "2026-10-18T12:05:00Z", vehicle_id=501)]).status_code == 200
+    assert _post_webhook(client, [_ping(1, 40.0, "2026-10-18T12:10:00Z", vehicle_id=501)],
+                         secret="whsec-other").status_code == 200
+    assert telemetry_ingestor.flush()
+
+    driver = db.query(models.Driver).filter_by(carrier_id=carrier.id, external_id="1").one()
+    states = {(row.carrier_id, row.entity_type): (row.driver_id, row.latitude)
+              for row in db.query(models.MotiveLatestState)}
+    assert states == {
+        (carrier.id, "driver"): (driver.id, 32.0), (carrier.id, "vehicle"): (None, 32.0),
+        (other.id, "driver"): (other_driver.id, 40.0), (other.id, "vehicle"): (None, 40.0),
+    }
+    assert client.get(f"/motive/location/{driver.id}").json()["latitude"] == 32.0
+    events = db.query(models.MotiveTelemetryEvent).filter_by(driver_id=other_driver.id).all()
+    assert [(event.carrier_id, event.latitude) for event in events] == [(other.id, 40.0)]
+
+
+def test_live_refresh_updates_local_state(client, db, motive_stub):
+    driver = db.query(models.Driver).filter_by(external_id="2").one()
+    motive_stub.scripts["/drivers/2/location"] = [(200, {
+        "latitude": 35.1, "longitude": -90.0, "speed": 0, "heading": 10,
+        "timestamp": "2026-10-18T13:00:00", "address": "Memphis, TN",
+    })]
+
+    live = client.get(f"/motive/location/{driver.id}", params={"live": "true"})
+    assert live.headers["X-Location-Source"] == "live"
+    assert live.json()["address"] == "Memphis, TN"
+
+    local = client.get(f"/motive/location/{driver.id}")
+    assert local.headers["X-Location-Source"] == "local"
+    assert local.json()["latitude"] == 35.1
+    assert motive_stub.hits == {"/drivers/2/location": 1}
+    assert db.query(models.MotiveTelemetryEvent).filter_by(event_type="location_poll").count() == 1
+
+
+def test_breadcrumb_encoding_round_trip():
+    from app.services.breadcrumbs import decode_points, encode_points
+
+    points = [(1792324800 + 30 * i, 32.78 + i * 0.0004, -96.8 - i * 0.0003) for i in range(2880)]
+    data = encode_points(points)
+    assert len(data) < 6 * len(points)
+    decoded = decode_points(data)
+    assert [p[0] for p in decoded] == [p[0] for p in points]
+    assert all(abs(a[1] - b[1]) < 1e-5 and abs(a[2] - b[2]) < 1e-5 for a, b in zip(decoded, points))
+
+
+def test_concurrent_breadcrumb_appends_keep_every_point(tmp_path):
+    import threading
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.database import Base
+    from app.services.breadcrumbs import append_points, decode_points
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'crumbs.db'}", connect_args={"check_same_thread": False, "timeout": 10})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    start = datetime(2026, 10, 18, 12)
+    appended = threading.Event()
+
+    def writer(offset, hold):
+        db = Session()
+        try:
+            append_points(db, 1, 7, [(start + timedelta(minutes=offset + 2 * i), 30.0, -97.0) for i in range(5)])
+            appended.set()
+            time.sleep(hold)  # the other writer appends while this transaction is open
+            db.commit()
+        finally:
+            db.close()
+
+    first = threading.Thread(target=writer, args=(0, 0.3))
+    first.start()
+    assert appended.wait(5)
+    writer(1, 0)
+    first.join()
+
+    db = Session()
+    (row,) = db.query(models.DriverBreadcrumbDay).all()
+    assert row.point_count == 10 and len(decode_points(row.data)) == 10
+    db.close()
+    engine.dispose()
+
+
+def test_location_history_from_breadcrumbs(client, db, motive_stub):
+    from app.services.motive_telemetry import telemetry_ingestor
+
+    driver = db.query(models.Driver).filter_by(external_id="1").one()
+    # A straight northbound run over two days with one detour
+    pings = []
+    for i in range(200):
+        day, minute = divmod(i, 100)
+        lon = -96.5 if i == 150 else -97.0
+        pings.append({"event_type": "location_update", "driver_id": 1,
+                      "location": {"lat": 30.0 + i * 0.01, "lon": lon,
+                                   "located_at": f"2026-10-{17 + day}T10:{minute // 2:02d}:{(minute % 2) * 30:02d}Z"}})
+    _post_webhook(client, pings)
+    _post_webhook(client, pings[:10])  # redelivered
+    assert telemetry_ingestor.flush()
+    assert [row.point_count for row in db.query(models.DriverBreadcrumbDay).order_by("day")] == [100, 100]
+
+    params = {"start_date": "2026-10-17", "end_date": "2026-10-18", "max_points": 5}
+    history = client.get(f"/motive/location/history/{driver.id}", params=params).json()
+    assert history["source"] == "local" and history["total_points"] == 200
+    lats = [round(lat, 2) for _, lat, _ in history["points"]]
+    assert history["returned_points"] == 5
+    assert lats[0] == 30.0 and lats[-1] == 31.99
+    assert {31.49, 31.5, 31.51} <= set(lats)  # the detour survives simplification
+
+    one_day = client.get(f"/motive/location/history/{driver.id}",
+                         params={"start_date": "2026-10-18", "end_date": "2026-10-18"}).json()
+    assert one_day["total_points"] == 100 and one_day["returned_points"] == 100
+    assert motive_stub.hits == {}
+
+
+def test_location_history_backfills_from_motive(client, db, motive_stub):
+    driver = db.query(models.Driver).filter_by(external_id="2").one()
+    motive_stub.scripts["/drivers/2/location/history"] = [(200, {"locations": [
+        {"location": {"lat": 35.0 + i * 0.01, "lon": -90.0, "located_at": f"2026-10-10T08:{i:02d}:00Z"}}
+        for i in range(30)
+    ] + [{"location": {"lat": 1.0, "lon": 1.0}}]})]
+
+    params = {"start_date": "2026-10-10", "end_date": "2026-10-10"}
+    first = client.get(f"/motive/location/history/{driver.id}", params=params).json()
+    assert first["source"] == "live" and first["total_points"] == 30
+    second = client.get(f"/motive/location/history/{driver.id}", params=params).json()
+    assert second["source"] == "local" and second["points"] == first["points"]
+    assert motive_stub.hits == {"/drivers/2/location/history": 1}
@@ -0,0 +1,323 @@
+# Tests for payroll payables drill-down
+import csv
+import io
+from datetime import datetime, timedelta
+
+from app import models
+
+
+def _seed_lines(db, carrier, count=5):
+    payee = models.Payee(carrier_id=carrier.id, name="Owner Op")
+    db.add(payee)
+    db.flush()
+    base = datetime(2026, 3, 1)
+    for i in range(count):
+        load = models.Load(carrier_id=carrier.id, load_number=f"L-{i}", pickup_address="x", delivery_address="y",
+                           pickup_city="Dallas", pickup_state="TX", delivery_city="Austin", delivery_state="TX")
+        db.add(load)
+        db.flush()
+        db.add(models.SettlementLedgerLine(load_id=load.id, payee_id=payee.id, category="base_pay",
+                                           amount=100 + i, created_at=base + timedelta(hours=i)))
+    db.commit()
+    return payee.id
+
+
+def test_payee_lines_paginated_with_sql_total(client, db, carrier, statement_counter):
+    payee_id = _seed_lines(db, carrier, count=5)
+
+    statement_counter["count"] = 0
+    first = client.get(f"/payroll/payables-grouped/{payee_id}/lines", params={"limit": 3}).json()
+    # payee, totals, joined page - independent of line count
+    assert statement_counter["count"] == 3
+    assert first["total"] == 510.0
+    assert first["line_count"] == 5
+    assert [l["load_info"]["load_number"] for l in first["lines"]] == ["L-0", "L-1", "L-2"]
+    assert first["lines"][0]["load_info"]["pickup_location"] == "Dallas, TX"
+
+    second = client.get(
+        f"/payroll/payables-grouped/{payee_id}/lines", params={"limit": 3, "cursor": first["next_cursor"]}
+    ).json()
+    assert [l["load_info"]["load_number"] for l in second["lines"]] == ["L-3", "L-4"]
+    assert second["next_cursor"] is None
+
+
+def test_payee_lines_csv_export(client, db, carrier):
+    payee_id = _seed_lines(db, carrier, count=3)
+
+    res = client.get(f"/payroll/payables-grouped/{payee_id}/lines/export")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [r["load_number"] for r in rows] == ["L-0", "L-1", "L-2"]
+    assert rows[2]["amount"] == "102.00"
+
+
+def _seed_batch(db, carrier, payee_count=3):
+    payee_ids = []
+    for i in range(payee_count):
+        payee = models.Payee(carrier_id=carrier.id, name=f"Payee {i}")
+        db.add(payee)
+        db.flush()
+        driver = models.Driver(carrier_id=carrier.id, name=f"Driver {i}", payee_id=payee.id, email=f"d{i}@example.com")
+        db.add(driver)
+        db.flush()
+        db.add_all([
+            models.SettlementLedgerLine(payee_id=payee.id, category="base_pay", amount=1000),
+            models.SettlementLedgerLine(payee_id=payee.id, category="detention", amount=75),
+            models.RecurringSettlementItem(driver_id=driver.id, payee_id=payee.id, item_type="deduction",
+                                           amount=50, schedule="weekly"),
+        ])
+        payee_ids.append(payee.id)
+    db.commit()
+    return payee_ids
+
+
+def test_batch_settlements_set_based(db, carrier, statement_counter):
+    from app.services.settlement_engine import run_batch_settlements
+
+    payee_ids = _seed_batch(db, carrier, payee_count=5)
+    carrier_id = carrier.id
+    start, end = datetime(2026, 3, 1), datetime(2026, 3, 7)
+
+    statement_counter["count"] = 0
+    result = run_batch_settlements(db, carrier_id, start, end, notify=False)
+    # Constant statement count, independent of payee count
+    assert statement_counter["count"] <= 8
+
+    assert result["settlements_created"] == 5
+    assert result["total_amount"] == 5 * (1000 + 75 - 50)
+    assert {s["payee_id"] for s in result["settlements"]} == set(payee_ids)
+    assert all(s["line_count"] == 3 for s in result["settlements"])
+
+    pending = db.query(models.SettlementLedgerLine).filter(models.SettlementLedgerLine.settlement_id.is_(None)).count()
+    assert pending == 0
+    item = db.query(models.RecurringSettlementItem).first()
+    assert item.next_date == end + timedelta(days=7)
+
+
+def test_batch_settlements_background_job(client, db, carrier):
+    import time
+
+    _seed_batch(db, carrier, payee_count=2)
+    res = client.post("/payroll/settlements/batch", params={
+        "period_start": "2026-03-01T00:00:00", "period_end": "2026-03-07T00:00:00", "background": True,
+    })
+    assert res.status_code == 200
+    job_id = res.json()["job_id"]
+
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "succeeded", job
+    assert job["result"]["settlements_created"] == 2
+    assert job["progress"] == job["total"]
+
+
+def _seed_recalc(db, carrier, load_count=4):
+    from app.services.pay_engine import recalc_load_pay
+
+    driver_payee = models.Payee(carrier_id=carrier.id, name="Driver Payee")
+    owner_payee = models.Payee(carrier_id=carrier.id, name="Owner Payee")
+    db.add_all([driver_payee, owner_payee])
+    db.flush()
+    driver = models.Driver(carrier_id=carrier.id, name="Driver", payee_id=driver_payee.id)
+    db.add(driver)
+    db.flush()
+    db.add_all([
+        models.DriverPayProfile(driver_id=driver.id, pay_type="percent", rate=25, driver_kind="owner_operator"),
+        models.DriverAdditionalPayee(driver_id=driver.id, payee_id=owner_payee.id, pay_rate_percent=10),
+    ])
+    loads = []
+    for i in range(load_count):
+        load = models.Load(carrier_id=carrier.id, load_number=f"R-{i}", driver_id=driver.id, rate_amount=1000 + i * 100,
+                           pickup_address="x", delivery_address="y", pickup_date=datetime(2026, 3, 1 + i))
+        db.add(load)
+        db.flush()
+        db.add(models.LoadCharge(load_id=load.id, category="detention", amount=50))
+        loads.append(load)
+    db.commit()
+    for load in loads:
+        db.refresh(load)
+        recalc_load_pay(db, load)
+    return driver, [load.id for load in loads]
+
+
+def test_recalculate_dry_run_then_apply(client, db, carrier, statement_counter):
+    driver, load_ids = _seed_recalc(db, carrier, load_count=4)
+    driver_id = driver.id
+    old_profile = db.query(models.DriverPayProfile).filter_by(driver_id=driver_id).one()
+    old_profile.active = False
+    db.add(models.DriverPayProfile(driver_id=driver_id, pay_type="percent", rate=30, driver_kind="owner_operator"))
+    db.commit()
+    detention_ids = {
+        line.id for line in db.query(models.SettlementLedgerLine).filter_by(category="detention")
+    }
+
+    preview = client.post("/payroll/recalculate", json={"driver_id": driver_id, "dry_run": True}).json()
+    assert preview["dry_run"] is True
+    assert preview["loads_checked"] == 4
+    assert preview["loads_changed"] == 4
+    assert preview["lines_created"] == 4 and preview["lines_deleted"] == 4
+    assert preview["changes"][0]["create"][0]["description"] == "Freight % (30%)"
+    assert db.query(models.SettlementLedgerLine).filter_by(description="Freight % (30%)").count() == 0
+
+    statement_counter["count"] = 0
+    applied = client.post("/payroll/recalculate", json={"driver_id": driver_id}).json()
+    # loads, drivers, profiles, additional payees, charges, lines, delete, insert
+    assert statement_counter["count"] <= 8
+    assert applied["lines_unchanged"] == 8
+    amounts = sorted(
+        line.amount for line in db.query(models.SettlementLedgerLine).filter_by(category="base_pay", payee_id=driver.payee_id)
+    )
+    assert amounts == [300.0, 330.0, 360.0, 390.0]
+    # Unchanged lines are kept, not rewritten
+    assert detention_ids == {
+        line.id for line in db.query(models.SettlementLedgerLine).filter_by(category="detention")
+    }
+
+    again = client.post("/payroll/recalculate", json={"load_ids": load_ids}).json()
+    assert again["loads_changed"] == 0
+
+
+def test_recalculate_locked_load_adds_adjustment(db, carrier):
+    from app.services.pay_engine import recalc_loads_pay
+
+    driver, load_ids = _seed_recalc(db, carrier, load_count=1)
+    db.query(models.SettlementLedgerLine).update({"locked_at": datetime(2026, 3, 10)})
+    db.query(models.DriverPayProfile).update({"rate": 30})
+    db.commit()
+
+    result = recalc_loads_pay(db, carrier.id, load_ids=load_ids)
+    assert result["lines_created"] == 1
+    adjustment = db.query(models.SettlementLedgerLine).filter_by(category="adjustment").one()
+    assert adjustment.amount == 50.0
+    assert adjustment.payee_id == driver.payee_id
+    assert adjustment.adjustment_group_id
+
+
+def test_single_and_batch_recalc_use_the_same_profile(client, db, carrier):
+    from app.services.pay_engine import recalc_load_pay, recalc_loads_pay
+
+    driver, load_ids = _seed_recalc(db, carrier, load_count=2)
+    driver_id, payee_id = driver.id, driver.payee_id
+    res = client.post(f"/payroll/drivers/{driver_id}/pay-profile",
+                      json={"pay_type": "percent", "rate": 30, "driver_kind": "owner_operator"})
+    assert res.status_code == 200, res.text
+    assert db.query(models.DriverPayProfile).filter_by(driver_id=driver_id, active=True).count() == 1
+
+    db.expire_all()
+    recalc_load_pay(db, db.get(models.Load, load_ids[0]))
+    base = db.query(models.SettlementLedgerLine).filter_by(load_id=load_ids[0], category="base_pay",
+                                                            payee_id=payee_id).one()
+    assert (base.description, base.amount) == ("Freight % (30%)", 300.0)
+
+    # The batch path agrees with the single-load result and only changes the other load
+    result = recalc_loads_pay(db, carrier.id, load_ids=load_ids)
+    assert [change["load_id"] for change in result["changes"]] == [load_ids[1]]
+
+
+def _seed_settlements(db, carrier):
+    payee = models.Payee(carrier_id=carrier.id, name="Report Payee")
+    db.add(payee)
+    db.flush()
+    driver = models.Driver(carrier_id=carrier.id, name="Report Driver", payee_id=payee.id)
+    load = models.Load(carrier_id=carrier.id, load_number="RPT-1", pickup_address="x", delivery_address="y",
+                       pickup_city="Dallas", pickup_state="TX", delivery_city="Austin", delivery_state="TX")
+    db.add_all([driver, load])
+    db.flush()
+    settlements = []
+    for week, status in enumerate(["paid", "approved", "draft"]):
+        start = datetime(2026, 3, 1) + timedelta(days=7 * week)
+        settlement = models.PayrollSettlement(payee_id=payee.id, period_start=start,
+                                              period_end=start + timedelta(days=6), status=status)
+        db.add(settlement)
+        db.flush()
+        db.add_all([
+            models.SettlementLedgerLine(payee_id=payee.id, load_id=load.id, settlement_id=settlement.id,
+                                        category="base_pay", amount=1000),
+            models.SettlementLedgerLine(payee_id=payee.id, settlement_id=settlement.id,
+                                        category="adjustment", amount=-25, created_at=start),
+        ])
+        settlements.append(settlement.id)
+    db.commit()
+    return driver.id, settlements
+
+
+def test_payroll_reports_use_grouped_queries(db, carrier, statement_counter):
+    from app.services.payroll_reports import payroll_reports
+
+    driver_id, _ = _seed_settlements(db, carrier)
+    carrier_id = carrier.id
+    start, end = datetime(2026, 1, 1), datetime(2026, 12, 31)
+
+    statement_counter["count"] = 0
+    summary = payroll_reports.generate_payroll_summary(db, carrier_id, start, end)
+    assert statement_counter["count"] == 3
+    assert summary["summary"]["total_paid"] == 2925.0
+    assert summary["summary"]["settlement_count"] == 3
+    assert summary["summary"]["driver_count"] == 1
+    assert summary["summary"]["total_line_items"] == 6
+    assert summary["category_breakdown"] == {"base_pay": 3000.0, "adjustment": -75.0}
+    assert summary["status_breakdown"]["paid"] == {"count": 1, "total": 975.0}
+
+    statement_counter["count"] = 0
+    history = payroll_reports.generate_driver_pay_history(db, driver_id)
+    assert statement_counter["count"] == 3
+    assert history["summary"]["total_earned"] == 975.0
+    assert history["summary"]["pending_amount"] == 1950.0
+    assert history["history"][0]["status"] == "draft"
+    assert history["history"][0]["lines"][0]["load_info"]["pickup_location"] == "Dallas, TX"
+
+    statement_counter["count"] = 0
+    variance = payroll_reports.generate_variance_report(db, carrier_id, start, end)
+    assert statement_counter["count"] == 2
+    assert variance["summary"]["decreases_count"] == 3
+    assert variance["summary"]["total_decrease_amount"] == 75.0
+    assert variance["adjustments"][0]["payee_name"] == "Report Payee"
+
+
+def test_ytd_report_reads_rollup_refreshed_on_status_change(client, db, carrier):
+    _, settlement_ids = _seed_settlements(db, carrier)
+    assert client.get("/payroll/reports/ytd", params={"year": 2026}).json()["summary"]["total_paid"] == 0.0
+
+    client.post(f"/payroll/settlements/{settlement_ids[1]}/approve")
+    client.post(f"/payroll/settlements/{settlement_ids[2]}/approve")
+    report = client.get("/payroll/reports/ytd", params={"year": 2026}).json()
+    assert report["summary"]["total_paid"] == 1950.0
+    assert report["summary"]["settlement_count"] == 2
+    assert report["category_breakdown"] == {"base_pay": 2000.0, "adjustment": -50.0}
+
+    client.post(f"/payroll/settlements/{settlement_ids[2]}/void")
+    report = client.get("/payroll/reports/ytd", params={"year": 2026}).json()
+    assert report["summary"]["total_paid"] == 975.0
+    assert report["by_payee"][0]["payee_name"] == "Report Payee"
+
+
+def test_recalc_refreshes_rollup_of_approved_settlement(client, db, carrier):
+    from app.services.pay_engine import recalc_load_pay, recalc_loads_pay
+
+    driver, load_ids = _seed_recalc(db, carrier, load_count=2)
+    payee_id = driver.payee_id
+    settlement = client.post("/payroll/settlements", json={
+        "payee_id": payee_id, "period_start": "2026-03-01T00:00:00", "period_end": "2026-03-07T00:00:00",
+    }).json()
+    client.post(f"/payroll/settlements/{settlement['id']}/approve")
+
+    def rollup():
+        rows = db.query(models.PayrollPeriodRollup).filter_by(settlement_id=settlement["id"])
+        return {row.category: (row.total_amount, row.line_count) for row in rows}
+
+    # Two loads: base pay 25% of 1000 and 1100, detention 50 each
+    assert rollup() == {"base_pay": (525.0, 2), "detention": (100.0, 2)}
+
+    db.query(models.DriverPayProfile).update({"rate": 30})
+    db.commit()
+    db.expire_all()
+    recalc_load_pay(db, db.get(models.Load, load_ids[0]))
+    # The first load's lines left the approved settlement and are pending again
+    assert rollup() == {"base_pay": (275.0, 1), "detention": (50.0, 1)}
+
+    recalc_loads_pay(db, carrier.id, load_ids=load_ids)
+    assert rollup() == {"detention": (50.0, 1)}
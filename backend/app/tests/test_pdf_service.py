@@ -0,0 +1,148 @@
+# Tests for the shared headless browser used for POD PDFs
+import asyncio
+import io
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from app.services.browser_pool import BrowserPool
+
+
+def _blank_pdf() -> bytes:
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class FakeChromium:
+    """Stands in for Playwright's browser/context/page objects; records activity."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.connected = True
+        self.active = 0
+        self.peak = 0
+        self.crash_next = False
+
+    async def new_context(self, **kwargs):
+        return FakeContext(self)
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    def is_closed(self):
+        return self.context.closed or not self.context.browser.connected
+
+    async def set_content(self, html, **kwargs):
+        browser = self.context.browser
+        if browser.crash_next:
+            browser.crash_next = False
+            browser.connected = False
+            raise RuntimeError("Target page, context or browser has been closed")
+        browser.active += 1
+        browser.peak = max(browser.peak, browser.active)
+        await asyncio.sleep(browser.delay)
+        browser.active -= 1
+
+    async def pdf(self, **kwargs):
+        return _blank_pdf()
+
+
+class FakePlaywright:
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = BrowserPool(max_pages=2, page_reuse=3)
+    pool.browsers = []
+
+    async def launch():
+        browser = FakeChromium(delay=0.01)
+        pool.browsers.append(browser)
+        return FakePlaywright(), browser
+
+    monkeypatch.setattr(pool, "_launch", launch)
+    return pool
+
+
+def test_browser_is_reused_and_pages_recycled(pool):
+    async def run():
+        for _ in range(7):
+            await pool.render_pdf("<p>POD</p>")
+
+    asyncio.run(run())
+    stats = pool.stats()
+    assert stats["launches"] == 1
+    assert stats["renders"] == 7
+    # Sequential renders share one page, replaced every 3 uses
+    assert stats["pages_created"] == 3 and stats["pages_recycled"] == 2
+
+
+def test_concurrency_is_capped(pool):
+    async def run():
+        return await pool.render_many(["<p>POD</p>"] * 10)
+
+    results = asyncio.run(run())
+    assert len(results) == 10
+    assert pool.browsers[0].peak == 2
+    assert pool.stats()["pages_created"] <= 4
+
+
+def test_crashed_browser_is_relaunched_and_render_retried(pool):
+    async def run():
+        await pool.render_pdf("<p>first</p>")
+        pool.browsers[0].crash_next = True
+        return await pool.render_pdf("<p>second</p>")
+
+    assert asyncio.run(run()).startswith(b"%PDF")
+    stats = pool.stats()
+    assert stats["launches"] == 2 and stats["restarts"] == 1 and stats["retries"] == 1
+    assert stats["connected"] is True
+
+
+def test_pod_packet_merges_renders(pool, monkeypatch):
+    from app.services import pdf_service
+
+    monkeypatch.setattr(pdf_service, "browser_pool", pool)
+    pods = [{"load_data": {"id": i, "load_number": f"L-{i}"}, "pod_data": {"receiver_name": "Dock 4"},
+             "company_data": {"company_name": "Summit Freight"}} for i in range(3)]
+    html = pdf_service.PDFService().render_pod_html(**pods[0])
+    assert "L-0" in html and "Dock 4" in html
+
+    packet = asyncio.run(pdf_service.PDFService().generate_pod_packet(pods))
+    assert len(PdfReader(io.BytesIO(packet)).pages) == 3
+
+
+def test_renders_from_separate_loops_share_one_browser(pool):
+    first = asyncio.run(pool.render_pdf("<p>first</p>"))
+    second = asyncio.run(pool.render_pdf("<p>second</p>"))
+    assert first.startswith(b"%PDF") and second.startswith(b"%PDF")
+    assert pool.stats()["launches"] == 1 and pool.stats()["pages_created"] == 1
+
+    asyncio.run(pool.close())
+    assert [browser.connected for browser in pool.browsers] == [False]
+    assert not pool.stats()["connected"]
@@ -1,4 +1,180 @@
-# Stub tests for pod module
+# Tests for POD uploads to Dropbox
+import json
+import time
+
+import pytest
+
+from app import models
+
+INCORRECT_OFFSET = {"error_summary": "incorrect_offset/..", "error": {".tag": "incorrect_offset", "correct_offset": 8}}
+
 
 def test_pod_stub():
     assert True
+
+
+@pytest.fixture
+def dropbox_stub(stub_server, monkeypatch):
+    """Point the Dropbox service at the stub server; links resolve, uploads succeed unless scripted."""
+    from app.core.config import settings
+    from app.services import dropbox
+    from app.services.dropbox import dropbox_http
+
+    monkeypatch.setattr(dropbox, "DROPBOX_CONTENT_URL", f"{stub_server.url}/content")
+    monkeypatch.setattr(dropbox, "DROPBOX_API_URL", f"{stub_server.url}/api")
+    monkeypatch.setattr(settings, "ENABLE_DROPBOX", True)
+    monkeypatch.setattr(settings, "DROPBOX_ACCESS_TOKEN", "test-token")
+    original = dropbox_http.config
+    dropbox_http.configure(rate_per_second=None, max_retries=0, backoff_base=0, backoff_max=0, failure_threshold=0)
+    stub_server.scripts["/content/files/upload"] = [(200, {})]
+    stub_server.scripts["/api/sharing/create_shared_link_with_settings"] = [(200, {"url": "https://dropbox.test/s/pod"})]
+    try:
+        yield stub_server
+    finally:
+        dropbox_http.configure(**original.__dict__)
+
+
+@pytest.fixture
+def pod_load(db, carrier):
+    user = models.User(id=1, carrier_id=carrier.id, email="dispatch@example.com", password_hash="x", role="admin")
+    driver = models.Driver(carrier_id=carrier.id, name="Driver 1")
+    db.add_all([user, driver])
+    db.flush()
+    load = models.Load(carrier_id=carrier.id, load_number="L-100", pickup_address="x", delivery_address="y",
+                       driver_id=driver.id)
+    db.add(load)
+    db.commit()
+    return load
+
+
+def _files(count, size=16):
+    return [("files", (f"pod-{i}.pdf", bytes([i]) * size, "application/pdf")) for i in range(count)]
+
+
+def test_large_file_uses_upload_session_and_resumes_from_correct_offset(client, db, pod_load, dropbox_stub, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "DROPBOX_UPLOAD_CHUNK_SIZE", 4)
+    dropbox_stub.scripts["/content/files/upload_session/start"] = [(200, {"session_id": "s1"})]
+    # The first append landed but its response was lost: Dropbox already has 8 bytes
+    dropbox_stub.scripts["/content/files/upload_session/append_v2"] = [(409, INCORRECT_OFFSET), (200, {})]
+    dropbox_stub.scripts["/content/files/upload_session/finish"] = [(200, {})]
+
+    res = client.post("/pod/upload", data={"load_id": str(pod_load.id)},
+                      files=[("files", ("pod.pdf", b"0123456789", "application/pdf"))])
+    assert res.status_code == 200, res.text
+    assert res.json()["upload_status"] == "completed"
+    assert res.json()["links"] == ["https://dropbox.test/s/pod"]
+
+    sent = [(path, json.loads(headers["Dropbox-API-Arg"]), body) for path, headers, body in dropbox_stub.requests
+            if path.startswith("/content/")]
+    assert [(path.rsplit("/", 1)[1], body) for path, _, body in sent] == [
+        ("start", b"0123"), ("append_v2", b"4567"), ("finish", b"89"),
+    ]
+    assert sent[2][1]["cursor"] == {"session_id": "s1", "offset": 8}
+    assert sent[2][1]["commit"]["path"].endswith(f"/loads/{pod_load.id}/POD/pod.pdf")
+    assert "/content/files/upload" not in dropbox_stub.hits
+
+
+def test_files_upload_concurrently(client, db, pod_load, dropbox_stub):
+    dropbox_stub.scripts["/content/files/upload"] = [(200, {}, 0.3)]
+
+    started = time.perf_counter()
+    res = client.post("/pod/upload", data={"load_id": str(pod_load.id)}, files=_files(4))
+    elapsed = time.perf_counter() - started
+
+    assert res.status_code == 200, res.text
+    assert len(res.json()["links"]) == 4
+    assert dropbox_stub.hits["/content/files/upload"] == 4
+    assert elapsed < 0.9  # four 0.3s uploads, serially 1.2s
+
+
+def test_partial_failure_keeps_uploaded_files(client, db, pod_load, dropbox_stub):
+    dropbox_stub.scripts["/content/files/upload"] = [(200, {}), (409, {"error_summary": "path/insufficient_space/"})]
+
+    res = client.post("/pod/upload", data={"load_id": str(pod_load.id)}, files=_files(2))
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert body["upload_status"] == "partial"
+    assert sorted(entry["status"] for entry in body["files"]) == ["failed", "uploaded"]
+    assert len(body["links"]) == 1
+
+    documents = db.query(models.DocumentExchange).order_by(models.DocumentExchange.id).all()
+    assert sorted(doc.upload_status for doc in documents) == ["completed", "failed"]
+    failed = next(doc for doc in documents if doc.upload_status == "failed")
+    assert failed.attachment_url == "" and "409" in failed.upload_error
+
+    dropbox_stub.scripts["/content/files/upload"] = [(409, {"error_summary": "path/insufficient_space/"})]
+    res = client.post("/pod/upload", data={"load_id": str(pod_load.id)}, files=_files(1))
+    assert res.status_code == 502
+
+
+def test_background_upload_reports_per_file_status(client, db, pod_load, dropbox_stub):
+    res = client.post(
+        "/pod/upload",
+        data={"load_id": str(pod_load.id), "background": "true"},
+        files=_files(3) + [("signature", ("sig.png", b"\x89PNG", "image/png"))],
+    )
+    assert res.status_code == 200, res.text
+    body = res.json()
+    for _ in range(100):
+        job = client.get(f"/jobs/{body['job_id']}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "succeeded", job
+    assert job["progress"] == job["total"] == 4
+    assert job["result"]["upload_status"] == "completed"
+    assert job["result"]["signature_link"] == "https://dropbox.test/s/pod"
+
+    db.expire_all()
+    history = client.get("/pod/history").json()
+    assert history[0]["id"] == body["pod_id"]
+    assert history[0]["upload_status"] == "completed"
+    assert [entry["filename"] for entry in history[0]["files"]] == ["pod-0.pdf", "pod-1.pdf", "pod-2.pdf", "signature.png"]
+    assert len(history[0]["file_links"]) == 3
+    exchange = client.get("/pod/documents-exchange").json()
+    assert {doc["upload_status"] for doc in exchange} == {"completed"} and len(exchange) == 3
+
+
+def test_status_commits_stay_off_the_upload_event_loop(client, db, pod_load, dropbox_stub, monkeypatch):
+    import asyncio
+
+    commit = db.commit
+    on_loop = []
+
+    def recording_commit():
+        on_loop.append(asyncio._get_running_loop() is not None)
+        commit()
+
+    monkeypatch.setattr(db, "commit", recording_commit)
+    res = client.post("/pod/upload", data={"load_id": str(pod_load.id)}, files=_files(3))
+    assert res.status_code == 200, res.text
+    assert res.json()["upload_status"] == "completed"
+    assert on_loop and not any(on_loop)
+
+
+def test_signature_comes_from_the_form_not_the_filename(client, db, carrier, dropbox_stub):
+    db.add(models.User(id=1, carrier_id=carrier.id, email="dispatch@example.com", password_hash="x", role="admin"))
+    load = models.Load(carrier_id=carrier.id, load_number="L-200", pickup_address="x", delivery_address="y")
+    db.add(load)
+    db.commit()
+
+    # No driver, so no document rows; a regular file happens to be called signature.png
+    res = client.post("/pod/upload", data={"load_id": str(load.id)},
+                      files=[("files", ("signature.png", b"\x89PNG", "image/png"))])
+    assert res.status_code == 200, res.text
+    assert res.json()["links"] == ["https://dropbox.test/s/pod"]
+    assert res.json()["signature_link"] is None
+
+
+
+def test_same_named_files_get_distinct_paths(client, db, pod_load, dropbox_stub):
+    files = [("files", ("image.jpg", bytes([i]) * 8, "image/jpeg")) for i in range(3)]
+    res = client.post("/pod/upload", data={"load_id": str(pod_load.id)}, files=files)
+    assert res.status_code == 200, res.text
+    assert [entry["filename"] for entry in res.json()["files"]] == ["image.jpg"] * 3
+
+    uploaded = {json.loads(headers["Dropbox-API-Arg"])["path"].rsplit("/", 1)[1]: body
+                for path, headers, body in dropbox_stub.requests if path == "/content/files/upload"}
+    assert uploaded == {"image.jpg": bytes([0]) * 8, "image (2).jpg": bytes([1]) * 8, "image (3).jpg": bytes([2]) * 8}
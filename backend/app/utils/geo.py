@@ -0,0 +1,54 @@
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def _farthest(x: np.ndarray, y: np.ndarray, first: int, last: int) -> Tuple[float, int]:
+    """Largest perpendicular distance from the chord first→last, and its index."""
+    if last - first < 2:
+        return 0.0, -1
+    xs, ys = x[first + 1:last], y[first + 1:last]
+    dx, dy = x[last] - x[first], y[last] - y[first]
+    norm = math.hypot(dx, dy)
+    if norm == 0:
+        distances = np.hypot(xs - x[first], ys - y[first])
+    else:
+        distances = np.abs(dy * (xs - x[first]) - dx * (ys - y[first])) / norm
+    offset = int(np.argmax(distances))
+    return float(distances[offset]), first + 1 + offset
+
+
+def simplify_to_count(points: Sequence[Sequence[float]], max_points: int, lat_index: int = 1, lon_index: int = 2) -> List:
+    """
+    Douglas-Peucker keeping at most max_points, most significant first.
+
+    Segments are split in order of their farthest point's deviation (a heap
+    instead of a fixed tolerance), so the result is the best max_points-point
+    approximation the algorithm can produce. Distances use an equirectangular
+    projection around the track's mean latitude, which is accurate enough for
+    choosing points on a driving trail. Endpoints are always kept.
+    """
+    if max_points < 2:
+        raise ValueError("max_points must be at least 2")
+    if len(points) <= max_points:
+        return list(points)
+
+    lat = np.fromiter((point[lat_index] for point in points), dtype=float, count=len(points))
+    lon = np.fromiter((point[lon_index] for point in points), dtype=float, count=len(points))
+    x = np.radians(lon) * math.cos(math.radians(float(lat.mean())))
+    y = np.radians(lat)
+
+    last = len(points) - 1
+    keep = {0, last}
+    distance, index = _farthest(x, y, 0, last)
+    heap = [(-distance, index, 0, last)] if index >= 0 else []
+    while heap and len(keep) < max_points:
+        _, index, first, end = heapq.heappop(heap)
+        keep.add(index)
+        for a, b in ((first, index), (index, end)):
+            distance, split = _farthest(x, y, a, b)
+            if split >= 0:
+                heapq.heappush(heap, (-distance, split, a, b))
+    return [points[i] for i in sorted(keep)]
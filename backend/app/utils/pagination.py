@@ -0,0 +1,31 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for (created_at, id) ordered listings."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        ts, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(created_col, id_col, cursor: Optional[str], descending: bool = True):
+    """Filter clause selecting rows strictly after the cursor position, or None."""
+    if not cursor:
+        return None
+    created_at, row_id = decode_cursor(cursor)
+    if descending:
+        return or_(created_col < created_at, and_(created_col == created_at, id_col < row_id))
+    return or_(created_col > created_at, and_(created_col == created_at, id_col > row_id))
@@ -0,0 +1,53 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+
+def upsert(
+    db: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    conflict_columns: Iterable[str],
+    update_columns: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    INSERT ... ON CONFLICT DO UPDATE for PostgreSQL and SQLite.
+
+    Rows conflicting on conflict_columns (a unique index) get update_columns
+    overwritten, defaulting to every column in the first row except the
+    conflict columns; an empty update_columns leaves existing rows untouched
+    (ON CONFLICT DO NOTHING). Other dialects fall back to Session.merge-style
+    lookups.
+    """
+    if not rows:
+        return
+    conflict_columns = list(conflict_columns)
+    if update_columns is None:
+        update_columns = [c for c in rows[0] if c not in conflict_columns]
+    update_columns = list(update_columns)
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model).values(rows)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={name: stmt.excluded[name] for name in update_columns},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        db.execute(stmt)
+        return
+
+    for row in rows:
+        existing = db.query(model).filter_by(**{c: row[c] for c in conflict_columns}).first()
+        if existing is None:
+            db.add(model(**row))
+        else:
+            for name in update_columns:
+                setattr(existing, name, row[name])
+    db.flush()
@@ -4,7 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { Plus, LayoutGrid, List, Filter, Download, RefreshCw, Columns } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
-import { apiFetch, API_BASE, getToken } from '@/lib/api';
+import { apiFetch, apiFetchAllPages, API_BASE, getToken } from '@/lib/api';
 import { LoadCard, Load, LoadListView, LoadDetailModal } from '@/components/loads';
 import { LoadKanbanBoard } from '@/components/loads/LoadKanbanBoard';
 import AICreateLoadModal from '@/components/AICreateLoadModal';
@@ -57,7 +57,7 @@ export default function LoadsPage() {
     try {
       setLoading(true);
       const [loadsRes, settingsRes, driversRes, customersRes, equipmentRes] = await Promise.all([
-        apiFetch('/loads'),
+        apiFetchAllPages('/loads'),
         getFinancialSettings(),
         apiFetch('/drivers'),
         apiFetch('/customers'),
@@ -40,6 +40,8 @@ type PayeeDetail = {
   payee_type: string;
   lines: LedgerLine[];
   total: number;
+  line_count: number;
+  next_cursor: string | null;
 };
 
 type Settlement = {
@@ -109,10 +111,17 @@ export default function PayrollPage() {
     setSelectedPayeeDetail(null);
     try {
       const token = getToken();
-      const res = await apiFetch(`/payroll/payables-grouped/${payeeId}/lines`, {
-        headers: token ? { Authorization: `Bearer ${token}` } : undefined,
-      });
-      setSelectedPayeeDetail(res);
+      const headers = token ? { Authorization: `Bearer ${token}` } : undefined;
+      // Lines come in pages; follow next_cursor so large payees are not cut off
+      const path = `/payroll/payables-grouped/${payeeId}/lines`;
+      const detail: PayeeDetail = await apiFetch(path, { headers });
+      let cursor = detail.next_cursor;
+      while (cursor) {
+        const page: PayeeDetail = await apiFetch(`${path}?cursor=${encodeURIComponent(cursor)}`, { headers });
+        detail.lines.push(...page.lines);
+        cursor = page.next_cursor;
+      }
+      setSelectedPayeeDetail({ ...detail, next_cursor: null });
     } catch (err) {
       setError(getErrorMessage(err, "Failed to load payee details"));
     } finally {
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
-import { apiFetch, getErrorMessage, getToken } from "../../../../lib/api";
+import { apiFetch, apiFetchAllPages, getErrorMessage, getToken } from "../../../../lib/api";
 import MapPreview from "../../../../components/MapPreview";
 
 type Load = {
@@ -46,7 +46,7 @@ export default function DriverLoads() {
           const match = drivers.find((d) => d.id === me.driver_id);
           if (match?.name) setDriverName(match.name);
         }
-        const res = await apiFetch("/loads", {
+        const res = await apiFetchAllPages("/loads", {
           headers: { Authorization: `Bearer ${token}` },
         });
         setLoads(res);
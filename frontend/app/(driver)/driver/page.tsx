@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import Link from "next/link";
-import { apiFetch, getErrorMessage, getToken } from "../../../lib/api";
+import { apiFetch, apiFetchAllPages, getErrorMessage, getToken } from "../../../lib/api";
 
 type Load = {
   id: number;
@@ -36,7 +36,7 @@ export default function DriverDashboard() {
           const match = drivers.find((d) => d.id === me.driver_id);
           if (match?.name) setDriverName(match.name);
         }
-        const res = await apiFetch("/loads", {
+        const res = await apiFetchAllPages("/loads", {
           headers: token ? { Authorization: `Bearer ${token}` } : undefined,
         });
         setLoads(res);
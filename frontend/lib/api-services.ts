@@ -3,7 +3,7 @@
  * Centralized API calls for all backend endpoints
  */
 
-import { apiFetch, getToken } from "./api";
+import { apiFetch, apiFetchAllPages, getToken } from "./api";
 
 // ============================================================================
 // AUTHENTICATION
@@ -101,7 +101,7 @@ export const customersApi = {
 export const loadsApi = {
   getAll: async (params?: any) => {
     const query = params ? `?${new URLSearchParams(params)}` : "";
-    return apiFetch(`/loads${query}`, {
+    return apiFetchAllPages(`/loads${query}`, {
       headers: { Authorization: `Bearer ${getToken()}` },
     });
   },
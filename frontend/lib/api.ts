@@ -48,7 +48,7 @@ export function getDriverId(): number | null {
   return decoded?.driver_id || null;
 }
 
-export async function apiFetch(path: string, init: RequestInit = {}) {
+async function apiResponse(path: string, init: RequestInit = {}) {
   const url = `${API_BASE}${path.startsWith("/") ? path : `/${path}`}`;
   
   // Get token and add Authorization header
@@ -73,6 +73,11 @@ export async function apiFetch(path: string, init: RequestInit = {}) {
     const text = await res.text();
     throw new Error(text || `HTTP ${res.status}`);
   }
+  return res;
+}
+
+export async function apiFetch(path: string, init: RequestInit = {}) {
+  const res = await apiResponse(path, init);
   
   const contentType = res.headers.get("content-type") || "";
   if (contentType.includes("application/json")) {
@@ -81,6 +86,23 @@ export async function apiFetch(path: string, init: RequestInit = {}) {
   return res.text();
 }
 
+/**
+ * Fetch every page of a cursor-paged list endpoint (e.g. /loads), following
+ * the X-Next-Cursor response header until the last page.
+ */
+export async function apiFetchAllPages<T = any>(path: string, init: RequestInit = {}): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const separator = path.includes("?") ? "&" : "?";
+    const pagePath: string = cursor ? `${path}${separator}cursor=${encodeURIComponent(cursor)}` : path;
+    const res = await apiResponse(pagePath, init);
+    items.push(...((await res.json()) as T[]));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
+}
+
 export function getErrorMessage(err: unknown, fallback: string) {
   if (err instanceof Error) return err.message || fallback;
   if (typeof err === "string") return err || fallback;